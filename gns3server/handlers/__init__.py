@@ -19,6 +19,7 @@ import os
 
 from gns3server.handlers.api.version_handler import VersionHandler
 from gns3server.handlers.api.network_handler import NetworkHandler
+from gns3server.handlers.api.link_handler import LinkHandler
 from gns3server.handlers.api.project_handler import ProjectHandler
 from gns3server.handlers.api.dynamips_device_handler import DynamipsDeviceHandler
 from gns3server.handlers.api.dynamips_vm_handler import DynamipsVMHandler
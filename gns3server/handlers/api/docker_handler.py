@@ -88,10 +88,11 @@ class DockerHandler:
 
     @classmethod
     @Route.post(
-        r"/projects/{project_id}/docker/vms/{id}/start",
+        r"/projects/{project_id}/docker/vms/{vm_id}/start",
+        long_running=True,
         parameters={
             "project_id": "UUID of the project",
-            "id": "ID of the container"
+            "vm_id": "ID of the container"
         },
         status_codes={
             204: "Instance started",
@@ -104,17 +105,18 @@ class DockerHandler:
     def start(request, response):
         docker_manager = Docker.instance()
         container = docker_manager.get_vm(
-            request.match_info["id"],
+            request.match_info["vm_id"],
             project_id=request.match_info["project_id"])
         yield from container.start()
         response.set_status(204)
 
     @classmethod
     @Route.post(
-        r"/projects/{project_id}/docker/vms/{id}/stop",
+        r"/projects/{project_id}/docker/vms/{vm_id}/stop",
+        long_running=True,
         parameters={
             "project_id": "UUID of the project",
-            "id": "ID of the container"
+            "vm_id": "ID of the container"
         },
         status_codes={
             204: "Instance stopped",
@@ -127,17 +129,18 @@ class DockerHandler:
     def stop(request, response):
         docker_manager = Docker.instance()
         container = docker_manager.get_vm(
-            request.match_info["id"],
+            request.match_info["vm_id"],
             project_id=request.match_info["project_id"])
         yield from container.stop()
         response.set_status(204)
 
     @classmethod
     @Route.post(
-        r"/projects/{project_id}/docker/vms/{id}/reload",
+        r"/projects/{project_id}/docker/vms/{vm_id}/reload",
+        long_running=True,
         parameters={
             "project_id": "UUID of the project",
-            "id": "ID of the container"
+            "vm_id": "ID of the container"
         },
         status_codes={
             204: "Instance restarted",
@@ -150,16 +153,16 @@ class DockerHandler:
     def reload(request, response):
         docker_manager = Docker.instance()
         container = docker_manager.get_vm(
-            request.match_info["id"],
+            request.match_info["vm_id"],
             project_id=request.match_info["project_id"])
         yield from container.restart()
         response.set_status(204)
 
     @classmethod
     @Route.delete(
-        r"/projects/{project_id}/docker/vms/{id}",
+        r"/projects/{project_id}/docker/vms/{vm_id}",
         parameters={
-            "id": "ID for the container",
+            "vm_id": "ID for the container",
             "project_id": "UUID for the project"
         },
         status_codes={
@@ -171,17 +174,17 @@ class DockerHandler:
     def delete(request, response):
         docker_manager = Docker.instance()
         container = docker_manager.get_vm(
-            request.match_info["id"],
+            request.match_info["vm_id"],
             project_id=request.match_info["project_id"])
         yield from container.delete()
         response.set_status(204)
 
     @classmethod
     @Route.post(
-        r"/projects/{project_id}/docker/vms/{id}/suspend",
+        r"/projects/{project_id}/docker/vms/{vm_id}/suspend",
         parameters={
             "project_id": "UUID of the project",
-            "id": "ID of the container"
+            "vm_id": "ID of the container"
         },
         status_codes={
             204: "Instance paused",
@@ -194,7 +197,7 @@ class DockerHandler:
     def suspend(request, response):
         docker_manager = Docker.instance()
         container = docker_manager.get_vm(
-            request.match_info["id"],
+            request.match_info["vm_id"],
             project_id=request.match_info["project_id"])
         yield from container.pause()
         response.set_status(204)
@@ -203,7 +206,7 @@ class DockerHandler:
         r"/projects/{project_id}/docker/vms/{vm_id}/adapters/{adapter_number:\d+}/ports/{port_number:\d+}/nio",
         parameters={
             "project_id": "UUID for the project",
-            "id": "ID of the container",
+            "vm_id": "ID of the container",
             "adapter_number": "Adapter where the nio should be added",
             "port_number": "Port on the adapter"
         },
@@ -233,7 +236,7 @@ class DockerHandler:
         r"/projects/{project_id}/docker/vms/{vm_id}/adapters/{adapter_number:\d+}/ports/{port_number:\d+}/nio",
         parameters={
             "project_id": "UUID for the project",
-            "id": "ID of the container",
+            "vm_id": "ID of the container",
             "adapter_number": "Adapter where the nio should be added",
             "port_number": "Port on the adapter"
         },
@@ -149,15 +149,16 @@ class DynamipsDeviceHandler:
         port_settings = request.json.get("port_settings")
         mappings = request.json.get("mappings")
 
-        if asyncio.iscoroutinefunction(device.add_nio):
-            yield from device.add_nio(nio, port_number)
-        else:
-            device.add_nio(nio, port_number)
-
         if port_settings:
-            yield from device.set_port_settings(port_number, port_settings)
-        elif mappings:
-            yield from device.set_mappings(mappings)
+            # port settings are sent to the hypervisor with the NIO in one batch
+            yield from device.add_nio(nio, port_number, port_settings)
+        else:
+            if asyncio.iscoroutinefunction(device.add_nio):
+                yield from device.add_nio(nio, port_number)
+            else:
+                device.add_nio(nio, port_number)
+            if mappings:
+                yield from device.set_mappings(mappings)
 
         response.set_status(201)
         response.json(nio)
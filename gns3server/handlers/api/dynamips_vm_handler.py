@@ -70,6 +70,8 @@ class DynamipsVMHandler:
                                                    request.json.get("vm_id"),
                                                    request.json.get("dynamips_id"),
                                                    platform,
+                                                   image=request.json.get("image"),
+                                                   ram=request.json.get("ram"),
                                                    console=request.json.get("console"),
                                                    aux=request.json.get("aux"),
                                                    chassis=request.json.pop("chassis", default_chassis))
@@ -146,6 +148,7 @@ class DynamipsVMHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/dynamips/vms/{vm_id}/start",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -170,6 +173,7 @@ class DynamipsVMHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/dynamips/vms/{vm_id}/stop",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -230,6 +234,7 @@ class DynamipsVMHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/dynamips/vms/{vm_id}/reload",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -429,6 +434,8 @@ class DynamipsVMHandler:
 
     @Route.get(
         r"/projects/{project_id}/dynamips/vms/{vm_id}/idlepc_proposals",
+        read_only=False,
+        long_running=True,
         status_codes={
             200: "Idle-PCs retrieved",
             400: "Invalid request",
@@ -448,6 +455,8 @@ class DynamipsVMHandler:
 
     @Route.get(
         r"/projects/{project_id}/dynamips/vms/{vm_id}/auto_idlepc",
+        read_only=False,
+        long_running=True,
         status_codes={
             200: "Best Idle-pc value found",
             400: "Invalid request",
@@ -459,7 +468,8 @@ class DynamipsVMHandler:
         dynamips_manager = Dynamips.instance()
         vm = dynamips_manager.get_vm(request.match_info["vm_id"],
                                      project_id=request.match_info["project_id"])
-        idlepc = yield from dynamips_manager.auto_idlepc(vm)
+        use_database = bool(int(request.GET.get("use_database", "1")))
+        idlepc = yield from dynamips_manager.auto_idlepc(vm, use_database=use_database)
         response.set_status(200)
         response.json({"idlepc": idlepc})
 
@@ -481,11 +491,12 @@ class DynamipsVMHandler:
         r"/dynamips/vms/{path}",
         status_codes={
             204: "Image uploaded",
+            409: "Could not write the image or resume its upload",
         },
         raw=True,
-        description="Upload Dynamips image.")
+        description="Upload Dynamips image, an interrupted upload is resumed with the offset query parameter.")
     def upload_vm(request, response):
 
         dynamips_manager = Dynamips.instance()
-        yield from dynamips_manager.write_image(request.match_info["path"], request.content)
+        yield from dynamips_manager.write_image(request.match_info["path"], request.content, offset=request.GET.get("offset", 0))
         response.set_status(204)
@@ -14,11 +14,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import asyncio
 import aiohttp
 
 from ...web.route import Route
 from ...schemas.file import FILE_STREAM_SCHEMA
+from ...utils.pcap_filter import PcapFilter, PcapFilterError
+from ...utils.asyncio.pcap_stream import PcapStream
 
 
 class FileHandler:
@@ -35,28 +36,41 @@ class FileHandler:
         input=FILE_STREAM_SCHEMA
     )
     def read(request, response):
-        response.enable_chunked_encoding()
 
-        if not request.json.get("location").endswith(".pcap"):
+        location = request.json.get("location")
+        if not location.endswith(".pcap"):
             raise aiohttp.web.HTTPForbidden(text="Only .pcap file are allowed")
 
+        packet_filter = None
+        if request.json.get("filter"):
+            try:
+                packet_filter = PcapFilter(request.json["filter"])
+            except PcapFilterError as e:
+                raise aiohttp.web.HTTPBadRequest(text=str(e))
+
         try:
-            with open(request.json.get("location"), "rb") as f:
-                loop = asyncio.get_event_loop()
-                response.content_type = "application/octet-stream"
-                response.set_status(200)
-                # Very important: do not send a content lenght otherwise QT close the connection but curl can consume the Feed
-                response.content_length = None
-
-                response.start(request)
-
-                while True:
-                    data = yield from loop.run_in_executor(None, f.read, 16)
-                    if len(data) == 0:
-                        yield from asyncio.sleep(0.1)
-                    else:
-                        response.write(data)
+            subscriber = PcapStream.subscribe(location, packet_filter)
         except FileNotFoundError:
             raise aiohttp.web.HTTPNotFound()
         except OSError as e:
             raise aiohttp.web.HTTPConflict(text=str(e))
+
+        try:
+            response.enable_chunked_encoding()
+            response.content_type = "application/octet-stream"
+            response.set_status(200)
+            # Very important: do not send a content lenght otherwise QT close the connection but curl can consume the Feed
+            response.content_length = None
+            response.start(request)
+
+            while True:
+                data = yield from subscriber.read()
+                if not data:
+                    break
+                response.write(data)
+                yield from response.drain()
+            yield from response.write_eof()
+        except ConnectionError:
+            pass
+        finally:
+            subscriber.close()
@@ -134,6 +134,7 @@ class IOUHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/iou/vms/{vm_id}/start",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -163,6 +164,7 @@ class IOUHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/iou/vms/{vm_id}/stop",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -183,6 +185,7 @@ class IOUHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/iou/vms/{vm_id}/reload",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance",
@@ -377,11 +380,12 @@ class IOUHandler:
         r"/iou/vms/{path}",
         status_codes={
             204: "Image uploaded",
+            409: "Could not write the image or resume its upload",
         },
         raw=True,
-        description="Upload IOU image.")
+        description="Upload IOU image, an interrupted upload is resumed with the offset query parameter.")
     def upload_vm(request, response):
 
         iou_manager = IOU.instance()
-        yield from iou_manager.write_image(request.match_info["path"], request.content)
+        yield from iou_manager.write_image(request.match_info["path"], request.content, offset=request.GET.get("offset", 0))
         response.set_status(204)
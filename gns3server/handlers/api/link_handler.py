@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import aiohttp
+from collections import OrderedDict
+
+from ...web.route import Route
+from ...schemas.link import LINK_BULK_CREATE_SCHEMA
+from ...schemas.link import LINK_BULK_OBJECT_SCHEMA
+from ...modules import MODULES
+from ...modules.vm_error import VMError
+from ...modules.port_manager import PortManager
+from ...modules.project_manager import ProjectManager
+from ...ubridge.ubridge_error import UbridgeError
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class LinkHandler:
+
+    """
+    API entry points for links between VMs.
+    """
+
+    @classmethod
+    @Route.post(
+        r"/projects/{project_id}/links/bulk",
+        parameters={
+            "project_id": "The UUID of the project",
+        },
+        status_codes={
+            201: "Links processed, see the status of each link",
+            400: "Invalid request",
+            404: "The project doesn't exist",
+            409: "Not enough free UDP ports"
+        },
+        description="Create several UDP links between VMs on this server",
+        input=LINK_BULK_CREATE_SCHEMA,
+        output=LINK_BULK_OBJECT_SCHEMA)
+    def create_bulk(request, response):
+
+        pm = ProjectManager.instance()
+        project = pm.get_project(request.match_info["project_id"])
+        port_manager = PortManager.instance()
+        links = request.json["links"]
+
+        results = []
+        bindings = OrderedDict()
+        udp_ports = []
+        if links:
+            udp_ports = port_manager.get_free_udp_ports(project, len(links) * 2)
+            for link_index, link in enumerate(links):
+                results.append({"status": "created", "nios": [None, None]})
+                ports = udp_ports[link_index * 2:link_index * 2 + 2]
+                for side, endpoint in enumerate(link["endpoints"]):
+                    nio_settings = {"type": "nio_udp",
+                                    "lport": ports[side],
+                                    "rhost": "127.0.0.1",
+                                    "rport": ports[1 - side]}
+                    node_id = endpoint.get("vm_id", endpoint.get("device_id"))
+                    bindings.setdefault(node_id, []).append((link_index, side, endpoint, nio_settings))
+
+        try:
+            # the NIOs of a VM are bound in order while holding the VM lock,
+            # different VMs are handled concurrently
+            tasks = []
+            for node_id, node_bindings in bindings.items():
+                tasks.append(asyncio.async(Route.run_with_vm_lock(node_id, LinkHandler._bind_nios, project, node_bindings, results)))
+            if tasks:
+                yield from asyncio.wait(tasks)
+                for task in tasks:
+                    # raise unexpected errors
+                    task.result()
+        except BaseException:
+            for result in results:
+                result["status"] = "error"
+            raise
+        finally:
+            # a link is created only if both NIOs are bound, unbind the
+            # other NIO and release the ports of the links in error
+            yield from LinkHandler._unbind_nios(project, links, results)
+            for link_index, result in enumerate(results):
+                if result["status"] == "error":
+                    for port in udp_ports[link_index * 2:link_index * 2 + 2]:
+                        port_manager.release_udp_port(port, project)
+
+        response.set_status(201)
+        response.json({"links": results})
+
+    @staticmethod
+    def _get_node(project, endpoint):
+        """
+        Returns the manager and the VM (or Dynamips device) of an endpoint.
+        """
+
+        for module in MODULES:
+            if module.__name__.lower() == endpoint["module"]:
+                manager = module.instance()
+                break
+        else:
+            raise aiohttp.web.HTTPConflict(text="Module {} is not available on this server".format(endpoint["module"]))
+
+        if "device_id" in endpoint:
+            if not hasattr(manager, "get_device"):
+                raise aiohttp.web.HTTPConflict(text="Module {} has no devices".format(endpoint["module"]))
+            return manager, manager.get_device(endpoint["device_id"], project_id=project.id)
+        return manager, manager.get_vm(endpoint["vm_id"], project_id=project.id)
+
+    @staticmethod
+    @asyncio.coroutine
+    def _bind_nios(project, node_bindings, results):
+        """
+        Binds the NIOs of one VM and records the outcome in the link results.
+        """
+
+        for link_index, side, endpoint, nio_settings in node_bindings:
+            result = results[link_index]
+            try:
+                manager, node = LinkHandler._get_node(project, endpoint)
+                nio = yield from manager.add_nio_binding(node, endpoint["adapter_number"], endpoint["port_number"], nio_settings)
+                result["nios"][side] = nio.__json__()
+            except (VMError, UbridgeError) as e:
+                LinkHandler._link_error(result, side, nio_settings, str(e))
+            except aiohttp.web.HTTPException as e:
+                LinkHandler._link_error(result, side, nio_settings, e.text)
+
+    @staticmethod
+    @asyncio.coroutine
+    def _unbind_nios(project, links, results):
+        """
+        Removes the NIOs bound for the links in error.
+        """
+
+        unbindings = OrderedDict()
+        for link_index, result in enumerate(results):
+            if result["status"] != "error":
+                continue
+            for side, nio in enumerate(result["nios"]):
+                if nio is not None:
+                    endpoint = links[link_index]["endpoints"][side]
+                    node_id = endpoint.get("vm_id", endpoint.get("device_id"))
+                    unbindings.setdefault(node_id, []).append(endpoint)
+                    result["nios"][side] = None
+
+        tasks = []
+        for node_id, endpoints in unbindings.items():
+            tasks.append(asyncio.async(Route.run_with_vm_lock(node_id, LinkHandler._unbind_node_nios, project, endpoints)))
+        if tasks:
+            yield from asyncio.wait(tasks)
+            for task in tasks:
+                if task.exception():
+                    log.error("Could not unbind NIOs: {}".format(task.exception()))
+
+    @staticmethod
+    @asyncio.coroutine
+    def _unbind_node_nios(project, endpoints):
+
+        for endpoint in endpoints:
+            try:
+                manager, node = LinkHandler._get_node(project, endpoint)
+                yield from manager.remove_nio_binding(node, endpoint["adapter_number"], endpoint["port_number"])
+            except (VMError, UbridgeError) as e:
+                log.error("Could not unbind NIO of {}: {}".format(endpoint, e))
+            except aiohttp.web.HTTPException as e:
+                log.error("Could not unbind NIO of {}: {}".format(endpoint, e.text))
+
+    @staticmethod
+    def _link_error(result, side, nio_settings, message):
+
+        log.error("Could not bind NIO {}: {}".format(nio_settings, message))
+        result["status"] = "error"
+        result.setdefault("message", message)
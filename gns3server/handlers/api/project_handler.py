@@ -23,6 +23,7 @@ import psutil
 import tempfile
 
 from ...web.route import Route
+from ...web.sendfile import send_file
 from ...schemas.project import PROJECT_OBJECT_SCHEMA, PROJECT_CREATE_SCHEMA, PROJECT_UPDATE_SCHEMA, PROJECT_FILE_LIST_SCHEMA, PROJECT_LIST_SCHEMA
 from ...modules.project_manager import ProjectManager
 from ...modules import MODULES
@@ -211,17 +212,20 @@ class ProjectHandler:
         response.write("{}\n".format(json.dumps(ProjectHandler._getPingMessage())).encode("utf-8"))
         while True:
             try:
-                (action, msg) = yield from asyncio.wait_for(queue.get(), 5)
-                if hasattr(msg, "__json__"):
-                    msg = json.dumps({"action": action, "event": msg.__json__()}, sort_keys=True)
+                # the notifications are serialized once for all the clients
+                # and sent by batches, a slow client only fills its own queue
+                notifications = yield from queue.get_batch(timeout=5)
+                if notifications:
+                    data = b"".join(notification.data for notification in notifications)
+                    log.debug("Send notifications: %s", data)
+                    response.write(data)
                 else:
-                    msg = json.dumps({"action": action, "event": msg}, sort_keys=True)
-                log.debug("Send notification: %s", msg)
-                response.write(("{}\n".format(msg)).encode("utf-8"))
+                    response.write("{}\n".format(json.dumps(ProjectHandler._getPingMessage())).encode("utf-8"))
+                yield from response.drain()
             except asyncio.futures.CancelledError as e:
                 break
-            except asyncio.futures.TimeoutError:
-                response.write("{}\n".format(json.dumps(ProjectHandler._getPingMessage())).encode("utf-8"))
+            except ConnectionError:
+                break
         project.stop_listen_queue(queue)
         if project.id in ProjectHandler._notifications_listening:
             ProjectHandler._notifications_listening[project.id] -= 1
@@ -284,26 +288,7 @@ class ProjectHandler:
         if path[0] == ".":
             raise aiohttp.web.HTTPForbidden
         path = os.path.join(project.path, path)
-
-        response.content_type = "application/octet-stream"
-        response.set_status(200)
-        response.enable_chunked_encoding()
-        # Very important: do not send a content length otherwise QT close the connection but curl can consume the Feed
-        response.content_length = None
-
-        try:
-            with open(path, "rb") as f:
-                response.start(request)
-                while True:
-                    data = f.read(4096)
-                    if not data:
-                        break
-                    yield from response.write(data)
-
-        except FileNotFoundError:
-            raise aiohttp.web.HTTPNotFound()
-        except PermissionError:
-            raise aiohttp.web.HTTPForbidden()
+        yield from send_file(request, response, path)
 
     @classmethod
     @Route.post(
@@ -368,11 +353,15 @@ class ProjectHandler:
         response.content_length = None
         response.start(request)
 
-        include_images = bool(int(request.json.get("include_images", "0")))
-        for data in project.export(include_images=include_images):
+        @asyncio.coroutine
+        def write(data):
             response.write(data)
             yield from response.drain()
 
+        include_images = bool(int(request.json.get("include_images", "0")))
+        z = yield from project.export(include_images=include_images)
+        yield from z.stream(write)
+
         yield from response.write_eof()
 
     @classmethod
@@ -141,6 +141,7 @@ class QEMUHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/qemu/vms/{vm_id}/start",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -167,6 +168,7 @@ class QEMUHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/qemu/vms/{vm_id}/stop",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -187,6 +189,7 @@ class QEMUHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/qemu/vms/{vm_id}/reload",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance",
@@ -380,11 +383,12 @@ class QEMUHandler:
         r"/qemu/vms/{path:.+}",
         status_codes={
             204: "Image uploaded",
+            409: "Could not write the image or resume its upload",
         },
         raw=True,
-        description="Upload Qemu image.")
+        description="Upload Qemu image, an interrupted upload is resumed with the offset query parameter.")
     def upload_vm(request, response):
 
         qemu_manager = Qemu.instance()
-        yield from qemu_manager.write_image(request.match_info["path"], request.content)
+        yield from qemu_manager.write_image(request.match_info["path"], request.content, offset=request.GET.get("offset", 0))
         response.set_status(204)
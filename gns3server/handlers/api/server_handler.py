@@ -18,6 +18,7 @@
 from ...web.route import Route
 from ...config import Config
 from ...modules.project_manager import ProjectManager
+from ...web.route_metrics import RouteMetrics
 from aiohttp.web import HTTPForbidden
 
 import asyncio
@@ -64,3 +65,15 @@ class ServerHandler:
         server = Server.instance()
         asyncio.async(server.shutdown_server())
         response.set_status(201)
+
+    @classmethod
+    @Route.get(
+        r"/server/metrics",
+        description="Retrieve the metrics of the API calls in the Prometheus text format",
+        status_codes={
+            200: "Metrics returned"
+        })
+    def metrics(request, response):
+
+        response.headers["CONTENT-TYPE"] = "text/plain; version=0.0.4; charset=utf-8"
+        response.body = RouteMetrics.instance().prometheus().encode("utf-8")
@@ -177,6 +177,7 @@ class VirtualBoxHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/virtualbox/vms/{vm_id}/start",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -201,6 +202,7 @@ class VirtualBoxHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/virtualbox/vms/{vm_id}/stop",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -261,6 +263,7 @@ class VirtualBoxHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/virtualbox/vms/{vm_id}/reload",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -71,6 +71,9 @@ class VMwareHandler:
                                                  request.json.pop("linked_clone"),
                                                  console=request.json.get("console", None))
 
+        if "enable_remote_console" in request.json:
+            yield from vm.set_enable_remote_console(request.json.pop("enable_remote_console"))
+
         for name, value in request.json.items():
             if name != "vm_id":
                 if hasattr(vm, name) and getattr(vm, name) != value:
@@ -120,6 +123,9 @@ class VMwareHandler:
         vmware_manager = VMware.instance()
         vm = vmware_manager.get_vm(request.match_info["vm_id"], project_id=request.match_info["project_id"])
 
+        if "enable_remote_console" in request.json:
+            yield from vm.set_enable_remote_console(request.json.pop("enable_remote_console"))
+
         for name, value in request.json.items():
             if hasattr(vm, name) and getattr(vm, name) != value:
                 setattr(vm, name, value)
@@ -149,6 +155,7 @@ class VMwareHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/vmware/vms/{vm_id}/start",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -173,6 +180,7 @@ class VMwareHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/vmware/vms/{vm_id}/stop",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -233,6 +241,7 @@ class VMwareHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/vmware/vms/{vm_id}/reload",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
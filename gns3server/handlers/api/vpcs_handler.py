@@ -121,6 +121,7 @@ class VPCSHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/vpcs/vms/{vm_id}/start",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -142,6 +143,7 @@ class VPCSHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/vpcs/vms/{vm_id}/stop",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance"
@@ -162,6 +164,7 @@ class VPCSHandler:
     @classmethod
     @Route.post(
         r"/projects/{project_id}/vpcs/vms/{vm_id}/reload",
+        long_running=True,
         parameters={
             "project_id": "UUID for the project",
             "vm_id": "UUID for the instance",
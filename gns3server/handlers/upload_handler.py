@@ -21,10 +21,16 @@ import stat
 import io
 import tarfile
 import asyncio
+import uuid
 
 from ..config import Config
 from ..web.route import Route
-from ..utils.images import remove_checksum, md5sum
+from ..web.sendfile import write_file
+from ..utils.asyncio.file_upload import FileUpload, TarExtractor, READ_SIZE
+from ..utils.images import remove_checksum, set_checksum
+
+import logging
+log = logging.getLogger(__name__)
 
 
 class UploadHandler:
@@ -58,44 +64,121 @@ class UploadHandler:
         raw=True
     )
     def upload(request, response):
-        data = yield from request.post()
-
-        if not data["file"]:
-            response.redirect("/upload")
-            return
-
-        if data["type"] not in ["IOU", "IOURC", "QEMU", "IOS", "IMAGES", "PROJECTS"]:
-            raise aiohttp.web.HTTPForbidden(text="You are not authorized to upload this kind of image {}".format(data["type"]))
+        reader = aiohttp.MultipartReader(request.headers, request.content)
+        upload_type = None
+        spooled_path = None
+        filename = None
 
         try:
-            if data["type"] == "IMAGES":
-                UploadHandler._restore_directory(data["file"], UploadHandler.image_directory())
-            elif data["type"] == "PROJECTS":
-                UploadHandler._restore_directory(data["file"], UploadHandler.project_directory())
-            else:
-                if data["type"] == "IOURC":
-                    destination_dir = os.path.expanduser("~/")
-                    destination_path = os.path.join(destination_dir, ".iourc")
+            while True:
+                part = yield from reader.next()
+                if part is None:
+                    break
+                name = UploadHandler._part_name(part)
+                if name == "type":
+                    upload_type = yield from part.text()
+                    if upload_type not in ["IOU", "IOURC", "QEMU", "IOS", "IMAGES", "PROJECTS"]:
+                        raise aiohttp.web.HTTPForbidden(text="You are not authorized to upload this kind of image {}".format(upload_type))
+                elif name == "file" and part.filename:
+                    filename = os.path.basename(part.filename)
+                    if upload_type is None:
+                        # the type is sent after the file, keep the file until we know where it goes
+                        spooled_path = os.path.join(UploadHandler.image_directory(), ".upload-{}".format(uuid.uuid4()))
+                        upload = FileUpload(spooled_path)
+                        try:
+                            yield from upload.open()
+                            yield from upload.write_stream(UploadHandler._part_reader(part))
+                            yield from upload.finish()
+                        finally:
+                            upload.close()
+                    else:
+                        yield from UploadHandler._store(UploadHandler._part_reader(part), upload_type, filename)
                 else:
-                    destination_dir = os.path.join(UploadHandler.image_directory(), data["type"])
-                    destination_path = os.path.join(destination_dir, data["file"].filename)
-                os.makedirs(destination_dir, exist_ok=True)
-                remove_checksum(destination_path)
-                with open(destination_path, "wb+") as f:
-                    while True:
-                        chunk = data["file"].file.read(512)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                md5sum(destination_path)
-                st = os.stat(destination_path)
-                os.chmod(destination_path, st.st_mode | stat.S_IXUSR)
-        except OSError as e:
+                    yield from part.release()
+
+            if filename is None:
+                response.redirect("/upload")
+                return
+            if upload_type is None:
+                raise aiohttp.web.HTTPForbidden(text="The type of the upload is missing")
+            if spooled_path:
+                with open(spooled_path, "rb") as f:
+                    yield from UploadHandler._store(UploadHandler._file_reader(f), upload_type, filename)
+        except (OSError, tarfile.TarError) as e:
             response.html("Could not upload file: {}".format(e))
             response.set_status(200)
             return
+        finally:
+            if spooled_path:
+                try:
+                    os.remove(spooled_path)
+                except OSError:
+                    pass
         response.redirect("/upload")
 
+    @staticmethod
+    def _part_name(part):
+
+        _, params = aiohttp.multipart.parse_content_disposition(part.headers.get(aiohttp.hdrs.CONTENT_DISPOSITION))
+        return params.get("name")
+
+    @staticmethod
+    def _part_reader(part):
+        """
+        Returns a read coroutine for a part of a multipart request
+        """
+
+        @asyncio.coroutine
+        def read(size):
+            while not part.at_eof():
+                # an empty chunk doesn't mean the end of the part
+                data = yield from part.read_chunk(size)
+                if data:
+                    return data
+            return b""
+        return read
+
+    @staticmethod
+    def _file_reader(f):
+        """
+        Returns a read coroutine for a file
+        """
+
+        @asyncio.coroutine
+        def read(size):
+            return (yield from asyncio.get_event_loop().run_in_executor(None, f.read, size))
+        return read
+
+    @staticmethod
+    @asyncio.coroutine
+    def _store(read, upload_type, filename):
+        """
+        Writes an uploaded file while it's received
+        """
+
+        if upload_type == "IMAGES":
+            yield from UploadHandler._restore_directory(read, UploadHandler.image_directory())
+            return
+        if upload_type == "PROJECTS":
+            yield from UploadHandler._restore_directory(read, UploadHandler.project_directory())
+            return
+
+        if upload_type == "IOURC":
+            destination_path = os.path.join(os.path.expanduser("~/"), ".iourc")
+        else:
+            destination_path = os.path.join(UploadHandler.image_directory(), upload_type, filename)
+        remove_checksum(destination_path)
+        upload = FileUpload(destination_path)
+        try:
+            yield from upload.open()
+            yield from upload.write_stream(read)
+            digest = yield from upload.finish()
+        finally:
+            upload.close()
+        st = os.stat(destination_path)
+        os.chmod(destination_path, st.st_mode | stat.S_IXUSR)
+        set_checksum(destination_path, digest)
+
     @classmethod
     @Route.get(
         r"/backup/images.tar",
@@ -115,19 +198,22 @@ class UploadHandler:
         yield from UploadHandler._backup_directory(request, response, UploadHandler.project_directory())
 
     @staticmethod
-    def _restore_directory(file, directory):
+    @asyncio.coroutine
+    def _restore_directory(read, directory):
         """
         Extract from HTTP stream the content of a tar
         """
-        destination_path = os.path.join(directory, "archive.tar")
-        os.makedirs(directory, exist_ok=True)
-        with open(destination_path, "wb+") as f:
-            chunk = file.file.read()
-            f.write(chunk)
-        t = tarfile.open(destination_path)
-        t.extractall(directory)
-        t.close()
-        os.remove(destination_path)
+        extractor = TarExtractor(directory)
+        extractor.start()
+        try:
+            while True:
+                data = yield from read(READ_SIZE)
+                if not data:
+                    break
+                yield from extractor.write(data)
+            yield from extractor.finish()
+        finally:
+            extractor.close()
 
     @staticmethod
     @asyncio.coroutine
@@ -142,16 +228,29 @@ class UploadHandler:
         response.content_length = None
         response.start(request)
 
-        buffer = io.BytesIO()
-        with tarfile.open('arch.tar', 'w', fileobj=buffer) as tar:
-            for root, dirs, files in os.walk(directory):
-                for file in files:
-                    path = os.path.join(root, file)
-                    tar.add(os.path.join(root, file), arcname=os.path.relpath(path, directory))
-                    response.write(buffer.getvalue())
-                    yield from response.drain()
-                    buffer.truncate(0)
-                    buffer.seek(0)
+        # only used to build the headers of the members
+        tar = tarfile.TarFile(fileobj=io.BytesIO(), mode="w")
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    info = tar.gettarinfo(path, arcname=os.path.relpath(path, directory))
+                except OSError as e:
+                    log.warning("Can't add {} to the backup: {}".format(path, e))
+                    continue
+                if info is None:
+                    # sockets and other unsupported file types
+                    continue
+                response.write(info.tobuf(tarfile.GNU_FORMAT, "utf-8", "surrogateescape"))
+                if info.isreg():
+                    # the file is streamed from the disk, not loaded in memory
+                    with open(path, "rb") as f:
+                        yield from write_file(request, response, f, 0, info.size, use_sendfile=False)
+                    remainder = info.size % tarfile.BLOCKSIZE
+                    if remainder:
+                        response.write(b"\0" * (tarfile.BLOCKSIZE - remainder))
+                yield from response.drain()
+        response.write(b"\0" * (tarfile.BLOCKSIZE * 2))
         yield from response.write_eof()
 
     @staticmethod
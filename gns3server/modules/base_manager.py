@@ -32,14 +32,16 @@ from uuid import UUID, uuid4
 from gns3server.utils.interfaces import is_interface_up
 from ..config import Config
 from ..utils.asyncio import wait_run_in_executor
+from ..utils.asyncio.file_upload import FileUpload
 from ..utils import force_unix_path
 from .project_manager import ProjectManager
+from .shutdown_scheduler import ShutdownScheduler
 
 from .nios.nio_udp import NIOUDP
 from .nios.nio_tap import NIOTAP
 from .nios.nio_nat import NIONAT
 from .nios.nio_generic_ethernet import NIOGenericEthernet
-from ..utils.images import md5sum, remove_checksum
+from ..utils.images import remove_checksum, set_checksum
 from .vm_error import VMError
 
 
@@ -51,6 +53,8 @@ class BaseManager:
     """
 
     _convert_lock = None
+    # Number of VMs closed at the same time when a project is closed
+    _SHUTDOWN_CONCURRENCY = 16
 
     def __init__(self):
 
@@ -106,21 +110,55 @@ class BaseManager:
 
         return self._config
 
+    @property
+    def shutdown_concurrency(self):
+        """
+        Number of VMs of this module closed at the same time,
+        can be changed with shutdown_concurrency in the module section
+        of the configuration (0 for no limit).
+
+        :returns: integer
+        """
+
+        return self.config.get_section_config(self.module_name).getint("shutdown_concurrency", self._SHUTDOWN_CONCURRENCY)
+
+    def schedule_close_vm(self, scheduler, vm):
+        """
+        Adds the close of a VM to a shutdown scheduler.
+
+        :param scheduler: ShutdownScheduler instance
+        :param vm: VM instance
+        """
+
+        scheduler.set_concurrency(self.module_name, self.shutdown_concurrency)
+        scheduler.add("vms", self.module_name, "close VM {}".format(vm.name), self.close_vm, vm.id)
+
+    def _schedule_unload(self, scheduler):
+        """
+        Adds the jobs needed to unload the module to a shutdown scheduler.
+
+        :param scheduler: ShutdownScheduler instance
+        """
+
+        for vm in list(self._vms.values()):
+            self.schedule_close_vm(scheduler, vm)
+
     @asyncio.coroutine
-    def unload(self):
+    def probe_executables(self):
+        """
+        Runs the probes of the executables used by this module when the
+        server starts, the checks done when a VM starts find them in the
+        probe cache.
+        """
 
-        tasks = []
-        for vm_id in self._vms.keys():
-            tasks.append(asyncio.async(self.close_vm(vm_id)))
+        pass
 
-        if tasks:
-            done, _ = yield from asyncio.wait(tasks)
-            for future in done:
-                try:
-                    future.result()
-                except (Exception, GeneratorExit) as e:
-                    log.error("Could not close VM {}".format(e), exc_info=1)
-                    continue
+    @asyncio.coroutine
+    def unload(self):
+
+        scheduler = ShutdownScheduler("Unload of module {}".format(self.module_name))
+        self._schedule_unload(scheduler)
+        yield from scheduler.run()
 
         if hasattr(BaseManager, "_instance"):
             BaseManager._instance = None
@@ -392,6 +430,35 @@ class BaseManager:
         assert nio is not None
         return nio
 
+    @asyncio.coroutine
+    def add_nio_binding(self, vm, adapter_number, port_number, nio_settings):
+        """
+        Creates a NIO and binds it to a VM adapter.
+
+        :param vm: VM instance
+        :param adapter_number: adapter number
+        :param port_number: port number (not used by all the VMs)
+        :param nio_settings: information to create the NIO
+
+        :returns: a NIO object
+        """
+
+        nio = self.create_nio(None, nio_settings)
+        yield from vm.adapter_add_nio_binding(adapter_number, nio)
+        return nio
+
+    @asyncio.coroutine
+    def remove_nio_binding(self, vm, adapter_number, port_number):
+        """
+        Removes the NIO bound to a VM adapter.
+
+        :param vm: VM instance
+        :param adapter_number: adapter number
+        :param port_number: port number (not used by all the VMs)
+        """
+
+        yield from vm.adapter_remove_nio_binding(adapter_number)
+
     def get_abs_image_path(self, path):
         """
         Get the absolute path of an image
@@ -463,7 +530,7 @@ class BaseManager:
         img_dir = self.get_images_directory()
         for root, dirs, files in os.walk(img_dir):
             for filename in files:
-                if filename[0] != "." and not filename.endswith(".md5sum"):
+                if filename[0] != "." and not filename.endswith(".md5sum") and not filename.endswith(".tmp"):
                     path = os.path.relpath(os.path.join(root, filename), img_dir)
                     images.append({
                         "filename": filename,
@@ -478,25 +545,36 @@ class BaseManager:
         raise NotImplementedError
 
     @asyncio.coroutine
-    def write_image(self, filename, stream):
+    def write_image(self, filename, stream, offset=0):
+        """
+        Writes an uploaded image in the images directory.
+
+        :param filename: image file name
+        :param stream: StreamReader of the request body
+        :param offset: offset where a previous upload of the image was interrupted
+        """
+
         directory = self.get_images_directory()
         path = os.path.abspath(os.path.join(directory, *os.path.split(filename)))
         if os.path.commonprefix([directory, path]) != directory:
             raise aiohttp.web.HTTPForbidden(text="Could not write image: {}, {} is forbiden".format(filename, path))
+        try:
+            offset = int(offset)
+        except ValueError:
+            raise aiohttp.web.HTTPBadRequest(text="Invalid upload offset: {}".format(offset))
         log.info("Writting image file %s", path)
+        # We store the file under his final name only when the upload is finished
+        upload = FileUpload(path, offset=offset)
         try:
             remove_checksum(path)
-            # We store the file under his final name only when the upload is finished
-            tmp_path = path + ".tmp"
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(tmp_path, 'wb+') as f:
-                while True:
-                    packet = yield from stream.read(512)
-                    if not packet:
-                        break
-                    f.write(packet)
-            os.chmod(tmp_path, stat.S_IWRITE | stat.S_IREAD | stat.S_IEXEC)
-            shutil.move(tmp_path, path)
-            md5sum(path)
+            yield from upload.open()
+            yield from upload.write_stream(stream.read)
+            os.chmod(upload.tmp_path, stat.S_IWRITE | stat.S_IREAD | stat.S_IEXEC)
+            digest = yield from upload.finish()
+            set_checksum(path, digest)
+        except ValueError as e:
+            raise aiohttp.web.HTTPConflict(text="Could not resume the upload of image: {}, {}".format(filename, e))
         except OSError as e:
             raise aiohttp.web.HTTPConflict(text="Could not write image: {} because {}".format(filename, e))
+        finally:
+            upload.close()
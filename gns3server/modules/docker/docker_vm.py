@@ -76,6 +76,7 @@ class DockerVM(BaseVM):
         self._ubridge_hypervisor = None
         self._temporary_directory = None
         self._telnet_servers = []
+        self._telnet_consoles = []
         self._x11vnc_process = None
         self._console_resolution = console_resolution
         self._console_http_path = console_http_path
@@ -386,6 +387,8 @@ class DockerVM(BaseVM):
             stdin=asyncio.subprocess.PIPE)
         server = AsyncioTelnetServer(reader=process.stdout, writer=process.stdin, binary=True, echo=True)
         self._telnet_servers.append((yield from asyncio.start_server(server.run, self._manager.port_manager.console_host, self.aux)))
+        server.start()
+        self._telnet_consoles.append(server)
         log.debug("Docker container '%s' started listen for auxilary telnet on %d", self.name, self.aux)
 
     @asyncio.coroutine
@@ -464,6 +467,8 @@ class DockerVM(BaseVM):
 
         telnet = AsyncioTelnetServer(reader=output_stream, writer=input_stream, echo=True)
         self._telnet_servers.append((yield from asyncio.start_server(telnet.run, self._manager.port_manager.console_host, self.console)))
+        telnet.start()
+        self._telnet_consoles.append(telnet)
 
         self._console_websocket = yield from self.manager.websocket_query("containers/{}/attach/ws?stream=1&stdin=1&stdout=1&stderr=1".format(self._cid))
         input_stream.ws = self._console_websocket
@@ -519,6 +524,9 @@ class DockerVM(BaseVM):
                 telnet_server.close()
                 yield from telnet_server.wait_closed()
             self._telnet_servers = []
+        for telnet_console in self._telnet_consoles:
+            telnet_console.close()
+        self._telnet_consoles = []
 
     @asyncio.coroutine
     def stop(self):
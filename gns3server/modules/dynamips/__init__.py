@@ -29,18 +29,23 @@ import asyncio
 import tempfile
 import logging
 import glob
+import collections
 
 log = logging.getLogger(__name__)
 
 from gns3server.utils.interfaces import interfaces, is_interface_up
 from gns3server.utils.asyncio import wait_run_in_executor
 from gns3server.utils import parse_version
+from gns3server.utils.images import md5sum
 from uuid import UUID, uuid4
 from ..base_manager import BaseManager
 from ..project_manager import ProjectManager
 from ..port_manager import PortManager
 from .dynamips_error import DynamipsError
 from .hypervisor import Hypervisor
+from .hypervisor_pool import HypervisorPool
+from .idlepc_database import IdlePCDatabase, IDLEPC_DATABASE_FILENAME
+from .ghost_cache import GhostCache
 from .nodes.router import Router
 from .dynamips_vm import DynamipsVM
 from .dynamips_device import DynamipsDevice
@@ -111,9 +116,21 @@ class Dynamips(BaseManager):
         super().__init__()
         Dynamips._ghost_ios_lock = asyncio.Lock()
         self._devices = {}
-        self._ghost_files = set()
+        self._ghost_cache = None
         self._dynamips_path = None
         self._dynamips_ids = {}
+        self._hypervisor_pool = HypervisorPool(self)
+        self._idlepc_database = None
+
+    @property
+    def hypervisor_pool(self):
+        """
+        Returns the pool of hypervisors used by the routers.
+
+        :returns: HypervisorPool instance
+        """
+
+        return self._hypervisor_pool
 
     def get_dynamips_id(self, project_id):
         """
@@ -151,23 +168,11 @@ class Dynamips(BaseManager):
         if dynamips_id in self._dynamips_ids[project_id]:
             self._dynamips_ids[project_id].remove(dynamips_id)
 
-    @asyncio.coroutine
-    def unload(self):
+    def _schedule_unload(self, scheduler):
 
-        yield from BaseManager.unload(self)
-
-        tasks = []
+        super()._schedule_unload(scheduler)
         for device in self._devices.values():
-            tasks.append(asyncio.async(device.hypervisor.stop()))
-
-        if tasks:
-            done, _ = yield from asyncio.wait(tasks)
-            for future in done:
-                try:
-                    future.result()
-                except (Exception, GeneratorExit) as e:
-                    log.error("Could not stop device hypervisor {}".format(e), exc_info=1)
-                    continue
+            scheduler.add("hypervisors", self.module_name, "stop device hypervisor {}".format(device.name), device.hypervisor.stop)
 
     @asyncio.coroutine
     def project_closing(self, project):
@@ -211,8 +216,6 @@ class Dynamips(BaseManager):
         for file in files:
             try:
                 log.debug("Deleting file {}".format(file))
-                if file in self._ghost_files:
-                    self._ghost_files.remove(file)
                 yield from wait_run_in_executor(os.remove, file)
             except OSError as e:
                 log.warn("Could not delete file {}: {}".format(file, e))
@@ -478,6 +481,49 @@ class Dynamips(BaseManager):
         yield from nio.create()
         return nio
 
+    @asyncio.coroutine
+    def add_nio_binding(self, node, adapter_number, port_number, nio_settings):
+        """
+        Creates a NIO and binds it to a router slot/port or to a device port.
+
+        :param node: Dynamips node instance (router or device)
+        :param adapter_number: slot number (not used by devices)
+        :param port_number: port number
+        :param nio_settings: information to create the NIO
+
+        :returns: a NIO object
+        """
+
+        nio = yield from self.create_nio(node, nio_settings)
+        try:
+            if isinstance(node, Router):
+                yield from node.slot_add_nio_binding(adapter_number, port_number, nio)
+            elif asyncio.iscoroutinefunction(node.add_nio):
+                yield from node.add_nio(nio, port_number)
+            else:
+                node.add_nio(nio, port_number)
+        except BaseException:
+            # the NIO exists in the hypervisor but is not used
+            yield from nio.delete()
+            raise
+        return nio
+
+    @asyncio.coroutine
+    def remove_nio_binding(self, node, adapter_number, port_number):
+        """
+        Removes the NIO bound to a router slot/port or to a device port.
+
+        :param node: Dynamips node instance (router or device)
+        :param adapter_number: slot number (not used by devices)
+        :param port_number: port number
+        """
+
+        if isinstance(node, Router):
+            nio = yield from node.slot_remove_nio_binding(adapter_number, port_number)
+        else:
+            nio = yield from node.remove_nio(port_number)
+        yield from nio.delete()
+
     @asyncio.coroutine
     def _set_ghost_ios(self, vm):
         """
@@ -493,22 +539,27 @@ class Dynamips(BaseManager):
             log.warning("Ghost IOS is not supported for c7200 with NPE-G2")
             return
 
-        ghost_file = vm.formatted_ghost_file()
-        ghost_file_path = os.path.join(vm.hypervisor.working_dir, ghost_file)
-        if ghost_file_path not in self._ghost_files:
+        image_md5 = yield from wait_run_in_executor(md5sum, vm.image)
+        if image_md5 is None:
+            log.warning("Ghost IOS is not supported for image {}".format(vm.image))
+            return
+
+        ghost_cache = self.ghost_cache
+        ghost_file_path = ghost_cache.get_path(image_md5, vm.platform, vm.ram)
+        if not ghost_cache.contains(ghost_file_path):
             # create a new ghost IOS instance
             ghost_id = str(uuid4())
-            ghost = Router("ghost-" + ghost_file, ghost_id, vm.project, vm.manager, platform=vm.platform, hypervisor=vm.hypervisor, ghost_flag=True)
+            ghost = Router("ghost-" + os.path.basename(ghost_file_path), ghost_id, vm.project, vm.manager, platform=vm.platform, hypervisor=vm.hypervisor, ghost_flag=True)
             try:
                 yield from ghost.create()
                 yield from ghost.set_image(vm.image)
                 yield from ghost.set_ghost_status(1)
-                yield from ghost.set_ghost_file(ghost_file)
+                yield from ghost.set_ghost_file(ghost_file_path)
                 yield from ghost.set_ram(vm.ram)
                 try:
                     yield from ghost.start()
                     yield from ghost.stop()
-                    self._ghost_files.add(ghost_file_path)
+                    ghost_cache.add(ghost_file_path, in_use=self._ghost_files_in_use())
                 except DynamipsError:
                     raise
                 finally:
@@ -516,10 +567,34 @@ class Dynamips(BaseManager):
             except DynamipsError as e:
                 log.warn("Could not create ghost instance: {}".format(e))
 
-        if vm.ghost_file != ghost_file and os.path.isfile(ghost_file_path):
+        if vm.ghost_file != ghost_file_path and ghost_cache.contains(ghost_file_path):
             # set the ghost file to the router
             yield from vm.set_ghost_status(2)
-            yield from vm.set_ghost_file(ghost_file)
+            yield from vm.set_ghost_file(ghost_file_path)
+            ghost_cache.touch(ghost_file_path)
+
+    @property
+    def ghost_cache(self):
+        """
+        Returns the cache of the ghost files shared by all the projects.
+
+        :returns: GhostCache instance
+        """
+
+        dynamips_config = self.config.get_section_config("Dynamips")
+        directory = dynamips_config.get("ghost_cache_path", os.path.join(self.get_images_directory(), ".ghosts"))
+        directory = os.path.expanduser(directory)
+        if self._ghost_cache is None or self._ghost_cache.directory != directory:
+            self._ghost_cache = GhostCache(directory)
+        self._ghost_cache.max_size = dynamips_config.getint("ghost_cache_size", 4096)
+        return self._ghost_cache
+
+    def _ghost_files_in_use(self):
+        """
+        Returns the ghost files used by the routers.
+        """
+
+        return {vm.ghost_file for vm in self._vms.values() if vm.ghost_file}
 
     @asyncio.coroutine
     def update_vm_settings(self, vm, settings):
@@ -530,7 +605,9 @@ class Dynamips(BaseManager):
         :param settings: settings to update (dict)
         """
 
-        for name, value in settings.items():
+        # the idle-PC is set before the image, the idle-PC found in
+        # the database for the image is used only if there is none
+        for name, value in sorted(settings.items(), key=lambda setting: setting[0] != "idlepc"):
             if hasattr(vm, name) and getattr(vm, name) != value:
                 if hasattr(vm, "set_{}".format(name)):
                     setter = getattr(vm, "set_{}".format(name))
@@ -646,13 +723,21 @@ class Dynamips(BaseManager):
         return os.path.join("configs", os.path.basename(path))
 
     @asyncio.coroutine
-    def auto_idlepc(self, vm):
+    def auto_idlepc(self, vm, use_database=True):
         """
         Try to find the best possible idle-pc value.
 
+        The value validated before for the image is tried first,
+        it is forgotten if the router is not idle with it.
+
         :param vm: VM instance
+        :param use_database: try the value from the idle-PC database first
         """
 
+        known_idlepc = None
+        if use_database:
+            known_idlepc = yield from self.get_known_idlepc(vm)
+
         yield from vm.set_idlepc("0x0")
         was_auto_started = False
         try:
@@ -661,29 +746,36 @@ class Dynamips(BaseManager):
                 yield from vm.start()
                 was_auto_started = True
                 yield from asyncio.sleep(20)  # leave time to the router to boot
+
             validated_idlepc = None
+            if known_idlepc:
+                cpu_usage = yield from self._probe_idlepc(vm, known_idlepc)
+                if cpu_usage < 70:
+                    log.info("Auto Idle-PC: using idle-PC value {} from the database".format(known_idlepc))
+                    return known_idlepc
+                log.info("Auto Idle-PC: idle-PC value {} from the database is not suitable".format(known_idlepc))
+                yield from self._remove_idlepc(vm)
+                yield from vm.set_idlepc("0x0")
+
             idlepcs = yield from vm.get_idle_pc_prop()
             if not idlepcs:
                 raise DynamipsError("No Idle-PC values found")
-
-            for idlepc in idlepcs:
-                yield from vm.set_idlepc(idlepc.split()[0])
-                log.debug("Auto Idle-PC: trying idle-PC value {}".format(vm.idlepc))
-                start_time = time.time()
-                initial_cpu_usage = yield from vm.get_cpu_usage()
-                log.debug("Auto Idle-PC: initial CPU usage is {}%".format(initial_cpu_usage))
-                yield from asyncio.sleep(3)  # wait 3 seconds to probe the cpu again
-                elapsed_time = time.time() - start_time
-                cpu_usage = yield from vm.get_cpu_usage()
-                cpu_elapsed_usage = cpu_usage - initial_cpu_usage
-                cpu_usage = abs(cpu_elapsed_usage * 100.0 / elapsed_time)
-                if cpu_usage > 100:
-                    cpu_usage = 100
-                log.debug("Auto Idle-PC: CPU usage is {}% after {:.2} seconds".format(cpu_usage, elapsed_time))
-                if cpu_usage < 70:
-                    validated_idlepc = vm.idlepc
-                    log.debug("Auto Idle-PC: idle-PC value {} has been validated".format(validated_idlepc))
-                    break
+            candidates = [idlepc.split()[0] for idlepc in idlepcs if idlepc.split()[0] != known_idlepc]
+
+            workers = min(self.config.get_section_config("Dynamips").getint("auto_idlepc_workers", 0),
+                          os.cpu_count() or 1,
+                          len(candidates))
+            if workers > 1:
+                validated_idlepc = yield from self._parallel_idlepc_search(vm, candidates, workers)
+                if validated_idlepc is not None:
+                    yield from vm.set_idlepc(validated_idlepc)
+            else:
+                for idlepc in candidates:
+                    cpu_usage = yield from self._probe_idlepc(vm, idlepc)
+                    if cpu_usage < 70:
+                        validated_idlepc = idlepc
+                        log.debug("Auto Idle-PC: idle-PC value {} has been validated".format(validated_idlepc))
+                        break
 
             if validated_idlepc is None:
                 raise DynamipsError("Sorry, no idle-pc value was suitable")
@@ -693,8 +785,141 @@ class Dynamips(BaseManager):
         finally:
             if was_auto_started:
                 yield from vm.stop()
+        yield from self._store_idlepc(vm, validated_idlepc)
         return validated_idlepc
 
+    @asyncio.coroutine
+    def _probe_idlepc(self, vm, idlepc):
+        """
+        Sets an idle-PC value on a running router and measures its CPU usage.
+
+        :param vm: VM instance
+        :param idlepc: idle-PC value
+
+        :returns: CPU usage in percent
+        """
+
+        yield from vm.set_idlepc(idlepc)
+        log.debug("Auto Idle-PC: trying idle-PC value {}".format(idlepc))
+        start_time = time.time()
+        initial_cpu_usage = yield from vm.get_cpu_usage()
+        log.debug("Auto Idle-PC: initial CPU usage is {}%".format(initial_cpu_usage))
+        yield from asyncio.sleep(3)  # wait 3 seconds to probe the cpu again
+        elapsed_time = time.time() - start_time
+        cpu_usage = yield from vm.get_cpu_usage()
+        cpu_elapsed_usage = cpu_usage - initial_cpu_usage
+        cpu_usage = abs(cpu_elapsed_usage * 100.0 / elapsed_time)
+        if cpu_usage > 100:
+            cpu_usage = 100
+        log.debug("Auto Idle-PC: CPU usage is {}% after {:.2} seconds".format(cpu_usage, elapsed_time))
+        return cpu_usage
+
+    @asyncio.coroutine
+    def _parallel_idlepc_search(self, vm, candidates, workers):
+        """
+        Tests the idle-PC values on throwaway routers running the image
+        of the VM, each one in its own Dynamips process.
+
+        :param vm: VM instance
+        :param candidates: idle-PC values in order of preference
+        :param workers: number of throwaway routers
+
+        :returns: the first suitable idle-PC value or None
+        """
+
+        queue = collections.deque(enumerate(candidates))
+        validated = []
+        with tempfile.TemporaryDirectory(prefix="gns3-idlepc-") as tmpdir:
+            tasks = []
+            for worker in range(workers):
+                working_dir = os.path.join(tmpdir, str(worker))
+                os.makedirs(working_dir)
+                tasks.append(asyncio.async(self._idlepc_worker(vm, working_dir, queue, validated)))
+            done, _ = yield from asyncio.wait(tasks)
+            errors = [task.exception() for task in done if task.exception() is not None]
+        if not validated and errors:
+            raise DynamipsError("Auto Idle-PC failed: {}".format(errors[0]))
+        if not validated:
+            return None
+        # the same value as the sequential search: the first one in the list
+        return min(validated)[1]
+
+    @asyncio.coroutine
+    def _idlepc_worker(self, vm, working_dir, queue, validated):
+        """
+        Boots a throwaway router and tests idle-PC values
+        until one has been validated by any worker.
+        """
+
+        hypervisor = yield from self.start_new_hypervisor(working_dir=working_dir)
+        router = Router("idlepc-" + vm.name, str(uuid4()), vm.project, self, platform=vm.platform, hypervisor=hypervisor, ghost_flag=True)
+        try:
+            yield from router.create()
+            yield from router.set_image(vm.image)
+            yield from router.set_ram(vm.ram)
+            yield from router.start()
+            yield from asyncio.sleep(20)  # leave time to the router to boot
+            # the values left in the queue are after the tested ones in the list
+            while queue and not validated:
+                index, idlepc = queue.popleft()
+                cpu_usage = yield from self._probe_idlepc(router, idlepc)
+                if cpu_usage < 70:
+                    log.debug("Auto Idle-PC: idle-PC value {} has been validated".format(idlepc))
+                    validated.append((index, idlepc))
+        finally:
+            if router in hypervisor.devices:
+                hypervisor.devices.remove(router)
+            yield from hypervisor.stop()
+
+    @property
+    def idlepc_database(self):
+        """
+        Returns the database of the validated idle-PC values,
+        stored in the IOS images directory.
+
+        :returns: IdlePCDatabase instance
+        """
+
+        path = os.path.join(self.get_images_directory(), IDLEPC_DATABASE_FILENAME)
+        if self._idlepc_database is None or self._idlepc_database.path != path:
+            self._idlepc_database = IdlePCDatabase(path)
+        return self._idlepc_database
+
+    @asyncio.coroutine
+    def get_known_idlepc(self, vm):
+        """
+        Returns the idle-PC value validated before for the image of a VM.
+
+        :param vm: VM instance
+
+        :returns: idle-PC value or None
+        """
+
+        if not vm.image or not os.path.isfile(vm.image):
+            return None
+        image_md5 = yield from wait_run_in_executor(md5sum, vm.image)
+        if image_md5 is None:
+            return None
+        return self.idlepc_database.get(image_md5, vm.platform, vm.ram)
+
+    @asyncio.coroutine
+    def _store_idlepc(self, vm, idlepc):
+
+        if not vm.image or not os.path.isfile(vm.image):
+            return
+        image_md5 = yield from wait_run_in_executor(md5sum, vm.image)
+        if image_md5 is not None:
+            self.idlepc_database.set(image_md5, vm.platform, vm.ram, idlepc, image=os.path.basename(vm.image))
+
+    @asyncio.coroutine
+    def _remove_idlepc(self, vm):
+
+        if not vm.image or not os.path.isfile(vm.image):
+            return
+        image_md5 = yield from wait_run_in_executor(md5sum, vm.image)
+        if image_md5 is not None:
+            self.idlepc_database.remove(image_md5, vm.platform, vm.ram)
+
     def get_images_directory(self):
         """
         Return the full path of the images directory on disk
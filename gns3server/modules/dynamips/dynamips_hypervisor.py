@@ -20,11 +20,11 @@ Interface for Dynamips hypervisor management module ("hypervisor")
 http://github.com/GNS3/dynamips/blob/master/README.hypervisor#L46
 """
 
-import re
 import time
 import logging
 import asyncio
 
+from gns3server.utils.asyncio.hypervisor_protocol import HypervisorProtocol
 from .dynamips_error import DynamipsError
 
 log = logging.getLogger(__name__)
@@ -42,10 +42,6 @@ class DynamipsHypervisor:
     hypervisor (defaults to 30 seconds)
     """
 
-    # Used to parse Dynamips response codes
-    error_re = re.compile(r"""^2[0-9]{2}-""")
-    success_re = re.compile(r"""^1[0-9]{2}\s{1}""")
-
     def __init__(self, working_dir, host, port=7200, timeout=30.0):
 
         self._host = host
@@ -55,9 +51,7 @@ class DynamipsHypervisor:
         self._working_dir = working_dir
         self._version = "N/A"
         self._timeout = timeout
-        self._reader = None
-        self._writer = None
-        self._io_lock = asyncio.Lock()
+        self._protocol = None
 
     @asyncio.coroutine
     def connect(self, timeout=10):
@@ -77,10 +71,17 @@ class DynamipsHypervisor:
         begin = time.time()
         connection_success = False
         last_exception = None
+        loop = asyncio.get_event_loop()
         while time.time() - begin < timeout:
             yield from asyncio.sleep(0.01)
             try:
-                self._reader, self._writer = yield from asyncio.wait_for(asyncio.open_connection(host, self._port), timeout=1)
+                _, self._protocol = yield from asyncio.wait_for(loop.create_connection(lambda: HypervisorProtocol(DynamipsError,
+                                                                                                                  "Dynamips",
+                                                                                                                  host,
+                                                                                                                  self._port,
+                                                                                                                  lambda: self.is_running()),
+                                                                                       host,
+                                                                                       self._port), timeout=1)
             except (asyncio.TimeoutError, OSError) as e:
                 last_exception = e
                 continue
@@ -118,8 +119,8 @@ class DynamipsHypervisor:
         """
 
         yield from self.send("hypervisor close")
-        self._writer.close()
-        self._reader, self._writer = None
+        self._protocol.close()
+        self._protocol = None
 
     @asyncio.coroutine
     def stop(self):
@@ -132,13 +133,9 @@ class DynamipsHypervisor:
             yield from self.send("hypervisor stop")
         except DynamipsError:
             pass
-        try:
-            if self._writer is not None:
-                yield from self._writer.drain()
-                self._writer.close()
-        except OSError as e:
-            log.debug("Stopping hypervisor {}:{} {}".format(self._host, self._port, e))
-        self._reader = self._writer = None
+        if self._protocol is not None:
+            self._protocol.close()
+            self._protocol = None
 
     @asyncio.coroutine
     def reset(self):
@@ -161,6 +158,18 @@ class DynamipsHypervisor:
         self._working_dir = working_dir
         log.debug("Working directory set to {}".format(self._working_dir))
 
+    @property
+    def command_stats(self):
+        """
+        Returns the timing counters of the commands sent to this hypervisor.
+
+        :returns: dictionary command -> {count, errors, total_time, max_time}
+        """
+
+        if self._protocol is None:
+            return {}
+        return self._protocol.stats
+
     @property
     def working_dir(self):
         """
@@ -231,86 +240,21 @@ class DynamipsHypervisor:
         :returns: results as a list
         """
 
-        # Dynamips responses are of the form:
-        #   1xx yyyyyy\r\n
-        #   1xx yyyyyy\r\n
-        #   ...
-        #   100-yyyy\r\n
-        # or
-        #   2xx-yyyy\r\n
-        #
-        # Where 1xx is a code from 100-199 for a success or 200-299 for an error
-        # The result might be multiple lines and might be less than the buffer size
-        # but still have more data. The only thing we know for sure is the last line
-        # will begin with '100-' or a '2xx-' and end with '\r\n'
-
-        with (yield from self._io_lock):
-            if self._writer is None or self._reader is None:
-                raise DynamipsError("Not connected")
+        results = yield from self.send_batch([command])
+        return results[0]
 
-            try:
-                command = command.strip() + '\n'
-                log.debug("sending {}".format(command))
-                self._writer.write(command.encode())
-                yield from self._writer.drain()
-            except OSError as e:
-                raise DynamipsError("Could not send Dynamips command '{command}' to {host}:{port}: {error}, process running: {run}"
-                                    .format(command=command.strip(), host=self._host, port=self._port, error=e, run=self.is_running()))
-
-            # Now retrieve the result
-            data = []
-            buf = ''
-            while True:
-                try:
-                    try:
-                        # line = yield from self._reader.readline()  # this can lead to ValueError: Line is too long
-                        chunk = yield from self._reader.read(1024)  # match to Dynamips' buffer size
-                    except asyncio.CancelledError:
-                        # task has been canceled but continue to read
-                        # any remaining data sent by the hypervisor
-                        continue
-                    except ConnectionResetError as e:
-                        # Sometimes WinError 64 (ERROR_NETNAME_DELETED) is returned here on Windows.
-                        # These happen if connection reset is received before IOCP could complete
-                        # a previous operation. Ignore and try again....
-                        log.warning("Connection reset received while reading Dynamips response: {}".format(e))
-                        continue
-                    if not chunk:
-                        raise DynamipsError("No data returned from {host}:{port}, Dynamips process running: {run}"
-                                            .format(host=self._host, port=self._port, run=self.is_running()))
-                    buf += chunk.decode("utf-8", errors="ignore")
-                except OSError as e:
-                    raise DynamipsError("Could not read response for '{command}' from {host}:{port}: {error}, process running: {run}"
-                                        .format(command=command.strip(), host=self._host, port=self._port, error=e, run=self.is_running()))
-
-                # If the buffer doesn't end in '\n' then we can't be done
-                try:
-                    if buf[-1] != '\n':
-                        continue
-                except IndexError:
-                    raise DynamipsError("Could not communicate with {host}:{port}, Dynamips process running: {run}"
-                                        .format(host=self._host, port=self._port, run=self.is_running()))
-
-                data += buf.split('\r\n')
-                if data[-1] == '':
-                    data.pop()
-                buf = ''
-
-                # Does it contain an error code?
-                if self.error_re.search(data[-1]):
-                    raise DynamipsError(data[-1][4:])
-
-                # Or does the last line begin with '100-'? Then we are done!
-                if data[-1][:4] == '100-':
-                    data[-1] = data[-1][4:]
-                    if data[-1] == 'OK':
-                        data.pop()
-                    break
-
-            # Remove success responses codes
-            for index in range(len(data)):
-                if self.success_re.search(data[index]):
-                    data[index] = data[index][4:]
-
-            log.debug("returned result {}".format(data))
-            return data
+    @asyncio.coroutine
+    def send_batch(self, commands, return_exceptions=False):
+        """
+        Sends several commands to this hypervisor in one write and
+        waits for all the replies.
+
+        :param commands: list of Dynamips hypervisor commands
+        :param return_exceptions: return errors in the result list instead of raising the first one
+
+        :returns: list of results (one result list per command)
+        """
+
+        if self._protocol is None:
+            raise DynamipsError("Not connected")
+        return (yield from self._protocol.send_batch(commands, return_exceptions=return_exceptions))
@@ -43,9 +43,11 @@ class DynamipsVM:
     Factory to create an Router object based on the correct platform.
     """
 
-    def __new__(cls, name, vm_id, project, manager, dynamips_id, platform, **kwargs):
+    def __new__(cls, name, vm_id, project, manager, dynamips_id, platform, image=None, ram=None, **kwargs):
 
         if platform not in PLATFORMS:
             raise DynamipsError("Unknown router platform: {}".format(platform))
 
-        return PLATFORMS[platform](name, vm_id, project, manager, dynamips_id, **kwargs)
+        router = PLATFORMS[platform](name, vm_id, project, manager, dynamips_id, **kwargs)
+        router.set_placement_hint(image=image, ram=ram)
+        return router
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Ghost RAM files shared by the routers of all the projects.
+"""
+
+import os
+import json
+import time
+
+import logging
+log = logging.getLogger(__name__)
+
+GHOST_CACHE_INDEX = "index.json"
+
+
+class GhostCache:
+
+    """
+    Ghost RAM files named after the md5 of the IOS image, the platform and
+    the RAM. All the routers using the same image map the same file, the
+    least recently used files are deleted when the cache is bigger than
+    its maximum size.
+
+    :param directory: cache directory
+    :param max_size: maximum size of the cache in MB
+    """
+
+    def __init__(self, directory, max_size=4096):
+
+        self._directory = directory
+        self._max_size = max_size
+        self._entries = {}
+        self._load()
+
+    @property
+    def directory(self):
+        """
+        Cache directory
+        """
+
+        return self._directory
+
+    @property
+    def max_size(self):
+        """
+        Maximum size of the cache in MB
+        """
+
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, max_size):
+
+        self._max_size = max_size
+
+    def _load(self):
+
+        index = os.path.join(self._directory, GHOST_CACHE_INDEX)
+        try:
+            with open(index) as f:
+                self._entries = json.load(f)["ghosts"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if os.path.exists(index):
+                log.warning("Can't load the ghost cache index {}: {}".format(index, e))
+            self._entries = {}
+
+        if not os.path.isdir(self._directory):
+            return
+        self._entries = {name: last_used for name, last_used in self._entries.items()
+                         if os.path.isfile(os.path.join(self._directory, name))}
+        # ghost files not in the index were not completely generated
+        for name in os.listdir(self._directory):
+            if name.endswith(".ghost") and name not in self._entries:
+                try:
+                    os.remove(os.path.join(self._directory, name))
+                except OSError as e:
+                    log.warning("Could not delete incomplete ghost file {}: {}".format(name, e))
+
+    def _save(self):
+
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            index = os.path.join(self._directory, GHOST_CACHE_INDEX)
+            with open(index + ".tmp", "w") as f:
+                json.dump({"version": 1, "ghosts": self._entries}, f)
+            os.replace(index + ".tmp", index)
+        except OSError as e:
+            log.error("Can't write the ghost cache index: {}".format(e))
+
+    def get_path(self, image_md5, platform, ram):
+        """
+        Returns the path of the ghost file of an IOS image.
+
+        :param image_md5: md5 of the IOS image
+        :param platform: router platform
+        :param ram: amount of RAM in Mbytes
+
+        :returns: path of the ghost file
+        """
+
+        os.makedirs(self._directory, exist_ok=True)
+        return os.path.join(self._directory, "{}-{}-{}.ghost".format(image_md5, platform, ram))
+
+    def contains(self, path):
+        """
+        Returns True if a ghost file has been generated.
+
+        :param path: path of the ghost file
+        """
+
+        name = os.path.basename(path)
+        return name in self._entries and os.path.isfile(path)
+
+    def touch(self, path):
+        """
+        Marks a ghost file as used.
+
+        :param path: path of the ghost file
+        """
+
+        name = os.path.basename(path)
+        if name in self._entries:
+            self._entries[name] = time.time()
+            self._save()
+
+    def add(self, path, in_use=()):
+        """
+        Adds a generated ghost file and deletes the least recently used
+        ones if the cache is too big.
+
+        :param path: path of the ghost file
+        :param in_use: paths of the ghost files used by the routers, never deleted
+        """
+
+        self._entries[os.path.basename(path)] = time.time()
+        self.evict(in_use=set(in_use) | {path})
+        self._save()
+
+    def size(self):
+        """
+        Returns the size of the ghost files in bytes.
+        """
+
+        size = 0
+        for name in self._entries:
+            try:
+                size += os.path.getsize(os.path.join(self._directory, name))
+            except OSError:
+                continue
+        return size
+
+    def evict(self, in_use=()):
+        """
+        Deletes the least recently used ghost files until the
+        cache size is below its maximum size.
+
+        :param in_use: paths of the ghost files used by the routers, never deleted
+        """
+
+        in_use = {os.path.basename(path) for path in in_use}
+        max_size = self._max_size * 1024 * 1024
+        size = self.size()
+        for name in sorted(self._entries, key=self._entries.get):
+            if size <= max_size:
+                break
+            if name in in_use:
+                continue
+            path = os.path.join(self._directory, name)
+            try:
+                file_size = os.path.getsize(path)
+                os.remove(path)
+            except OSError as e:
+                log.warning("Could not delete ghost file {}: {}".format(path, e))
+                continue
+            log.info("Ghost file {} removed from the cache".format(name))
+            del self._entries[name]
+            size -= file_size
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Places the routers of a project on a pool of Dynamips hypervisors.
+"""
+
+import os
+import asyncio
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class _PoolEntry:
+
+    """
+    A hypervisor of the pool and the routers placed on it.
+    """
+
+    def __init__(self, hypervisor):
+
+        self.hypervisor = hypervisor
+        self.routers = {}
+
+    @property
+    def ram(self):
+
+        return sum(ram for ram, _, _ in self.routers.values())
+
+    def images(self):
+
+        return {image for _, image, _ in self.routers.values() if image}
+
+    def platforms(self):
+
+        return {platform for _, _, platform in self.routers.values()}
+
+    def has_name(self, name):
+
+        return any(device.name == name for device in self.hypervisor.devices)
+
+
+class HypervisorPool:
+
+    """
+    Routers of a project sharing one Dynamips process save the memory and
+    the startup time of a process per router, and the routers running the
+    same IOS image share the same ghost instance.
+
+    Settings in the Dynamips section of the configuration:
+    - hypervisors_per_project: maximum number of processes per project,
+      0 starts a process for each router (default)
+    - memory_usage_limit_per_hypervisor: RAM in MB of the routers placed on
+      a process before a new one is started (default 1024)
+    - allocate_hypervisor_per_ios_image: a process only runs routers using
+      the same IOS image (default True)
+
+    :param manager: Dynamips manager instance
+    """
+
+    def __init__(self, manager):
+
+        self._manager = manager
+        self._entries = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def _settings(self):
+
+        return self._manager.config.get_section_config("Dynamips")
+
+    @property
+    def hypervisors_per_project(self):
+
+        return self._settings.getint("hypervisors_per_project", 0)
+
+    @property
+    def memory_usage_limit(self):
+
+        return self._settings.getint("memory_usage_limit_per_hypervisor", 1024)
+
+    @property
+    def hypervisor_per_ios_image(self):
+
+        return self._settings.getboolean("allocate_hypervisor_per_ios_image", True)
+
+    def hypervisors(self, project):
+        """
+        Returns the hypervisors of the pool for a project.
+
+        :param project: Project instance
+        :returns: list of Hypervisor instances
+        """
+
+        return [entry.hypervisor for entry in self._entries.get(project.id, [])]
+
+    def _score(self, entry, router, image, ram):
+        """
+        Returns the placement score of a router on a hypervisor,
+        None if the router can't be placed on it.
+        """
+
+        if not entry.hypervisor.is_running() or entry.has_name(router.name):
+            return None
+        if entry.hypervisor.working_dir != router.project.module_working_directory(self._manager.module_name.lower()):
+            return None
+        images = entry.images()
+        if image and images and self.hypervisor_per_ios_image and images != {image}:
+            return None
+        if entry.ram + ram > self.memory_usage_limit:
+            return None
+        # the same image first for the ghost instance, the same platform
+        # next, then the fullest hypervisor to use as few processes as possible
+        return (image in images, router.platform in entry.platforms(), entry.ram)
+
+    def _select(self, router, image, ram):
+
+        entries = self._entries.get(router.project.id, [])
+        candidates = []
+        for entry in entries:
+            score = self._score(entry, router, image, ram)
+            if score is not None:
+                candidates.append((score, entry))
+        if candidates:
+            return max(candidates, key=lambda candidate: candidate[0])[1]
+        running = [entry for entry in entries if entry.hypervisor.is_running() and not entry.has_name(router.name)]
+        if running and len(running) >= self.hypervisors_per_project:
+            # no more process allowed, use the least loaded one
+            return min(running, key=lambda entry: entry.ram)
+        return None
+
+    @asyncio.coroutine
+    def allocate(self, router, image=None, ram=None):
+        """
+        Returns the hypervisor where a router must be created.
+
+        :param router: Router instance
+        :param image: IOS image the router will use (if known)
+        :param ram: RAM the router will use (if known)
+
+        :returns: Hypervisor instance
+        """
+
+        working_dir = router.project.module_working_directory(self._manager.module_name.lower())
+        if not self.hypervisors_per_project:
+            return (yield from self._manager.start_new_hypervisor(working_dir=working_dir))
+
+        image = os.path.basename(image or router.image or "")
+        ram = ram or router.ram
+        with (yield from self._lock):
+            entry = self._select(router, image, ram)
+            if entry is None:
+                hypervisor = yield from self._manager.start_new_hypervisor(working_dir=working_dir)
+                entry = _PoolEntry(hypervisor)
+                entries = self._entries.setdefault(router.project.id, [])
+                # forget the stopped hypervisors
+                entries[:] = [e for e in entries if e.hypervisor.is_running()]
+                entries.append(entry)
+                log.info("Hypervisor {}:{} added to the pool of project {}".format(hypervisor.host, hypervisor.port, router.project.id))
+            entry.routers[router.id] = (ram, image, router.platform)
+            log.debug('Router "{}" placed on hypervisor {}:{} ({} routers, {} MB)'.format(router.name,
+                                                                                          entry.hypervisor.host,
+                                                                                          entry.hypervisor.port,
+                                                                                          len(entry.routers),
+                                                                                          entry.ram))
+            return entry.hypervisor
+
+    def update(self, router):
+        """
+        Updates the image and RAM of a router used for the next placements.
+
+        :param router: Router instance
+        """
+
+        for entry in self._entries.get(router.project.id, []):
+            if router.id in entry.routers:
+                entry.routers[router.id] = (router.ram, os.path.basename(router.image or ""), router.platform)
+
+    def release(self, router):
+        """
+        Removes a router from the pool.
+
+        :param router: Router instance
+        """
+
+        entries = self._entries.get(router.project.id)
+        if not entries:
+            return
+        for entry in list(entries):
+            entry.routers.pop(router.id, None)
+            if not entry.routers:
+                entries.remove(entry)
+        if not entries:
+            del self._entries[router.project.id]
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Database of the validated idle-PC values of the IOS images.
+"""
+
+import os
+import json
+import time
+
+import logging
+log = logging.getLogger(__name__)
+
+IDLEPC_DATABASE_FILENAME = ".gns3_idlepc_db"
+
+
+class IdlePCDatabase:
+
+    """
+    Idle-PC values indexed by the md5 of the IOS image, the platform
+    and the RAM of the router. The database is a JSON file.
+
+    :param path: path of the database file
+    """
+
+    def __init__(self, path):
+
+        self._path = path
+        self._entries = {}
+        self._load()
+
+    @property
+    def path(self):
+        """
+        Path of the database file
+        """
+
+        return self._path
+
+    @staticmethod
+    def _key(image_md5, platform, ram):
+
+        return "{}:{}:{}".format(image_md5, platform, ram)
+
+    def _load(self):
+
+        try:
+            with open(self._path) as f:
+                self._entries = json.load(f)["idlepcs"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if os.path.exists(self._path):
+                log.warning("Can't load the idle-PC database {}: {}".format(self._path, e))
+
+    def _save(self):
+
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp_path = self._path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": 1, "idlepcs": self._entries}, f, indent=4, sort_keys=True)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            log.error("Can't write the idle-PC database {}: {}".format(self._path, e))
+
+    def get(self, image_md5, platform, ram):
+        """
+        Returns the idle-PC value of an IOS image. A value found for the
+        image and platform with another amount of RAM is used if there is
+        none for this amount of RAM.
+
+        :param image_md5: md5 of the IOS image
+        :param platform: router platform
+        :param ram: amount of RAM in Mbytes
+
+        :returns: idle-PC value or None
+        """
+
+        entry = self._entries.get(self._key(image_md5, platform, ram))
+        if entry is None:
+            prefix = self._key(image_md5, platform, "")
+            for key in sorted(self._entries):
+                if key.startswith(prefix):
+                    entry = self._entries[key]
+                    break
+        if entry is None:
+            return None
+        return entry["idlepc"]
+
+    def set(self, image_md5, platform, ram, idlepc, image=None):
+        """
+        Records a validated idle-PC value.
+
+        :param image_md5: md5 of the IOS image
+        :param platform: router platform
+        :param ram: amount of RAM in Mbytes
+        :param idlepc: idle-PC value
+        :param image: image name (informative)
+        """
+
+        self._entries[self._key(image_md5, platform, ram)] = {"idlepc": idlepc,
+                                                              "image": image,
+                                                              "validated": int(time.time())}
+        self._save()
+
+    def remove(self, image_md5, platform, ram):
+        """
+        Forgets an idle-PC value.
+
+        :param image_md5: md5 of the IOS image
+        :param platform: router platform
+        :param ram: amount of RAM in Mbytes
+        """
+
+        if self._entries.pop(self._key(image_md5, platform, ram), None) is not None:
+            self._save()
@@ -131,18 +131,26 @@ class EthernetSwitch(Device):
             yield from self.hypervisor.stop()
 
     @asyncio.coroutine
-    def add_nio(self, nio, port_number):
+    def add_nio(self, nio, port_number, port_settings=None):
         """
         Adds a NIO as new port on Ethernet switch.
 
         :param nio: NIO instance to add
         :param port_number: port to allocate for the NIO
+        :param port_settings: optional port settings, sent to the hypervisor in the same batch
         """
 
         if port_number in self._nios:
             raise DynamipsError("Port {} isn't free".format(port_number))
 
-        yield from self._hypervisor.send('ethsw add_nio "{name}" {nio}'.format(name=self._name, nio=nio))
+        commands = ['ethsw add_nio "{name}" {nio}'.format(name=self._name, nio=nio)]
+        if port_settings:
+            command, mapping = self._port_settings_command(nio, port_settings)
+            commands.append(command)
+
+        results = yield from self._hypervisor.send_batch(commands, return_exceptions=True)
+        if isinstance(results[0], DynamipsError):
+            raise results[0]
 
         log.info('Ethernet switch "{name}" [{id}]: NIO {nio} bound to port {port}'.format(name=self._name,
                                                                                           id=self._id,
@@ -150,6 +158,46 @@ class EthernetSwitch(Device):
                                                                                           port=port_number))
         self._nios[port_number] = nio
 
+        if port_settings:
+            if isinstance(results[1], DynamipsError):
+                raise results[1]
+            log.info('Ethernet switch "{name}" [{id}]: port {port} set as {mapping}'.format(name=self._name,
+                                                                                            id=self._id,
+                                                                                            port=port_number,
+                                                                                            mapping=mapping))
+            self._mappings[port_number] = mapping
+
+    def _port_settings_command(self, nio, settings):
+        """
+        Builds the hypervisor command applying port settings to a NIO.
+
+        :param nio: NIO instance
+        :param settings: port settings
+
+        :returns: tuple (command, port mapping)
+        """
+
+        if settings["type"] == "access":
+            command = 'ethsw set_access_port "{name}" {nio} {vlan_id}'.format(name=self._name,
+                                                                              nio=nio,
+                                                                              vlan_id=settings["vlan"])
+            return command, ("access", settings["vlan"])
+        elif settings["type"] == "dot1q":
+            command = 'ethsw set_dot1q_port "{name}" {nio} {native_vlan}'.format(name=self._name,
+                                                                                 nio=nio,
+                                                                                 native_vlan=settings["vlan"])
+            return command, ("dot1q", settings["vlan"])
+        elif settings["type"] == "qinq":
+            ethertype = settings["ethertype"]
+            if ethertype != "0x8100" and parse_version(self.hypervisor.version) < parse_version('0.2.16'):
+                raise DynamipsError("Dynamips version required is >= 0.2.16 to change the default QinQ Ethernet type, detected version is {}".format(self.hypervisor.version))
+            command = 'ethsw set_qinq_port "{name}" {nio} {outer_vlan} {ethertype}'.format(name=self._name,
+                                                                                           nio=nio,
+                                                                                           outer_vlan=settings["vlan"],
+                                                                                           ethertype=ethertype if ethertype != "0x8100" else "")
+            return command, ("qinq", settings["vlan"], ethertype)
+        raise DynamipsError("Unknown port type {}".format(settings["type"]))
+
     @asyncio.coroutine
     def remove_nio(self, port_number):
         """
@@ -207,16 +255,14 @@ class EthernetSwitch(Device):
         if port_number not in self._nios:
             raise DynamipsError("Port {} is not allocated".format(port_number))
 
-        nio = self._nios[port_number]
-        yield from self._hypervisor.send('ethsw set_access_port "{name}" {nio} {vlan_id}'.format(name=self._name,
-                                                                                                 nio=nio,
-                                                                                                 vlan_id=vlan_id))
+        command, mapping = self._port_settings_command(self._nios[port_number], {"type": "access", "vlan": vlan_id})
+        yield from self._hypervisor.send(command)
 
         log.info('Ethernet switch "{name}" [{id}]: port {port} set as an access port in VLAN {vlan_id}'.format(name=self._name,
                                                                                                                id=self._id,
                                                                                                                port=port_number,
                                                                                                                vlan_id=vlan_id))
-        self._mappings[port_number] = ("access", vlan_id)
+        self._mappings[port_number] = mapping
 
     @asyncio.coroutine
     def set_dot1q_port(self, port_number, native_vlan):
@@ -230,17 +276,15 @@ class EthernetSwitch(Device):
         if port_number not in self._nios:
             raise DynamipsError("Port {} is not allocated".format(port_number))
 
-        nio = self._nios[port_number]
-        yield from self._hypervisor.send('ethsw set_dot1q_port "{name}" {nio} {native_vlan}'.format(name=self._name,
-                                                                                                    nio=nio,
-                                                                                                    native_vlan=native_vlan))
+        command, mapping = self._port_settings_command(self._nios[port_number], {"type": "dot1q", "vlan": native_vlan})
+        yield from self._hypervisor.send(command)
 
         log.info('Ethernet switch "{name}" [{id}]: port {port} set as a 802.1Q port with native VLAN {vlan_id}'.format(name=self._name,
                                                                                                                        id=self._id,
                                                                                                                        port=port_number,
                                                                                                                        vlan_id=native_vlan))
 
-        self._mappings[port_number] = ("dot1q", native_vlan)
+        self._mappings[port_number] = mapping
 
     @asyncio.coroutine
     def set_qinq_port(self, port_number, outer_vlan, ethertype):
@@ -254,21 +298,15 @@ class EthernetSwitch(Device):
         if port_number not in self._nios:
             raise DynamipsError("Port {} is not allocated".format(port_number))
 
-        nio = self._nios[port_number]
-        if ethertype != "0x8100" and parse_version(self.hypervisor.version) < parse_version('0.2.16'):
-            raise DynamipsError("Dynamips version required is >= 0.2.16 to change the default QinQ Ethernet type, detected version is {}".format(self.hypervisor.version))
-
-        yield from self._hypervisor.send('ethsw set_qinq_port "{name}" {nio} {outer_vlan} {ethertype}'.format(name=self._name,
-                                                                                                              nio=nio,
-                                                                                                              outer_vlan=outer_vlan,
-                                                                                                              ethertype=ethertype if ethertype != "0x8100" else ""))
+        command, mapping = self._port_settings_command(self._nios[port_number], {"type": "qinq", "vlan": outer_vlan, "ethertype": ethertype})
+        yield from self._hypervisor.send(command)
 
         log.info('Ethernet switch "{name}" [{id}]: port {port} set as a QinQ ({ethertype}) port with outer VLAN {vlan_id}'.format(name=self._name,
                                                                                                                                   id=self._id,
                                                                                                                                   port=port_number,
                                                                                                                                   vlan_id=outer_vlan,
                                                                                                                                   ethertype=ethertype))
-        self._mappings[port_number] = ("qinq", outer_vlan, ethertype)
+        self._mappings[port_number] = mapping
 
     @asyncio.coroutine
     def get_mac_addr_table(self):
@@ -92,6 +92,7 @@ class Router(BaseVM):
         self._system_id = "FTX0945W0MY"  # processor board ID in IOS
         self._slots = []
         self._ghost_flag = ghost_flag
+        self._placement_hint = (None, None)
 
         if not ghost_flag:
             if not dynamips_id:
@@ -168,32 +169,46 @@ class Router(BaseVM):
 
         return self._dynamips_id
 
+    def set_placement_hint(self, image=None, ram=None):
+        """
+        Sets the IOS image and RAM the router will use, before they are
+        configured, to choose its hypervisor when it's created.
+
+        :param image: path to IOS image file
+        :param ram: amount of RAM in Mbytes (integer)
+        """
+
+        self._placement_hint = (image, ram)
+
     @asyncio.coroutine
     def create(self):
 
         if not self._hypervisor:
-            module_workdir = self.project.module_working_directory(self.manager.module_name.lower())
-            self._hypervisor = yield from self.manager.start_new_hypervisor(working_dir=module_workdir)
+            image, ram = self._placement_hint
+            self._hypervisor = yield from self.manager.hypervisor_pool.allocate(self, image=image, ram=ram)
 
-        yield from self._hypervisor.send('vm create "{name}" {id} {platform}'.format(name=self._name,
-                                                                                     id=self._dynamips_id,
-                                                                                     platform=self._platform))
+        commands = ['vm create "{name}" {id} {platform}'.format(name=self._name,
+                                                                id=self._dynamips_id,
+                                                                platform=self._platform)]
 
         if not self._ghost_flag:
 
-            log.info('Router {platform} "{name}" [{id}] has been created'.format(name=self._name,
-                                                                                 platform=self._platform,
-                                                                                 id=self._id))
-
-            yield from self._hypervisor.send('vm set_con_tcp_port "{name}" {console}'.format(name=self._name, console=self._console))
+            commands.append('vm set_con_tcp_port "{name}" {console}'.format(name=self._name, console=self._console))
 
             if self.aux is not None:
-                yield from self._hypervisor.send('vm set_aux_tcp_port "{name}" {aux}'.format(name=self._name, aux=self.aux))
+                commands.append('vm set_aux_tcp_port "{name}" {aux}'.format(name=self._name, aux=self.aux))
 
             # get the default base MAC address
-            mac_addr = yield from self._hypervisor.send('{platform} get_mac_addr "{name}"'.format(platform=self._platform,
-                                                                                                  name=self._name))
-            self._mac_addr = mac_addr[0]
+            commands.append('{platform} get_mac_addr "{name}"'.format(platform=self._platform, name=self._name))
+
+        results = yield from self._hypervisor.send_batch(commands)
+
+        if not self._ghost_flag:
+
+            log.info('Router {platform} "{name}" [{id}] has been created'.format(name=self._name,
+                                                                                 platform=self._platform,
+                                                                                 id=self._id))
+            self._mac_addr = results[-1][0]
 
         self._hypervisor.devices.append(self)
 
@@ -332,15 +347,19 @@ class Router(BaseVM):
                     if nio and isinstance(nio, NIOUDP):
                         self.manager.port_manager.release_udp_port(nio.lport, self._project)
 
-        if self in self._hypervisor.devices:
-            self._hypervisor.devices.remove(self)
-        if self._hypervisor and not self._hypervisor.devices:
-            try:
-                yield from self.stop()
-                yield from self._hypervisor.send('vm delete "{}"'.format(self._name))
-            except DynamipsError as e:
-                log.warn("Could not stop and delete {}: {}".format(self._name, e))
-            yield from self.hypervisor.stop()
+        if self._hypervisor:
+            # the hypervisor can be shared with other routers of the pool
+            if self._hypervisor.is_running():
+                try:
+                    yield from self.stop()
+                    yield from self._hypervisor.send('vm delete "{}"'.format(self._name))
+                except DynamipsError as e:
+                    log.warn("Could not stop and delete {}: {}".format(self._name, e))
+            if self in self._hypervisor.devices:
+                self._hypervisor.devices.remove(self)
+            self.manager.hypervisor_pool.release(self)
+            if not self._hypervisor.devices:
+                yield from self.hypervisor.stop()
 
         if self._auto_delete_disks:
             # delete nvram and disk files
@@ -441,6 +460,15 @@ class Router(BaseVM):
                                                                                      image=image))
 
         self._image = image
+        self.manager.hypervisor_pool.update(self)
+
+        if not self._idlepc and not self._ghost_flag:
+            idlepc = yield from self.manager.get_known_idlepc(self)
+            if idlepc:
+                log.info('Router "{name}" [{id}]: idle-PC {idlepc} found in the database'.format(name=self._name,
+                                                                                                 id=self._id,
+                                                                                                 idlepc=idlepc))
+                yield from self.set_idlepc(idlepc)
 
     @property
     def ram(self):
@@ -469,6 +497,7 @@ class Router(BaseVM):
                                                                                               old_ram=self._ram,
                                                                                               new_ram=ram))
         self._ram = ram
+        self.manager.hypervisor_pool.update(self)
 
     @property
     def nvram(self):
@@ -733,8 +762,8 @@ class Router(BaseVM):
         :ghost_file: path to ghost file
         """
 
-        yield from self._hypervisor.send('vm set_ghost_file "{name}" {ghost_file}'.format(name=self._name,
-                                                                                          ghost_file=ghost_file))
+        yield from self._hypervisor.send('vm set_ghost_file "{name}" "{ghost_file}"'.format(name=self._name,
+                                                                                            ghost_file=ghost_file))
 
         log.info('Router "{name}" [{id}]: ghost file set to {ghost_file}'.format(name=self._name,
                                                                                  id=self._id,
@@ -742,18 +771,6 @@ class Router(BaseVM):
 
         self._ghost_file = ghost_file
 
-    def formatted_ghost_file(self):
-        """
-        Returns a properly formatted ghost file name.
-
-        :returns: formatted ghost_file name (string)
-        """
-
-        # replace specials characters in 'drive:\filename' in Linux and Dynamips in MS Windows or viceversa.
-        ghost_file = "{}-{}.ghost".format(os.path.basename(self._image), self._ram)
-        ghost_file = ghost_file.replace('\\', '-').replace('/', '-').replace(':', '-')
-        return ghost_file
-
     @property
     def ghost_status(self):
         """Returns ghost RAM status
@@ -1192,20 +1209,26 @@ class Router(BaseVM):
             raise DynamipsError("Port {port_number} does not exist in adapter {adapter}".format(adapter=adapter,
                                                                                                 port_number=port_number))
 
-        try:
-            yield from self._hypervisor.send('vm slot_add_nio_binding "{name}" {slot_number} {port_number} {nio}'.format(name=self._name,
-                                                                                                                         slot_number=slot_number,
-                                                                                                                         port_number=port_number,
-                                                                                                                         nio=nio))
-        except DynamipsError:
+        add_binding = 'vm slot_add_nio_binding "{name}" {slot_number} {port_number} {nio}'.format(name=self._name,
+                                                                                                  slot_number=slot_number,
+                                                                                                  port_number=port_number,
+                                                                                                  nio=nio)
+        commands = [add_binding]
+        is_running = yield from self.is_running()
+        if is_running:  # running router
+            commands.append('vm slot_enable_nio "{name}" {slot_number} {port_number}'.format(name=self._name,
+                                                                                             slot_number=slot_number,
+                                                                                             port_number=port_number))
+
+        results = yield from self._hypervisor.send_batch(commands, return_exceptions=True)
+        if isinstance(results[0], DynamipsError):
             # in case of error try to remove and add the nio binding
-            yield from self._hypervisor.send('vm slot_remove_nio_binding "{name}" {slot_number} {port_number}'.format(name=self._name,
-                                                                                                                      slot_number=slot_number,
-                                                                                                                      port_number=port_number))
-            yield from self._hypervisor.send('vm slot_add_nio_binding "{name}" {slot_number} {port_number} {nio}'.format(name=self._name,
-                                                                                                                         slot_number=slot_number,
-                                                                                                                         port_number=port_number,
-                                                                                                                         nio=nio))
+            remove_binding = 'vm slot_remove_nio_binding "{name}" {slot_number} {port_number}'.format(name=self._name,
+                                                                                                      slot_number=slot_number,
+                                                                                                      port_number=port_number)
+            yield from self._hypervisor.send_batch([remove_binding] + commands)
+        elif is_running and isinstance(results[1], DynamipsError):
+            raise results[1]
 
         log.info('Router "{name}" [{id}]: NIO {nio_name} bound to port {slot_number}/{port_number}'.format(name=self._name,
                                                                                                            id=self._id,
@@ -1213,7 +1236,11 @@ class Router(BaseVM):
                                                                                                            slot_number=slot_number,
                                                                                                            port_number=port_number))
 
-        yield from self.slot_enable_nio(slot_number, port_number)
+        if is_running:
+            log.info('Router "{name}" [{id}]: NIO enabled on port {slot_number}/{port_number}'.format(name=self._name,
+                                                                                                      id=self._id,
+                                                                                                      slot_number=slot_number,
+                                                                                                      port_number=port_number))
         adapter.add_nio(port_number, nio)
 
     @asyncio.coroutine
@@ -20,9 +20,13 @@ IOU server module.
 """
 
 import os
+import sys
 import asyncio
+import subprocess
 
 from ..base_manager import BaseManager
+from ...utils.asyncio import subprocess_check_output
+from ...utils.probe_cache import ProbeCache
 from .iou_error import IOUError
 from .iou_vm import IOUVM
 
@@ -88,6 +92,51 @@ class IOU(BaseManager):
                     log.warning(e)
                     continue
 
+    @asyncio.coroutine
+    def add_nio_binding(self, vm, adapter_number, port_number, nio_settings):
+        """
+        Creates a NIO and binds it to an IOU adapter/port.
+
+        :param vm: IOUVM instance
+        :param adapter_number: adapter number
+        :param port_number: port number
+        :param nio_settings: information to create the NIO
+
+        :returns: a NIO object
+        """
+
+        nio = self.create_nio(vm.iouyap_path, nio_settings)
+        yield from vm.adapter_add_nio_binding(adapter_number, port_number, nio)
+        return nio
+
+    @asyncio.coroutine
+    def remove_nio_binding(self, vm, adapter_number, port_number):
+        """
+        Removes the NIO bound to an IOU adapter/port.
+
+        :param vm: IOUVM instance
+        :param adapter_number: adapter number
+        :param port_number: port number
+        """
+
+        yield from vm.adapter_remove_nio_binding(adapter_number, port_number)
+
+    @asyncio.coroutine
+    def probe_executables(self):
+        """
+        Probes the shared library dependencies of the IOU images.
+        """
+
+        if not sys.platform.startswith("linux"):
+            return
+        cache = ProbeCache.instance()
+        for image in (yield from self.list_images()):
+            path = os.path.join(self.get_images_directory(), image["path"])
+            try:
+                yield from cache.probe(path, "ldd", lambda: subprocess_check_output("ldd", path))
+            except (OSError, subprocess.SubprocessError) as e:
+                log.debug("Could not determine the shared library dependencies for {}: {}".format(path, e))
+
     def get_application_id(self, vm_id):
         """
         Get an unique application identifier for IOU.
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Console of an IOU instance served on the event loop. IOU exchanges the
+console data as datagrams on a UNIX socket of the netio directory, the
+datagrams are bridged to the Telnet clients by AsyncioTelnetServer.
+"""
+
+import os
+import time
+import socket
+import asyncio
+
+from ...utils.asyncio.telnet_server import AsyncioTelnetServer
+from .ioucon import FileLock, NetioError, mkdir_netio
+
+import logging
+log = logging.getLogger(__name__)
+
+# How long to wait before retrying a connection (seconds)
+RETRY_DELAY = 0.5
+
+# How often to test an idle connection (seconds)
+POLL_TIMEOUT = 3
+
+
+class _NetioProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, console):
+
+        self._console = console
+        self.closed = asyncio.Future()
+
+    def datagram_received(self, data, addr):
+
+        self._console.feed_output(data)
+
+    def error_received(self, exc):
+
+        # IOU has gone away (stopped or reloaded)
+        log.debug("IOU console netio error: {}".format(exc))
+        self._console.disconnect()
+
+    def connection_lost(self, exc):
+
+        if not self.closed.done():
+            self.closed.set_result(True)
+
+
+class IOUConsole:
+
+    """
+    Console of an IOU instance. The Telnet clients stay connected when
+    IOU is reloaded, the console connects again to the new IOU process.
+
+    :param application_id: IOU application identifier
+    :param host: Telnet server host
+    :param port: Telnet server port
+    :param netio: netio directory used by IOU
+    """
+
+    def __init__(self, application_id, host, port, netio=None):
+
+        if netio is None:
+            netio = "/tmp/netio{}".format(os.getuid())
+        self._netio = netio
+        self._ttyC = "{}/ttyC{}".format(netio, application_id)
+        self._ttyS = "{}/ttyS{}".format(netio, application_id)
+        self._host = host
+        self._port = port
+        self._lock = None
+        self._output = None
+        self._telnet = None
+        self._server = None
+        self._transport = None
+        self._socket = None
+        self._task = None
+        self._last_activity = 0
+
+    @property
+    def connected(self):
+        """
+        True if the console is connected to IOU
+        """
+
+        return self._transport is not None
+
+    @asyncio.coroutine
+    def start(self):
+        """
+        Starts the Telnet server and connects to IOU.
+
+        :raises IOUConError: if the netio socket is used by another console
+        :raises OSError: if the Telnet server can't be started
+        """
+
+        mkdir_netio(self._netio)
+        self._lock = FileLock(self._ttyC)
+        self._lock.lock()
+        try:
+            self._output = asyncio.StreamReader()
+            self._telnet = AsyncioTelnetServer(reader=self._output, writer=self, binary=True, echo=True)
+            self._server = yield from asyncio.start_server(self._telnet.run, self._host, self._port)
+        except OSError:
+            self._telnet = None
+            self._lock.unlock()
+            self._lock = None
+            raise
+        self._telnet.start()
+        self._task = asyncio.async(self._run())
+
+    def stop(self):
+        """
+        Stops the console, the Telnet clients are disconnected.
+        """
+
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.disconnect()
+        if self._server:
+            self._server.close()
+            self._server = None
+        if self._telnet:
+            self._telnet.close()
+            self._telnet = None
+        if self._output:
+            self._output.feed_eof()
+            self._output = None
+        if self._lock:
+            try:
+                self._unlink()
+            finally:
+                self._lock.unlock()
+                self._lock = None
+
+    def feed_output(self, data):
+        """
+        Receives the output of IOU.
+        """
+
+        self._last_activity = time.time()
+        if self._output is not None:
+            self._output.feed_data(data)
+
+    def write(self, data):
+        """
+        Sends the input of the Telnet clients to IOU, the data
+        are dropped when IOU is not running.
+        """
+
+        if self._transport is not None:
+            self._last_activity = time.time()
+            # the transport doesn't know the address of a connected socket
+            self._transport.sendto(bytes(data), self._ttyS)
+
+    @asyncio.coroutine
+    def drain(self):
+
+        # datagrams are never buffered
+        return
+
+    def disconnect(self):
+
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+            self._socket = None
+
+    def _unlink(self):
+
+        try:
+            os.unlink(self._ttyC)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise NetioError("Couldn't unlink socket {}: {}".format(self._ttyC, e))
+
+    @asyncio.coroutine
+    def _connect(self):
+        """
+        Waits for IOU to create its socket and connects to it.
+        """
+
+        self._unlink()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        try:
+            sock.bind(self._ttyC)
+            while True:
+                try:
+                    sock.connect(self._ttyS)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    log.debug("Waiting to connect to {}".format(self._ttyS))
+                    yield from asyncio.sleep(RETRY_DELAY)
+            loop = asyncio.get_event_loop()
+            transport, protocol = yield from loop.create_datagram_endpoint(lambda: _NetioProtocol(self), sock=sock)
+            return sock, transport, protocol
+        except BaseException:
+            sock.close()
+            raise
+
+    @asyncio.coroutine
+    def _run(self):
+
+        while True:
+            try:
+                self._socket, self._transport, protocol = yield from self._connect()
+            except OSError as e:
+                log.error("Couldn't connect to IOU console socket {}: {}".format(self._ttyS, e))
+                return
+            log.debug("Connected to IOU console socket {}".format(self._ttyS))
+            while self._transport is not None and not protocol.closed.done():
+                yield from asyncio.wait([protocol.closed], timeout=POLL_TIMEOUT)
+                if self._socket is not None and time.time() - self._last_activity >= POLL_TIMEOUT:
+                    # An empty datagram checks if IOU is still there
+                    # (the transport doesn't send empty datagrams)
+                    try:
+                        self._socket.send(b"")
+                    except BlockingIOError:
+                        pass
+                    except OSError as e:
+                        log.debug("IOU console socket {} is closed: {}".format(self._ttyS, e))
+                        break
+            self.disconnect()
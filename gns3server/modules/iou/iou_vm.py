@@ -27,8 +27,6 @@ import re
 import asyncio
 import subprocess
 import shutil
-import argparse
-import threading
 import configparser
 import struct
 import hashlib
@@ -43,9 +41,11 @@ from ..nios.nio_udp import NIOUDP
 from ..nios.nio_tap import NIOTAP
 from ..nios.nio_generic_ethernet import NIOGenericEthernet
 from ..base_vm import BaseVM
+from ...utils.probe_cache import ProbeCache
 from .utils.iou_import import nvram_import
 from .utils.iou_export import nvram_export
-from .ioucon import start_ioucon
+from .ioucon import IOUConError
+from .iou_console import IOUConsole
 import gns3server.utils.asyncio
 import gns3server.utils.images
 
@@ -77,7 +77,7 @@ class IOUVM(BaseVM):
         self._iou_stdout_file = ""
         self._started = False
         self._path = None
-        self._ioucon_thread = None
+        self._iou_console = None
 
         # IOU settings
         self._ethernet_adapters = []
@@ -363,7 +363,7 @@ class IOUVM(BaseVM):
         """
 
         try:
-            output = yield from gns3server.utils.asyncio.subprocess_check_output("ldd", self._path)
+            output = yield from ProbeCache.instance().probe(self._path, "ldd", lambda: gns3server.utils.asyncio.subprocess_check_output("ldd", self._path))
         except (FileNotFoundError, subprocess.SubprocessError) as e:
             log.warn("Could not determine the shared library dependencies for {}: {}".format(self._path, e))
             return
@@ -371,6 +371,8 @@ class IOUVM(BaseVM):
         p = re.compile("([\.\w]+)\s=>\s+not found")
         missing_libs = p.findall(output)
         if missing_libs:
+            # the libraries may be installed without changing the image
+            ProbeCache.instance().remove(self._path, "ldd")
             raise IOUError("The following shared library dependencies cannot be found for IOU image {}: {}".format(self._path,
                                                                                                                    ", ".join(missing_libs)))
 
@@ -410,6 +412,7 @@ class IOUVM(BaseVM):
         # in tests or generating one
         if not hasattr(sys, "_called_from_test"):
             try:
+                # not cached, it depends on the hostname and the address of the host
                 hostid = (yield from gns3server.utils.asyncio.subprocess_check_output("hostid")).strip()
             except FileNotFoundError as e:
                 raise IOUError("Could not find hostid: {}".format(e))
@@ -525,7 +528,7 @@ class IOUVM(BaseVM):
                 raise IOUError("Could not start IOU {}: {}\n{}".format(self._path, e, iou_stdout))
 
             # start console support
-            self._start_ioucon()
+            yield from self._start_ioucon()
             # connections support
             yield from self._start_iouyap()
 
@@ -539,7 +542,7 @@ class IOUVM(BaseVM):
         log.info("{} process has stopped, return code: {}".format(process_name, returncode))
         self._terminate_process_iou()
         self._terminate_process_iouyap()
-        self._ioucon_thread_stop_event.set()
+        self._stop_ioucon()
         if returncode != 0:
             self.project.emit("log.error", {"message": "{} process has stopped, return code: {}\n{}".format(process_name,
                                                                                                             returncode,
@@ -652,11 +655,7 @@ class IOUVM(BaseVM):
 
         if self.is_running():
             # stop console support
-            if self._ioucon_thread:
-                self._ioucon_thread_stop_event.set()
-                if self._ioucon_thread.is_alive():
-                    self._ioucon_thread.join(timeout=3.0)  # wait for the thread to free the console port
-                self._ioucon_thread = None
+            self._stop_ioucon()
 
             self._terminate_process_iou()
             if self._iou_process.returncode is None:
@@ -846,18 +845,33 @@ class IOUVM(BaseVM):
                 log.warn("could not read {}: {}".format(self._iouyap_stdout_file, e))
         return output
 
+    @asyncio.coroutine
     def _start_ioucon(self):
         """
-        Starts ioucon thread (for console connections).
+        Starts the console server (for console connections).
         """
 
-        if not self._ioucon_thread:
-            telnet_server = "{}:{}".format(self._manager.port_manager.console_host, self.console)
-            log.info("Starting ioucon for IOU instance {} to accept Telnet connections on {}".format(self._name, telnet_server))
-            args = argparse.Namespace(appl_id=str(self.application_id), debug=False, escape='^^', telnet_limit=0, telnet_server=telnet_server)
-            self._ioucon_thread_stop_event = threading.Event()
-            self._ioucon_thread = threading.Thread(target=start_ioucon, args=(args, self._ioucon_thread_stop_event))
-            self._ioucon_thread.start()
+        if not self._iou_console:
+            console_host = self._manager.port_manager.console_host
+            log.info("Starting console for IOU instance {} to accept Telnet connections on {}:{}".format(self._name, console_host, self.console))
+            iou_console = IOUConsole(self.application_id, console_host, self.console)
+            try:
+                yield from iou_console.start()
+            except (IOUConError, OSError) as e:
+                raise IOUError("Could not start the console of IOU {}: {}".format(self._name, e))
+            self._iou_console = iou_console
+
+    def _stop_ioucon(self):
+        """
+        Stops the console server.
+        """
+
+        if self._iou_console:
+            try:
+                self._iou_console.stop()
+            except IOUConError as e:
+                log.warning("Could not stop the console of IOU {}: {}".format(self._name, e))
+            self._iou_console = None
 
     @property
     def ethernet_adapters(self):
@@ -1021,7 +1035,7 @@ class IOUVM(BaseVM):
         if "IOURC" not in os.environ:
             env["IOURC"] = self.iourc_path
         try:
-            output = yield from gns3server.utils.asyncio.subprocess_check_output(self._path, "-h", cwd=self.working_dir, env=env)
+            output = yield from ProbeCache.instance().probe(self._path, "-h", lambda: gns3server.utils.asyncio.subprocess_check_output(self._path, "-h", cwd=self.working_dir, env=env))
             if re.search("-l\s+Enable Layer 1 keepalive messages", output):
                 command.extend(["-l"])
             else:
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import asyncio
+import collections
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class Notification(tuple):
+
+    """
+    A notification is the tuple (action, event), it's serialized
+    only once whatever the number of clients receiving it.
+
+    :param action: action name
+    :param event: event (dictionary or object with a __json__ method)
+    """
+
+    def __new__(cls, action, event):
+
+        return super().__new__(cls, (action, event))
+
+    @property
+    def action(self):
+
+        return self[0]
+
+    @property
+    def event(self):
+
+        return self[1]
+
+    @property
+    def data(self):
+        """
+        The notification as sent to the clients: a JSON object and a new line.
+
+        :returns: bytes
+        """
+
+        data = self.__dict__.get("_data")
+        if data is None:
+            event = self.event
+            if hasattr(event, "__json__"):
+                event = event.__json__()
+            data = "{}\n".format(json.dumps({"action": self.action, "event": event}, sort_keys=True)).encode("utf-8")
+            self.__dict__["_data"] = data
+        return data
+
+    @property
+    def coalesce_key(self):
+        """
+        Key of the notifications replaced by a newer one when the client is
+        too slow: the status of a VM and the progress of a project task.
+
+        :returns: key or None if the notification can't be replaced
+        """
+
+        if self.action.startswith("vm."):
+            vm_id = getattr(self.event, "id", None)
+            if vm_id is not None:
+                return ("vm", vm_id)
+        elif self.action.startswith("project.") and isinstance(self.event, dict):
+            return (self.action, self.event.get("project_id"))
+        return None
+
+
+class NotificationQueue:
+
+    """
+    Bounded queue of notifications for one client. When the queue is
+    full a pending notification with the same coalesce key is replaced,
+    otherwise the oldest notification is dropped.
+
+    :param maxsize: maximum number of pending notifications
+    """
+
+    def __init__(self, maxsize=1000):
+
+        self._maxsize = maxsize
+        self._queue = collections.deque()
+        self._waiter = None
+        self._dropped = 0
+
+    @property
+    def dropped(self):
+        """
+        Number of notifications dropped since the last batch.
+        """
+
+        return self._dropped
+
+    def qsize(self):
+
+        return len(self._queue)
+
+    def empty(self):
+
+        return not self._queue
+
+    def put_nowait(self, notification):
+        """
+        Adds a notification, never blocks.
+
+        :param notification: Notification instance or tuple (action, event)
+        """
+
+        if not isinstance(notification, Notification):
+            notification = Notification(*notification)
+        if len(self._queue) >= self._maxsize:
+            key = notification.coalesce_key
+            if key is not None:
+                for index, pending in enumerate(self._queue):
+                    if pending.coalesce_key == key:
+                        del self._queue[index]
+                        break
+            if len(self._queue) >= self._maxsize:
+                self._queue.popleft()
+                self._dropped += 1
+                if self._dropped == 1:
+                    log.warning("Notification client is too slow, dropping notifications")
+        self._queue.append(notification)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def get_nowait(self):
+        """
+        Returns the oldest notification.
+
+        :raises asyncio.QueueEmpty: if there is no notification
+        """
+
+        if not self._queue:
+            raise asyncio.QueueEmpty()
+        return self._queue.popleft()
+
+    @asyncio.coroutine
+    def _wait(self, timeout):
+
+        self._waiter = asyncio.Future()
+        try:
+            yield from asyncio.wait_for(self._waiter, timeout)
+        finally:
+            self._waiter = None
+
+    @asyncio.coroutine
+    def get(self):
+        """
+        Waits for a notification and returns it.
+        """
+
+        while not self._queue:
+            yield from self._wait(None)
+        return self._queue.popleft()
+
+    @asyncio.coroutine
+    def get_batch(self, timeout, window=0.05):
+        """
+        Waits for notifications and returns all the notifications
+        received during a short window after the first one.
+
+        :param timeout: seconds to wait for the first notification
+        :param window: seconds to wait for more notifications after the first one
+
+        :returns: list of Notification (empty after the timeout)
+        """
+
+        if not self._queue:
+            try:
+                yield from self._wait(timeout)
+            except asyncio.TimeoutError:
+                return []
+        if window:
+            yield from asyncio.sleep(window)
+
+        batch = list(self._queue)
+        self._queue.clear()
+        if self._dropped:
+            message = "{} notifications have been dropped because the client is too slow".format(self._dropped)
+            batch.insert(0, Notification("log.warning", {"message": message}))
+            self._dropped = 0
+        return batch
@@ -28,6 +28,76 @@ log = logging.getLogger(__name__)
 BANNED_PORTS = set((1, 7, 9, 11, 13, 15, 17, 19, 20, 21, 22, 23, 25, 37, 42, 43, 53, 77, 79, 87, 95, 101, 102, 103, 104, 109, 110, 111, 113, 115, 117, 119, 123, 135, 139, 143, 179, 389, 465, 512, 513, 514, 515, 526, 530, 531, 532, 540, 556, 563, 587, 601, 636, 993, 995, 2049, 3659, 4045, 6000, 6665, 6666, 6667, 6668, 6669))
 
 
+class PortAllocator:
+
+    """
+    Keeps track of the free ports of a range in a bitmap
+    and hands them out from a rotating cursor, so an allocation
+    doesn't have to walk over all the ports already in use.
+
+    :param start_port: first port in the range
+    :param end_port: last port in the range
+    :param used_ports: ports already allocated within the range
+    """
+
+    def __init__(self, start_port, end_port, used_ports=()):
+
+        self._start_port = start_port
+        self._end_port = end_port
+        # one byte per port, 0 means the port is free
+        self._bitmap = bytearray(end_port - start_port + 1)
+        self._cursor = 0
+        for port in BANNED_PORTS.union(used_ports):
+            if start_port <= port <= end_port:
+                self._bitmap[port - start_port] = 1
+
+    def __contains__(self, port):
+
+        return self._start_port <= port <= self._end_port
+
+    def mark_used(self, port):
+        """
+        Marks a port as allocated.
+
+        :param port: port number
+        """
+
+        if port in self:
+            self._bitmap[port - self._start_port] = 1
+
+    def mark_free(self, port):
+        """
+        Marks a port as free.
+
+        :param port: port number
+        """
+
+        if port in self and port not in BANNED_PORTS:
+            self._bitmap[port - self._start_port] = 0
+
+    def candidates(self):
+        """
+        Yields the free ports starting from the cursor and wrapping
+        around the range. The cursor moves past each candidate.
+        """
+
+        size = len(self._bitmap)
+        scanned = 0
+        index = self._cursor
+        while scanned < size:
+            if index >= size:
+                index = 0
+            found = self._bitmap.find(0, index)
+            if found == -1:
+                scanned += size - index
+                index = 0
+                continue
+            scanned += found - index + 1
+            index = found + 1
+            self._cursor = index
+            yield self._start_port + found
+
+
 class PortManager:
 
     """
@@ -42,6 +112,7 @@ class PortManager:
         self._udp_host = "0.0.0.0"
         self._used_tcp_ports = set()
         self._used_udp_ports = set()
+        self._allocators = {}
 
         server_config = Config.instance().get_section_config("Server")
         remote_console_connections = server_config.getboolean("allow_remote_console")
@@ -185,6 +256,92 @@ class PortManager:
                 s.bind(sa)  # the port is available if bind is a success
             return True
 
+    def _allocator(self, start_port, end_port, socket_type):
+        """
+        Returns the allocator of a port range, created on first use.
+
+        :param start_port: first port in the range
+        :param end_port: last port in the range
+        :param socket_type: TCP or UDP
+        """
+
+        key = (socket_type, start_port, end_port)
+        if key not in self._allocators:
+            if end_port < start_port:
+                raise HTTPConflict(text="Invalid port range {}-{}".format(start_port, end_port))
+            used_ports = self._used_udp_ports if socket_type == "UDP" else self._used_tcp_ports
+            self._allocators[key] = PortAllocator(start_port, end_port, used_ports)
+        return self._allocators[key]
+
+    def _allocate_ports(self, start_port, end_port, host, socket_type, count):
+        """
+        Finds free ports in a range. Only the candidates handed out by the
+        allocator are probed with bind().
+
+        :param start_port: first port in the range
+        :param end_port: last port in the range
+        :param host: host/address for bind()
+        :param socket_type: TCP or UDP
+        :param count: number of ports to find
+
+        :returns: list of ports
+        """
+
+        ports = []
+        last_exception = None
+        for port in self._allocator(start_port, end_port, socket_type).candidates():
+            try:
+                PortManager._check_port(host, port, socket_type)
+            except OSError as e:
+                # used by another program, try again on the next pass
+                last_exception = e
+                continue
+            ports.append(port)
+            if len(ports) == count:
+                return ports
+
+        raise HTTPConflict(text="Could not find a free port between {} and {} on host {}, last exception: {}".format(start_port,
+                                                                                                                     end_port,
+                                                                                                                     host,
+                                                                                                                     last_exception))
+
+    def _allocate_port(self, start_port, end_port, host, socket_type):
+
+        return self._allocate_ports(start_port, end_port, host, socket_type, 1)[0]
+
+    def _add_tcp_port(self, port):
+
+        self._used_tcp_ports.add(port)
+        self._mark_port("TCP", port, used=True)
+
+    def _remove_tcp_port(self, port):
+
+        self._used_tcp_ports.remove(port)
+        self._mark_port("TCP", port, used=False)
+
+    def _add_udp_port(self, port):
+
+        self._used_udp_ports.add(port)
+        self._mark_port("UDP", port, used=True)
+
+    def _remove_udp_port(self, port):
+
+        self._used_udp_ports.remove(port)
+        self._mark_port("UDP", port, used=False)
+
+    def _mark_port(self, socket_type, port, used):
+        """
+        Updates all the allocators with a range containing the port
+        (ranges can overlap, e.g. VNC and console ports).
+        """
+
+        for (allocator_type, _, _), allocator in self._allocators.items():
+            if allocator_type == socket_type:
+                if used:
+                    allocator.mark_used(port)
+                else:
+                    allocator.mark_free(port)
+
     def get_free_tcp_port(self, project, port_range_start=None, port_range_end=None):
         """
         Get an available TCP port and reserve it
@@ -197,13 +354,8 @@ class PortManager:
             port_range_start = self._console_port_range[0]
             port_range_end = self._console_port_range[1]
 
-        port = self.find_unused_port(port_range_start,
-                                     port_range_end,
-                                     host=self._console_host,
-                                     socket_type="TCP",
-                                     ignore_ports=self._used_tcp_ports)
-
-        self._used_tcp_ports.add(port)
+        port = self._allocate_port(port_range_start, port_range_end, self._console_host, "TCP")
+        self._add_tcp_port(port)
         project.record_tcp_port(port)
         log.debug("TCP port {} has been allocated".format(port))
         return port
@@ -249,7 +401,7 @@ class PortManager:
             #project.emit("log.warning", {"message": msg})
             return port
 
-        self._used_tcp_ports.add(port)
+        self._add_tcp_port(port)
         project.record_tcp_port(port)
         log.debug("TCP port {} has been reserved".format(port))
         return port
@@ -263,7 +415,7 @@ class PortManager:
         """
 
         if port in self._used_tcp_ports:
-            self._used_tcp_ports.remove(port)
+            self._remove_tcp_port(port)
             project.remove_tcp_port(port)
             log.debug("TCP port {} has been released".format(port))
 
@@ -273,17 +425,30 @@ class PortManager:
 
         :param project: Project instance
         """
-        port = self.find_unused_port(self._udp_port_range[0],
-                                     self._udp_port_range[1],
-                                     host=self._udp_host,
-                                     socket_type="UDP",
-                                     ignore_ports=self._used_udp_ports)
-
-        self._used_udp_ports.add(port)
+        port = self._allocate_port(self._udp_port_range[0], self._udp_port_range[1], self._udp_host, "UDP")
+        self._add_udp_port(port)
         project.record_udp_port(port)
         log.debug("UDP port {} has been allocated".format(port))
         return port
 
+    def get_free_udp_ports(self, project, count):
+        """
+        Get several available UDP ports and reserve them in one pass
+        over the range.
+
+        :param project: Project instance
+        :param count: number of ports
+
+        :returns: list of UDP ports
+        """
+
+        ports = self._allocate_ports(self._udp_port_range[0], self._udp_port_range[1], self._udp_host, "UDP", count)
+        for port in ports:
+            self._add_udp_port(port)
+            project.record_udp_port(port)
+        log.debug("UDP ports {} have been allocated".format(ports))
+        return ports
+
     def reserve_udp_port(self, port, project):
         """
         Reserve a specific UDP port number
@@ -296,7 +461,7 @@ class PortManager:
             raise HTTPConflict(text="UDP port {} already in use on host {}".format(port, self._console_host))
         if port < self._udp_port_range[0] or port > self._udp_port_range[1]:
             raise HTTPConflict(text="UDP port {} is outside the range {}-{}".format(port, self._udp_port_range[0], self._udp_port_range[1]))
-        self._used_udp_ports.add(port)
+        self._add_udp_port(port)
         project.record_udp_port(port)
         log.debug("UDP port {} has been reserved".format(port))
 
@@ -309,6 +474,6 @@ class PortManager:
         """
 
         if port in self._used_udp_ports:
-            self._used_udp_ports.remove(port)
+            self._remove_udp_port(port)
             project.remove_udp_port(port)
             log.debug("UDP port {} has been released".format(port))
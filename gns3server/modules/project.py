@@ -19,15 +19,17 @@ import os
 import aiohttp
 import shutil
 import asyncio
-import hashlib
-import zipstream
 import zipfile
 import json
 
 from uuid import UUID, uuid4
 from .port_manager import PortManager
+from .shutdown_scheduler import ShutdownScheduler
+from .notification_queue import Notification, NotificationQueue
 from ..config import Config
 from ..utils.asyncio import wait_run_in_executor
+from ..utils.zip_stream import ZipStream
+from ..utils.hash_index import HashIndex
 
 
 import logging
@@ -72,6 +74,7 @@ class Project:
 
         # clients listening for notifications
         self._listeners = set()
+        self._shutdown_report = None
 
         if path is None:
             path = os.path.join(self._location, self._id)
@@ -349,11 +352,19 @@ class Project:
         Closes the project, but keep information on disk
         """
 
-        for module in self.modules():
-            yield from module.instance().project_closing(self)
         yield from self._close_and_clean(self._temporary)
-        for module in self.modules():
-            yield from module.instance().project_closed(self)
+
+    def _shutdown_scheduler(self, action):
+        """
+        Returns a scheduler sending its progress to the clients.
+
+        :param action: "close" or "commit"
+        """
+
+        def progress(done, total):
+            self.emit("project.{}".format(action), {"project_id": self._id, "done": done, "total": total})
+
+        return ShutdownScheduler("Project {} {}".format(self._id, action), progress=progress)
 
     @asyncio.coroutine
     def _close_and_clean(self, cleanup):
@@ -363,17 +374,14 @@ class Project:
         :param cleanup: If True drop the project directory
         """
 
-        tasks = []
+        scheduler = self._shutdown_scheduler("close")
+        for module in self.modules():
+            manager = module.instance()
+            scheduler.add("before", manager.module_name, "close project in {}".format(manager.module_name),
+                          manager.project_closing, self, critical=True)
         for vm in self._vms:
-            tasks.append(asyncio.async(vm.manager.close_vm(vm.id)))
-
-        if tasks:
-            done, _ = yield from asyncio.wait(tasks)
-            for future in done:
-                try:
-                    future.result()
-                except (Exception, GeneratorExit) as e:
-                    log.error("Could not close VM or device {}".format(e), exc_info=1)
+            vm.manager.schedule_close_vm(scheduler, vm)
+        yield from scheduler.run()
 
         if cleanup and os.path.exists(self.path):
             try:
@@ -396,18 +404,47 @@ class Project:
         for port in self._used_udp_ports.copy():
             port_manager.release_udp_port(port, self)
 
+        for module in self.modules():
+            manager = module.instance()
+            scheduler.add("after", manager.module_name, "close project in {}".format(manager.module_name),
+                          manager.project_closed, self, critical=True)
+        yield from scheduler.run()
+        self._shutdown_report = scheduler.report()
+        log.info("Project {} closed in {:.3f}s".format(self._id, self._shutdown_report["total_time"]))
+
+    @asyncio.coroutine
+    def _destroy_vm(self, vm):
+
+        yield from vm.delete()
+        self.remove_vm(vm)
+
     @asyncio.coroutine
     def commit(self):
         """
         Writes project changes on disk
         """
 
+        scheduler = self._shutdown_scheduler("commit")
         while self._vms_to_destroy:
             vm = self._vms_to_destroy.pop()
-            yield from vm.delete()
-            self.remove_vm(vm)
+            scheduler.set_concurrency(vm.manager.module_name, vm.manager.shutdown_concurrency)
+            scheduler.add("vms", vm.manager.module_name, "delete VM {}".format(vm.name), self._destroy_vm, vm, critical=True)
         for module in self.modules():
-            yield from module.instance().project_committed(self)
+            manager = module.instance()
+            scheduler.add("after", manager.module_name, "commit project in {}".format(manager.module_name),
+                          manager.project_committed, self, critical=True)
+        yield from scheduler.run()
+        self._shutdown_report = scheduler.report()
+
+    @property
+    def shutdown_report(self):
+        """
+        Timing report of the last close or commit of the project
+
+        :returns: dictionary (see ShutdownScheduler.report) or None
+        """
+
+        return self._shutdown_report
 
     @asyncio.coroutine
     def delete(self):
@@ -415,11 +452,7 @@ class Project:
         Removes project from disk
         """
 
-        for module in self.modules():
-            yield from module.instance().project_closing(self)
         yield from self._close_and_clean(True)
-        for module in self.modules():
-            yield from module.instance().project_closed(self)
 
     @classmethod
     def clean_project_directory(cls):
@@ -455,14 +488,18 @@ class Project:
         :param action: Action name
         :param event: Event to send
         """
+
+        if not self._listeners:
+            return
+        notification = Notification(action, event)
         for listener in self._listeners:
-            listener.put_nowait((action, event, ))
+            listener.put_nowait(notification)
 
     def get_listen_queue(self):
         """Get a queue where you receive all the events related to the
         project."""
 
-        queue = asyncio.Queue()
+        queue = NotificationQueue()
         self._listeners.add(queue)
         return queue
 
@@ -488,47 +525,46 @@ class Project:
         for (dirpath, dirnames, filenames) in os.walk(self.path):
             for filename in filenames:
                 if not filename.endswith(".ghost"):
-                    path = os.path.relpath(dirpath, self.path)
-                    path = os.path.join(path, filename)
-                    path = os.path.normpath(path)
-                    file_info = {"path": path}
-
-                    try:
-                        file_info["md5sum"] = yield from wait_run_in_executor(self._hash_file, os.path.join(dirpath, filename))
-                    except OSError:
-                        continue
-                    files.append(file_info)
-
-        return files
-
-    def _hash_file(self, path):
-        """
-        Compute and md5 hash for file
-
-        :returns: hexadecimal md5
-        """
+                    files.append(os.path.join(dirpath, filename))
 
-        m = hashlib.md5()
-        with open(path, "rb") as f:
-            while True:
-                buf = f.read(128)
-                if not buf:
-                    break
-                m.update(buf)
-        return m.hexdigest()
+        digests = yield from HashIndex.instance_for(self.path).get_many(files)
+        return [{"path": os.path.normpath(os.path.relpath(path, self.path)), "md5sum": digests[path]}
+                for path in files if path in digests]
 
+    @asyncio.coroutine
     def export(self, include_images=False):
         """
         Export the project as zip. It's a ZipStream object.
         The file will be read chunk by chunk when you iterate on
-        the zip.
+        the zip or when you call its stream coroutine, which compresses
+        on all the cores. The entries are listed now on a thread, the
+        progress is sent to the notification clients as project.export events.
 
         It will ignore some files like snapshots and
 
         :returns: ZipStream object
         """
 
-        z = zipstream.ZipFile(allowZip64=True)
+        z = ZipStream(progress=self._export_progress(), on_error=self._export_error)
+        images_directories = None
+        if include_images:
+            images_directories = self._images_directories()
+        warnings = yield from wait_run_in_executor(self._export_files, z, images_directories)
+        for msg in warnings:
+            self.emit("log.warning", {"message": msg})
+        return z
+
+    def _export_files(self, z, images_directories):
+        """
+        Adds the project files to the zip, runs on a thread.
+
+        :param z: ZipStream instance
+        :param images_directories: directories of the images to export, None to not export the images
+
+        :returns: list of warning messages
+        """
+
+        warnings = []
         # topdown allo to modify the list of directory in order to ignore
         # directory
         for root, dirs, files in os.walk(self._path, topdown=True):
@@ -541,43 +577,74 @@ class Project:
 
             for file in files:
                 path = os.path.join(root, file)
-                # Try open the file
                 try:
-                    open(path).close()
+                    # We rename the .gns3 project.gns3 to avoid the task to the client to guess the file name
+                    if file.endswith(".gns3"):
+                        self._export_project_file(path, z, images_directories)
+                    else:
+                        # We merge the data from all server in the same project-files directory
+                        vm_directory = os.path.join(self._path, "servers", "vm")
+                        if os.path.commonprefix([root, vm_directory]) == vm_directory:
+                            z.write(path, os.path.relpath(path, vm_directory))
+                        else:
+                            z.write(path, os.path.relpath(path, self._path))
                 except OSError as e:
                     msg = "Could not export file {}: {}".format(path, e)
                     log.warn(msg)
-                    self.emit("log.warning", {"message": msg})
-                    continue
-                # We rename the .gns3 project.gns3 to avoid the task to the client to guess the file name
-                if file.endswith(".gns3"):
-                    self._export_project_file(path, z, include_images)
-                else:
-                    # We merge the data from all server in the same project-files directory
-                    vm_directory = os.path.join(self._path, "servers", "vm")
-                    if os.path.commonprefix([root, vm_directory]) == vm_directory:
-                        z.write(path, os.path.relpath(path, vm_directory), compress_type=zipfile.ZIP_DEFLATED)
-                    else:
-                        z.write(path, os.path.relpath(path, self._path), compress_type=zipfile.ZIP_DEFLATED)
-        return z
+                    warnings.append(msg)
+        return warnings
 
-    def _export_images(self, image, type, z):
+    def _export_error(self, path, error):
+        """
+        Called when a file can't be read while the zip is produced.
         """
-        Take a project file (.gns3) and export images to the zip
 
-        :param image: Image path
-        :param type: Type of image
-        :param z: Zipfile instance for the export
+        msg = "Could not export file {}: {}".format(path, error)
+        log.warn(msg)
+        self.emit("log.warning", {"message": msg})
+
+    def _export_progress(self):
+        """
+        Callback sending the export progress to the clients,
+        only when the percentage change.
+        """
+
+        last = [-1]
+
+        def progress(done, total):
+            percent = 100 if total == 0 else done * 100 // total
+            if percent != last[0]:
+                last[0] = percent
+                self.emit("project.export", {"project_id": self._id, "progress": percent})
+        return progress
+
+    @staticmethod
+    def _images_directories():
+        """
+        Returns the images directories of the modules
         """
         from . import MODULES
 
+        directories = []
         for module in MODULES:
             try:
-                img_directory = module.instance().get_images_directory()
+                directories.append(module.instance().get_images_directory())
             except NotImplementedError:
                 # Some modules don't have images
                 continue
+        return directories
+
+    def _export_images(self, image, type, z, images_directories):
+        """
+        Take a project file (.gns3) and export images to the zip
+
+        :param image: Image path
+        :param type: Type of image
+        :param z: Zipfile instance for the export
+        :param images_directories: directories of the images
+        """
 
+        for img_directory in images_directories:
             directory = os.path.split(img_directory)[-1:][0]
 
             if os.path.exists(image):
@@ -587,14 +654,16 @@ class Project:
 
             if os.path.exists(path):
                 arcname = os.path.join("images", directory, os.path.basename(image))
-                z.write(path, arcname)
+                z.write(path, arcname, compress_type=zipfile.ZIP_STORED)
                 break
 
-    def _export_project_file(self, path, z, include_images):
+    def _export_project_file(self, path, z, images_directories):
         """
         Take a project file (.gns3) and patch it for the export
 
         :param path: Path of the .gns3
+        :param z: Zipfile instance for the export
+        :param images_directories: directories of the images to export, None to not export the images
         """
 
         with open(path) as f:
@@ -605,8 +674,8 @@ class Project:
                     for prop, value in node["properties"].items():
                         if prop.endswith("image"):
                             node["properties"][prop] = os.path.basename(value)
-                            if include_images is True:
-                                self._export_images(value, node["type"], z)
+                            if images_directories is not None:
+                                self._export_images(value, node["type"], z, images_directories)
         z.writestr("project.gns3", json.dumps(topology).encode())
 
     def import_zip(self, stream, gns3vm=True):
@@ -19,6 +19,71 @@ import os
 import asyncio
 import struct
 
+import logging
+log = logging.getLogger(__name__)
+
+QCOW2_MAGIC = 0x514649fb  # The first 4 bytes contain the characters 'Q', 'F', 'I' followed by 0xfb.
+
+# Header extensions
+QCOW2_EXT_END = 0x00000000
+QCOW2_EXT_BACKING_FORMAT = 0xe2792aca
+QCOW2_EXT_FEATURE_TABLE = 0x6803f857
+
+# Each QCOW2 file begins with a header, in big endian format, as follows:
+#
+# typedef struct QCowHeader {
+#     uint32_t magic;
+#     uint32_t version;
+#
+#     uint64_t backing_file_offset;
+#     uint32_t backing_file_size;
+#
+#     uint32_t cluster_bits;
+#     uint64_t size; /* in bytes */
+#     uint32_t crypt_method;
+#
+#     uint32_t l1_size;
+#     uint64_t l1_table_offset;
+#
+#     uint64_t refcount_table_offset;
+#     uint32_t refcount_table_clusters;
+#
+#     uint32_t nb_snapshots;
+#     uint64_t snapshots_offset;
+#
+#     /* version 3 only */
+#     uint64_t incompatible_features;
+#     uint64_t compatible_features;
+#     uint64_t autoclear_features;
+#
+#     uint32_t refcount_order;
+#     uint32_t header_length;
+# } QCowHeader;
+HEADER_V2_FORMAT = ">IIQIIQIIQQIIQ"
+HEADER_V3_FORMAT = HEADER_V2_FORMAT + "QQQII"
+HEADER_V2_FIELDS = ("magic", "version",
+                    "backing_file_offset", "backing_file_size",
+                    "cluster_bits", "size", "crypt_method",
+                    "l1_size", "l1_table_offset",
+                    "refcount_table_offset", "refcount_table_clusters",
+                    "nb_snapshots", "snapshots_offset")
+HEADER_V3_FIELDS = HEADER_V2_FIELDS + ("incompatible_features", "compatible_features", "autoclear_features",
+                                       "refcount_order", "header_length")
+
+# Feature name table written by qemu-img
+FEATURE_TABLE = ((0, 0, b"dirty bit"),
+                 (0, 1, b"corrupt bit"),
+                 (1, 0, b"lazy refcounts"))
+
+
+def _extension(ext_type, data):
+    """
+    Returns a header extension padded to 8 bytes.
+    """
+
+    padding = -len(data) % 8
+    return struct.pack(">II", ext_type, len(data)) + data + b"\0" * padding
+
 
 class Qcow2Error(Exception):
     pass
@@ -26,7 +91,7 @@ class Qcow2Error(Exception):
 
 class Qcow2:
     """
-    Allow to parse a Qcow2 file
+    Allow to parse a Qcow2 file (version 2 and 3 headers)
     """
 
     def __init__(self, path):
@@ -35,40 +100,59 @@ class Qcow2:
         self._reload()
 
     def _reload(self):
-        # Each QCOW2 file begins with a header, in big endian format, as follows:
-        #
-        # typedef struct QCowHeader {
-        #     uint32_t magic;
-        #     uint32_t version;
-        #
-        #     uint64_t backing_file_offset;
-        #     uint32_t backing_file_size;
-        #
-        #     uint32_t cluster_bits;
-        #     uint64_t size; /* in bytes */
-        #     uint32_t crypt_method;
-        #
-        #     uint32_t l1_size;
-        #     uint64_t l1_table_offset;
-        #
-        #     uint64_t refcount_table_offset;
-        #     uint32_t refcount_table_clusters;
-        #
-        #     uint32_t nb_snapshots;
-        #     uint64_t snapshots_offset;
-        # } QCowHeader;
-        struct_format = ">IIQi"
 
         with open(self.path, 'rb') as f:
-            content = f.read(struct.calcsize(struct_format))
-
+            content = f.read(struct.calcsize(HEADER_V2_FORMAT))
             try:
-                self.magic, self.version, self.backing_file_offset, self.backing_file_size = struct.unpack_from(struct_format, content)
+                values = struct.unpack_from(HEADER_V2_FORMAT, content)
             except struct.error:
                 raise Qcow2Error("Invalid file header for {}".format(self.path))
+            self.__dict__.update(zip(HEADER_V2_FIELDS, values))
+            if self.magic != QCOW2_MAGIC:
+                raise Qcow2Error("Invalid magic for {}".format(self.path))
+
+            if self.version >= 3:
+                f.seek(0)
+                content = f.read(struct.calcsize(HEADER_V3_FORMAT))
+                try:
+                    values = struct.unpack_from(HEADER_V3_FORMAT, content)
+                except struct.error:
+                    raise Qcow2Error("Invalid file header for {}".format(self.path))
+                self.__dict__.update(zip(HEADER_V3_FIELDS, values))
+            else:
+                self.incompatible_features = 0
+                self.compatible_features = 0
+                self.autoclear_features = 0
+                self.refcount_order = 4
+                self.header_length = struct.calcsize(HEADER_V2_FORMAT)
 
-        if self.magic != 1363560955:  # The first 4 bytes contain the characters 'Q', 'F', 'I' followed by 0xfb.
-            raise Qcow2Error("Invalid magic for {}".format(self.path))
+            self.extensions = []
+            offset = self.header_length
+            f.seek(offset)
+            while True:
+                content = f.read(8)
+                if len(content) < 8:
+                    raise Qcow2Error("Invalid header extension for {}".format(self.path))
+                ext_type, length = struct.unpack(">II", content)
+                offset += 8
+                if ext_type == QCOW2_EXT_END:
+                    break
+                data = f.read(length)
+                if len(data) < length:
+                    raise Qcow2Error("Invalid header extension for {}".format(self.path))
+                self.extensions.append((ext_type, data))
+                offset += length + (-length % 8)
+                f.seek(offset)
+            # end of the header extensions
+            self.extensions_end = offset
+
+    @property
+    def cluster_size(self):
+        """
+        Size of the clusters in bytes
+        """
+
+        return 1 << self.cluster_bits
 
     @property
     def backing_file(self):
@@ -77,6 +161,8 @@ class Qcow2:
 
         :returns: None if it's not a linked clone, the path otherwise
         """
+        if not self.backing_file_offset:
+            return None
         with open(self.path, 'rb') as f:
             f.seek(self.backing_file_offset)
             content = f.read(self.backing_file_size)
@@ -85,6 +171,117 @@ class Qcow2:
             return None
         return path
 
+    @property
+    def backing_format(self):
+        """
+        Format of the base image if it's stored in the header
+
+        :returns: None if the format is not stored, the format name otherwise
+        """
+
+        for ext_type, data in self.extensions:
+            if ext_type == QCOW2_EXT_BACKING_FORMAT:
+                return data.decode()
+        return None
+
+    def set_backing_file(self, base_image):
+        """
+        Writes a new path to the base image in the header, the image
+        content is not changed (like qemu-img rebase -u).
+
+        :param base_image: Path to the base image
+        """
+
+        name = base_image.encode()
+        # qemu-img stores the name after the header extensions,
+        # it must fit in the first cluster
+        offset = self.extensions_end
+        if offset + len(name) > self.cluster_size:
+            raise Qcow2Error("Not enough space in the header of {} for the backing file {}".format(self.path, base_image))
+        with open(self.path, 'r+b') as f:
+            f.seek(offset)
+            f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(8)
+            f.write(struct.pack(">QI", offset, len(name)))
+        self._reload()
+
+    @classmethod
+    def create(cls, path, base_image, base_format="qcow2", size=None, cluster_bits=16):
+        """
+        Creates an empty version 3 image using a base image
+        (like qemu-img create -o backing_file).
+
+        :param path: Path of the new image
+        :param base_image: Path to the base image
+        :param base_format: Format of the base image
+        :param size: Size of the image in bytes, the size of the base image if None
+
+        :returns: Qcow2 instance
+        """
+
+        if size is None:
+            if base_format != "qcow2":
+                raise Qcow2Error("The size of the {} base image {} is not known".format(base_format, base_image))
+            size = cls(base_image).size
+
+        cluster_size = 1 << cluster_bits
+        l2_entries = cluster_size // 8
+        l1_size = -(-size // (cluster_size * l2_entries))
+        l1_clusters = max(1, -(-l1_size * 8 // cluster_size))
+
+        # cluster 0 is the header, then the refcount table,
+        # one refcount block (16 bits refcounts) and the L1 table
+        refcount_table_offset = cluster_size
+        refcount_block_offset = 2 * cluster_size
+        l1_table_offset = 3 * cluster_size
+        nb_clusters = 3 + l1_clusters
+        if nb_clusters > cluster_size // 2:
+            raise Qcow2Error("Image size {} is too big".format(size))
+
+        header_length = struct.calcsize(HEADER_V3_FORMAT)
+        extensions = b""
+        if base_format:
+            extensions += _extension(QCOW2_EXT_BACKING_FORMAT, base_format.encode())
+        feature_table = b"".join(struct.pack(">BB46s", feature_type, bit, name) for feature_type, bit, name in FEATURE_TABLE)
+        extensions += _extension(QCOW2_EXT_FEATURE_TABLE, feature_table)
+        extensions += struct.pack(">II", QCOW2_EXT_END, 0)
+        name = base_image.encode()
+        backing_file_offset = header_length + len(extensions)
+        if backing_file_offset + len(name) > cluster_size:
+            raise Qcow2Error("The path of the base image {} is too long".format(base_image))
+
+        header = struct.pack(HEADER_V3_FORMAT,
+                             QCOW2_MAGIC, 3,
+                             backing_file_offset, len(name),
+                             cluster_bits, size, 0,
+                             l1_size, l1_table_offset,
+                             refcount_table_offset, 1,
+                             0, 0,
+                             0, 0, 0,
+                             4, header_length)
+
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(header + extensions + name)
+                f.seek(refcount_table_offset)
+                f.write(struct.pack(">Q", refcount_block_offset))
+                f.seek(refcount_block_offset)
+                f.write(struct.pack(">H", 1) * nb_clusters)
+                # the L1 table is empty, the file ends after
+                # the used entries aligned on a sector
+                f.truncate(l1_table_offset + max(512, -(-l1_size * 8 // 512) * 512))
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return cls(path)
+
     @asyncio.coroutine
     def rebase(self, qemu_img, base_image):
         """
@@ -95,6 +292,13 @@ class Qcow2:
         """
         if not os.path.exists(base_image):
             raise FileNotFoundError(base_image)
+        if self.backing_file == base_image:
+            return
+        try:
+            self.set_backing_file(base_image)
+            return
+        except Qcow2Error as e:
+            log.debug("{}, using qemu-img".format(e))
         command = [qemu_img, "rebase", "-u", "-b", base_image, self.path]
         process = yield from asyncio.create_subprocess_exec(*command)
         retcode = yield from process.wait()
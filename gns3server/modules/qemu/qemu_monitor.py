@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Persistent sessions with the QEMU monitor (HMP) or the QEMU
+Machine Protocol (QMP).
+"""
+
+import re
+import json
+import asyncio
+
+from .qemu_error import QemuError
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class QemuMonitor:
+
+    """
+    Session with the human monitor of a QEMU process. The connection
+    is opened on the first command and kept open, the commands are
+    sent one after the other.
+
+    :param host: monitor host
+    :param port: monitor port
+    :param timeout: timeout in seconds for a command
+    """
+
+    PROMPT = b"(qemu) "
+    _ESCAPE_SEQUENCE = re.compile(rb"\x1b\[[0-9;]*[A-Za-z]")
+
+    def __init__(self, host, port, timeout=30):
+
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def port(self):
+
+        return self._port
+
+    @property
+    def connected(self):
+        """
+        Returns either the connection is established or not.
+
+        :returns: boolean
+        """
+
+        return self._writer is not None
+
+    @asyncio.coroutine
+    def _connect(self):
+
+        log.info("Connecting to QEMU monitor on {}:{}".format(self._host, self._port))
+        self._reader, self._writer = yield from asyncio.open_connection(self._host, self._port)
+        try:
+            yield from self._handshake()
+        except BaseException:
+            # including a timeout: the banner must not be read as a reply
+            self.close()
+            raise
+
+    @asyncio.coroutine
+    def _handshake(self):
+
+        # banner then prompt
+        yield from self._read_until_prompt()
+
+    @asyncio.coroutine
+    def _read_until_prompt(self):
+
+        data = b""
+        while not data.endswith(self.PROMPT):
+            chunk = yield from self._reader.read(4096)
+            if not chunk:
+                raise EOFError("Connection closed by QEMU")
+            data += chunk
+        return data[:-len(self.PROMPT)]
+
+    @asyncio.coroutine
+    def _execute(self, command):
+        """
+        Sends a command to the monitor.
+
+        :param command: monitor command
+        :returns: output lines (bytes)
+        """
+
+        self._writer.write(command.encode("ascii") + b"\n")
+        output = yield from self._read_until_prompt()
+        output = self._ESCAPE_SEQUENCE.sub(b"", output)
+        # the first line is the echo of the command
+        return [line.strip() for line in output.splitlines()[1:] if line.strip()]
+
+    @asyncio.coroutine
+    def execute(self, command, *args):
+        """
+        Executes a command, the connection is opened again if needed.
+
+        :param command: monitor command
+        :returns: result of the command
+        """
+
+        with (yield from self._lock):
+            if self.connected and self._closed_by_peer():
+                # a connection kept open can be closed by QEMU, open a new
+                # one before sending the command. A command is never sent
+                # twice because it may not be idempotent (system_reset...)
+                log.debug("QEMU monitor connection closed by QEMU, reconnecting")
+                self.close()
+            if not self.connected:
+                yield from asyncio.wait_for(self._connect(), timeout=self._timeout)
+            try:
+                return (yield from asyncio.wait_for(self._execute(command, *args), timeout=self._timeout))
+            except (OSError, EOFError, asyncio.TimeoutError, asyncio.CancelledError):
+                # the reply of the command could come after the next command
+                self.close()
+                raise
+
+    def _closed_by_peer(self):
+        """
+        Returns True if the connection has been closed while it was idle.
+        """
+
+        return self._reader.at_eof() or self._reader.exception() is not None or self._writer.transport.is_closing()
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+
+class QemuQMPMonitor(QemuMonitor):
+
+    """
+    Session with the QEMU Machine Protocol, the replies
+    are JSON objects.
+    """
+
+    # QMP commands for the human monitor commands used by the VM
+    COMMANDS = {
+        "stop": "stop",
+        "cont": "cont",
+        "system_reset": "system_reset",
+        "system_powerdown": "system_powerdown"
+    }
+
+    @asyncio.coroutine
+    def _handshake(self):
+
+        greeting = yield from self._read_message()
+        if "QMP" not in greeting:
+            raise ValueError("Invalid QMP greeting: {}".format(greeting))
+        yield from self._execute("qmp_capabilities")
+
+    @asyncio.coroutine
+    def _read_message(self):
+
+        line = yield from self._reader.readline()
+        if not line:
+            raise EOFError("Connection closed by QEMU")
+        return json.loads(line.decode("utf-8"))
+
+    @asyncio.coroutine
+    def _execute(self, command, arguments=None):
+        """
+        Sends a QMP command.
+
+        :param command: QMP command
+        :param arguments: command arguments
+        :returns: value returned by the command
+        """
+
+        message = {"execute": command}
+        if arguments:
+            message["arguments"] = arguments
+        self._writer.write(json.dumps(message).encode("utf-8") + b"\r\n")
+        while True:
+            reply = yield from self._read_message()
+            if "event" in reply:
+                log.debug("QMP event: {}".format(reply))
+                continue
+            if "error" in reply:
+                raise QemuError("QMP command {} failed: {}".format(command, reply["error"].get("desc", reply["error"])))
+            return reply.get("return")
+
+    @asyncio.coroutine
+    def human_command(self, command):
+        """
+        Executes a human monitor command through QMP.
+
+        :param command: monitor command
+        :returns: output lines (bytes)
+        """
+
+        if command in self.COMMANDS:
+            yield from self.execute(self.COMMANDS[command])
+            return []
+        output = yield from self.execute("human-monitor-command", {"command-line": command})
+        return [line.strip().encode("utf-8") for line in output.splitlines() if line.strip()]
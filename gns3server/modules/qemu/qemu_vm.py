@@ -32,6 +32,7 @@ import gns3server
 
 from gns3server.utils import parse_version
 from .qemu_error import QemuError
+from .qemu_monitor import QemuMonitor, QemuQMPMonitor
 from ..adapters.ethernet_adapter import EthernetAdapter
 from ..nios.nio_udp import NIOUDP
 from ..nios.nio_tap import NIOTAP
@@ -74,6 +75,7 @@ class QemuVM(BaseVM):
         self._process = None
         self._cpulimit_process = None
         self._monitor = None
+        self._monitor_session = None
         self._stdout_file = ""
         self._execute_lock = asyncio.Lock()
 
@@ -911,6 +913,7 @@ class QemuVM(BaseVM):
             self.status = "stopped"
             self._hw_virtualization = False
             self._process = None
+            self._close_monitor_session()
             if returncode != 0:
                 self.project.emit("log.error", {"message": "QEMU process has stopped, return code: {}\n{}".format(returncode, self.read_stdout())})
 
@@ -942,9 +945,40 @@ class QemuVM(BaseVM):
                         pass
                     if self._process.returncode is None:
                         log.warn('QEMU VM "{}" PID={} is still running'.format(self._name, self._process.pid))
+            self._close_monitor_session()
             self._process = None
             self._stop_cpulimit()
 
+    @property
+    def monitor_protocol(self):
+        """
+        Returns the protocol of the monitor: hmp (human monitor) or qmp (JSON).
+
+        :returns: string
+        """
+
+        return self._manager.config.get_section_config("Qemu").get("monitor_protocol", "hmp")
+
+    def _get_monitor_session(self):
+        """
+        Returns the session with the monitor of the running QEMU process,
+        the connection is kept open between the commands.
+        """
+
+        if self._monitor_session is None or self._monitor_session.port != self._monitor:
+            self._close_monitor_session()
+            if self.monitor_protocol == "qmp":
+                self._monitor_session = QemuQMPMonitor(self._monitor_host, self._monitor)
+            else:
+                self._monitor_session = QemuMonitor(self._monitor_host, self._monitor)
+        return self._monitor_session
+
+    def _close_monitor_session(self):
+
+        if self._monitor_session is not None:
+            self._monitor_session.close()
+            self._monitor_session = None
+
     @asyncio.coroutine
     def _control_vm(self, command, expected=None):
         """
@@ -959,31 +993,20 @@ class QemuVM(BaseVM):
         result = None
         if self.is_running() and self._monitor:
             log.debug("Execute QEMU monitor command: {}".format(command))
+            session = self._get_monitor_session()
             try:
-                log.info("Connecting to Qemu monitor on {}:{}".format(self._monitor_host, self._monitor))
-                reader, writer = yield from asyncio.open_connection(self._monitor_host, self._monitor)
-            except OSError as e:
-                log.warn("Could not connect to QEMU monitor: {}".format(e))
-                return result
-            try:
-                writer.write(command.encode('ascii') + b"\n")
-            except OSError as e:
-                log.warn("Could not write to QEMU monitor: {}".format(e))
-                writer.close()
+                if isinstance(session, QemuQMPMonitor):
+                    lines = yield from session.human_command(command)
+                else:
+                    lines = yield from session.execute(command)
+            except (OSError, EOFError, ValueError, asyncio.TimeoutError, QemuError) as e:
+                log.warn("Could not execute QEMU monitor command {}: {}".format(command, e))
                 return result
             if expected:
-                try:
-                    while result is None:
-                        line = yield from reader.readline()
-                        if not line:
-                            break
-                        for expect in expected:
-                            if expect in line:
-                                result = line.decode("utf-8").strip()
-                                break
-                except EOFError as e:
-                    log.warn("Could not read from QEMU monitor: {}".format(e))
-            writer.close()
+                for line in lines:
+                    for expect in expected:
+                        if expect in line:
+                            return line.decode("utf-8").strip()
         return result
 
     @asyncio.coroutine
@@ -1015,6 +1038,16 @@ class QemuVM(BaseVM):
         :returns: status (string)
         """
 
+        if self.monitor_protocol == "qmp":
+            if not self.is_running() or not self._monitor:
+                return None
+            try:
+                status = yield from self._get_monitor_session().execute("query-status")
+            except (OSError, EOFError, ValueError, asyncio.TimeoutError, QemuError) as e:
+                log.warn("Could not query QEMU status: {}".format(e))
+                return None
+            return status["status"]
+
         result = yield from self._control_vm("info status", [
             b"debug", b"inmigrate", b"internal-error", b"io-error",
             b"paused", b"postmigrate", b"prelaunch", b"finish-migrate",
@@ -1207,6 +1240,8 @@ class QemuVM(BaseVM):
     def _monitor_options(self):
 
         if self._monitor:
+            if self.monitor_protocol == "qmp":
+                return ["-qmp", "tcp:{}:{},server,nowait".format(self._monitor_host, self._monitor)]
             return ["-monitor", "tcp:{}:{},server,nowait".format(self._monitor_host, self._monitor)]
         else:
             return []
@@ -1232,6 +1267,28 @@ class QemuVM(BaseVM):
 
         return qemu_img_path
 
+    @asyncio.coroutine
+    def _create_linked_clone(self, qemu_img_path, disk_image, disk, disk_name):
+        """
+        Creates a linked clone disk with qemu-img.
+
+        :param qemu_img_path: Path to the qemu-img binary
+        :param disk_image: Path to the base image
+        :param disk: Path of the linked clone
+        :param disk_name: Name of the disk (hda, hdb...)
+        """
+
+        try:
+            process = yield from asyncio.create_subprocess_exec(qemu_img_path, "create", "-o",
+                                                                "backing_file={}".format(disk_image),
+                                                                "-f", "qcow2", disk)
+            retcode = yield from process.wait()
+            if retcode is not None and retcode != 0:
+                raise QemuError("Could not create {} disk image".format(disk_name))
+            log.info("{} returned with {}".format(qemu_img_path, retcode))
+        except (OSError, subprocess.SubprocessError) as e:
+            raise QemuError("Could not create {} disk image {}".format(disk_name, e))
+
     @asyncio.coroutine
     def _disk_options(self):
         options = []
@@ -1258,14 +1315,13 @@ class QemuVM(BaseVM):
                 if not os.path.exists(disk):
                     # create the disk
                     try:
-                        process = yield from asyncio.create_subprocess_exec(qemu_img_path, "create", "-o",
-                                                                            "backing_file={}".format(disk_image),
-                                                                            "-f", "qcow2", disk)
-                        retcode = yield from process.wait()
-                        if retcode is not None and retcode != 0:
-                            raise QemuError("Could not create {} disk image".format(disk_name))
-                        log.info("{} returned with {}".format(qemu_img_path, retcode))
-                    except (OSError, subprocess.SubprocessError) as e:
+                        Qcow2.create(disk, disk_image)
+                        log.info("{} disk image {} created".format(disk_name, disk))
+                    except Qcow2Error as e:
+                        # qemu-img knows the size of the other image formats
+                        log.debug("{}, using qemu-img".format(e))
+                        yield from self._create_linked_clone(qemu_img_path, disk_image, disk, disk_name)
+                    except OSError as e:
                         raise QemuError("Could not create {} disk image {}".format(disk_name, e))
                 else:
                     # The disk exists we check if the clone work
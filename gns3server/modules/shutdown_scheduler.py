@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Runs the jobs needed to close a project or unload a module.
+"""
+
+import time
+import asyncio
+
+import logging
+log = logging.getLogger(__name__)
+
+# Stages in execution order, a stage starts when the previous one is finished:
+# the module hooks run before the VMs, the VMs, the processes used by
+# the VMs (uBridge then the hypervisors) and the module hooks run after.
+STAGES = ("before", "vms", "ubridge", "hypervisors", "after")
+
+
+class ShutdownScheduler:
+
+    """
+    Jobs are run stage after stage. In a stage the jobs of
+    all the groups (usually a module) run at the same time
+    but a group doesn't run more than its concurrency limit
+    of jobs at once, so closing a big project doesn't start
+    hundreds of VBoxManage or vmrun processes.
+
+    :param name: name used in the logs
+    :param progress: callable(done, total) called after each job
+    """
+
+    def __init__(self, name, progress=None):
+
+        self._name = name
+        self._progress = progress
+        self._jobs = []
+        self._concurrency = {}
+        self._timings = []
+        self._total_time = 0.0
+        self._done = 0
+        self._total = 0
+
+    def set_concurrency(self, group, limit):
+        """
+        Sets the number of jobs of a group running at the same time.
+
+        :param group: group name
+        :param limit: number of jobs (None or 0 for no limit)
+        """
+
+        self._concurrency[group] = limit
+
+    def add(self, stage, group, description, func, *args, critical=False):
+        """
+        Adds a job.
+
+        :param stage: stage name (see STAGES)
+        :param group: group name
+        :param description: description of the job for the logs
+        :param func: coroutine function
+        :param args: parameters of the function
+        :param critical: raise the error of the job after its stage, instead of only logging it
+        """
+
+        if stage not in STAGES:
+            raise ValueError("Unknown stage {}".format(stage))
+        self._jobs.append((stage, group, description, func, args, critical))
+        self._total += 1
+
+    @asyncio.coroutine
+    def run(self):
+        """
+        Runs the jobs added since the last run, the errors are logged
+        except for the critical jobs: the first error of a critical job
+        is raised when its stage is done and the next stages are not run.
+        """
+
+        start = time.monotonic()
+        semaphores = {}
+        for group, limit in self._concurrency.items():
+            if limit:
+                semaphores[group] = asyncio.Semaphore(limit)
+
+        try:
+            for stage in STAGES:
+                jobs = [job for job in self._jobs if job[0] == stage]
+                if not jobs:
+                    continue
+                tasks = [asyncio.async(self._run_job(semaphores.get(job[1]), *job)) for job in jobs]
+                yield from asyncio.wait(tasks)
+                for task in tasks:
+                    error = task.result()
+                    if error is not None:
+                        raise error
+        finally:
+            self._jobs = []
+            self._total_time += time.monotonic() - start
+            log.debug("{} done in {:.3f}s".format(self._name, self._total_time))
+
+    @asyncio.coroutine
+    def _run_job(self, semaphore, stage, group, description, func, args, critical):
+        """
+        Runs a job and records its timing.
+
+        :returns: the error to raise or None
+        """
+
+        if semaphore is not None:
+            yield from semaphore.acquire()
+        start = time.monotonic()
+        error = None
+        try:
+            yield from func(*args)
+        except (Exception, GeneratorExit) as e:
+            if critical:
+                error = e
+            else:
+                log.error("Could not {}: {}".format(description, e), exc_info=1)
+            failed = True
+        else:
+            failed = False
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+        self._timings.append((stage, group, description, time.monotonic() - start, failed))
+        self._done += 1
+        if self._progress:
+            self._progress(self._done, self._total)
+        return error
+
+    def report(self):
+        """
+        Timing report of the runs.
+
+        :returns: dictionary with the total time and per stage and group:
+        the number of jobs, errors, total time and slowest job
+        """
+
+        stages = {}
+        for stage, group, description, elapsed, failed in self._timings:
+            info = stages.setdefault(stage, {}).setdefault(group, {"jobs": 0,
+                                                                   "errors": 0,
+                                                                   "total_time": 0.0,
+                                                                   "max_time": 0.0,
+                                                                   "slowest": None})
+            info["jobs"] += 1
+            if failed:
+                info["errors"] += 1
+            info["total_time"] += elapsed
+            if elapsed >= info["max_time"]:
+                info["max_time"] = elapsed
+                info["slowest"] = description
+        return {"name": self._name, "total_time": self._total_time, "stages": stages}
@@ -21,6 +21,7 @@ VirtualBox server module.
 
 import os
 import sys
+import time
 import shutil
 import asyncio
 import subprocess
@@ -28,6 +29,7 @@ import logging
 
 log = logging.getLogger(__name__)
 
+from ...utils.asyncio.rwlock import ReadWriteLock
 from ..base_manager import BaseManager
 from .virtualbox_vm import VirtualBoxVM
 from .virtualbox_error import VirtualBoxError
@@ -36,12 +38,25 @@ from .virtualbox_error import VirtualBoxError
 class VirtualBox(BaseManager):
 
     _VM_CLASS = VirtualBoxVM
+    # closing a VM runs several VBoxManage commands
+    _SHUTDOWN_CONCURRENCY = 4
+
+    # VBoxManage commands changing the list of VMs or disks, they are not
+    # run at the same time as other commands
+    _REGISTRY_COMMANDS = ("registervm", "unregistervm", "createvm", "clonevm", "closemedium", "createhd", "import")
+    # VBoxManage commands that don't change the VM
+    _READ_ONLY_COMMANDS = ("showvminfo", "getextradata")
+    # seconds the showvminfo output of a VM is used when nothing has been changed by GNS3
+    SHOWVMINFO_MAX_AGE = 1
 
     def __init__(self):
 
         super().__init__()
         self._vboxmanage_path = None
-        self._execute_lock = asyncio.Lock()
+        self._execute_lock = ReadWriteLock()
+        self._execute_semaphore = None
+        self._vm_locks = {}
+        self._vm_info_cache = {}
 
     @property
     def vboxmanage_path(self):
@@ -83,35 +98,119 @@ class VirtualBox(BaseManager):
         self._vboxmanage_path = vboxmanage_path
         return vboxmanage_path
 
+    @staticmethod
+    def _command_vm(subcommand, args):
+        """
+        Returns the name of the VM a VBoxManage command works on.
+
+        :returns: VM name or None
+        """
+
+        if subcommand == "guestproperty":
+            return args[1] if len(args) > 1 else None
+        if subcommand in ("showvminfo", "getextradata", "setextradata", "modifyvm", "controlvm",
+                          "startvm", "storageattach", "storagectl", "snapshot", "discardstate"):
+            return args[0] if args else None
+        return None
+
     @asyncio.coroutine
     def execute(self, subcommand, args, timeout=60):
+        """
+        Executes VBoxManage.
 
-        # We use a lock prevent parallel execution due to strange errors
-        # reported by a user and reproduced by us.
-        # https://github.com/GNS3/gns3-gui/issues/261
-        with (yield from self._execute_lock):
-            vboxmanage_path = self.vboxmanage_path
-            if not vboxmanage_path:
-                vboxmanage_path = self.find_vboxmanage()
-            command = [vboxmanage_path, "--nologo", subcommand]
-            command.extend(args)
-            command_string = " ".join(command)
-            log.info("Executing VBoxManage with command: {}".format(command_string))
-            try:
-                process = yield from asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-            except (OSError, subprocess.SubprocessError) as e:
-                raise VirtualBoxError("Could not execute VBoxManage: {}".format(e))
+        Parallel executions on the same VM or while the list of
+        VMs and disks changes cause strange errors reported by a user
+        and reproduced by us (https://github.com/GNS3/gns3-gui/issues/261).
+        So the commands on a VM are run one after the other, the commands
+        changing the VirtualBox registry run alone and the other commands
+        run in parallel (up to vboxmanage_parallel_commands at once).
+
+        :param subcommand: VBoxManage subcommand
+        :param args: arguments of the subcommand
+        :param timeout: timeout in seconds
 
+        :returns: output lines
+        """
+
+        if self._execute_semaphore is None:
+            limit = self.config.get_section_config("VirtualBox").getint("vboxmanage_parallel_commands", 4)
+            self._execute_semaphore = asyncio.Semaphore(max(limit, 1))
+
+        vmname = self._command_vm(subcommand, args)
+        if subcommand in self._REGISTRY_COMMANDS:
+            with (yield from self._execute_lock.writer()):
+                self._vm_info_cache.clear()
+                return (yield from self._execute(subcommand, args, timeout))
+
+        with (yield from self._execute_lock.reader()):
+            if vmname is None:
+                with (yield from self._execute_semaphore):
+                    return (yield from self._execute(subcommand, args, timeout))
+
+            self._vm_locks.setdefault(vmname, {"lock": asyncio.Lock(), "concurrency": 0})
+            self._vm_locks[vmname]["concurrency"] += 1
             try:
-                stdout_data, stderr_data = yield from asyncio.wait_for(process.communicate(), timeout=timeout)
-            except asyncio.TimeoutError:
-                raise VirtualBoxError("VBoxManage has timed out after {} seconds!".format(timeout))
+                with (yield from self._vm_locks[vmname]["lock"]):
+                    if subcommand not in self._READ_ONLY_COMMANDS:
+                        self._vm_info_cache.pop(vmname, None)
+                    with (yield from self._execute_semaphore):
+                        return (yield from self._execute(subcommand, args, timeout))
+            finally:
+                self._vm_locks[vmname]["concurrency"] -= 1
+
+                # No more waiting commands, garbage collect the lock
+                if self._vm_locks[vmname]["concurrency"] <= 0:
+                    del self._vm_locks[vmname]
 
-            if process.returncode:
-                vboxmanage_error = stderr_data.decode("utf-8", errors="ignore")
-                raise VirtualBoxError("VirtualBox has returned an error: {}".format(vboxmanage_error))
+    @asyncio.coroutine
+    def _execute(self, subcommand, args, timeout):
 
-            return stdout_data.decode("utf-8", errors="ignore").splitlines()
+        vboxmanage_path = self.vboxmanage_path
+        if not vboxmanage_path:
+            vboxmanage_path = self.find_vboxmanage()
+        command = [vboxmanage_path, "--nologo", subcommand]
+        command.extend(args)
+        command_string = " ".join(command)
+        log.info("Executing VBoxManage with command: {}".format(command_string))
+        try:
+            process = yield from asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except (OSError, subprocess.SubprocessError) as e:
+            raise VirtualBoxError("Could not execute VBoxManage: {}".format(e))
+
+        try:
+            stdout_data, stderr_data = yield from asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise VirtualBoxError("VBoxManage has timed out after {} seconds!".format(timeout))
+
+        if process.returncode:
+            vboxmanage_error = stderr_data.decode("utf-8", errors="ignore")
+            raise VirtualBoxError("VirtualBox has returned an error: {}".format(vboxmanage_error))
+
+        return stdout_data.decode("utf-8", errors="ignore").splitlines()
+
+    @asyncio.coroutine
+    def showvminfo(self, vmname, max_age=None):
+        """
+        Returns the output of showvminfo --machinereadable for a VM. The output
+        is cached, the cache of a VM is dropped when GNS3 runs a VBoxManage
+        command changing it.
+
+        :param vmname: VirtualBox VM name
+        :param max_age: seconds the cached output can be used (default: SHOWVMINFO_MAX_AGE),
+        the state of a VM can be changed outside of GNS3 (e.g. the guest powers off)
+
+        :returns: output lines
+        """
+
+        if max_age is None:
+            max_age = self.SHOWVMINFO_MAX_AGE
+        cached = self._vm_info_cache.get(vmname)
+        if cached is not None and time.monotonic() - cached[0] <= max_age:
+            return cached[1]
+        start = time.monotonic()
+        result = yield from self.execute("showvminfo", [vmname, "--machinereadable"])
+        self._vm_info_cache[vmname] = (start, result)
+        return result
 
     @asyncio.coroutine
     def _find_inaccessible_hdd_files(self):
@@ -163,7 +262,7 @@ class VirtualBox(BaseManager):
         Gets VirtualBox VM list.
         """
 
-        vms = []
+        vmnames = []
         result = yield from self.execute("list", ["vms"])
         for line in result:
             if len(line) == 0 or line[0] != '"' or line[-1:] != "}":
@@ -172,21 +271,35 @@ class VirtualBox(BaseManager):
             vmname = vmname.strip('"')
             if vmname == "<inaccessible>":
                 continue  # ignore inaccessible VMs
-            extra_data = yield from self.execute("getextradata", [vmname, "GNS3/Clone"])
-            if not extra_data[0].strip() == "Value: yes":
-                # get the amount of RAM
-                info_results = yield from self.execute("showvminfo", [vmname, "--machinereadable"])
-                ram = 0
-                for info in info_results:
-                    try:
-                        name, value = info.split('=', 1)
-                        if name.strip() == "memory":
-                            ram = int(value.strip())
-                            break
-                    except ValueError:
-                        continue
-                vms.append({"vmname": vmname, "ram": ram})
-        return vms
+            vmnames.append(vmname)
+
+        # the VMs are queried in parallel
+        vms = yield from asyncio.gather(*[self._get_image_info(vmname) for vmname in vmnames])
+        return [vm for vm in vms if vm is not None]
+
+    @asyncio.coroutine
+    def _get_image_info(self, vmname):
+        """
+        Returns the RAM of a VM or None for the VMs cloned by GNS3.
+
+        :param vmname: VirtualBox VM name
+        """
+
+        extra_data = yield from self.execute("getextradata", [vmname, "GNS3/Clone"])
+        if extra_data[0].strip() == "Value: yes":
+            return None
+        # get the amount of RAM, it's only changed by the user
+        info_results = yield from self.showvminfo(vmname, max_age=60)
+        ram = 0
+        for info in info_results:
+            try:
+                name, value = info.split('=', 1)
+                if name.strip() == "memory":
+                    ram = int(value.strip())
+                    break
+            except ValueError:
+                continue
+        return {"vmname": vmname, "ram": ram}
 
     @staticmethod
     def get_legacy_vm_workdir(legacy_vm_id, name):
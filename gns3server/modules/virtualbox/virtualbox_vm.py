@@ -25,22 +25,18 @@ import re
 import os
 import tempfile
 import json
-import socket
 import asyncio
 
 from gns3server.utils import parse_version
-from gns3server.utils.telnet_server import TelnetServer
 from gns3server.utils.asyncio import wait_for_file_creation, wait_for_named_pipe_creation, locked_coroutine
+from gns3server.utils.asyncio.serial import asyncio_open_serial
+from gns3server.utils.asyncio.telnet_server import AsyncioTelnetServer
 from .virtualbox_error import VirtualBoxError
 from ..nios.nio_udp import NIOUDP
 from ..nios.nio_nat import NIONAT
 from ..adapters.ethernet_adapter import EthernetAdapter
 from ..base_vm import BaseVM
 
-if sys.platform.startswith('win'):
-    import msvcrt
-    import win32file
-
 import logging
 log = logging.getLogger(__name__)
 
@@ -58,8 +54,10 @@ class VirtualBoxVM(BaseVM):
         self._maximum_adapters = 8
         self._linked_clone = linked_clone
         self._system_properties = {}
-        self._telnet_server_thread = None
-        self._serial_pipe = None
+        self._telnet_server = None
+        self._telnet_console = None
+        self._remote_pipe = None
+        self._remote_pipe_reader = None
 
         # VirtualBox settings
         self._adapters = adapters
@@ -111,7 +109,7 @@ class VirtualBoxVM(BaseVM):
         :returns: state (string)
         """
 
-        results = yield from self.manager.execute("showvminfo", [self._vmname, "--machinereadable"])
+        results = yield from self.manager.showvminfo(self._vmname)
         for info in results:
             if '=' in info:
                 name, value = info.split('=', 1)
@@ -225,7 +223,7 @@ class VirtualBoxVM(BaseVM):
                     yield from wait_for_file_creation(self._get_pipe_name())
             except asyncio.TimeoutError:
                 raise VirtualBoxError('Pipe file "{}" for remote console has not been created by VirtualBox'.format(self._get_pipe_name()))
-            self._start_remote_console()
+            yield from self._start_remote_console()
 
         if (yield from self.check_hw_virtualization()):
             self._hw_virtualization = True
@@ -521,7 +519,7 @@ class VirtualBoxVM(BaseVM):
             log.info("VirtualBox VM '{name}' [{id}] has enabled the console".format(name=self.name, id=self.id))
             vm_state = yield from self._get_vm_state()
             if vm_state == "running":
-                self._start_remote_console()
+                yield from self._start_remote_console()
         else:
             log.info("VirtualBox VM '{name}' [{id}] has disabled the console".format(name=self.name, id=self.id))
             self._stop_remote_console()
@@ -665,7 +663,7 @@ class VirtualBoxVM(BaseVM):
         """
 
         vm_info = {}
-        results = yield from self.manager.execute("showvminfo", [self._vmname, "--machinereadable"])
+        results = yield from self.manager.showvminfo(self._vmname)
         for info in results:
             try:
                 name, value = info.split('=', 1)
@@ -850,54 +848,44 @@ class VirtualBoxVM(BaseVM):
         result = yield from self.manager.execute("snapshot", args)
         log.debug("Snapshot 'reset' created: {}".format(result))
 
+    @asyncio.coroutine
     def _start_remote_console(self):
         """
         Starts remote console support for this VM.
         """
 
-        # starts the Telnet to pipe thread
+        # the serial pipe is bridged to a Telnet server running on the event loop
         pipe_name = self._get_pipe_name()
-        if sys.platform.startswith("win"):
-            try:
-                self._serial_pipe = open(pipe_name, "a+b")
-            except OSError as e:
-                raise VirtualBoxError("Could not open the pipe {}: {}".format(pipe_name, e))
-            try:
-                self._telnet_server_thread = TelnetServer(self._vmname, msvcrt.get_osfhandle(self._serial_pipe.fileno()), self._manager.port_manager.console_host, self._console)
-            except OSError as e:
-                raise VirtualBoxError("Unable to create Telnet server: {}".format(e))
-            self._telnet_server_thread.start()
-        else:
-            try:
-                self._serial_pipe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-                self._serial_pipe.connect(pipe_name)
-            except OSError as e:
-                raise VirtualBoxError("Could not connect to the pipe {}: {}".format(pipe_name, e))
-            try:
-                self._telnet_server_thread = TelnetServer(self._vmname, self._serial_pipe, self._manager.port_manager.console_host, self._console)
-            except OSError as e:
-                raise VirtualBoxError("Unable to create Telnet server: {}".format(e))
-            self._telnet_server_thread.start()
+        try:
+            self._remote_pipe_reader, self._remote_pipe = yield from asyncio_open_serial(pipe_name)
+        except OSError as e:
+            raise VirtualBoxError("Could not open the pipe {}: {}".format(pipe_name, e))
+        self._telnet_console = AsyncioTelnetServer(reader=self._remote_pipe_reader, writer=self._remote_pipe, binary=True, echo=True)
+        try:
+            self._telnet_server = yield from asyncio.start_server(self._telnet_console.run, self._manager.port_manager.console_host, self.console)
+        except OSError as e:
+            self._stop_remote_console()
+            raise VirtualBoxError("Unable to create Telnet server: {}".format(e))
+        self._telnet_console.start()
 
     def _stop_remote_console(self):
         """
         Stops remote console support for this VM.
         """
 
-        if self._telnet_server_thread:
-            if self._telnet_server_thread.is_alive():
-                self._telnet_server_thread.stop()
-                self._telnet_server_thread.join(timeout=3)
-            if self._telnet_server_thread.is_alive():
-                log.warn("Serial pipe thread is still alive!")
-            self._telnet_server_thread = None
+        if self._telnet_server:
+            self._telnet_server.close()
+            self._telnet_server = None
 
-        if self._serial_pipe:
-            if sys.platform.startswith("win"):
-                win32file.CloseHandle(msvcrt.get_osfhandle(self._serial_pipe.fileno()))
-            else:
-                self._serial_pipe.close()
-            self._serial_pipe = None
+        if self._telnet_console:
+            self._telnet_console.close()
+            self._telnet_console = None
+
+        if self._remote_pipe:
+            # the clients are disconnected at the end of the pipe
+            self._remote_pipe.close()
+            self._remote_pipe = None
+            self._remote_pipe_reader = None
 
     @asyncio.coroutine
     def adapter_add_nio_binding(self, adapter_number, nio):
@@ -31,6 +31,7 @@ import codecs
 from collections import OrderedDict
 from gns3server.utils.interfaces import interfaces
 from gns3server.utils.asyncio import subprocess_check_output
+from gns3server.utils.probe_cache import ProbeCache
 from gns3server.utils import parse_version
 
 log = logging.getLogger(__name__)
@@ -44,6 +45,8 @@ from gns3server.modules.vmware.nio_vmnet import NIOVMNET
 class VMware(BaseManager):
 
     _VM_CLASS = VMwareVM
+    # closing a VM runs several vmrun commands
+    _SHUTDOWN_CONCURRENCY = 4
 
     def __init__(self):
 
@@ -214,7 +217,7 @@ class VMware(BaseManager):
                 raise VMwareError("VMware is not installed (vmware or vmplayer executable could not be found in $PATH)")
 
             try:
-                output = yield from subprocess_check_output(vmware_path, "-v")
+                output = yield from ProbeCache.instance().probe(vmware_path, "-v", lambda: subprocess_check_output(vmware_path, "-v"))
                 match = re.search("VMware Workstation ([0-9]+)\.", output)
                 version = None
                 if match:
@@ -414,7 +417,7 @@ class VMware(BaseManager):
                 vmrun_path = self.find_vmrun()
 
             try:
-                output = yield from subprocess_check_output(vmrun_path)
+                output = yield from ProbeCache.instance().probe(vmrun_path, "version", lambda: subprocess_check_output(vmrun_path))
                 match = re.search("vmrun version ([0-9\.]+)", output)
                 version = None
                 if match:
@@ -21,13 +21,13 @@ VMware VM instance.
 
 import sys
 import os
-import socket
 import asyncio
 import tempfile
 
-from gns3server.utils.telnet_server import TelnetServer
 from gns3server.utils.interfaces import interfaces
 from gns3server.utils.asyncio import wait_for_file_creation, wait_for_named_pipe_creation
+from gns3server.utils.asyncio.serial import asyncio_open_serial
+from gns3server.utils.asyncio.telnet_server import AsyncioTelnetServer
 from collections import OrderedDict
 from .vmware_error import VMwareError
 from ..nios.nio_udp import NIOUDP
@@ -37,10 +37,6 @@ from .nio_vmnet import NIOVMNET
 from ..adapters.ethernet_adapter import EthernetAdapter
 from ..base_vm import BaseVM
 
-if sys.platform.startswith('win'):
-    import msvcrt
-    import win32file
-
 import logging
 log = logging.getLogger(__name__)
 
@@ -57,8 +53,10 @@ class VMwareVM(BaseVM):
 
         self._linked_clone = linked_clone
         self._vmx_pairs = OrderedDict()
-        self._telnet_server_thread = None
-        self._serial_pipe = None
+        self._telnet_server = None
+        self._telnet_console = None
+        self._remote_pipe = None
+        self._remote_pipe_reader = None
         self._vmnets = []
         self._maximum_adapters = 10
         self._started = False
@@ -464,7 +462,7 @@ class VMwareVM(BaseVM):
                         yield from wait_for_file_creation(self._get_pipe_name())  # wait for VMware to create the pipe file.
                 except asyncio.TimeoutError:
                     raise VMwareError('Pipe file "{}" for remote console has not been created by VMware'.format(self._get_pipe_name()))
-                self._start_remote_console()
+                yield from self._start_remote_console()
         except VMwareError:
             yield from self.stop()
             raise
@@ -655,8 +653,8 @@ class VMwareVM(BaseVM):
 
         return self._enable_remote_console
 
-    @enable_remote_console.setter
-    def enable_remote_console(self, enable_remote_console):
+    @asyncio.coroutine
+    def set_enable_remote_console(self, enable_remote_console):
         """
         Sets either the console is enabled or not
 
@@ -666,7 +664,7 @@ class VMwareVM(BaseVM):
         if enable_remote_console:
             log.info("VMware VM '{name}' [{id}] has enabled the console".format(name=self.name, id=self.id))
             if self._started:
-                self._start_remote_console()
+                yield from self._start_remote_console()
         else:
             log.info("VMware VM '{name}' [{id}] has disabled the console".format(name=self.name, id=self.id))
             self._stop_remote_console()
@@ -888,54 +886,44 @@ class VMwareVM(BaseVM):
                        "serial0.pipe.endpoint": "server"}
         self._vmx_pairs.update(serial_port)
 
+    @asyncio.coroutine
     def _start_remote_console(self):
         """
         Starts remote console support for this VM.
         """
 
-        # starts the Telnet to pipe thread
+        # the serial pipe is bridged to a Telnet server running on the event loop
         pipe_name = self._get_pipe_name()
-        if sys.platform.startswith("win"):
-            try:
-                self._serial_pipe = open(pipe_name, "a+b")
-            except OSError as e:
-                raise VMwareError("Could not open the pipe {}: {}".format(pipe_name, e))
-            try:
-                self._telnet_server_thread = TelnetServer(self.name, msvcrt.get_osfhandle(self._serial_pipe.fileno()), self._manager.port_manager.console_host, self._console)
-            except OSError as e:
-                raise VMwareError("Unable to create Telnet server: {}".format(e))
-            self._telnet_server_thread.start()
-        else:
-            try:
-                self._serial_pipe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-                self._serial_pipe.connect(pipe_name)
-            except OSError as e:
-                raise VMwareError("Could not connect to the pipe {}: {}".format(pipe_name, e))
-            try:
-                self._telnet_server_thread = TelnetServer(self.name, self._serial_pipe, self._manager.port_manager.console_host, self._console)
-            except OSError as e:
-                raise VMwareError("Unable to create Telnet server: {}".format(e))
-            self._telnet_server_thread.start()
+        try:
+            self._remote_pipe_reader, self._remote_pipe = yield from asyncio_open_serial(pipe_name)
+        except OSError as e:
+            raise VMwareError("Could not open the pipe {}: {}".format(pipe_name, e))
+        self._telnet_console = AsyncioTelnetServer(reader=self._remote_pipe_reader, writer=self._remote_pipe, binary=True, echo=True)
+        try:
+            self._telnet_server = yield from asyncio.start_server(self._telnet_console.run, self._manager.port_manager.console_host, self.console)
+        except OSError as e:
+            self._stop_remote_console()
+            raise VMwareError("Unable to create Telnet server: {}".format(e))
+        self._telnet_console.start()
 
     def _stop_remote_console(self):
         """
         Stops remote console support for this VM.
         """
 
-        if self._telnet_server_thread:
-            if self._telnet_server_thread.is_alive():
-                self._telnet_server_thread.stop()
-                self._telnet_server_thread.join(timeout=3)
-            if self._telnet_server_thread.is_alive():
-                log.warn("Serial pipe thread is still alive!")
-            self._telnet_server_thread = None
+        if self._telnet_server:
+            self._telnet_server.close()
+            self._telnet_server = None
 
-        if self._serial_pipe:
-            if sys.platform.startswith("win"):
-                win32file.CloseHandle(msvcrt.get_osfhandle(self._serial_pipe.fileno()))
-            else:
-                self._serial_pipe.close()
-            self._serial_pipe = None
+        if self._telnet_console:
+            self._telnet_console.close()
+            self._telnet_console = None
+
+        if self._remote_pipe:
+            # the clients are disconnected at the end of the pipe
+            self._remote_pipe.close()
+            self._remote_pipe = None
+            self._remote_pipe_reader = None
 
     @asyncio.coroutine
     def start_capture(self, adapter_number, output_file):
@@ -20,9 +20,12 @@ VPCS server module.
 """
 
 import os
+import shutil
 import asyncio
 
 from ..base_manager import BaseManager
+from ...utils.asyncio import subprocess_check_output
+from ...utils.probe_cache import ProbeCache
 from .vpcs_error import VPCSError
 from .vpcs_vm import VPCSVM
 
@@ -69,6 +72,45 @@ class VPCS(BaseManager):
         yield from super().close_vm(vm_id, *args, **kwargs)
         return vm
 
+    @asyncio.coroutine
+    def probe_executables(self):
+        """
+        Probes the version of the VPCS executable.
+        """
+
+        vpcs_path = shutil.which(self.config.get_section_config("VPCS").get("vpcs_path", "vpcs"))
+        if vpcs_path:
+            yield from ProbeCache.instance().probe(vpcs_path, "-v", lambda: subprocess_check_output(vpcs_path, "-v"))
+
+    @asyncio.coroutine
+    def add_nio_binding(self, vm, adapter_number, port_number, nio_settings):
+        """
+        Creates a NIO and binds it to a VPCS port.
+
+        :param vm: VPCSVM instance
+        :param adapter_number: adapter number (always 0)
+        :param port_number: port number
+        :param nio_settings: information to create the NIO
+
+        :returns: a NIO object
+        """
+
+        nio = self.create_nio(vm.vpcs_path, nio_settings)
+        vm.port_add_nio_binding(port_number, nio)
+        return nio
+
+    @asyncio.coroutine
+    def remove_nio_binding(self, vm, adapter_number, port_number):
+        """
+        Removes the NIO bound to a VPCS port.
+
+        :param vm: VPCSVM instance
+        :param adapter_number: adapter number (always 0)
+        :param port_number: port number
+        """
+
+        vm.port_remove_nio_binding(port_number)
+
     def get_mac_id(self, vm_id):
         """
         Get an unique VPCS MAC id (offset)
@@ -31,6 +31,7 @@ import shutil
 from ...utils.asyncio import wait_for_process_termination
 from ...utils.asyncio import monitor_process
 from ...utils.asyncio import subprocess_check_output
+from ...utils.probe_cache import ProbeCache
 from gns3server.utils import parse_version
 from .vpcs_error import VPCSError
 from ..adapters.ethernet_adapter import EthernetAdapter
@@ -202,7 +203,8 @@ class VPCSVM(BaseVM):
         Checks if the VPCS executable version is >= 0.8b or == 0.6.1.
         """
         try:
-            output = yield from subprocess_check_output(self.vpcs_path, "-v", cwd=self.working_dir)
+            vpcs_path = self.vpcs_path
+            output = yield from ProbeCache.instance().probe(vpcs_path, "-v", lambda: subprocess_check_output(vpcs_path, "-v", cwd=self.working_dir))
             match = re.search("Welcome to Virtual PC Simulator, version ([0-9a-z\.]+)", output)
             if match:
                 version = match.group(1)
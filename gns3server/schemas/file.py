@@ -25,6 +25,10 @@ FILE_STREAM_SCHEMA = {
             "description": "File path",
             "type": ["string"],
             "minLength": 1
+        },
+        "filter": {
+            "description": "Capture filter applied to the packets (pcap-filter syntax subset, for example: tcp port 80 and host 10.0.0.1)",
+            "type": ["string", "null"]
         }
     },
     "additionalProperties": False,
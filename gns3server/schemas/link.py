@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+LINK_ENDPOINT_SCHEMA = {
+    "description": "Link endpoint on a VM or a Dynamips device",
+    "type": "object",
+    "properties": {
+        "module": {
+            "description": "Module of the VM",
+            "enum": ["docker", "dynamips", "iou", "qemu", "virtualbox", "vmware", "vpcs"]
+        },
+        "vm_id": {
+            "description": "VM UUID",
+            "type": "string",
+            "minLength": 36,
+            "maxLength": 36,
+            "pattern": "^[a-fA-F0-9]{8}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}$"
+        },
+        "device_id": {
+            "description": "Dynamips device UUID",
+            "type": "string",
+            "minLength": 36,
+            "maxLength": 36,
+            "pattern": "^[a-fA-F0-9]{8}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}$"
+        },
+        "adapter_number": {
+            "description": "Adapter number (slot for Dynamips routers)",
+            "type": "integer",
+            "minimum": 0
+        },
+        "port_number": {
+            "description": "Port number on the adapter",
+            "type": "integer",
+            "minimum": 0
+        },
+    },
+    "oneOf": [
+        {"required": ["vm_id"]},
+        {"required": ["device_id"]}
+    ],
+    "additionalProperties": False,
+    "required": ["module", "adapter_number", "port_number"]
+}
+
+
+LINK_BULK_CREATE_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": "Request validation to create several links between VMs",
+    "type": "object",
+    "properties": {
+        "links": {
+            "description": "Links to create",
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "endpoints": {
+                        "description": "The two endpoints of the link",
+                        "type": "array",
+                        "items": LINK_ENDPOINT_SCHEMA,
+                        "minItems": 2,
+                        "maxItems": 2
+                    },
+                },
+                "additionalProperties": False,
+                "required": ["endpoints"]
+            },
+        },
+    },
+    "additionalProperties": False,
+    "required": ["links"]
+}
+
+
+LINK_BULK_OBJECT_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "description": "Result of a bulk link creation",
+    "type": "object",
+    "properties": {
+        "links": {
+            "description": "Result for each link, in the order of the request",
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "status": {
+                        "description": "Link creation status",
+                        "enum": ["created", "error"]
+                    },
+                    "nios": {
+                        "description": "UDP NIOs bound on each endpoint (null if the binding failed)",
+                        "type": "array",
+                        "items": {"type": ["object", "null"]}
+                    },
+                    "message": {
+                        "description": "Error message",
+                        "type": "string"
+                    },
+                },
+                "additionalProperties": False,
+                "required": ["status"]
+            },
+        },
+    },
+    "additionalProperties": False,
+    "required": ["links"]
+}
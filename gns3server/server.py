@@ -21,6 +21,7 @@ Set up and run the server.
 
 import os
 import sys
+import shutil
 import signal
 import asyncio
 import aiohttp
@@ -28,12 +29,15 @@ import functools
 import types
 import time
 import atexit
+import subprocess
 
 from .web.route import Route
 from .web.request_handler import RequestHandler
 from .config import Config
 from .modules import MODULES
 from .modules.port_manager import PortManager
+from .utils.asyncio import subprocess_check_output
+from .utils.probe_cache import ProbeCache
 
 # do not delete this import
 import gns3server.handlers
@@ -104,6 +108,24 @@ class Server:
 
         self._loop.stop()
 
+    @asyncio.coroutine
+    def _probe_executables(self):
+        """
+        Fills the probe cache of the executables before the first VMs start.
+        """
+
+        ubridge_path = shutil.which(Config.instance().get_section_config("Server").get("ubridge_path", "ubridge"))
+        if ubridge_path:
+            try:
+                yield from ProbeCache.instance().probe(ubridge_path, "-v", lambda: subprocess_check_output(ubridge_path, "-v"))
+            except (OSError, subprocess.SubprocessError) as e:
+                log.warning("Could not probe uBridge {}: {}".format(ubridge_path, e))
+        for module in MODULES:
+            try:
+                yield from module.instance().probe_executables()
+            except (OSError, subprocess.SubprocessError) as e:
+                log.warning("Could not probe the executables of module {}: {}".format(module.__name__, e))
+
     def _signal_handling(self):
 
         def signal_handler(signame, *args):
@@ -244,6 +266,7 @@ class Server:
         self._loop.run_until_complete(server)
         self._signal_handling()
         self._exit_handling()
+        asyncio.async(self._probe_executables())
 
         if server_config.getboolean("live"):
             log.info("Code live reload is enabled, watching for file changes")
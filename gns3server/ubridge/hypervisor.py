@@ -29,6 +29,7 @@ import re
 from gns3server.utils import parse_version
 from gns3server.utils.asyncio import wait_for_process_termination
 from gns3server.utils.asyncio import subprocess_check_output
+from gns3server.utils.probe_cache import ProbeCache
 from .ubridge_hypervisor import UBridgeHypervisor
 from .ubridge_error import UbridgeError
 
@@ -123,7 +124,7 @@ class Hypervisor(UBridgeHypervisor):
         Checks if the ubridge executable version is >= 0.9.4
         """
         try:
-            output = yield from subprocess_check_output(self._path, "-v", cwd=self._working_dir)
+            output = yield from ProbeCache.instance().probe(self._path, "-v", lambda: subprocess_check_output(self._path, "-v", cwd=self._working_dir))
             match = re.search("ubridge version ([0-9a-z\.]+)", output)
             if match:
                 version = match.group(1)
@@ -15,11 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import re
 import time
 import logging
 import asyncio
 
+from gns3server.utils.asyncio.hypervisor_protocol import HypervisorProtocol
 from .ubridge_error import UbridgeError
 
 log = logging.getLogger(__name__)
@@ -36,19 +36,13 @@ class UBridgeHypervisor:
     hypervisor (defaults to 30 seconds)
     """
 
-    # Used to parse Ubridge response codes
-    error_re = re.compile(r"""^2[0-9]{2}-""")
-    success_re = re.compile(r"""^1[0-9]{2}\s{1}""")
-
     def __init__(self, host, port, timeout=30.0):
 
         self._host = host
         self._port = port
         self._version = "N/A"
         self._timeout = timeout
-        self._reader = None
-        self._writer = None
-        self._io_lock = asyncio.Lock()
+        self._protocol = None
 
     @asyncio.coroutine
     def connect(self, timeout=10):
@@ -68,10 +62,17 @@ class UBridgeHypervisor:
         begin = time.time()
         connection_success = False
         last_exception = None
+        loop = asyncio.get_event_loop()
         while time.time() - begin < timeout:
             yield from asyncio.sleep(0.01)
             try:
-                self._reader, self._writer = yield from asyncio.open_connection(host, self._port)
+                _, self._protocol = yield from loop.create_connection(lambda: HypervisorProtocol(UbridgeError,
+                                                                                                 "uBridge",
+                                                                                                 host,
+                                                                                                 self._port,
+                                                                                                 lambda: self.is_running()),
+                                                                      host,
+                                                                      self._port)
             except OSError as e:
                 last_exception = e
                 continue
@@ -106,8 +107,8 @@ class UBridgeHypervisor:
         """
 
         yield from self.send("hypervisor close")
-        self._writer.close()
-        self._reader, self._writer = None
+        self._protocol.close()
+        self._protocol = None
 
     @asyncio.coroutine
     def stop(self):
@@ -120,13 +121,9 @@ class UBridgeHypervisor:
             yield from self.send("hypervisor stop")
         except UbridgeError:
             pass
-        try:
-            if self._writer is not None:
-                yield from self._writer.drain()
-                self._writer.close()
-        except OSError as e:
-            log.debug("Stopping hypervisor {}:{} {}".format(self._host, self._port, e))
-        self._reader = self._writer = None
+        if self._protocol is not None:
+            self._protocol.close()
+            self._protocol = None
 
     @asyncio.coroutine
     def reset(self):
@@ -136,6 +133,18 @@ class UBridgeHypervisor:
 
         yield from self.send("hypervisor reset")
 
+    @property
+    def command_stats(self):
+        """
+        Returns the timing counters of the commands sent to this hypervisor.
+
+        :returns: dictionary command -> {count, errors, total_time, max_time}
+        """
+
+        if self._protocol is None:
+            return {}
+        return self._protocol.stats
+
     @property
     def port(self):
         """
@@ -186,79 +195,21 @@ class UBridgeHypervisor:
         :returns: results as a list
         """
 
-        # uBridge responses are of the form:
-        #   1xx yyyyyy\r\n
-        #   1xx yyyyyy\r\n
-        #   ...
-        #   100-yyyy\r\n
-        # or
-        #   2xx-yyyy\r\n
-        #
-        # Where 1xx is a code from 100-199 for a success or 200-299 for an error
-        # The result might be multiple lines and might be less than the buffer size
-        # but still have more data. The only thing we know for sure is the last line
-        # will begin with '100-' or a '2xx-' and end with '\r\n'
-
-        with (yield from self._io_lock):
-            if self._writer is None or self._reader is None:
-                raise UbridgeError("Not connected")
+        results = yield from self.send_batch([command])
+        return results[0]
 
-            try:
-                command = command.strip() + '\n'
-                log.debug("sending {}".format(command))
-                self._writer.write(command.encode())
-                yield from self._writer.drain()
-            except OSError as e:
-                raise UbridgeError("Lost communication with {host}:{port} :{error}, Dynamips process running: {run}"
-                                   .format(host=self._host, port=self._port, error=e, run=self.is_running()))
-
-            # Now retrieve the result
-            data = []
-            buf = ''
-            while True:
-                try:
-                    try:
-                        chunk = yield from self._reader.read(1024)
-                    except asyncio.CancelledError:
-                        # task has been canceled but continue to read
-                        # any remaining data sent by the hypervisor
-                        continue
-                    if not chunk:
-                        raise UbridgeError("No data returned from {host}:{port}, uBridge process running: {run}"
-                                           .format(host=self._host, port=self._port, run=self.is_running()))
-                    buf += chunk.decode("utf-8")
-                except OSError as e:
-                    raise UbridgeError("Lost communication with {host}:{port} :{error}, uBridge process running: {run}"
-                                       .format(host=self._host, port=self._port, error=e, run=self.is_running()))
-
-                # If the buffer doesn't end in '\n' then we can't be done
-                try:
-                    if buf[-1] != '\n':
-                        continue
-                except IndexError:
-                    raise UbridgeError("Could not communicate with {host}:{port}, uBridge process running: {run}"
-                                       .format(host=self._host, port=self._port, run=self.is_running()))
-
-                data += buf.split('\r\n')
-                if data[-1] == '':
-                    data.pop()
-                buf = ''
-
-                # Does it contain an error code?
-                if self.error_re.search(data[-1]):
-                    raise UbridgeError(data[-1][4:])
-
-                # Or does the last line begin with '100-'? Then we are done!
-                if data[-1][:4] == '100-':
-                    data[-1] = data[-1][4:]
-                    if data[-1] == 'OK':
-                        data.pop()
-                    break
-
-            # Remove success responses codes
-            for index in range(len(data)):
-                if self.success_re.search(data[index]):
-                    data[index] = data[index][4:]
-
-            log.debug("returned result {}".format(data))
-            return data
+    @asyncio.coroutine
+    def send_batch(self, commands, return_exceptions=False):
+        """
+        Sends several commands to this hypervisor in one write and
+        waits for all the replies.
+
+        :param commands: list of uBridge hypervisor commands
+        :param return_exceptions: return errors in the result list instead of raising the first one
+
+        :returns: list of results (one result list per command)
+        """
+
+        if self._protocol is None:
+            raise UbridgeError("Not connected")
+        return (yield from self._protocol.send_batch(commands, return_exceptions=return_exceptions))
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Writing of the uploaded files without blocking the event loop.
+"""
+
+import io
+import os
+import queue
+import asyncio
+import hashlib
+import tarfile
+import threading
+
+import logging
+log = logging.getLogger(__name__)
+
+READ_SIZE = 256 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+TAR_QUEUE_SIZE = 16
+
+
+class FileUpload:
+
+    """
+    Writes an uploaded file on a thread while it's received, the md5 is
+    computed at the same time. The data are written in a temporary file
+    renamed when the upload is complete. The temporary file is kept when
+    the upload is interrupted, the upload can be resumed from its size.
+
+    Usage:
+        upload = FileUpload(path, offset=offset)
+        try:
+            yield from upload.open()
+            yield from upload.write(data)
+            ...
+            yield from upload.finish()
+        finally:
+            upload.close()
+
+    :param path: file path
+    :param offset: offset where a previous upload was interrupted
+    """
+
+    def __init__(self, path, offset=0):
+
+        self._path = path
+        self._tmp_path = path + ".tmp"
+        self._offset = offset
+        self._size = offset
+        self._file = None
+        self._md5 = hashlib.md5()
+        self._digest = None
+        self._buffer = []
+        self._buffered = 0
+        self._pending = None
+
+    @property
+    def path(self):
+
+        return self._path
+
+    @property
+    def tmp_path(self):
+        """
+        Path of the file while it is uploaded
+        """
+
+        return self._tmp_path
+
+    @property
+    def size(self):
+        """
+        Number of bytes received, including the resumed part
+        """
+
+        return self._size
+
+    @property
+    def md5sum(self):
+        """
+        md5 of the file once the upload is finished
+        """
+
+        return self._digest
+
+    @staticmethod
+    def resume_offset(path):
+        """
+        Returns the offset where the interrupted upload of a file can be resumed.
+
+        :param path: file path
+        """
+
+        try:
+            return os.path.getsize(path + ".tmp")
+        except OSError:
+            return 0
+
+    def _open(self):
+
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        if self._offset == 0:
+            self._file = open(self._tmp_path, "wb")
+            return
+        size = self.resume_offset(self._path)
+        if size < self._offset:
+            raise ValueError("the upload can be resumed at offset {}".format(size))
+        self._file = open(self._tmp_path, "r+b")
+        # the md5 of the part already received
+        remaining = self._offset
+        while remaining > 0:
+            data = self._file.read(min(WRITE_BUFFER_SIZE, remaining))
+            if not data:
+                break
+            self._md5.update(data)
+            remaining -= len(data)
+        self._file.truncate(self._offset)
+        self._file.seek(self._offset)
+
+    @asyncio.coroutine
+    def open(self):
+        """
+        Opens the temporary file.
+
+        :raises ValueError: if the upload can't be resumed at the offset
+        """
+
+        yield from asyncio.get_event_loop().run_in_executor(None, self._open)
+
+    def _write(self, data):
+
+        self._file.write(data)
+        self._md5.update(data)
+
+    @asyncio.coroutine
+    def _flush(self):
+
+        if self._pending is not None:
+            # one write at a time, the next buffer is received meanwhile
+            pending, self._pending = self._pending, None
+            yield from pending
+        if self._buffer:
+            data = b"".join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            self._pending = asyncio.get_event_loop().run_in_executor(None, self._write, data)
+
+    @asyncio.coroutine
+    def write(self, data):
+        """
+        Writes received data, they are buffered and written
+        on a thread with large writes.
+
+        :param data: bytes
+        """
+
+        if not data:
+            return
+        self._buffer.append(bytes(data))
+        self._buffered += len(data)
+        self._size += len(data)
+        if self._buffered >= WRITE_BUFFER_SIZE:
+            yield from self._flush()
+
+    @asyncio.coroutine
+    def write_stream(self, read):
+        """
+        Writes all the data returned by a read coroutine.
+
+        :param read: function returning a coroutine, called with the size
+        to read and returning the data (empty at the end of the stream)
+        """
+
+        while True:
+            data = yield from read(READ_SIZE)
+            if not data:
+                break
+            yield from self.write(data)
+
+    def _finish(self, path):
+
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, path)
+
+    @asyncio.coroutine
+    def finish(self, path=None):
+        """
+        Writes the remaining data and renames the file.
+
+        :param path: final path if it's not the path of the upload
+        :returns: md5 of the file
+        """
+
+        yield from self._flush()
+        yield from self._flush()
+        path = path or self._path
+        yield from asyncio.get_event_loop().run_in_executor(None, self._finish, path)
+        self._digest = self._md5.hexdigest()
+        log.info("{} uploaded ({} bytes, md5 {})".format(path, self._size, self._digest))
+        return self._digest
+
+    def close(self):
+        """
+        Closes the temporary file, must be called
+        even if the upload failed.
+        """
+
+        if self._pending is not None:
+            # the file is closed by the write
+            self._pending.add_done_callback(lambda future: self._close_file())
+            self._pending = None
+        else:
+            self._close_file()
+
+    def _close_file(self):
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _QueueReader(io.RawIOBase):
+
+    """
+    File object read by a thread and filled by the event loop.
+    """
+
+    def __init__(self):
+
+        self.queue = queue.Queue(maxsize=TAR_QUEUE_SIZE)
+        self._data = memoryview(b"")
+        self._eof = False
+
+    def readable(self):
+
+        return True
+
+    def readinto(self, buffer):
+
+        while not self._data and not self._eof:
+            data = self.queue.get()
+            if data is None:
+                self._eof = True
+            else:
+                self._data = memoryview(data)
+        size = min(len(buffer), len(self._data))
+        buffer[:size] = self._data[:size]
+        self._data = self._data[size:]
+        return size
+
+
+class TarExtractor:
+
+    """
+    Extracts a tar archive while it's received, the archive
+    is never written on disk nor kept in memory.
+
+    :param directory: destination directory
+    """
+
+    def __init__(self, directory):
+
+        self._directory = os.path.abspath(directory)
+        self._reader = _QueueReader()
+        self._done = threading.Event()
+        self._future = None
+
+    def _is_safe(self, member):
+
+        path = os.path.abspath(os.path.join(self._directory, member.name))
+        if os.path.commonprefix([self._directory + os.sep, path]) != self._directory + os.sep:
+            return False
+        if member.issym() or member.islnk():
+            target = os.path.join(os.path.dirname(path), member.linkname) if member.issym() else os.path.join(self._directory, member.linkname)
+            return os.path.commonprefix([self._directory + os.sep, os.path.abspath(target)]) == self._directory + os.sep
+        return True
+
+    def _extract(self):
+
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            with tarfile.open(fileobj=self._reader, mode="r|*") as tar:
+                for member in tar:
+                    if not self._is_safe(member):
+                        log.warning("{} is outside of {}, not extracted".format(member.name, self._directory))
+                        continue
+                    tar.extract(member, self._directory)
+        finally:
+            self._done.set()
+
+    def start(self):
+        """
+        Starts the extraction thread.
+        """
+
+        self._future = asyncio.get_event_loop().run_in_executor(None, self._extract)
+
+    def _put(self, data):
+
+        while not self._done.is_set():
+            try:
+                self._reader.queue.put(data, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    @asyncio.coroutine
+    def write(self, data):
+        """
+        Sends received data to the extraction thread.
+
+        :param data: bytes
+        """
+
+        if self._future.done():
+            # the extraction has failed or the end of the archive is reached
+            yield from self._future
+            return
+        try:
+            self._reader.queue.put_nowait(bytes(data))
+        except queue.Full:
+            yield from asyncio.get_event_loop().run_in_executor(None, self._put, bytes(data))
+
+    @asyncio.coroutine
+    def finish(self):
+        """
+        Waits for the end of the extraction.
+
+        :raises tarfile.TarError: if the archive is invalid
+        """
+
+        yield from asyncio.get_event_loop().run_in_executor(None, self._put, None)
+        yield from self._future
+
+    def close(self):
+        """
+        Stops the extraction thread if the upload is interrupted.
+        """
+
+        if self._future is None:
+            return
+        if self._future.done():
+            if not self._future.cancelled() and self._future.exception() is not None:
+                log.debug("Extraction in {} failed: {}".format(self._directory, self._future.exception()))
+        else:
+            # unblock the thread, the archive is truncated
+            try:
+                self._reader.queue.put_nowait(None)
+            except queue.Full:
+                asyncio.get_event_loop().run_in_executor(None, self._put, None)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Notifications of the modifications of a file, with inotify on Linux
+and by polling on the other platforms.
+"""
+
+import os
+import sys
+import asyncio
+
+import logging
+log = logging.getLogger(__name__)
+
+try:
+    import ctypes
+    import ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    INOTIFY_AVAILABLE = sys.platform.startswith("linux")
+except (ImportError, OSError, AttributeError, TypeError):
+    INOTIFY_AVAILABLE = False
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+POLL_INTERVAL = 0.1
+
+
+class FileWatcher:
+
+    """
+    Wakes up the reader of a file when data are appended to it.
+
+    Usage:
+        while True:
+            watcher.clear()
+            data = f.read()
+            if not data:
+                yield from watcher.wait(1)
+
+    :param path: file path
+    """
+
+    def __init__(self, path):
+
+        self._path = path
+        self._event = asyncio.Event()
+        self._fd = None
+        if INOTIFY_AVAILABLE:
+            self._add_inotify_watch()
+
+    def _add_inotify_watch(self):
+
+        fd = _inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            log.warning("Can't initialize inotify: {}".format(os.strerror(ctypes.get_errno())))
+            return
+        mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+        if _inotify_add_watch(fd, os.fsencode(self._path), mask) < 0:
+            log.warning("Can't watch {} with inotify: {}".format(self._path, os.strerror(ctypes.get_errno())))
+            os.close(fd)
+            return
+        self._fd = fd
+        asyncio.get_event_loop().add_reader(fd, self._read_events)
+
+    @property
+    def inotify(self):
+        """
+        True if the modifications are notified by inotify
+        """
+
+        return self._fd is not None
+
+    def _read_events(self):
+
+        try:
+            # the content of the events doesn't matter
+            os.read(self._fd, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            log.warning("Can't read inotify events for {}: {}".format(self._path, e))
+        self._event.set()
+
+    def clear(self):
+        """
+        Forgets the previous modifications, must be called before reading the file.
+        """
+
+        self._event.clear()
+
+    @asyncio.coroutine
+    def wait(self, timeout):
+        """
+        Waits until the file is modified.
+
+        :param timeout: maximum time to wait in seconds, the polling interval
+        is used instead if inotify is not available
+        """
+
+        if self._fd is None:
+            timeout = min(timeout, POLL_INTERVAL)
+        try:
+            yield from asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def close(self):
+
+        if self._fd is not None:
+            asyncio.get_event_loop().remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        self._event.set()
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Client side of the text protocol spoken by the Dynamips and uBridge hypervisors.
+"""
+
+import time
+import asyncio
+import collections
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class HypervisorProtocol(asyncio.Protocol):
+
+    """
+    Sends commands to a Dynamips or uBridge hypervisor and parses the replies.
+
+    Hypervisor responses are of the form:
+      1xx yyyyyy\r\n
+      1xx yyyyyy\r\n
+      ...
+      100-yyyy\r\n
+    or
+      2xx-yyyy\r\n
+
+    Where 1xx is a code from 100-199 for a success or 200-299 for an error.
+    The hypervisor processes the commands of a connection in order, so
+    several commands can be written at once and the replies matched to them
+    as they are parsed.
+
+    :param error_class: exception class used to report errors
+    :param name: name of the hypervisor (for error messages)
+    :param host: hypervisor host
+    :param port: hypervisor port
+    :param is_running: callable returning if the hypervisor process is running
+    """
+
+    def __init__(self, error_class, name, host, port, is_running=None):
+
+        self._error_class = error_class
+        self._name = name
+        self._host = host
+        self._port = port
+        self._is_running = is_running
+        self._transport = None
+        self._buffer = bytearray()
+        self._data = []
+        self._pending = collections.deque()
+        self._paused = False
+        self._drain_waiter = None
+        self._stats = {}
+
+    def connection_made(self, transport):
+
+        self._transport = transport
+
+    def connection_lost(self, exc):
+
+        if exc is None:
+            message = "No data returned from {host}:{port}, {name} process running: {run}"
+        else:
+            message = "Lost communication with {host}:{port} :{error}, {name} process running: {run}"
+        self._fail_pending(message.format(host=self._host,
+                                          port=self._port,
+                                          error=exc,
+                                          name=self._name,
+                                          run=self._running()))
+        self._transport = None
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    def pause_writing(self):
+
+        self._paused = True
+
+    def resume_writing(self):
+
+        self._paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    def data_received(self, data):
+
+        self._buffer.extend(data)
+        start = 0
+        while True:
+            end = self._buffer.find(b'\r\n', start)
+            if end == -1:
+                break
+            self._line_received(self._buffer[start:end])
+            start = end + 2
+        if start:
+            del self._buffer[:start]
+
+    def _line_received(self, line):
+        """
+        Handles a complete line, the reply code is checked on the bytes
+        and the line is decoded only once.
+
+        :param line: line without the trailing \r\n (bytearray)
+        """
+
+        code = line[:4]
+        if len(code) == 4 and code[1:3].isdigit():
+            # Does it contain an error code?
+            if code[0:1] == b'2' and code[3:4] == b'-':
+                self._resolve(error=line[4:].decode("utf-8", errors="ignore"))
+                return
+            if code[0:1] == b'1':
+                # Or does the line begin with '100-'? Then we are done!
+                if code == b'100-':
+                    if line[4:] != b'OK':
+                        self._data.append(line[4:].decode("utf-8", errors="ignore"))
+                    self._resolve(result=self._data)
+                    return
+                # Remove success responses codes
+                if code[3:4] == b' ':
+                    self._data.append(line[4:].decode("utf-8", errors="ignore"))
+                    return
+        self._data.append(line.decode("utf-8", errors="ignore"))
+
+    def _resolve(self, result=None, error=None):
+        """
+        Resolves the oldest command waiting for a reply.
+
+        :param result: results as a list
+        :param error: error message if the command failed
+        """
+
+        self._data = []
+        try:
+            command, future, start = self._pending.popleft()
+        except IndexError:
+            log.warning("Unexpected reply received from {host}:{port}: {reply}".format(host=self._host,
+                                                                                       port=self._port,
+                                                                                       reply=error or result))
+            return
+
+        self._record(command, time.monotonic() - start, error is not None)
+        if future.cancelled():
+            return
+        if error is not None:
+            log.debug("command {} returned error {}".format(command, error))
+            future.set_exception(self._error_class(error))
+        else:
+            log.debug("returned result {}".format(result))
+            future.set_result(result)
+
+    def _record(self, command, elapsed, failed):
+        """
+        Updates the timing counters of a command.
+
+        :param command: command that completed
+        :param elapsed: time between the write and the reply, in seconds
+        :param failed: True if the command returned an error
+        """
+
+        # use the module and the command name, e.g. "vm set_ios"
+        key = " ".join(command.split(" ", 2)[:2])
+        stats = self._stats.setdefault(key, {"count": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0})
+        stats["count"] += 1
+        if failed:
+            stats["errors"] += 1
+        stats["total_time"] += elapsed
+        stats["max_time"] = max(stats["max_time"], elapsed)
+
+    def _fail_pending(self, message):
+        """
+        Fails all the commands waiting for a reply.
+
+        :param message: error message
+        """
+
+        while self._pending:
+            command, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(self._error_class("{} (command '{}')".format(message, command)))
+
+    def _running(self):
+
+        if self._is_running is None:
+            return "unknown"
+        return self._is_running()
+
+    @property
+    def connected(self):
+        """
+        Returns either the connection is established or not.
+
+        :returns: boolean
+        """
+
+        return self._transport is not None
+
+    @property
+    def stats(self):
+        """
+        Returns the per-command timing counters.
+
+        :returns: dictionary command -> {count, errors, total_time, max_time}
+        """
+
+        return self._stats
+
+    def close(self):
+        """
+        Closes the connection and fails the commands still waiting for a reply.
+        """
+
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        self._fail_pending("Connection to {host}:{port} closed".format(host=self._host, port=self._port))
+
+    @asyncio.coroutine
+    def send_batch(self, commands, return_exceptions=False):
+        """
+        Sends several commands in one write and waits for all the replies.
+
+        :param commands: list of hypervisor commands
+        :param return_exceptions: return errors in the result list instead of raising the first one
+
+        :returns: list of results (one result list per command)
+        """
+
+        if not commands:
+            return []
+        if not self.connected:
+            raise self._error_class("Not connected")
+
+        futures = []
+        payload = []
+        now = time.monotonic()
+        for command in commands:
+            command = command.strip()
+            log.debug("sending {}".format(command))
+            future = asyncio.Future()
+            self._pending.append((command, future, now))
+            futures.append(future)
+            payload.append(command + '\n')
+        self._transport.write("".join(payload).encode())
+
+        try:
+            if self._paused:
+                if self._drain_waiter is None or self._drain_waiter.done():
+                    self._drain_waiter = asyncio.Future()
+                yield from asyncio.shield(self._drain_waiter)
+            yield from asyncio.wait(futures)
+        except asyncio.CancelledError:
+            # the replies will still be consumed by the protocol
+            for future in futures:
+                future.cancel()
+            raise
+
+        results = []
+        for future in futures:
+            error = future.exception()
+            results.append(error if error is not None else future.result())
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Live streaming of the pcap files written by the captures. All the clients
+watching the same file share one reader, each client can filter the packets.
+"""
+
+import os
+import struct
+import asyncio
+import collections
+
+from .file_watcher import FileWatcher
+
+import logging
+log = logging.getLogger(__name__)
+
+READ_SIZE = 256 * 1024
+MAX_QUEUED_BYTES = 16 * 1024 * 1024
+MAX_RECORD_SIZE = 256 * 1024 * 1024
+
+PCAP_HEADER_SIZE = 24
+PCAP_RECORD_HEADER_SIZE = 16
+PCAP_MAGICS = {
+    b"\xd4\xc3\xb2\xa1": "<",
+    b"\xa1\xb2\xc3\xd4": ">",
+    b"\x4d\x3c\xb2\xa1": "<",  # nanosecond timestamps
+    b"\xa1\xb2\x3c\x4d": ">",
+}
+
+
+class PcapParser:
+
+    """
+    Splits the content of a pcap file in records. A file which is not
+    a pcap file (pcapng for example) is passed through without parsing.
+    """
+
+    def __init__(self):
+
+        self._buffer = bytearray()
+        self._record_header = None
+        self.header = None
+        self.linktype = None
+        self.raw = False
+        self.consumed = 0
+
+    def feed(self, data):
+        """
+        Parses data read from the file.
+
+        :param data: bytes
+        :returns: list of the complete records (record header and packet)
+        """
+
+        if self.raw:
+            self.consumed += len(data)
+            return [data] if data else []
+
+        self._buffer.extend(data)
+        if self.header is None and not self._parse_header():
+            if self.raw:
+                data = bytes(self._buffer)
+                self._buffer.clear()
+                self.consumed += len(data)
+                return [data]
+            return []
+
+        records = []
+        buffer = memoryview(self._buffer)
+        position = 0
+        while len(buffer) - position >= PCAP_RECORD_HEADER_SIZE:
+            length, = self._record_header.unpack_from(buffer, position)
+            end = position + PCAP_RECORD_HEADER_SIZE + length
+            if end > len(buffer):
+                break
+            records.append(bytes(buffer[position:end]))
+            position = end
+        buffer.release()
+        if position:
+            del self._buffer[:position]
+            self.consumed += position
+
+        if len(self._buffer) >= PCAP_RECORD_HEADER_SIZE and self._record_header.unpack_from(self._buffer)[0] > MAX_RECORD_SIZE:
+            log.warning("Invalid pcap record, the rest of the file is sent without parsing")
+            self.raw = True
+            records.append(bytes(self._buffer))
+            self.consumed += len(self._buffer)
+            self._buffer.clear()
+        return records
+
+    def _parse_header(self):
+
+        if len(self._buffer) < 4:
+            return False
+        byte_order = PCAP_MAGICS.get(bytes(self._buffer[:4]))
+        if byte_order is None:
+            self.raw = True
+            return False
+        if len(self._buffer) < PCAP_HEADER_SIZE:
+            return False
+        self.header = bytes(self._buffer[:PCAP_HEADER_SIZE])
+        self.linktype, = struct.unpack_from(byte_order + "I", self.header, 20)
+        # captured length of the packet in the record header
+        self._record_header = struct.Struct(byte_order + "8xI")
+        del self._buffer[:PCAP_HEADER_SIZE]
+        self.consumed += PCAP_HEADER_SIZE
+        return True
+
+
+class PcapSubscriber:
+
+    """
+    A client of a pcap stream. The client first receives the content
+    of the file written before it subscribed, then the new packets.
+
+    :param stream: PcapStream instance
+    :param packet_filter: PcapFilter instance or None
+    :param history: size of the file already parsed by the stream
+    """
+
+    def __init__(self, stream, packet_filter, history):
+
+        self._stream = stream
+        self._filter = packet_filter
+        self._history = history
+        self._queue = collections.deque()
+        self._queued_bytes = 0
+        self._waiter = None
+        self._eof = False
+        self._dropped = 0
+        self._history_file = None
+        self._history_parser = None
+
+    @property
+    def dropped(self):
+        """
+        Number of packets dropped because the client is too slow
+        """
+
+        return self._dropped
+
+    def _select(self, records, linktype):
+
+        if self._filter is None or linktype is None:
+            return records
+        return [record for record in records if self._filter.match(linktype, memoryview(record)[PCAP_RECORD_HEADER_SIZE:])]
+
+    def _wake_up(self):
+
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def feed(self, records, linktype, header=None):
+        """
+        Receives the records read by the stream.
+
+        :param records: list of records
+        :param linktype: link type of the capture
+        :param header: pcap header if it has just been read
+        """
+
+        if header is not None:
+            self._queue.append(header)
+        records = self._select(records, linktype)
+        if self._queued_bytes > MAX_QUEUED_BYTES:
+            # whole records are dropped, the client still receives a valid pcap file
+            if self._dropped == 0:
+                log.warning("Pcap client is too slow, dropping packets")
+            self._dropped += len(records)
+        else:
+            for record in records:
+                self._queue.append(record)
+                self._queued_bytes += len(record)
+        if self._queue:
+            self._wake_up()
+
+    def feed_eof(self):
+
+        self._eof = True
+        self._wake_up()
+
+    @asyncio.coroutine
+    def _read_history(self):
+        """
+        Returns the next part of the file written before the subscription,
+        None when all of it has been sent.
+        """
+
+        loop = asyncio.get_event_loop()
+        while self._history > 0:
+            if self._history_file is None:
+                self._history_file = open(self._stream.path, "rb")
+                self._history_parser = PcapParser()
+            data = yield from loop.run_in_executor(None, self._history_file.read, min(READ_SIZE, self._history))
+            if not data:
+                break
+            self._history -= len(data)
+            parser = self._history_parser
+            had_header = parser.header is not None
+            records = self._select(parser.feed(data), parser.linktype)
+            if not had_header and parser.header is not None:
+                records.insert(0, parser.header)
+            if records:
+                return b"".join(records)
+        self._history = 0
+        self._close_history()
+        return None
+
+    def _close_history(self):
+
+        if self._history_file is not None:
+            self._history_file.close()
+            self._history_file = None
+            self._history_parser = None
+
+    @asyncio.coroutine
+    def read(self):
+        """
+        Waits for data to send to the client.
+
+        :returns: bytes, empty at the end of the stream
+        """
+
+        if self._history:
+            data = yield from self._read_history()
+            if data:
+                return data
+
+        while not self._queue:
+            if self._eof:
+                return b""
+            self._waiter = asyncio.Future()
+            try:
+                yield from self._waiter
+            finally:
+                self._waiter = None
+        data = b"".join(self._queue)
+        self._queue.clear()
+        self._queued_bytes = 0
+        return data
+
+    def close(self):
+        """
+        Unsubscribes from the stream.
+        """
+
+        self._eof = True
+        self._close_history()
+        self._stream.unsubscribe(self)
+
+
+class PcapStream:
+
+    """
+    Reads a pcap file while it's written by a capture and sends the
+    new records to the subscribers. The file is read with large reads
+    when inotify reports a modification (or by polling).
+
+    :param path: pcap file path
+    """
+
+    _streams = {}
+
+    def __init__(self, path):
+
+        self._path = path
+        self._file = open(path, "rb")
+        self._parser = PcapParser()
+        self._subscribers = set()
+        self._closed = False
+        self._watcher = FileWatcher(path)
+        self._task = asyncio.async(self._run())
+
+    @classmethod
+    def subscribe(cls, path, packet_filter=None):
+        """
+        Subscribes to the stream of a pcap file, the stream is
+        shared by all the subscribers of the file.
+
+        :param path: pcap file path
+        :param packet_filter: PcapFilter instance or None
+
+        :returns: PcapSubscriber instance
+        """
+
+        path = os.path.realpath(path)
+        stream = cls._streams.get(path)
+        if stream is None:
+            stream = cls(path)
+            cls._streams[path] = stream
+        subscriber = PcapSubscriber(stream, packet_filter, stream._parser.consumed)
+        stream._subscribers.add(subscriber)
+        return subscriber
+
+    @property
+    def path(self):
+
+        return self._path
+
+    def unsubscribe(self, subscriber):
+        """
+        Removes a subscriber, the stream is closed after the last one.
+
+        :param subscriber: PcapSubscriber instance
+        """
+
+        self._subscribers.discard(subscriber)
+        if not self._subscribers:
+            self.close()
+
+    def close(self):
+
+        if self._closed:
+            return
+        self._closed = True
+        if self._streams.get(self._path) is self:
+            del self._streams[self._path]
+        if self._task is not asyncio.Task.current_task():
+            self._task.cancel()
+        self._watcher.close()
+        self._file.close()
+        for subscriber in list(self._subscribers):
+            subscriber.feed_eof()
+
+    def _truncated(self):
+
+        return os.fstat(self._file.fileno()).st_size < self._file.tell()
+
+    @asyncio.coroutine
+    def _run(self):
+
+        loop = asyncio.get_event_loop()
+        try:
+            while not self._closed:
+                self._watcher.clear()
+                data = yield from loop.run_in_executor(None, self._file.read, READ_SIZE)
+                if data:
+                    had_header = self._parser.header is not None
+                    records = self._parser.feed(data)
+                    header = None
+                    if not had_header and self._parser.header is not None:
+                        header = self._parser.header
+                    for subscriber in list(self._subscribers):
+                        subscriber.feed(records, self._parser.linktype, header=header)
+                elif self._truncated():
+                    log.info("{} has been truncated, a new capture has started".format(self._path))
+                    break
+                else:
+                    yield from self._watcher.wait(1)
+        except (OSError, ValueError) as e:
+            if not self._closed:
+                log.error("Can't read {}: {}".format(self._path, e))
+        finally:
+            self.close()
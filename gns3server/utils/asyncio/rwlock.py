@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import collections
+
+
+class _Releaser:
+
+    def __init__(self, release):
+
+        self._release = release
+
+    def __enter__(self):
+
+        return None
+
+    def __exit__(self, *args):
+
+        self._release()
+
+
+class ReadWriteLock:
+
+    """
+    Lock shared by several readers or held by one writer.
+    The waiters are served in order so a writer is not starved
+    by a continuous flow of readers.
+
+    Usage:
+        with (yield from lock.reader()):
+            ...
+        with (yield from lock.writer()):
+            ...
+    """
+
+    def __init__(self):
+
+        self._readers = 0
+        self._writer = False
+        self._waiters = collections.deque()
+
+    @property
+    def readers(self):
+        """
+        Number of readers holding the lock
+        """
+
+        return self._readers
+
+    def locked(self):
+        """
+        Returns True if the lock is held by a reader or a writer
+        """
+
+        return self._writer or self._readers > 0
+
+    def _can_acquire(self, writer):
+
+        if writer:
+            return not self._writer and self._readers == 0
+        return not self._writer
+
+    def _grant(self, writer):
+
+        if writer:
+            self._writer = True
+        else:
+            self._readers += 1
+
+    def _wake_up(self):
+
+        while self._waiters:
+            future, writer = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._can_acquire(writer):
+                break
+            self._waiters.popleft()
+            self._grant(writer)
+            future.set_result(True)
+            if writer:
+                break
+
+    @asyncio.coroutine
+    def _acquire(self, writer):
+
+        if not self._waiters and self._can_acquire(writer):
+            self._grant(writer)
+            return True
+
+        future = asyncio.Future()
+        self._waiters.append((future, writer))
+        try:
+            yield from future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the lock was given to us just before the cancellation
+                self._release(writer)
+            else:
+                self._wake_up()
+            raise
+        return True
+
+    def _release(self, writer):
+
+        if writer:
+            if not self._writer:
+                raise RuntimeError("Write lock is not acquired")
+            self._writer = False
+        else:
+            if self._readers == 0:
+                raise RuntimeError("Read lock is not acquired")
+            self._readers -= 1
+        self._wake_up()
+
+    @asyncio.coroutine
+    def acquire_read(self):
+
+        return (yield from self._acquire(False))
+
+    def release_read(self):
+
+        self._release(False)
+
+    @asyncio.coroutine
+    def acquire_write(self):
+
+        return (yield from self._acquire(True))
+
+    def release_write(self):
+
+        self._release(True)
+
+    @asyncio.coroutine
+    def reader(self):
+        """
+        Acquires the lock as a reader, returns a context manager releasing it.
+        """
+
+        yield from self.acquire_read()
+        return _Releaser(self.release_read)
+
+    @asyncio.coroutine
+    def writer(self):
+        """
+        Acquires the lock as a writer, returns a context manager releasing it.
+        """
+
+        yield from self.acquire_write()
+        return _Releaser(self.release_write)
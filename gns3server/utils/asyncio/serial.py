@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Serial consoles of the VMs opened on the event loop: a UNIX socket
+on Linux and Mac OS X, a named pipe on Windows.
+"""
+
+import sys
+import asyncio
+
+
+@asyncio.coroutine
+def _asyncio_open_serial_windows(path):
+    """
+    Opens a named pipe, the Proactor event loop is required.
+
+    :param path: path of the named pipe
+    :returns: tuple (StreamReader, StreamWriter)
+    """
+
+    loop = asyncio.get_event_loop()
+    if not hasattr(loop, "create_pipe_connection"):
+        raise OSError("The event loop doesn't support named pipes")
+    reader = asyncio.StreamReader()
+    protocol = asyncio.StreamReaderProtocol(reader)
+    transport, _ = yield from loop.create_pipe_connection(lambda: protocol, path)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    return reader, writer
+
+
+@asyncio.coroutine
+def _asyncio_open_serial_unix(path):
+    """
+    Opens a UNIX socket.
+
+    :param path: path of the socket
+    :returns: tuple (StreamReader, StreamWriter)
+    """
+
+    return (yield from asyncio.open_unix_connection(path))
+
+
+@asyncio.coroutine
+def asyncio_open_serial(path):
+    """
+    Opens the serial console of a VM, the console is read by the
+    event loop like the network connections so a console doesn't
+    need a thread.
+
+    :param path: path of the named pipe or of the UNIX socket
+    :returns: tuple (StreamReader, StreamWriter)
+    """
+
+    if sys.platform.startswith("win"):
+        return (yield from _asyncio_open_serial_windows(path))
+    return (yield from _asyncio_open_serial_unix(path))
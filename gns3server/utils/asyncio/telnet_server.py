@@ -55,17 +55,86 @@ NAWS = 31     # Negotiate About Window Size
 LINEMO = 34     # Line Mode
 
 READ_SIZE = 1024
+SCROLLBACK_SIZE = 64 * 1024
+CLIENT_BUFFER_LIMIT = 1024 * 1024
+
+
+class RingBuffer:
+
+    """
+    Last bytes written in the buffer, stored in a fixed-size bytearray.
+
+    :param size: size of the buffer in bytes
+    """
+
+    def __init__(self, size):
+
+        self._buffer = bytearray(size)
+        self._size = size
+        self._position = 0
+        self._full = False
+
+    def __len__(self):
+
+        return self._size if self._full else self._position
+
+    def write(self, data):
+
+        if self._size == 0 or not data:
+            return
+        if len(data) >= self._size:
+            self._buffer[:] = data[-self._size:]
+            self._position = 0
+            self._full = True
+            return
+        end = self._position + len(data)
+        if end <= self._size:
+            self._buffer[self._position:end] = data
+        else:
+            split = self._size - self._position
+            self._buffer[self._position:] = data[:split]
+            self._buffer[:len(data) - split] = data[split:]
+        if end >= self._size:
+            self._full = True
+        self._position = end % self._size
+
+    def getvalue(self):
+        """
+        Returns the content of the buffer, oldest bytes first.
+        """
+
+        if not self._full:
+            return bytes(self._buffer[:self._position])
+        return bytes(self._buffer[self._position:] + self._buffer[:self._position])
 
 
 class AsyncioTelnetServer:
 
-    def __init__(self, reader=None, writer=None, binary=True, echo=False):
+    """
+    Telnet server sharing a console between several clients. The output of
+    the console is read by one task and sent to all the clients without
+    waiting for them, a client is disconnected when too much output is
+    waiting to be sent to it. The last output of the console is replayed
+    to the new clients. The output is read from the call of start() (or
+    the first client if start() isn't called), even when no client is
+    connected.
+
+    :param reader: StreamReader of the console output
+    :param writer: StreamWriter of the console input
+    :param binary: use the binary mode
+    :param echo: the telnet server echoes the input
+    :param scrollback: size in bytes of the output replayed to the new clients
+    :param client_buffer_limit: size in bytes of the output waiting for a client before it is disconnected
+    """
+
+    def __init__(self, reader=None, writer=None, binary=True, echo=False, scrollback=SCROLLBACK_SIZE, client_buffer_limit=CLIENT_BUFFER_LIMIT):
         self._reader = reader
         self._writer = writer
         self._clients = set()
-        self._lock = asyncio.Lock()
-        self._reader_process = None
-        self._current_read = None
+        self._scrollback = RingBuffer(scrollback)
+        self._client_buffer_limit = client_buffer_limit
+        self._reader_task = None
+        self._closed = False
 
         self._binary = binary
         # If echo is true when the client send data
@@ -73,10 +142,16 @@ class AsyncioTelnetServer:
         # it's our job (or the wrapped app) to send back the data
         self._echo = echo
 
+    @property
+    def clients(self):
+        """
+        Number of connected clients
+        """
+
+        return len(self._clients)
+
     @asyncio.coroutine
     def run(self, network_reader, network_writer):
-        # Keep track of connected clients
-        self._clients.add(network_writer)
 
         try:
             # Send initial telnet session opening
@@ -98,85 +173,89 @@ class AsyncioTelnetServer:
                     IAC, DONT, SGA,
                     IAC, WONT, BINARY,
                     IAC, DONT, BINARY]))
+
+            # The client gets what happened on the console before it connected
+            network_writer.write(self._scrollback.getvalue())
+            # Keep track of connected clients
+            self._clients.add(network_writer)
+            self.start()
             yield from network_writer.drain()
 
             yield from self._process(network_reader, network_writer)
-        except ConnectionResetError:
-            with (yield from self._lock):
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(network_writer)
+            network_writer.close()
+
+    def start(self):
+        """
+        Starts reading the output of the console, does nothing if
+        it's already started or if the console is closed.
+        """
 
-                network_writer.close()
+        if self._reader is not None and self._reader_task is None and not self._closed:
+            self._reader_task = asyncio.async(self._read_output())
+
+    def close(self):
+        """
+        Stops reading the output of the console and disconnects the clients.
+        """
 
-                if self._reader_process == network_reader:
-                    self._reader_process = None
-                    # Cancel current read from this reader
-                    self._current_read.cancel()
-            self._clients.remove(network_writer)
+        self._closed = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        for network_writer in list(self._clients):
+            network_writer.close()
+        self._clients.clear()
 
     @asyncio.coroutine
-    def _get_reader(self, network_reader):
+    def _read_output(self):
         """
-        Get a reader or None if another reader is already reading.
+        Sends the output of the console to all the clients.
         """
-        with (yield from self._lock):
-            if self._reader_process is None:
-                self._reader_process = network_reader
-            if self._reader_process == network_reader:
-                self._current_read = asyncio.async(self._reader.read(READ_SIZE))
-                return self._current_read
-        return None
+
+        while True:
+            data = yield from self._reader.read(READ_SIZE)
+            if not data:
+                break
+            self._scrollback.write(data)
+            self._broadcast(data)
+        # The console is closed
+        for network_writer in list(self._clients):
+            network_writer.close()
+
+    def _broadcast(self, data):
+
+        for network_writer in list(self._clients):
+            network_writer.write(data)
+            if network_writer.transport.get_write_buffer_size() > self._client_buffer_limit:
+                # A slow client doesn't slow down the other ones
+                log.warning("Telnet client is too slow to receive the console output, disconnecting it")
+                self._clients.discard(network_writer)
+                network_writer.transport.abort()
 
     @asyncio.coroutine
     def _process(self, network_reader, network_writer):
-        network_read = asyncio.async(network_reader.read(READ_SIZE))
-        reader_read = yield from self._get_reader(network_reader)
 
         while True:
-            if reader_read is None:
-                reader_read = yield from self._get_reader(network_reader)
-            if reader_read is None:
-                done, pending = yield from asyncio.wait(
-                    [
-                        network_read,
-                    ],
-                    timeout=1,
-                    return_when=asyncio.FIRST_COMPLETED)
-            else:
-                done, pending = yield from asyncio.wait(
-                    [
-                        network_read,
-                        reader_read
-                    ],
-                    return_when=asyncio.FIRST_COMPLETED)
-            for coro in done:
-                data = coro.result()
-
-                if coro == network_read:
-                    if network_reader.at_eof():
-                        raise ConnectionResetError()
-
-                    network_read = asyncio.async(network_reader.read(READ_SIZE))
-
-                    if IAC in data:
-                        data = yield from self._IAC_parser(data, network_reader, network_writer)
-                    if len(data) == 0:
-                        continue
-
-                    if not self._binary:
-                        data = data.replace(b"\r\n", b"\n")
-
-                    if self._writer:
-                        self._writer.write(data)
-                        yield from self._writer.drain()
-                elif coro == reader_read:
-                    if self._reader.at_eof():
-                        raise ConnectionResetError()
-
-                    reader_read = yield from self._get_reader(network_reader)
-
-                    # Replicate the output on all clients
-                    for writer in self._clients:
-                        writer.write(data)
-                        yield from writer.drain()
+            data = yield from network_reader.read(READ_SIZE)
+            if not data:
+                # The client is disconnected
+                return
+
+            if IAC in data:
+                data = yield from self._IAC_parser(bytearray(data), network_reader, network_writer)
+            if len(data) == 0:
+                continue
+
+            if not self._binary:
+                data = data.replace(b"\r\n", b"\n")
+
+            if self._writer:
+                self._writer.write(data)
+                yield from self._writer.drain()
 
     def _IAC_parser(self, buf, network_reader, network_writer):
         """
@@ -271,6 +350,7 @@ if __name__ == '__main__':
                                                                                               stderr=asyncio.subprocess.STDOUT,
                                                                                               stdin=asyncio.subprocess.PIPE)))
     server = AsyncioTelnetServer(reader=process.stdout, writer=process.stdin, binary=False, echo=False)
+    server.start()
 
     coro = asyncio.start_server(server.run, '127.0.0.1', 4444, loop=loop)
     s = loop.run_until_complete(coro)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Persistent index of the md5 of the images and project files.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import threading
+import concurrent.futures
+
+from ..config import Config
+
+import logging
+log = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".gns3_hash_index"
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """
+    Computes the md5 of a file
+
+    :param path: file path
+    :returns: hexadecimal md5
+    """
+
+    m = hashlib.md5()
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            m.update(view[:size])
+    return m.hexdigest()
+
+
+class HashIndex:
+
+    """
+    md5 of files indexed by (path, inode, size, mtime_ns). An entry is
+    used only if the stat of the file still matches, so a modified file
+    is hashed again. The index is saved in one file.
+
+    :param path: path of the index file
+    """
+
+    _instances = {}
+    _executor = None
+
+    def __init__(self, path):
+
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self._load()
+
+    @classmethod
+    def instance(cls, directory):
+        """
+        Returns the index stored in a directory
+
+        :param directory: directory of the index file
+        :returns: HashIndex instance
+        """
+
+        path = os.path.join(directory, INDEX_FILENAME)
+        if path not in cls._instances:
+            cls._instances[path] = cls(path)
+        return cls._instances[path]
+
+    @classmethod
+    def instance_for(cls, path):
+        """
+        Returns the index for a file: the index of the projects directory
+        for the project files and the index of the images directory for
+        the other files.
+
+        :param path: file path
+        :returns: HashIndex instance
+        """
+
+        server_config = Config.instance().get_section_config("Server")
+        projects_directory = os.path.abspath(os.path.expanduser(server_config.get("projects_path", "~/GNS3/projects")))
+        if os.path.commonprefix([projects_directory + os.sep, os.path.abspath(path)]) == projects_directory + os.sep:
+            return cls.instance(projects_directory)
+        return cls.instance(os.path.abspath(os.path.expanduser(server_config.get("images_path", "~/GNS3/images"))))
+
+    @classmethod
+    def reset(cls):
+        """
+        Forgets the loaded indexes (for tests)
+        """
+
+        cls._instances = {}
+
+    @property
+    def path(self):
+        """
+        Path of the index file
+        """
+
+        return self._path
+
+    def _load(self):
+
+        try:
+            with open(self._path) as f:
+                entries = json.load(f)["files"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if os.path.exists(self._path):
+                log.warning("Can't load the hash index {}: {}".format(self._path, e))
+            return
+        # forget the deleted files
+        self._entries = {path: tuple(entry) for path, entry in entries.items() if os.path.exists(path)}
+
+    def save(self):
+        """
+        Writes the index on disk
+        """
+
+        with self._lock:
+            data = json.dumps({"version": 1, "files": self._entries}, separators=(",", ":"))
+            self._dirty = False
+            try:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                tmp_path = self._path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path)
+            except OSError as e:
+                log.error("Can't write the hash index {}: {}".format(self._path, e))
+
+    def get(self, path, save=True):
+        """
+        Returns the md5 of a file, the file is hashed only if
+        it changed since the last call.
+
+        :param path: file path
+        :param save: write the index on disk if it was updated
+
+        :returns: hexadecimal md5
+        """
+
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and tuple(entry[:3]) == key:
+            return entry[3]
+
+        digest = hash_file(path)
+        with self._lock:
+            self._entries[path] = key + (digest, )
+            self._dirty = True
+        if save:
+            self.save()
+        return digest
+
+    def set(self, path, digest, save=True):
+        """
+        Records the md5 of a file computed by the caller,
+        for example while the file was written.
+
+        :param path: file path
+        :param digest: hexadecimal md5
+        :param save: write the index on disk
+        """
+
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            self._entries[path] = (st.st_ino, st.st_size, st.st_mtime_ns, digest)
+            self._dirty = True
+        if save:
+            self.save()
+
+    def remove(self, path, save=True):
+        """
+        Forgets the md5 of a file
+
+        :param path: file path
+        :param save: write the index on disk
+        """
+
+        with self._lock:
+            if self._entries.pop(os.path.abspath(path), None) is not None:
+                self._dirty = True
+        if save and self._dirty:
+            self.save()
+
+    @classmethod
+    def _get_executor(cls):
+
+        if cls._executor is None:
+            # hashlib releases the GIL so the threads hash in parallel
+            cls._executor = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+        return cls._executor
+
+    @asyncio.coroutine
+    def get_many(self, paths):
+        """
+        Returns the md5 of several files, the modified files are
+        hashed on a thread pool and the index is saved once.
+
+        :param paths: list of file paths
+        :returns: dictionary path -> md5 (without the files that can't be read)
+        """
+
+        loop = asyncio.get_event_loop()
+        futures = {path: loop.run_in_executor(self._get_executor(), self.get, path, False) for path in paths}
+        if futures:
+            yield from asyncio.wait(list(futures.values()))
+
+        result = {}
+        for path, future in futures.items():
+            try:
+                result[path] = future.result()
+            except OSError as e:
+                log.debug("Can't hash {}: {}".format(path, e))
+        if self._dirty:
+            yield from loop.run_in_executor(self._get_executor(), self.save)
+        return result
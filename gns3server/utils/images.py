@@ -16,7 +16,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import hashlib
+
+from .hash_index import HashIndex
 
 import logging
 log = logging.getLogger(__name__)
@@ -24,7 +25,9 @@ log = logging.getLogger(__name__)
 
 def md5sum(path):
     """
-    Return the md5sum of an image and cache it on disk
+    Return the md5sum of an image, the digest is kept
+    in the hash index and computed again only if the
+    image changed.
 
     :param path: Path to the image
     :returns: Digest of the image
@@ -34,32 +37,21 @@ def md5sum(path):
         return None
 
     try:
-        with open(path + '.md5sum') as f:
-            return f.read()
-    # Unicode error is when user rename an image to .md5sum ....
-    except (OSError, UnicodeDecodeError):
-        pass
-
-    try:
-        m = hashlib.md5()
-        with open(path, 'rb') as f:
-            while True:
-                buf = f.read(128)
-                if not buf:
-                    break
-                m.update(buf)
-        digest = m.hexdigest()
+        return HashIndex.instance_for(path).get(path)
     except OSError as e:
         log.error("Can't create digest of %s: %s", path, str(e))
         return None
 
+
+def set_checksum(path, digest):
+    """
+    Records the md5sum of an image computed while it was written
+    """
+
     try:
-        with open('{}.md5sum'.format(path), 'w+') as f:
-            f.write(digest)
+        HashIndex.instance_for(path).set(path, digest)
     except OSError as e:
-        log.error("Can't write digest of %s: %s", path, str(e))
-
-    return digest
+        log.error("Can't store digest of %s: %s", path, str(e))
 
 
 def remove_checksum(path):
@@ -67,6 +59,8 @@ def remove_checksum(path):
     Remove the checksum of an image from cache if exists
     """
 
+    HashIndex.instance_for(path).remove(path)
+    # checksum written by the previous versions
     path = '{}.md5sum'.format(path)
     if os.path.exists(path):
         os.remove(path)
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Capture filters applied by the server to the packets of a pcap file,
+a subset of the syntax of pcap-filter(7):
+
+    ip, ip6, arp, tcp, udp, icmp, icmp6, vlan [id]
+    [src|dst] host <address>
+    [src|dst] net <network>
+    [tcp|udp] [src|dst] port <port>
+    ether [src|dst] [host] <mac address>
+    less <length>, greater <length>
+
+Primitives are combined with and (&&), or (||), not (!) and parentheses.
+As in pcap-filter, and/or have the same precedence and are evaluated from
+left to right.
+"""
+
+import re
+import struct
+import ipaddress
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_PPP = 9
+LINKTYPE_PPP_HDLC = 50
+LINKTYPE_RAW = 101
+LINKTYPE_C_HDLC = 104
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+
+ETHERTYPE_IP = 0x0800
+ETHERTYPE_ARP = 0x0806
+ETHERTYPE_IPV6 = 0x86dd
+ETHERTYPE_VLANS = (0x8100, 0x88a8)
+
+PROTOCOLS = {"icmp": 1, "tcp": 6, "udp": 17, "icmp6": 58}
+PORT_PROTOCOLS = (6, 17, 132)
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPV6_FRAGMENT_HEADER = 44
+
+_TOKEN_RE = re.compile(r"\(|\)|!|&&|\|\||[^\s()!&|]+")
+
+
+class PcapFilterError(ValueError):
+    pass
+
+
+class _Packet:
+
+    """
+    Fields of a packet used by the filters, None when the
+    packet doesn't have the layer.
+    """
+
+    __slots__ = ("length", "eth_src", "eth_dst", "vlans", "ethertype", "ip_src", "ip_dst", "protocol", "sport", "dport")
+
+    def __init__(self, linktype, data):
+
+        self.length = len(data)
+        self.eth_src = self.eth_dst = None
+        self.vlans = []
+        self.ethertype = None
+        self.ip_src = self.ip_dst = None
+        self.protocol = None
+        self.sport = self.dport = None
+        try:
+            offset = self._decode_link(linktype, data)
+            if offset is not None:
+                self._decode_network(data, offset)
+        except (IndexError, struct.error):
+            # truncated packet, keep the fields already decoded
+            pass
+
+    def _decode_link(self, linktype, data):
+
+        if linktype == LINKTYPE_ETHERNET:
+            self.eth_dst = bytes(data[0:6])
+            self.eth_src = bytes(data[6:12])
+            self.ethertype, = struct.unpack_from("!H", data, 12)
+            offset = 14
+            while self.ethertype in ETHERTYPE_VLANS:
+                tci, self.ethertype = struct.unpack_from("!HH", data, offset)
+                self.vlans.append(tci & 0x0fff)
+                offset += 4
+            return offset
+        if linktype == LINKTYPE_C_HDLC:
+            self.ethertype, = struct.unpack_from("!H", data, 2)
+            return 4
+        if linktype in (LINKTYPE_PPP, LINKTYPE_PPP_HDLC):
+            offset = 2 if data[0:2] == b"\xff\x03" else 0
+            protocol, = struct.unpack_from("!H", data, offset)
+            self.ethertype = {0x0021: ETHERTYPE_IP, 0x0057: ETHERTYPE_IPV6}.get(protocol)
+            return offset + 2
+        if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+            self.ethertype = {4: ETHERTYPE_IP, 6: ETHERTYPE_IPV6}.get(data[0] >> 4)
+            return 0
+        return None
+
+    def _decode_network(self, data, offset):
+
+        if self.ethertype == ETHERTYPE_IP:
+            header_length = (data[offset] & 0x0f) * 4
+            fragment, self.protocol = struct.unpack_from("!HxB", data, offset + 6)
+            self.ip_src = bytes(data[offset + 12:offset + 16])
+            self.ip_dst = bytes(data[offset + 16:offset + 20])
+            if fragment & 0x1fff:
+                # only the first fragment has the ports
+                return
+            self._decode_transport(data, offset + header_length)
+        elif self.ethertype == ETHERTYPE_IPV6:
+            protocol = data[offset + 6]
+            self.ip_src = bytes(data[offset + 8:offset + 24])
+            self.ip_dst = bytes(data[offset + 24:offset + 40])
+            offset += 40
+            while protocol in IPV6_EXTENSION_HEADERS or protocol == IPV6_FRAGMENT_HEADER:
+                if protocol == IPV6_FRAGMENT_HEADER:
+                    fragment, = struct.unpack_from("!H", data, offset + 2)
+                    protocol = data[offset]
+                    offset += 8
+                    if fragment & 0xfff8:
+                        self.protocol = protocol
+                        return
+                else:
+                    protocol, length = data[offset], data[offset + 1]
+                    offset += (length + 1) * 8
+            self.protocol = protocol
+            self._decode_transport(data, offset)
+        elif self.ethertype == ETHERTYPE_ARP:
+            hardware_type, protocol_type, hardware_length, protocol_length = struct.unpack_from("!HHBB", data, offset)
+            if protocol_type == ETHERTYPE_IP and protocol_length == 4:
+                sender = offset + 8 + hardware_length
+                self.ip_src = bytes(data[sender:sender + 4])
+                target = sender + 4 + hardware_length
+                self.ip_dst = bytes(data[target:target + 4])
+
+    def _decode_transport(self, data, offset):
+
+        if self.protocol in PORT_PROTOCOLS:
+            self.sport, self.dport = struct.unpack_from("!HH", data, offset)
+
+
+def _either(direction, source, destination, match):
+
+    if direction == "src":
+        return lambda packet: match(source(packet))
+    if direction == "dst":
+        return lambda packet: match(destination(packet))
+    return lambda packet: match(source(packet)) or match(destination(packet))
+
+
+class _Parser:
+
+    def __init__(self, expression):
+
+        self._expression = expression
+        self._tokens = _TOKEN_RE.findall(expression)
+        self._position = 0
+
+    def error(self, message):
+
+        raise PcapFilterError("Invalid capture filter '{}': {}".format(self._expression, message))
+
+    def peek(self):
+
+        if self._position < len(self._tokens):
+            return self._tokens[self._position].lower()
+        return None
+
+    def next(self, expected=None):
+
+        token = self.peek()
+        if token is None:
+            self.error("unexpected end of the expression")
+        if expected is not None and token != expected:
+            self.error("'{}' expected instead of '{}'".format(expected, token))
+        value = self._tokens[self._position]
+        self._position += 1
+        return value
+
+    def parse(self):
+
+        match = self.expression()
+        if self.peek() is not None:
+            self.error("unexpected '{}'".format(self.peek()))
+        return match
+
+    def expression(self):
+
+        match = self.negation()
+        while self.peek() in ("and", "&&", "or", "||"):
+            operator = self.next().lower()
+            left, right = match, self.negation()
+            if operator in ("and", "&&"):
+                match = lambda packet, left=left, right=right: left(packet) and right(packet)
+            else:
+                match = lambda packet, left=left, right=right: left(packet) or right(packet)
+        return match
+
+    def negation(self):
+
+        token = self.peek()
+        if token in ("not", "!"):
+            self.next()
+            match = self.negation()
+            return lambda packet: not match(packet)
+        if token == "(":
+            self.next()
+            match = self.expression()
+            self.next(")")
+            return match
+        return self.primitive()
+
+    def primitive(self):
+
+        token = self.next().lower()
+        if token == "ip":
+            return lambda packet: packet.ethertype == ETHERTYPE_IP
+        if token == "ip6":
+            return lambda packet: packet.ethertype == ETHERTYPE_IPV6
+        if token == "arp":
+            return lambda packet: packet.ethertype == ETHERTYPE_ARP
+        if token == "vlan":
+            if self.peek() is not None and self.peek().isdigit():
+                vlan = self.integer(4095)
+                return lambda packet: vlan in packet.vlans
+            return lambda packet: bool(packet.vlans)
+        if token in ("less", "greater"):
+            length = self.integer()
+            if token == "less":
+                return lambda packet: packet.length <= length
+            return lambda packet: packet.length >= length
+        if token == "ether":
+            return self.ether()
+
+        protocol = None
+        if token in PROTOCOLS:
+            protocol = PROTOCOLS[token]
+            if self.peek() not in ("src", "dst", "port"):
+                return lambda packet: packet.protocol == protocol
+            token = self.next().lower()
+        direction = None
+        if token in ("src", "dst"):
+            direction = token
+            token = self.next().lower()
+
+        if token == "port":
+            port = self.integer(65535)
+            match = _either(direction, lambda packet: packet.sport, lambda packet: packet.dport, lambda value: value == port)
+            if protocol is not None:
+                return lambda packet: packet.protocol == protocol and match(packet)
+            return match
+        if protocol is not None:
+            self.error("'port' expected after '{}'".format(token))
+        if token == "host":
+            address = self.address()
+            return _either(direction, lambda packet: packet.ip_src, lambda packet: packet.ip_dst, lambda value: value == address)
+        if token == "net":
+            network = self.network()
+            return _either(direction, lambda packet: packet.ip_src, lambda packet: packet.ip_dst,
+                           lambda value: value is not None and len(value) == len(network.network_address.packed) and ipaddress.ip_address(value) in network)
+        self.error("unknown primitive '{}'".format(token))
+
+    def ether(self):
+
+        direction = None
+        if self.peek() in ("src", "dst"):
+            direction = self.next().lower()
+        if self.peek() == "host":
+            self.next()
+        value = self.next()
+        try:
+            mac = bytes(int(part, 16) for part in re.split("[:.-]", value))
+        except ValueError:
+            mac = b""
+        if len(mac) != 6:
+            self.error("invalid MAC address '{}'".format(value))
+        return _either(direction, lambda packet: packet.eth_src, lambda packet: packet.eth_dst, lambda value: value == mac)
+
+    def integer(self, maximum=None):
+
+        value = self.next()
+        try:
+            number = int(value)
+        except ValueError:
+            self.error("invalid number '{}'".format(value))
+        if number < 0 or (maximum is not None and number > maximum):
+            self.error("number '{}' out of range".format(value))
+        return number
+
+    def address(self):
+
+        value = self.next()
+        try:
+            return ipaddress.ip_address(value).packed
+        except ValueError:
+            self.error("invalid IP address '{}'".format(value))
+
+    def network(self):
+
+        value = self.next()
+        try:
+            return ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            self.error("invalid network '{}'".format(value))
+
+
+class PcapFilter:
+
+    """
+    Compiled capture filter.
+
+    :param expression: filter expression
+    :raises PcapFilterError: if the expression is invalid
+    """
+
+    def __init__(self, expression):
+
+        self._expression = expression
+        self._match = _Parser(expression).parse()
+
+    @property
+    def expression(self):
+
+        return self._expression
+
+    def match(self, linktype, data):
+        """
+        Returns True if a packet matches the filter.
+
+        :param linktype: link type of the capture
+        :param data: packet data, without the pcap record header
+        """
+
+        return bool(self._match(_Packet(linktype, data)))
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Persistent cache of the probes run on the emulator executables.
+"""
+
+import os
+import stat
+import json
+import shutil
+import asyncio
+
+from ..config import Config
+
+import logging
+log = logging.getLogger(__name__)
+
+PROBE_CACHE_FILENAME = ".gns3_probe_cache"
+
+
+class ProbeCache:
+
+    """
+    Output of the commands probing an executable (version, missing
+    shared libraries, supported options) indexed by the path, inode,
+    size and mtime of the executable. A probe is run again only when the
+    executable changed. The cache is saved in the images directory.
+
+    :param path: path of the cache file
+    """
+
+    _instances = {}
+
+    def __init__(self, path):
+
+        self._path = path
+        self._entries = {}
+        self._load()
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns the cache of the images directory
+
+        :returns: ProbeCache instance
+        """
+
+        server_config = Config.instance().get_section_config("Server")
+        directory = os.path.abspath(os.path.expanduser(server_config.get("images_path", "~/GNS3/images")))
+        path = os.path.join(directory, PROBE_CACHE_FILENAME)
+        if path not in cls._instances:
+            cls._instances[path] = cls(path)
+        return cls._instances[path]
+
+    @classmethod
+    def reset(cls):
+        """
+        Forgets the loaded caches (for tests)
+        """
+
+        cls._instances = {}
+
+    @property
+    def path(self):
+        """
+        Path of the cache file
+        """
+
+        return self._path
+
+    def _load(self):
+
+        try:
+            with open(self._path) as f:
+                self._entries = json.load(f)["probes"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if os.path.exists(self._path):
+                log.warning("Can't load the probe cache {}: {}".format(self._path, e))
+            self._entries = {}
+
+    def save(self):
+        """
+        Writes the cache on disk
+        """
+
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp_path = self._path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": 1, "probes": self._entries}, f)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            log.error("Can't write the probe cache {}: {}".format(self._path, e))
+
+    @staticmethod
+    def _resolve(path):
+
+        if not os.path.isabs(path):
+            path = shutil.which(path) or path
+        return os.path.realpath(path)
+
+    @staticmethod
+    def _key(path):
+        """
+        Returns the stat key of an executable,
+        None if the executable is not a regular file.
+        """
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+    def get(self, path, name):
+        """
+        Returns the cached output of a probe.
+
+        :param path: executable path
+        :param name: probe name
+
+        :returns: probe output or None if the probe must be run
+        """
+
+        path = self._resolve(path)
+        key = self._key(path)
+        entry = self._entries.get(path)
+        if key is None or entry is None or entry["key"] != key:
+            return None
+        return entry["probes"].get(name)
+
+    def set(self, path, name, output):
+        """
+        Records the output of a probe.
+
+        :param path: executable path
+        :param name: probe name
+        :param output: probe output
+        """
+
+        path = self._resolve(path)
+        key = self._key(path)
+        if key is None:
+            return
+        entry = self._entries.get(path)
+        if entry is None or entry["key"] != key:
+            # the executable changed, the other probes are outdated
+            entry = self._entries[path] = {"key": key, "probes": {}}
+        entry["probes"][name] = output
+        self.save()
+
+    def remove(self, path, name=None):
+        """
+        Forgets the probes of an executable.
+
+        :param path: executable path
+        :param name: probe name (all the probes if None)
+        """
+
+        path = self._resolve(path)
+        entry = self._entries.get(path)
+        if entry is None:
+            return
+        if name is None:
+            del self._entries[path]
+        elif entry["probes"].pop(name, None) is None:
+            return
+        self.save()
+
+    @asyncio.coroutine
+    def probe(self, path, name, probe):
+        """
+        Returns the output of a probe, the probe is run only
+        if there is no valid output in the cache.
+
+        :param path: executable path
+        :param name: probe name
+        :param probe: coroutine function running the probe
+
+        :returns: probe output
+        """
+
+        output = self.get(path, name)
+        if output is not None:
+            log.debug("Probe {} of {} found in the cache".format(name, path))
+            return output
+        output = yield from probe()
+        self.set(path, name, output)
+        return output
@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Streaming zip writer compressing the files on several cores.
+
+Files are split in chunks, each chunk is compressed on its own as a raw
+deflate stream ending on a byte boundary (sync flush). The concatenation
+of the chunks is a valid deflate stream and the CRC32 of the whole file
+is computed by combining the CRC32 of the chunks, so the chunks can be
+compressed in parallel and written in order.
+"""
+
+import os
+import time
+import zlib
+import struct
+import functools
+import asyncio
+import zipfile
+import collections
+import concurrent.futures
+
+import logging
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# These formats are already compressed, deflating them again wastes CPU for nothing
+COMPRESSED_EXTENSIONS = (".qcow2", ".vmdk", ".gz", ".tgz", ".bz2", ".xz", ".zip", ".7z", ".gns3project")
+
+ZIP64_LIMIT = zipfile.ZIP64_LIMIT
+
+_LOCAL_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+_DATA_DESCRIPTOR = struct.Struct("<4sL2L")
+_DATA_DESCRIPTOR64 = struct.Struct("<4sL2Q")
+_CENTRAL_DIRECTORY = struct.Struct("<4s4B4HL2L5H2L")
+_END_ARCHIVE = struct.Struct("<4s4H2LH")
+_END_ARCHIVE64 = struct.Struct("<4sQ2H2L4Q")
+_END_ARCHIVE64_LOCATOR = struct.Struct("<4sLQL")
+
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+_HEADER = "header"
+_DESCRIPTOR = "descriptor"
+
+
+def _gf2_matrix_times(mat, vec):
+
+    total = 0
+    i = 0
+    while vec:
+        if vec & 1:
+            total ^= mat[i]
+        vec >>= 1
+        i += 1
+    return total
+
+
+def _gf2_matrix_square(mat):
+
+    return [_gf2_matrix_times(mat, mat[n]) for n in range(32)]
+
+
+@functools.lru_cache(maxsize=16)
+def _crc32_zeros_operator(length):
+    """
+    Operator appending length zero bytes to a CRC32 (the chunks
+    have the same size so the operator is almost always cached).
+    """
+
+    # operator for one zero bit
+    odd = [0xedb88320] + [1 << n for n in range(31)]
+    # operator for two zero bits, then four zero bits
+    even = _gf2_matrix_square(odd)
+    odd = _gf2_matrix_square(even)
+
+    # first square will put the operator for one zero byte, eight zero bits, in even
+    operator = [1 << n for n in range(32)]
+    while True:
+        even = _gf2_matrix_square(odd)
+        if length & 1:
+            operator = [_gf2_matrix_times(even, column) for column in operator]
+        length >>= 1
+        if length == 0:
+            break
+        odd = _gf2_matrix_square(even)
+        if length & 1:
+            operator = [_gf2_matrix_times(odd, column) for column in operator]
+        length >>= 1
+        if length == 0:
+            break
+    return operator
+
+
+def crc32_combine(crc1, crc2, length2):
+    """
+    Computes the CRC32 of two concatenated blocks from
+    the CRC32 of each block (port of zlib crc32_combine).
+
+    :param crc1: CRC32 of the first block
+    :param crc2: CRC32 of the second block
+    :param length2: length of the second block
+
+    :returns: CRC32 of the concatenation
+    """
+
+    if length2 <= 0:
+        return crc1
+    return _gf2_matrix_times(_crc32_zeros_operator(length2), crc1) ^ crc2
+
+
+def _read_chunk(path, offset, length):
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def deflate_chunk(path, offset, length, level, last):
+    """
+    Reads and compresses a chunk of a file. This runs in a worker
+    so it must stay a module level function.
+
+    :param path: file path
+    :param offset: position of the chunk in the file
+    :param length: size of the chunk
+    :param level: compression level
+    :param last: True if it's the last chunk of the file
+
+    :returns: tuple (size read, CRC32 of the data read, compressed data)
+    """
+
+    data = _read_chunk(path, offset, length)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    payload = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return len(data), zlib.crc32(data), payload
+
+
+def store_chunk(path, offset, length, level, last):
+    """
+    Reads a chunk of a file stored without compression.
+
+    :returns: tuple (size read, CRC32 of the data read, data)
+    """
+
+    data = _read_chunk(path, offset, length)
+    return len(data), zlib.crc32(data), data
+
+
+def _dos_date_time(timestamp):
+
+    date_time = time.localtime(timestamp)[0:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+    dos_date = (date_time[0] - 1980) << 9 | date_time[1] << 5 | date_time[2]
+    dos_time = date_time[3] << 11 | date_time[4] << 5 | (date_time[5] // 2)
+    return dos_date, dos_time
+
+
+class _ZipEntry:
+
+    def __init__(self, arcname, path=None, data=None, compress_type=zipfile.ZIP_DEFLATED):
+
+        self.arcname = arcname
+        self.path = path
+        self.data = data
+        self.compress_type = compress_type
+        if path is not None:
+            st = os.stat(path)
+            self.size = st.st_size
+            self.mode = st.st_mode & 0xFFFF
+            self.date, self.time = _dos_date_time(st.st_mtime)
+        else:
+            self.size = len(data)
+            self.mode = 0o100600
+            self.date, self.time = _dos_date_time(time.time())
+
+        # a deflated chunk can be slightly bigger than the original data
+        self.zip64 = self.size + (self.size >> 6) + 1024 > ZIP64_LIMIT
+        try:
+            self.name = arcname.encode("ascii")
+            self.flags = _FLAG_DATA_DESCRIPTOR
+        except UnicodeEncodeError:
+            self.name = arcname.encode("utf-8")
+            self.flags = _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8
+        self.reset()
+
+    def reset(self):
+
+        self.skipped = False
+        self.offset = 0
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+
+    @property
+    def version(self):
+
+        return 45 if self.zip64 else 20
+
+    def chunks(self, chunk_size, level):
+        """
+        Jobs needed to produce the data of the entry.
+
+        :returns: list of tuples (function, arguments)
+        """
+
+        func = deflate_chunk if self.compress_type == zipfile.ZIP_DEFLATED else store_chunk
+        offsets = list(range(0, self.size, chunk_size)) or [0]
+        return [(func, (self.path, offset, chunk_size, level, offset == offsets[-1])) for offset in offsets]
+
+    def add_chunk(self, size, crc, payload):
+
+        self.crc = crc32_combine(self.crc, crc, size) if self.file_size else crc
+        self.file_size += size
+        self.compress_size += len(payload)
+
+    def local_header(self):
+
+        if self.zip64:
+            extra = struct.pack("<2H2Q", 1, 16, 0, 0)
+            size = 0xFFFFFFFF
+        else:
+            extra = b""
+            size = 0
+        return _LOCAL_FILE_HEADER.pack(b"PK\003\004", self.version, 0, self.flags, self.compress_type,
+                                       self.time, self.date, 0, size, size, len(self.name), len(extra)) + self.name + extra
+
+    def data_descriptor(self):
+
+        if self.zip64:
+            return _DATA_DESCRIPTOR64.pack(b"PK\007\010", self.crc, self.compress_size, self.file_size)
+        return _DATA_DESCRIPTOR.pack(b"PK\007\010", self.crc, self.compress_size, self.file_size)
+
+    def central_directory(self):
+
+        extra = []
+        file_size, compress_size, offset = self.file_size, self.compress_size, self.offset
+        if self.zip64 or file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+            extra += [file_size, compress_size]
+            file_size = compress_size = 0xFFFFFFFF
+        if offset > ZIP64_LIMIT:
+            extra.append(offset)
+            offset = 0xFFFFFFFF
+        if extra:
+            extra = struct.pack("<2H{}Q".format(len(extra)), 1, 8 * len(extra), *extra)
+            version = 45
+        else:
+            extra = b""
+            version = self.version
+        return _CENTRAL_DIRECTORY.pack(b"PK\001\002", version, 3, version, 0, self.flags, self.compress_type,
+                                       self.time, self.date, self.crc, compress_size, file_size,
+                                       len(self.name), len(extra), 0, 0, 0, self.mode << 16, offset) + self.name + extra
+
+
+class ZipStream:
+
+    """
+    Zip archive produced chunk by chunk. The members are added
+    with write / writestr and the archive is produced by iterating
+    on the object (in the current thread) or with the stream
+    coroutine (compression on several cores).
+
+    :param chunk_size: size of the chunks compressed independently
+    :param compresslevel: deflate compression level
+    :param workers: number of parallel compression jobs (default: number of CPUs)
+    :param progress: callable(done, total) called with the number of bytes processed
+    :param on_error: callable(path, exception) called when a file can't be read,
+    the file is left out of the archive. Without it the error is raised.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, compresslevel=6, workers=None, progress=None, on_error=None):
+
+        self._chunk_size = chunk_size
+        self._compresslevel = compresslevel
+        self._workers = workers or os.cpu_count() or 1
+        self._progress = progress
+        self._on_error = on_error
+        self._entries = []
+        self._offset = 0
+        self._done = 0
+
+    @property
+    def entries(self):
+        """
+        Names of the members of the archive
+
+        :returns: list of names
+        """
+
+        return [entry.arcname for entry in self._entries]
+
+    @property
+    def total_size(self):
+        """
+        Uncompressed size of all the members of the archive
+
+        :returns: size in bytes
+        """
+
+        return sum(entry.size for entry in self._entries)
+
+    def write(self, path, arcname=None, compress_type=None):
+        """
+        Adds a file to the archive, the content is read when the archive is produced.
+
+        :param path: file path
+        :param arcname: name in the archive (default: path)
+        :param compress_type: zipfile.ZIP_DEFLATED or zipfile.ZIP_STORED (default: depends on the extension)
+        """
+
+        if arcname is None:
+            arcname = path
+        if compress_type is None:
+            if path.lower().endswith(COMPRESSED_EXTENSIONS):
+                compress_type = zipfile.ZIP_STORED
+            else:
+                compress_type = zipfile.ZIP_DEFLATED
+        self._entries.append(_ZipEntry(self._arcname(arcname), path=path, compress_type=compress_type))
+
+    def writestr(self, arcname, data, compress_type=zipfile.ZIP_DEFLATED):
+        """
+        Adds a member from memory to the archive.
+
+        :param arcname: name in the archive
+        :param data: content (bytes)
+        :param compress_type: zipfile.ZIP_DEFLATED or zipfile.ZIP_STORED
+        """
+
+        self._entries.append(_ZipEntry(self._arcname(arcname), data=data, compress_type=compress_type))
+
+    @staticmethod
+    def _arcname(arcname):
+
+        arcname = os.path.normpath(os.path.splitdrive(arcname)[1])
+        while arcname[0] in (os.sep, os.altsep):
+            arcname = arcname[1:]
+        if os.sep != "/":
+            arcname = arcname.replace(os.sep, "/")
+        return arcname
+
+    def _jobs(self):
+        """
+        Members of the archive in order.
+
+        :returns: iterator of tuples (entry, job), job is _HEADER, _DESCRIPTOR
+        or a tuple (function, arguments) producing a chunk of data
+        """
+
+        self._offset = 0
+        self._done = 0
+        for entry in self._entries:
+            entry.reset()
+            yield entry, _HEADER
+            if entry.path is None:
+                yield entry, (self._compress_data, (entry, ))
+            else:
+                for job in entry.chunks(self._chunk_size, self._compresslevel):
+                    yield entry, job
+            yield entry, _DESCRIPTOR
+
+    def _compress_data(self, entry):
+
+        if entry.compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(self._compresslevel, zlib.DEFLATED, -15)
+            payload = compressor.compress(entry.data) + compressor.flush()
+        else:
+            payload = entry.data
+        return len(entry.data), zlib.crc32(entry.data), payload
+
+    def _skip(self, entry, error):
+        """
+        Leaves out a member whose file can't be read. Only possible before
+        its header is written, so when reading the first chunk fails.
+        """
+
+        if self._on_error is None or entry.path is None:
+            raise error
+        self._on_error(entry.path, error)
+        entry.skipped = True
+        self._done += entry.size
+        if self._progress:
+            self._progress(self._done, self.total_size)
+
+    def _output(self, entry, job, result=None):
+        """
+        Data to write for a member of the archive
+
+        :param entry: entry of the member
+        :param job: job as returned by _jobs
+        :param result: result of the job for a chunk of data
+        """
+
+        if job is _HEADER:
+            entry.offset = self._offset
+            data = entry.local_header()
+        elif job is _DESCRIPTOR:
+            data = entry.data_descriptor()
+        else:
+            entry.add_chunk(*result)
+            data = result[2]
+            self._done += result[0]
+            if self._progress:
+                self._progress(self._done, self.total_size)
+        self._offset += len(data)
+        return data
+
+    def _end_of_archive(self):
+
+        entries = [entry for entry in self._entries if not entry.skipped]
+        directory = b"".join(entry.central_directory() for entry in entries)
+        start = self._offset
+        count = len(entries)
+        data = directory
+        if count >= 0xFFFF or start > ZIP64_LIMIT or len(directory) > ZIP64_LIMIT:
+            data += _END_ARCHIVE64.pack(b"PK\006\006", 44, 45, 45, 0, 0, count, count, len(directory), start)
+            data += _END_ARCHIVE64_LOCATOR.pack(b"PK\006\007", 0, start + len(directory), 1)
+        data += _END_ARCHIVE.pack(b"PK\005\006", 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                                  min(len(directory), 0xFFFFFFFF), min(start, 0xFFFFFFFF), 0)
+        self._offset += len(data)
+        return data
+
+    def __iter__(self):
+
+        header = None
+        for entry, job in self._jobs():
+            if entry.skipped:
+                continue
+            if job is _HEADER:
+                # written once the first chunk has been read
+                header = entry
+                continue
+            result = None
+            if job is not _DESCRIPTOR:
+                func, args = job
+                try:
+                    result = func(*args)
+                except OSError as e:
+                    if header is not entry:
+                        raise
+                    header = None
+                    self._skip(entry, e)
+                    continue
+            if header is entry:
+                header = None
+                yield self._output(entry, _HEADER)
+            yield self._output(entry, job, result)
+        yield self._end_of_archive()
+
+    @asyncio.coroutine
+    def stream(self, write, executor=None):
+        """
+        Produces the archive, compressing up to `workers` chunks at the same time.
+
+        zlib releases the GIL while compressing and computing CRC32 so
+        a thread pool uses all the cores without copying the data between
+        processes. A concurrent.futures.ProcessPoolExecutor can be
+        passed instead.
+
+        :param write: coroutine called with each block of data, in order
+        :param executor: concurrent.futures executor (default: a thread pool of `workers` threads)
+        """
+
+        loop = asyncio.get_event_loop()
+        own_executor = executor is None
+        if own_executor:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._workers)
+        pending = collections.deque()
+        try:
+            for entry, job in self._jobs():
+                future = None
+                if job not in (_HEADER, _DESCRIPTOR):
+                    func, args = job
+                    if func == self._compress_data:
+                        # data already in memory
+                        future = asyncio.Future()
+                        future.set_result(func(*args))
+                    else:
+                        future = loop.run_in_executor(executor, func, *args)
+                pending.append((entry, job, future))
+                # keep all the workers busy but don't read the whole project in memory
+                while len(pending) > self._workers * 2 + 2:
+                    yield from self._flush(pending, write)
+            while pending:
+                yield from self._flush(pending, write)
+            yield from write(self._end_of_archive())
+        finally:
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+            if own_executor:
+                executor.shutdown(wait=False)
+
+    @asyncio.coroutine
+    def _flush(self, pending, write):
+
+        entry, job, future = pending.popleft()
+        if entry.skipped:
+            if future is not None:
+                if future.done():
+                    future.exception()
+                else:
+                    future.cancel()
+            return
+        if job is _HEADER and pending and pending[0][0] is entry and pending[0][2] is not None:
+            # the header is written once the first chunk has been read
+            first_chunk = pending[0][2]
+            yield from asyncio.wait([first_chunk])
+            error = first_chunk.exception()
+            if isinstance(error, OSError):
+                self._skip(entry, error)
+                return
+        result = None
+        if future is not None:
+            result = yield from future
+        yield from write(self._output(entry, job, result))
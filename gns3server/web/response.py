@@ -16,6 +16,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import json
+import time
+import zlib
+import gzip
 import jsonschema
 import aiohttp.web
 import asyncio
@@ -23,12 +26,75 @@ import logging
 import sys
 import jinja2
 
+try:
+    import ujson
+    UJSON_AVAILABLE = True
+except ImportError:
+    # ujson is optional, it's only faster than the json module
+    UJSON_AVAILABLE = False
+
 from ..utils.get_resource import get_resource
 from ..version import __version__
+from ..config import Config
+from .validator import get_validator
 
 log = logging.getLogger(__name__)
 renderer = jinja2.Environment(loader=jinja2.FileSystemLoader(get_resource('templates')))
 
+# Compress the responses bigger than this size in bytes
+COMPRESSION_THRESHOLD = 4096
+
+
+def dumps_compact(answer):
+    """
+    Serializes a JSON document without whitespaces,
+    with ujson if it's installed.
+
+    :param answer: JSON document
+    :returns: bytes
+    """
+
+    if UJSON_AVAILABLE:
+        try:
+            return ujson.dumps(answer, sort_keys=True, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return json.dumps(answer, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def accepts_compact_json(request):
+    """
+    Returns True if the client asks for JSON without indentation
+    with the header "Accept: application/json; indent=0".
+
+    :param request: request
+    """
+
+    for media_range in request.headers.get("ACCEPT", "").split(","):
+        params = [param.strip().replace(" ", "") for param in media_range.split(";")]
+        if params[0] == "application/json" and "indent=0" in params[1:]:
+            return True
+    return False
+
+
+def accepted_encoding(request):
+    """
+    Returns the compression accepted by the client: gzip, deflate or None.
+
+    :param request: request
+    """
+
+    encodings = set()
+    for coding in request.headers.get("ACCEPT-ENCODING", "").split(","):
+        params = [param.strip().lower() for param in coding.split(";")]
+        if "q=0" in params[1:] or "q=0.0" in params[1:]:
+            continue
+        encodings.add(params[0])
+    for encoding in ("gzip", "deflate"):
+        if encoding in encodings:
+            return encoding
+    return None
+
 
 class Response(aiohttp.web.Response):
 
@@ -36,12 +102,23 @@ class Response(aiohttp.web.Response):
 
         self._route = route
         self._output_schema = output_schema
+        self._output_validation_time = None
+        self._answer = None
         self._request = request
         headers['Access-Control-Allow-Origin'] = '*'
         headers['X-Route'] = self._route
         headers['Server'] = "Python/{0[0]}.{0[1]} GNS3/{1}".format(sys.version_info, __version__)
         super().__init__(headers=headers, **kwargs)
 
+    @property
+    def output_validation_time(self):
+        """
+        Time spent validating the JSON output in seconds,
+        None if it has not been validated.
+        """
+
+        return self._output_validation_time
+
     @asyncio.coroutine
     def prepare(self, request):
         if log.getEffectiveLevel() == logging.DEBUG:
@@ -51,8 +128,8 @@ class Response(aiohttp.web.Response):
                 log.debug("%s", request.json)
             log.info("Response: %d %s", self.status, self.reason)
             log.debug(dict(self.headers))
-            if hasattr(self, 'body') and self.body is not None and self.headers["CONTENT-TYPE"] == "application/json":
-                log.debug(json.loads(self.body.decode('utf-8')))
+            if self._answer is not None:
+                log.debug(self._answer)
         return (yield from super().prepare(request))
 
     def html(self, answer):
@@ -97,12 +174,41 @@ class Response(aiohttp.web.Response):
                 newanswer.append(elem)
             answer = newanswer
         if self._output_schema is not None:
+            start = time.monotonic()
             try:
-                jsonschema.validate(answer, self._output_schema)
+                get_validator(self._output_schema).validate(answer)
             except jsonschema.ValidationError as e:
                 log.error("Invalid output query. JSON schema error: {}".format(e.message))
                 raise aiohttp.web.HTTPBadRequest(text="{}".format(e))
-        self.body = json.dumps(answer, indent=4, sort_keys=True).encode('utf-8')
+            finally:
+                self._output_validation_time = (self._output_validation_time or 0.0) + time.monotonic() - start
+        self._answer = answer
+        if self._request is not None and accepts_compact_json(self._request):
+            body = dumps_compact(answer)
+        else:
+            body = json.dumps(answer, indent=4, sort_keys=True).encode('utf-8')
+        self.body = self._compress(body)
+
+    def _compress(self, body):
+        """
+        Compresses a body bigger than the compression threshold
+        if the client accepts gzip or deflate.
+
+        :param body: body (bytes)
+        :returns: body to send
+        """
+
+        threshold = Config.instance().get_section_config("Server").getint("compression_threshold", COMPRESSION_THRESHOLD)
+        if self._request is None or threshold <= 0 or len(body) < threshold:
+            return body
+        encoding = accepted_encoding(self._request)
+        if encoding is None:
+            return body
+        self.headers["VARY"] = "Accept-Encoding"
+        self.headers["CONTENT-ENCODING"] = encoding
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=6)
+        return zlib.compress(body, 6)
 
     def redirect(self, url):
         """
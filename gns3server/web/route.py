@@ -17,6 +17,8 @@
 
 import sys
 import json
+import time
+import random
 import urllib
 import asyncio
 import aiohttp
@@ -30,6 +32,9 @@ log = logging.getLogger(__name__)
 from ..modules.vm_error import VMError
 from ..ubridge.ubridge_error import UbridgeError
 from .response import Response
+from .validator import get_validator
+from .route_metrics import RouteMetrics
+from ..utils.asyncio.rwlock import ReadWriteLock
 from ..crash_report import CrashReport
 from ..config import Config
 
@@ -54,14 +59,18 @@ def parse_request(request, input_schema, raw):
         for (k, v) in urllib.parse.parse_qs(request.query_string).items():
             request.json[k] = v[0]
 
+    request.input_validation_time = 0.0
     if input_schema:
+        start = time.monotonic()
         try:
-            jsonschema.validate(request.json, input_schema)
+            get_validator(input_schema).validate(request.json)
         except jsonschema.ValidationError as e:
             log.error("Invalid input query. JSON schema error: {}".format(e.message))
             raise aiohttp.web.HTTPBadRequest(text="Invalid JSON: {} in schema: {}".format(
                 e.message,
                 json.dumps(e.schema)))
+        finally:
+            request.input_validation_time = time.monotonic() - start
 
     return request
 
@@ -72,12 +81,19 @@ class Route(object):
         * json schema verification
         * routing inside handlers
         * documentation information about endpoints
+
+        The calls on the same VM are serialized, except the read only
+        calls (by default the GET calls, set read_only=False for a GET
+        changing the VM) which run together. The read only calls don't
+        wait for a long running call (long_running=True), they run at
+        the same time and report it in the X-GNS3-VM-Operation header.
     """
 
     _routes = []
     _documentation = {}
 
     _vm_locks = {}
+    _vm_operations = {}
 
     @classmethod
     def get(cls, path, *args, **kw):
@@ -125,6 +141,19 @@ class Route(object):
         response.force_close()
         return response
 
+    @classmethod
+    def validate_output(cls, server_config):
+        """
+        Returns True if the output of an API call must be validated,
+        output_validation_rate in the server settings is the ratio of
+        the validated calls: 1 validates all of them and 0 none.
+        """
+
+        rate = server_config.getfloat("output_validation_rate", 1.0)
+        if rate >= 1:
+            return True
+        return rate > 0 and random.random() < rate
+
     @classmethod
     def _route(cls, method, path, *args, **kw):
         # This block is executed only the first time
@@ -132,6 +161,14 @@ class Route(object):
         input_schema = kw.get("input", {})
         api_version = kw.get("api_version", 1)
         raw = kw.get("raw", False)
+        read_only = kw.get("read_only", method == "GET")
+        long_running = kw.get("long_running", False)
+
+        # build the validators once for all the calls
+        if input_schema:
+            get_validator(input_schema)
+        if output_schema:
+            get_validator(output_schema)
 
         # If it's a JSON api endpoint just register the endpoint an do nothing
         if api_version is None:
@@ -157,10 +194,22 @@ class Route(object):
             })
             func = asyncio.coroutine(func)
 
+            def record_metrics(request, response, start):
+
+                RouteMetrics.instance().record(method,
+                                               route,
+                                               response.status,
+                                               time.monotonic() - start,
+                                               input_validation_time=getattr(request, "input_validation_time", 0.0),
+                                               output_validation_time=response.output_validation_time,
+                                               request_bytes=request.content_length or 0,
+                                               response_bytes=response.content_length or 0)
+
             @asyncio.coroutine
             def control_schema(request):
                 # This block is executed at each method call
 
+                start = time.monotonic()
                 server_config = Config.instance().get_section_config("Server")
 
                 # Authenticate
@@ -174,6 +223,7 @@ class Route(object):
 
                     request = yield from parse_request(request, None, raw)
                     yield from func(request, response)
+                    record_metrics(request, response, start)
                     return response
 
                 # API call
@@ -187,7 +237,10 @@ class Route(object):
                                 f.write("\n")
                         except OSError as e:
                             log.warn("Could not write to the record file {}: {}".format(record_file, e))
-                    response = Response(request=request, route=route, output_schema=output_schema)
+                    if output_schema and cls.validate_output(server_config):
+                        response = Response(request=request, route=route, output_schema=output_schema)
+                    else:
+                        response = Response(request=request, route=route)
                     yield from func(request, response)
                 except aiohttp.web.HTTPBadRequest as e:
                     response = Response(request=request, route=route)
@@ -196,6 +249,9 @@ class Route(object):
                 except aiohttp.web.HTTPException as e:
                     response = Response(request=request, route=route)
                     response.set_status(e.status)
+                    if "CONTENT-RANGE" in e.headers:
+                        # range not satisfiable
+                        response.headers["CONTENT-RANGE"] = e.headers["CONTENT-RANGE"]
                     response.json({"message": e.text, "status": e.status})
                 except (VMError, UbridgeError) as e:
                     log.error("VM error detected: {type}".format(type=type(e)), exc_info=1)
@@ -231,6 +287,7 @@ class Route(object):
                         tb = "\n".join(lines)
                         response.html("<h1>Internal error</h1><pre>{}</pre>".format(tb))
 
+                record_metrics(request, response, start)
                 return response
 
             @asyncio.coroutine
@@ -240,22 +297,41 @@ class Route(object):
                 between the same instance of the vm
                 """
 
-                if "vm_id" in request.match_info or "device_id" in request.match_info:
-                    vm_id = request.match_info.get("vm_id")
-                    if vm_id is None:
-                        vm_id = request.match_info["device_id"]
-                    cls._vm_locks.setdefault(vm_id, {"lock": asyncio.Lock(), "concurrency": 0})
-                    cls._vm_locks[vm_id]["concurrency"] += 1
-
-                    with (yield from cls._vm_locks[vm_id]["lock"]):
+                metrics = RouteMetrics.instance()
+                metrics.request_started(method, route)
+                try:
+                    if "vm_id" in request.match_info or "device_id" in request.match_info:
+                        vm_id = request.match_info.get("vm_id")
+                        if vm_id is None:
+                            vm_id = request.match_info["device_id"]
+                        operation = cls._vm_operations.get(vm_id)
+                        if read_only and operation is not None:
+                            # don't wait for the end of a long running call
+                            response = yield from control_schema(request)
+                            if not response.started:
+                                response.headers["X-GNS3-VM-Operation"] = "{} {}; elapsed={:.1f}".format(operation["method"],
+                                                                                                         operation["route"],
+                                                                                                         time.monotonic() - operation["started"])
+                            return response
+
+                        queued = time.monotonic()
+
+                        @asyncio.coroutine
+                        def locked_control_schema(request):
+                            metrics.record_lock_wait(method, route, time.monotonic() - queued)
+                            if not long_running:
+                                return (yield from control_schema(request))
+                            cls._vm_operations[vm_id] = {"method": method, "route": route, "started": time.monotonic()}
+                            try:
+                                return (yield from control_schema(request))
+                            finally:
+                                del cls._vm_operations[vm_id]
+
+                        response = yield from cls.run_with_vm_lock(vm_id, locked_control_schema, request, read_only=read_only)
+                    else:
                         response = yield from control_schema(request)
-                    cls._vm_locks[vm_id]["concurrency"] -= 1
-
-                    # No more waiting requests, garbage collect the lock
-                    if cls._vm_locks[vm_id]["concurrency"] <= 0:
-                        del cls._vm_locks[vm_id]
-                else:
-                    response = yield from control_schema(request)
+                finally:
+                    metrics.request_finished(method, route)
                 return response
 
             cls._routes.append((method, cls._path, vm_concurrency))
@@ -263,6 +339,34 @@ class Route(object):
             return vm_concurrency
         return register
 
+    @classmethod
+    @asyncio.coroutine
+    def run_with_vm_lock(cls, vm_id, func, *args, read_only=False):
+        """
+        Runs a coroutine function while holding the lock of a VM,
+        the same lock serializes the API calls for this VM.
+
+        :param vm_id: VM or device identifier
+        :param func: coroutine function
+        :param args: function arguments
+        :param read_only: share the lock with the other read only calls
+
+        :returns: function result
+        """
+
+        cls._vm_locks.setdefault(vm_id, {"lock": ReadWriteLock(), "concurrency": 0})
+        cls._vm_locks[vm_id]["concurrency"] += 1
+        try:
+            lock = cls._vm_locks[vm_id]["lock"]
+            with (yield from (lock.reader() if read_only else lock.writer())):
+                return (yield from func(*args))
+        finally:
+            cls._vm_locks[vm_id]["concurrency"] -= 1
+
+            # No more waiting requests, garbage collect the lock
+            if cls._vm_locks[vm_id]["concurrency"] <= 0:
+                del cls._vm_locks[vm_id]
+
     @classmethod
     def get_routes(cls):
         return cls._routes
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Counters and timings of the API routes.
+"""
+
+import bisect
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+
+    return "{" + ",".join('{}="{}"'.format(name, _escape(value)) for name, value in sorted(labels.items())) + "}"
+
+
+class RouteMetrics:
+
+    """
+    Number of calls, errors and time spent per route, including the
+    time spent validating the input and the output JSON documents and
+    waiting for the lock of a VM.
+    """
+
+    _instance = None
+
+    def __init__(self):
+
+        self._routes = {}
+
+    @classmethod
+    def instance(cls):
+
+        if cls._instance is None:
+            cls._instance = RouteMetrics()
+        return cls._instance
+
+    def _get(self, method, route):
+
+        metrics = self._routes.get((method, route))
+        if metrics is None:
+            metrics = {"calls": 0,
+                       "errors": 0,
+                       "in_flight": 0,
+                       "time": 0.0,
+                       "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                       "input_validation_time": 0.0,
+                       "output_validations": 0,
+                       "output_validation_time": 0.0,
+                       "lock_waits": 0,
+                       "lock_wait_time": 0.0,
+                       "request_bytes": 0,
+                       "response_bytes": 0,
+                       "statuses": {}}
+            self._routes[(method, route)] = metrics
+        return metrics
+
+    def record(self, method, route, status, duration, input_validation_time=0.0, output_validation_time=None, request_bytes=0, response_bytes=0):
+        """
+        Records an API call.
+
+        :param method: HTTP method
+        :param route: route path
+        :param status: HTTP status of the response
+        :param duration: time spent to handle the call in seconds
+        :param input_validation_time: time spent validating the request in seconds
+        :param output_validation_time: time spent validating the response in seconds,
+        None if the response has not been validated
+        :param request_bytes: size of the request body
+        :param response_bytes: size of the response body
+        """
+
+        metrics = self._get(method, route)
+        metrics["calls"] += 1
+        if status >= 400:
+            metrics["errors"] += 1
+        metrics["statuses"][status] = metrics["statuses"].get(status, 0) + 1
+        metrics["time"] += duration
+        metrics["buckets"][bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        metrics["input_validation_time"] += input_validation_time
+        if output_validation_time is not None:
+            metrics["output_validations"] += 1
+            metrics["output_validation_time"] += output_validation_time
+        metrics["request_bytes"] += request_bytes
+        metrics["response_bytes"] += response_bytes
+
+    def record_lock_wait(self, method, route, wait):
+        """
+        Records the time a call waited for the lock of a VM.
+
+        :param method: HTTP method
+        :param route: route path
+        :param wait: time in seconds
+        """
+
+        metrics = self._get(method, route)
+        metrics["lock_waits"] += 1
+        metrics["lock_wait_time"] += wait
+
+    def request_started(self, method, route):
+
+        self._get(method, route)["in_flight"] += 1
+
+    def request_finished(self, method, route):
+
+        self._get(method, route)["in_flight"] -= 1
+
+    def routes(self):
+        """
+        Returns the metrics of the routes.
+
+        :returns: dictionary (method, route) -> metrics
+        """
+
+        return {key: dict(metrics, statuses=dict(metrics["statuses"]), buckets=list(metrics["buckets"]))
+                for key, metrics in self._routes.items()}
+
+    def reset(self):
+
+        self._routes = {}
+
+    def prometheus(self):
+        """
+        Returns the metrics in the Prometheus text format.
+
+        :returns: string
+        """
+
+        lines = []
+        routes = sorted(self._routes.items())
+
+        def metric(name, metric_type, help_text, values):
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            lines.extend(values)
+
+        metric("gns3_http_requests_total", "counter", "Number of API calls.",
+               ["gns3_http_requests_total{} {}".format(_labels(method=method, route=route, status=status), count)
+                for (method, route), metrics in routes for status, count in sorted(metrics["statuses"].items())])
+
+        metric("gns3_http_requests_in_flight", "gauge", "Number of API calls being handled.",
+               ["gns3_http_requests_in_flight{} {}".format(_labels(method=method, route=route), metrics["in_flight"])
+                for (method, route), metrics in routes])
+
+        values = []
+        for (method, route), metrics in routes:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf", ), metrics["buckets"]):
+                cumulative += count
+                values.append("gns3_http_request_duration_seconds_bucket{} {}".format(_labels(method=method, route=route, le=bound), cumulative))
+            values.append("gns3_http_request_duration_seconds_sum{} {}".format(_labels(method=method, route=route), metrics["time"]))
+            values.append("gns3_http_request_duration_seconds_count{} {}".format(_labels(method=method, route=route), metrics["calls"]))
+        metric("gns3_http_request_duration_seconds", "histogram", "Time spent handling the API calls.", values)
+
+        values = []
+        for (method, route), metrics in routes:
+            values.append("gns3_http_vm_lock_wait_seconds_sum{} {}".format(_labels(method=method, route=route), metrics["lock_wait_time"]))
+            values.append("gns3_http_vm_lock_wait_seconds_count{} {}".format(_labels(method=method, route=route), metrics["lock_waits"]))
+        metric("gns3_http_vm_lock_wait_seconds", "summary", "Time spent waiting for the lock of a VM.", values)
+
+        for name, key, help_text in (("gns3_http_request_bytes_total", "request_bytes", "Size of the request bodies."),
+                                     ("gns3_http_response_bytes_total", "response_bytes", "Size of the response bodies."),
+                                     ("gns3_http_input_validation_seconds_total", "input_validation_time", "Time spent validating the requests."),
+                                     ("gns3_http_output_validation_seconds_total", "output_validation_time", "Time spent validating the responses."),
+                                     ("gns3_http_output_validations_total", "output_validations", "Number of validated responses.")):
+            metric(name, "counter", help_text,
+                   ["{}{} {}".format(name, _labels(method=method, route=route), metrics[key]) for (method, route), metrics in routes])
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File downloads with the sendfile system call and HTTP ranges.
+"""
+
+import os
+import asyncio
+import aiohttp.web
+import email.utils
+
+import logging
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def parse_range(header, size):
+    """
+    Parses a Range header with a single byte range.
+
+    :param header: value of the Range header
+    :param size: size of the file
+
+    :returns: tuple (offset, count) or None for the whole file
+    :raises aiohttp.web.HTTPRequestRangeNotSatisfiable: if the range is outside of the file
+    """
+
+    if not header:
+        return None
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        # only one range is supported, send the whole file
+        return None
+    start, _, end = ranges.strip().partition("-")
+    try:
+        if not start:
+            # the last bytes of the file
+            count = min(int(end), size)
+            if count <= 0:
+                raise ValueError()
+            return size - count, count
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise aiohttp.web.HTTPRequestRangeNotSatisfiable(headers={"CONTENT-RANGE": "bytes */{}".format(size)})
+    end = min(end, size - 1)
+    return start, end - start + 1
+
+
+def etag(stat):
+    """
+    Returns the entity tag of a file, it changes when the file is modified.
+
+    :param stat: os.stat_result of the file
+    """
+
+    return '"{:x}-{:x}"'.format(stat.st_mtime_ns, stat.st_size)
+
+
+def _sendfile_cb(loop, future, out_fd, in_fd, offset, count, registered):
+
+    if registered:
+        loop.remove_writer(out_fd)
+    if future.cancelled():
+        return
+    try:
+        sent = os.sendfile(out_fd, in_fd, offset, count)
+        if sent == 0:
+            # end of the file
+            future.set_result(0)
+            return
+    except (BlockingIOError, InterruptedError):
+        sent = 0
+    except OSError as e:
+        future.set_exception(e)
+        return
+    if sent:
+        future.set_result(sent)
+    else:
+        loop.add_writer(out_fd, _sendfile_cb, loop, future, out_fd, in_fd, offset, count, True)
+
+
+@asyncio.coroutine
+def _wait_transport_flushed(transport, response):
+    """
+    Waits until the data written by the response are sent, the
+    file data written with sendfile must come after them.
+    """
+
+    transport.set_write_buffer_limits(high=0)
+    try:
+        yield from response.drain()
+    finally:
+        transport.set_write_buffer_limits()
+
+
+@asyncio.coroutine
+def write_file(request, response, fobj, offset, count, use_sendfile=True):
+    """
+    Writes a part of a file in a started response, with the sendfile
+    system call when the connection allows it. If the file is shorter
+    than expected the missing bytes are replaced by zeros.
+
+    :param request: request
+    :param response: started response
+    :param fobj: file object opened in binary mode
+    :param offset: position of the first byte
+    :param count: number of bytes
+    :param use_sendfile: False if the data must go through the response (chunked encoding)
+    """
+
+    loop = asyncio.get_event_loop()
+    transport = request.transport
+    sock = transport.get_extra_info("socket")
+    use_sendfile = use_sendfile and hasattr(os, "sendfile") and sock is not None and transport.get_extra_info("sslcontext") is None
+    if use_sendfile:
+        yield from _wait_transport_flushed(transport, response)
+        while count > 0:
+            future = asyncio.Future()
+            _sendfile_cb(loop, future, sock.fileno(), fobj.fileno(), offset, count, False)
+            sent = yield from future
+            if sent == 0:
+                break
+            offset += sent
+            count -= sent
+    else:
+        fobj.seek(offset)
+        while count > 0:
+            data = yield from loop.run_in_executor(None, fobj.read, min(CHUNK_SIZE, count))
+            if not data:
+                break
+            response.write(data)
+            yield from response.drain()
+            count -= len(data)
+
+    if count > 0:
+        log.warning("File {} is shorter than expected, {} bytes are missing".format(fobj.name, count))
+        while count > 0:
+            response.write(b"\0" * min(CHUNK_SIZE, count))
+            yield from response.drain()
+            count -= CHUNK_SIZE
+
+
+@asyncio.coroutine
+def send_file(request, response, path, content_type="application/octet-stream"):
+    """
+    Sends a file, supports the Range and If-Range headers
+    to resume a download.
+
+    :param request: request
+    :param response: response not started
+    :param path: file path
+    :param content_type: content type of the response
+    """
+
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        raise aiohttp.web.HTTPNotFound()
+    except (PermissionError, IsADirectoryError):
+        raise aiohttp.web.HTTPForbidden()
+
+    with f:
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        tag = etag(stat)
+
+        byte_range = parse_range(request.headers.get("RANGE"), size)
+        if_range = request.headers.get("IF-RANGE")
+        if byte_range is not None and if_range is not None and if_range != tag:
+            # the file has changed since the first part was downloaded
+            byte_range = None
+
+        response.content_type = content_type
+        response.headers["ACCEPT-RANGES"] = "bytes"
+        response.headers["ETAG"] = tag
+        response.headers["LAST-MODIFIED"] = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        if byte_range is None:
+            offset, count = 0, size
+            response.set_status(200)
+        else:
+            offset, count = byte_range
+            response.set_status(206)
+            response.headers["CONTENT-RANGE"] = "bytes {}-{}/{}".format(offset, offset + count - 1, size)
+        response.content_length = count
+        response.start(request)
+        yield from write_file(request, response, f, offset, count)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+JSON schema validators compiled once per schema.
+"""
+
+import jsonschema
+
+_validators = {}
+
+
+def get_validator(schema):
+    """
+    Returns the validator of a schema, the schema is checked and the
+    validator built the first time only.
+
+    :param schema: JSON schema (dictionary)
+    :returns: jsonschema validator
+    """
+
+    # the schemas are module level dictionaries living as long as the server
+    key = id(schema)
+    entry = _validators.get(key)
+    if entry is None or entry[0] is not schema:
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        entry = (schema, cls(schema))
+        _validators[key] = entry
+    return entry[1]
+
+
+def validate(instance, schema):
+    """
+    Validates a JSON document with the cached validator of a schema.
+
+    :param instance: JSON document
+    :param schema: JSON schema
+
+    :raises jsonschema.ValidationError: if the document is invalid
+    """
+
+    get_validator(schema).validate(instance)
@@ -56,13 +56,14 @@ class Query:
             - example if True the session is included inside documentation
             - raw do not JSON encode the query
             - api_version Version of API, None if no version
+            - headers HTTP headers of the query
         """
         if body is not None and not kwargs.get("raw", False):
             body = json.dumps(body)
 
         @asyncio.coroutine
         def go_request(future):
-            response = yield from aiohttp.request(method, self.get_url(path, api_version), data=body)
+            response = yield from aiohttp.request(method, self.get_url(path, api_version), data=body, headers=kwargs.get("headers"))
             future.set_result(response)
         future = asyncio.Future()
         asyncio.async(go_request(future))
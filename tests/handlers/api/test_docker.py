@@ -20,11 +20,13 @@ import os
 import stat
 import sys
 import uuid
+import asyncio
 import aiohttp
 
 from tests.utils import asyncio_patch
 from unittest.mock import patch, MagicMock, PropertyMock
 from gns3server.modules.docker import Docker
+from gns3server.web.route import Route
 
 
 @pytest.fixture
@@ -75,6 +77,23 @@ def test_docker_start(server, vm):
         assert response.status == 204
 
 
+def test_docker_start_long_running(server, vm):
+
+    operations = []
+
+    @asyncio.coroutine
+    def start():
+        operations.append(Route._vm_operations.get(vm["vm_id"]))
+
+    with asyncio_patch("gns3server.modules.docker.docker_vm.DockerVM.start") as mock:
+        mock.side_effect = start
+        response = server.post("/projects/{project_id}/docker/vms/{vm_id}/start".format(project_id=vm["project_id"], vm_id=vm["vm_id"]))
+        assert response.status == 204
+    # the read only calls don't wait for the end of the start
+    assert operations[0]["method"] == "POST"
+    assert operations[0]["route"].endswith("/start")
+
+
 def test_docker_stop(server, vm):
     with asyncio_patch("gns3server.modules.docker.docker_vm.DockerVM.stop", return_value=True) as mock:
         response = server.post("/projects/{project_id}/docker/vms/{vm_id}/stop".format(project_id=vm["project_id"], vm_id=vm["vm_id"]))
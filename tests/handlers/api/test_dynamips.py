@@ -21,6 +21,7 @@ import stat
 from unittest.mock import patch
 
 from tests.utils import asyncio_patch
+from gns3server.utils.images import md5sum
 
 
 # @pytest.yield_fixture(scope="module")
@@ -167,9 +168,7 @@ def test_upload_vm(server, tmpdir):
     with open(str(tmpdir / "test2")) as f:
         assert f.read() == "TEST"
 
-    with open(str(tmpdir / "test2.md5sum")) as f:
-        checksum = f.read()
-        assert checksum == "033bd94b1168d7e4f0d644c3c95e35bf"
+    assert md5sum(str(tmpdir / "test2")) == "033bd94b1168d7e4f0d644c3c95e35bf"
 
 
 def test_upload_vm_permission_denied(server, tmpdir):
@@ -20,6 +20,7 @@ This test suite check /files endpoint
 """
 
 import json
+import struct
 import asyncio
 import aiohttp
 
@@ -74,3 +75,50 @@ def test_stream_file_not_found(server, tmpdir, loop):
     asyncio.async(go(future))
     response = loop.run_until_complete(future)
     assert response.status == 404
+
+
+def test_stream_filter(server, tmpdir, loop):
+
+    header = struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 28, 0, 0, 64, 17, 0, b"\x0a\0\0\x01", b"\x0a\0\0\x02")
+    udp = b"\0" * 12 + b"\x08\x00" + ip + struct.pack("!HHI", 1025, 53, 0)
+    arp = b"\0" * 12 + b"\x08\x06" + b"\0" * 28
+    with open(str(tmpdir / "test.pcap"), 'wb+') as f:
+        for packet in (arp, udp):
+            header += struct.pack("<IIII", 0, 0, len(packet), len(packet)) + packet
+        f.write(header)
+    expected_size = 24 + 16 + len(udp)
+
+    def go(future):
+        query = json.dumps({"location": str(tmpdir / "test.pcap"), "filter": "udp port 53"})
+        headers = {'content-type': 'application/json'}
+        response = yield from aiohttp.request("GET", server.get_url("/files/stream", 1), data=query, headers=headers)
+        response.body = b""
+        while len(response.body) < expected_size:
+            response.body += yield from response.content.read(expected_size - len(response.body))
+        response.close()
+        future.set_result(response)
+
+    future = asyncio.Future()
+    asyncio.async(go(future))
+    response = loop.run_until_complete(future)
+    assert response.status == 200
+    assert len(response.body) == expected_size
+    assert response.body.endswith(udp)
+
+
+def test_stream_invalid_filter(server, tmpdir, loop):
+    with open(str(tmpdir / "test.pcap"), 'w+') as f:
+        f.write("hello")
+
+    def go(future):
+        query = json.dumps({"location": str(tmpdir / "test.pcap"), "filter": "port http"})
+        headers = {'content-type': 'application/json'}
+        response = yield from aiohttp.request("GET", server.get_url("/files/stream", 1), data=query, headers=headers)
+        response.close()
+        future.set_result(response)
+
+    future = asyncio.Future()
+    asyncio.async(go(future))
+    response = loop.run_until_complete(future)
+    assert response.status == 400
@@ -24,6 +24,7 @@ import aiohttp
 
 from tests.utils import asyncio_patch
 from unittest.mock import patch, MagicMock, PropertyMock
+from gns3server.utils.images import md5sum
 
 pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="Not supported on Windows")
 
@@ -344,8 +345,6 @@ def test_upload_vm(server, tmpdir):
     with open(str(tmpdir / "test2")) as f:
         assert f.read() == "TEST"
 
-    with open(str(tmpdir / "test2.md5sum")) as f:
-        checksum = f.read()
-        assert checksum == "033bd94b1168d7e4f0d644c3c95e35bf"
+    assert md5sum(str(tmpdir / "test2")) == "033bd94b1168d7e4f0d644c3c95e35bf"
 
 
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from tests.utils import asyncio_patch
+
+
+@pytest.fixture(scope="function")
+def vpcs_vms(server, project):
+    vms = []
+    for name in ("PC1", "PC2", "PC3"):
+        response = server.post("/projects/{project_id}/vpcs/vms".format(project_id=project.id), {"name": name})
+        assert response.status == 201
+        vms.append(response.json)
+    return vms
+
+
+def test_create_bulk_links(server, project, vpcs_vms):
+    links = [{"endpoints": [{"module": "vpcs", "vm_id": vpcs_vms[0]["vm_id"], "adapter_number": 0, "port_number": 0},
+                            {"module": "vpcs", "vm_id": vpcs_vms[1]["vm_id"], "adapter_number": 0, "port_number": 0}]},
+             {"endpoints": [{"module": "vpcs", "vm_id": vpcs_vms[2]["vm_id"], "adapter_number": 0, "port_number": 0},
+                            {"module": "vpcs", "vm_id": vpcs_vms[0]["vm_id"], "adapter_number": 0, "port_number": 1}]}]
+    response = server.post("/projects/{project_id}/links/bulk".format(project_id=project.id), {"links": links}, example=True)
+    assert response.status == 201
+    assert response.route == "/projects/{project_id}/links/bulk"
+    assert response.json["links"][0]["status"] == "created"
+    nio_a, nio_b = response.json["links"][0]["nios"]
+    assert nio_a["type"] == "nio_udp"
+    assert nio_a["lport"] == nio_b["rport"]
+    assert nio_b["lport"] == nio_a["rport"]
+    # VPCS has only one port
+    assert response.json["links"][1]["status"] == "error"
+    assert response.json["links"][1]["nios"] == [None, None]
+    # the NIO of the second link bound to PC3 is removed
+    assert len(project._used_udp_ports) == 2
+
+
+def test_create_bulk_links_unknown_vm(server, project, vpcs_vms):
+    links = [{"endpoints": [{"module": "vpcs", "vm_id": vpcs_vms[0]["vm_id"], "adapter_number": 0, "port_number": 0},
+                            {"module": "vpcs", "vm_id": "00010203-0405-0607-0809-000000000000", "adapter_number": 0, "port_number": 0}]}]
+    response = server.post("/projects/{project_id}/links/bulk".format(project_id=project.id), {"links": links})
+    assert response.status == 201
+    assert response.json["links"][0]["status"] == "error"
+    # the NIO bound to the first VM is removed
+    assert response.json["links"][0]["nios"] == [None, None]
+    assert len(project._used_udp_ports) == 0
+
+
+def test_create_bulk_links_unexpected_error(server, project, vpcs_vms):
+    links = [{"endpoints": [{"module": "vpcs", "vm_id": vpcs_vms[0]["vm_id"], "adapter_number": 0, "port_number": 0},
+                            {"module": "vpcs", "vm_id": vpcs_vms[1]["vm_id"], "adapter_number": 0, "port_number": 0}]}]
+    with asyncio_patch("gns3server.modules.vpcs.VPCS.add_nio_binding", side_effect=RuntimeError("boom")):
+        response = server.post("/projects/{project_id}/links/bulk".format(project_id=project.id), {"links": links})
+    assert response.status == 500
+    assert len(project._used_udp_ports) == 0
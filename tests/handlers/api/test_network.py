@@ -19,10 +19,13 @@ import os
 import pytest
 
 
-def test_udp_allocation(server, project):
+def test_udp_allocation(server, project, port_manager):
     response = server.post('/projects/{}/ports/udp'.format(project.id), {}, example=True)
     assert response.status == 201
-    assert response.json == {'udp_port': 10000}
+    # ports are handed out from a rotating cursor, the first one depends on the previous tests
+    udp_port = response.json["udp_port"]
+    assert port_manager.udp_port_range[0] <= udp_port <= port_manager.udp_port_range[1]
+    assert udp_port in port_manager.udp_ports
 
 
 # Netfifaces is not available on Travis
@@ -26,7 +26,7 @@ import aiohttp
 import zipfile
 
 from unittest.mock import patch, MagicMock
-from tests.utils import asyncio_patch
+from tests.utils import asyncio_patch, AsyncioMagicMock
 
 from gns3server.handlers.api.project_handler import ProjectHandler
 from gns3server.modules.project_manager import ProjectManager
@@ -264,6 +264,33 @@ def test_get_file(server, tmpdir):
     assert response.status == 403
 
 
+def test_get_file_range(server, tmpdir):
+
+    with patch("gns3server.config.Config.get_section_config", return_value={"project_directory": str(tmpdir)}):
+        project = ProjectManager.instance().create_project()
+
+    with open(os.path.join(project.path, "hello"), "w+") as f:
+        f.write("hello world")
+
+    response = server.get("/projects/{project_id}/files/hello".format(project_id=project.id), raw=True, headers={"RANGE": "bytes=6-"})
+    assert response.status == 206
+    assert response.body == b"world"
+    assert response.headers["CONTENT-RANGE"] == "bytes 6-10/11"
+    etag = response.headers["ETAG"]
+
+    response = server.get("/projects/{project_id}/files/hello".format(project_id=project.id), raw=True, headers={"RANGE": "bytes=0-4", "IF-RANGE": etag})
+    assert response.status == 206
+    assert response.body == b"hello"
+
+    response = server.get("/projects/{project_id}/files/hello".format(project_id=project.id), raw=True, headers={"RANGE": "bytes=0-4", "IF-RANGE": '"old"'})
+    assert response.status == 200
+    assert response.body == b"hello world"
+
+    response = server.get("/projects/{project_id}/files/hello".format(project_id=project.id), raw=True, headers={"RANGE": "bytes=20-"})
+    assert response.status == 416
+    assert response.headers["CONTENT-RANGE"] == "bytes */11"
+
+
 def test_write_file(server, tmpdir):
 
     with patch("gns3server.config.Config.get_section_config", return_value={"project_directory": str(tmpdir)}):
@@ -308,7 +335,9 @@ def test_export(server, tmpdir, loop, project):
 
 def test_export_include_image(server, tmpdir, loop, project):
 
-    project.export = MagicMock()
+    z = MagicMock()
+    z.stream = AsyncioMagicMock()
+    project.export = AsyncioMagicMock(return_value=z)
     response = server.get("/projects/{project_id}/export".format(project_id=project.id), raw=True)
     project.export.assert_called_with(include_images=False)
 
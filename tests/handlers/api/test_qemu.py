@@ -22,6 +22,7 @@ import stat
 from tests.utils import asyncio_patch
 from unittest.mock import patch
 from gns3server.config import Config
+from gns3server.utils.images import md5sum
 
 @pytest.fixture
 def fake_qemu_bin():
@@ -238,9 +239,7 @@ def test_upload_vm(server, tmpdir):
     with open(str(tmpdir / "test2")) as f:
         assert f.read() == "TEST"
 
-    with open(str(tmpdir / "test2.md5sum")) as f:
-        checksum = f.read()
-        assert checksum == "033bd94b1168d7e4f0d644c3c95e35bf"
+    assert md5sum(str(tmpdir / "test2")) == "033bd94b1168d7e4f0d644c3c95e35bf"
 
 
 def test_upload_vm_ova(server, tmpdir):
@@ -251,9 +250,32 @@ def test_upload_vm_ova(server, tmpdir):
     with open(str(tmpdir / "test2.ova" / "test2.vmdk")) as f:
         assert f.read() == "TEST"
 
-    with open(str(tmpdir / "test2.ova" / "test2.vmdk.md5sum")) as f:
-        checksum = f.read()
-        assert checksum == "033bd94b1168d7e4f0d644c3c95e35bf"
+    assert md5sum(str(tmpdir / "test2.ova" / "test2.vmdk")) == "033bd94b1168d7e4f0d644c3c95e35bf"
+
+
+def test_upload_vm_resume(server, tmpdir):
+    with open(str(tmpdir / "test2.tmp"), "w+") as f:
+        f.write("TE")
+
+    with patch("gns3server.modules.Qemu.get_images_directory", return_value=str(tmpdir),):
+        response = server.post("/qemu/vms/test2?offset=2", body="ST", raw=True)
+        assert response.status == 204
+
+    with open(str(tmpdir / "test2")) as f:
+        assert f.read() == "TEST"
+    assert not os.path.exists(str(tmpdir / "test2.tmp"))
+    assert md5sum(str(tmpdir / "test2")) == "033bd94b1168d7e4f0d644c3c95e35bf"
+
+
+def test_upload_vm_resume_invalid_offset(server, tmpdir):
+    with open(str(tmpdir / "test2.tmp"), "w+") as f:
+        f.write("TE")
+
+    with patch("gns3server.modules.Qemu.get_images_directory", return_value=str(tmpdir),):
+        response = server.post("/qemu/vms/test2?offset=10", body="ST", raw=True)
+        assert response.status == 409
+        response = server.post("/qemu/vms/test2?offset=abc", body="ST", raw=True)
+        assert response.status == 400
 
 
 def test_upload_vm_forbiden_location(server, tmpdir):
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from gns3server.web.route_metrics import RouteMetrics
+
+
+def test_metrics(server):
+
+    RouteMetrics.instance().reset()
+    server.get("/version")
+    response = server.get("/server/metrics")
+    assert response.status == 200
+    assert response.headers["CONTENT-TYPE"].startswith("text/plain; version=0.0.4")
+    assert 'gns3_http_requests_total{method="GET",route="/v1/version",status="200"} 1' in response.html
+    assert 'gns3_http_request_duration_seconds_count{method="GET",route="/v1/version"} 1' in response.html
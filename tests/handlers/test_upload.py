@@ -25,6 +25,7 @@ from unittest.mock import patch
 
 
 from gns3server.config import Config
+from gns3server.utils.images import md5sum
 
 
 @pytest.yield_fixture(autouse=True)
@@ -71,9 +72,26 @@ def test_upload(server, tmpdir):
     with open(str(tmpdir / "QEMU" / "test2")) as f:
         assert f.read() == content
 
-    with open(str(tmpdir / "QEMU" / "test2.md5sum")) as f:
-        checksum = f.read()
-        assert checksum == "ae187e1febee2a150b64849c32d566ca"
+    assert md5sum(str(tmpdir / "QEMU" / "test2")) == "ae187e1febee2a150b64849c32d566ca"
+
+
+def test_upload_type_after_file(server, tmpdir):
+
+    with open(str(tmpdir / "test"), "w+") as f:
+        f.write("hello")
+    body = aiohttp.FormData()
+    body.add_field("file", open(str(tmpdir / "test"), "rb"), content_type="application/iou", filename="test2")
+    body.add_field("type", "QEMU")
+
+    Config.instance().set("Server", "images_path", str(tmpdir))
+
+    response = server.post('/upload', api_version=None, body=body, raw=True)
+    assert "test2" in response.body.decode("utf-8")
+
+    with open(str(tmpdir / "QEMU" / "test2")) as f:
+        assert f.read() == "hello"
+    assert md5sum(str(tmpdir / "QEMU" / "test2")) == "5d41402abc4b2a76b9719d911017c592"
+    assert [name for name in os.listdir(str(tmpdir)) if name.startswith(".upload")] == []
 
 
 def test_upload_previous_checksum(server, tmpdir):
@@ -100,9 +118,8 @@ def test_upload_previous_checksum(server, tmpdir):
     with open(str(tmpdir / "QEMU" / "test2")) as f:
         assert f.read() == content
 
-    with open(str(tmpdir / "QEMU" / "test2.md5sum")) as f:
-        checksum = f.read()
-        assert checksum == "ae187e1febee2a150b64849c32d566ca"
+    assert md5sum(str(tmpdir / "QEMU" / "test2")) == "ae187e1febee2a150b64849c32d566ca"
+    assert not os.path.exists(str(tmpdir / "QEMU" / "test2.md5sum"))
 
 
 def test_upload_images_backup(server, tmpdir):
@@ -139,6 +156,25 @@ def test_upload_images_backup(server, tmpdir):
     assert not os.path.exists(str(tmpdir / 'images' / 'archive.tar'))
 
 
+def test_upload_images_backup_outside_directory(server, tmpdir):
+    Config.instance().set("Server", "images_path", str(tmpdir / 'images'))
+
+    with open(str(tmpdir / 'a.img'), 'w+') as f:
+        f.write('hello')
+    with tarfile.open(str(tmpdir / 'test.tar'), 'w') as tar:
+        tar.add(str(tmpdir / 'a.img'), arcname='QEMU/a.img')
+        tar.add(str(tmpdir / 'a.img'), arcname='../evil.img')
+
+    body = aiohttp.FormData()
+    body.add_field('type', 'IMAGES')
+    body.add_field('file', open(str(tmpdir / 'test.tar'), 'rb'), content_type='application/x-gtar', filename='test.tar')
+    response = server.post('/upload', api_version=None, body=body, raw=True)
+    assert response.status == 200
+
+    assert os.path.exists(str(tmpdir / 'images' / 'QEMU' / 'a.img'))
+    assert not os.path.exists(str(tmpdir / 'evil.img'))
+
+
 def test_upload_projects_backup(server, tmpdir):
     Config.instance().set("Server", "projects_path", str(tmpdir / 'projects'))
     os.makedirs(str(tmpdir / 'projects' / 'b'))
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import asyncio
+
+from gns3server.modules.dynamips.dynamips_hypervisor import DynamipsHypervisor
+from gns3server.modules.dynamips.dynamips_error import DynamipsError
+
+
+REPLIES = {
+    "hypervisor version": b"100-0.2.16-amd64\r\n",
+    "vm list": b"101 R1\r\n101 R2\r\n100-OK\r\n",
+    "vm get_status \"R1\"": b"100-2\r\n",
+    "vm start \"R3\"": b"206-unable to find VM 'R3'\r\n",
+}
+
+
+@pytest.yield_fixture
+def fake_hypervisor(loop, tmpdir):
+    """
+    Starts a fake Dynamips hypervisor answering with canned replies,
+    the replies are sent in small chunks to test the reply parsing.
+    """
+
+    commands = []
+
+    @asyncio.coroutine
+    def handle(reader, writer):
+        while True:
+            line = yield from reader.readline()
+            if not line:
+                break
+            command = line.decode().strip()
+            commands.append(command)
+            reply = REPLIES.get(command, b"100-OK\r\n")
+            for i in range(0, len(reply), 3):
+                writer.write(reply[i:i + 3])
+                yield from writer.drain()
+        writer.close()
+
+    server = loop.run_until_complete(asyncio.start_server(handle, "127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+    hypervisor = DynamipsHypervisor(str(tmpdir), "127.0.0.1", port)
+    hypervisor.is_running = lambda: True
+    loop.run_until_complete(asyncio.async(hypervisor.connect()))
+    hypervisor.commands = commands
+    yield hypervisor
+    loop.run_until_complete(asyncio.async(hypervisor.stop()))
+    server.close()
+
+
+def test_send(loop, fake_hypervisor):
+
+    assert fake_hypervisor.version == "0.2.16"
+    assert loop.run_until_complete(asyncio.async(fake_hypervisor.send("vm list"))) == ["R1", "R2"]
+    assert loop.run_until_complete(asyncio.async(fake_hypervisor.send('vm get_status "R1"'))) == ["2"]
+
+
+def test_send_error(loop, fake_hypervisor):
+
+    with pytest.raises(DynamipsError):
+        loop.run_until_complete(asyncio.async(fake_hypervisor.send('vm start "R3"')))
+    # the connection is still usable after an error
+    assert loop.run_until_complete(asyncio.async(fake_hypervisor.send("vm list"))) == ["R1", "R2"]
+
+
+def test_send_batch(loop, fake_hypervisor):
+
+    results = loop.run_until_complete(asyncio.async(fake_hypervisor.send_batch(["vm list",
+                                                                                'vm start "R3"',
+                                                                                'vm get_status "R1"'],
+                                                                               return_exceptions=True)))
+    assert results[0] == ["R1", "R2"]
+    assert isinstance(results[1], DynamipsError)
+    assert results[2] == ["2"]
+    assert fake_hypervisor.commands[-3:] == ["vm list", 'vm start "R3"', 'vm get_status "R1"']
+
+    with pytest.raises(DynamipsError):
+        loop.run_until_complete(asyncio.async(fake_hypervisor.send_batch(["vm list", 'vm start "R3"'])))
+
+
+def test_send_concurrent(loop, fake_hypervisor):
+
+    tasks = [asyncio.async(fake_hypervisor.send("vm list")), asyncio.async(fake_hypervisor.send('vm get_status "R1"'))]
+    loop.run_until_complete(asyncio.wait(tasks))
+    assert tasks[0].result() == ["R1", "R2"]
+    assert tasks[1].result() == ["2"]
@@ -25,7 +25,11 @@ import asyncio
 
 from gns3server.modules.dynamips import Dynamips
 from gns3server.modules.dynamips.dynamips_error import DynamipsError
-from unittest.mock import patch
+from gns3server.modules.dynamips.nodes.router import Router
+from gns3server.utils.images import md5sum
+from gns3server.config import Config
+from unittest.mock import patch, MagicMock
+from tests.utils import asyncio_patch, AsyncioMagicMock
 
 
 @pytest.fixture(scope="module")
@@ -94,3 +98,119 @@ def test_project_closed(manager, project, loop):
 
     assert not os.path.exists(os.path.join(project_dir, "test.ghost"))
     assert project.id not in manager._dynamips_ids
+
+
+@pytest.fixture
+def ios_image(manager):
+
+    path = os.path.join(manager.get_images_directory(), "c7200.image")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb+") as f:
+        f.write(b"\x7fELF\x01\x02\x01")
+    return path
+
+
+@pytest.fixture
+def idlepc_vm(ios_image):
+
+    vm = MagicMock()
+    vm.image = ios_image
+    vm.platform = "c7200"
+    vm.ram = 256
+    vm.set_idlepc = AsyncioMagicMock()
+    vm.get_status = AsyncioMagicMock(return_value="running")
+    vm.get_idle_pc_prop = AsyncioMagicMock(return_value=["0x1 [10]", "0x2 [5]", "0x3 [2]"])
+    return vm
+
+
+def test_auto_idlepc_known(manager, idlepc_vm, loop):
+
+    manager.idlepc_database.set(md5sum(idlepc_vm.image), "c7200", 256, "0x60606f54")
+    with asyncio_patch("gns3server.modules.dynamips.Dynamips._probe_idlepc", return_value=10) as mock:
+        idlepc = loop.run_until_complete(asyncio.async(manager.auto_idlepc(idlepc_vm)))
+    assert idlepc == "0x60606f54"
+    mock.assert_called_once_with(idlepc_vm, "0x60606f54")
+    assert not idlepc_vm.get_idle_pc_prop.called
+
+
+def test_auto_idlepc_known_not_suitable(manager, idlepc_vm, loop):
+
+    manager.idlepc_database.set(md5sum(idlepc_vm.image), "c7200", 256, "0x60606f54")
+
+    @asyncio.coroutine
+    def probe(vm, idlepc):
+        return 100 if idlepc in ("0x60606f54", "0x1") else 10
+
+    with asyncio_patch("gns3server.modules.dynamips.Dynamips._probe_idlepc") as mock:
+        mock.side_effect = probe
+        idlepc = loop.run_until_complete(asyncio.async(manager.auto_idlepc(idlepc_vm)))
+    assert idlepc == "0x2"
+    assert [call[0][1] for call in mock.call_args_list] == ["0x60606f54", "0x1", "0x2"]
+    assert manager.idlepc_database.get(md5sum(idlepc_vm.image), "c7200", 256) == "0x2"
+
+
+def test_auto_idlepc_without_database(manager, idlepc_vm, loop):
+
+    manager.idlepc_database.set(md5sum(idlepc_vm.image), "c7200", 256, "0x60606f54")
+    with asyncio_patch("gns3server.modules.dynamips.Dynamips._probe_idlepc", return_value=10) as mock:
+        idlepc = loop.run_until_complete(asyncio.async(manager.auto_idlepc(idlepc_vm, use_database=False)))
+    assert idlepc == "0x1"
+    mock.assert_called_once_with(idlepc_vm, "0x1")
+
+
+def test_auto_idlepc_parallel(manager, idlepc_vm, loop):
+
+    Config.instance().set("Dynamips", "auto_idlepc_workers", "2")
+
+    @asyncio.coroutine
+    def worker(vm, working_dir, queue, validated):
+        assert os.path.isdir(working_dir)
+        while queue and not validated:
+            index, idlepc = queue.popleft()
+            yield from asyncio.sleep(0)
+            if idlepc != "0x1":
+                validated.append((index, idlepc))
+
+    with patch("os.cpu_count", return_value=4):
+        with patch("gns3server.modules.dynamips.Dynamips._idlepc_worker", side_effect=worker) as mock:
+            idlepc = loop.run_until_complete(asyncio.async(manager.auto_idlepc(idlepc_vm)))
+    assert mock.call_count == 2
+    assert idlepc == "0x2"
+    idlepc_vm.set_idlepc.assert_called_with("0x2")
+    assert manager.idlepc_database.get(md5sum(idlepc_vm.image), "c7200", 256) == "0x2"
+
+
+def test_auto_idlepc_parallel_error(manager, idlepc_vm, loop):
+
+    Config.instance().set("Dynamips", "auto_idlepc_workers", "2")
+
+    @asyncio.coroutine
+    def worker(vm, working_dir, queue, validated):
+        raise DynamipsError("Could not start")
+
+    with patch("os.cpu_count", return_value=4):
+        with patch("gns3server.modules.dynamips.Dynamips._idlepc_worker", side_effect=worker):
+            with pytest.raises(DynamipsError):
+                loop.run_until_complete(asyncio.async(manager.auto_idlepc(idlepc_vm)))
+
+
+def test_add_nio_binding_error(manager, loop):
+    router = MagicMock(spec=Router)
+    router.slot_add_nio_binding = AsyncioMagicMock(side_effect=DynamipsError("Slot 0 does not exist"))
+    nio = MagicMock()
+    nio.delete = AsyncioMagicMock()
+    with patch("gns3server.modules.dynamips.Dynamips.create_nio", new=AsyncioMagicMock(return_value=nio)):
+        with pytest.raises(DynamipsError):
+            loop.run_until_complete(asyncio.async(manager.add_nio_binding(router, 0, 0, {"type": "nio_udp"})))
+    # the NIO is deleted from the hypervisor
+    assert nio.delete.called
+
+
+def test_remove_nio_binding(manager, loop):
+    router = MagicMock(spec=Router)
+    nio = MagicMock()
+    nio.delete = AsyncioMagicMock()
+    router.slot_remove_nio_binding = AsyncioMagicMock(return_value=nio)
+    loop.run_until_complete(asyncio.async(manager.remove_nio_binding(router, 1, 0)))
+    router.slot_remove_nio_binding.assert_called_with(1, 0)
+    assert nio.delete.called
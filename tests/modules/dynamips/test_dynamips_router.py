@@ -15,11 +15,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import pytest
 import asyncio
 import configparser
 
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
+from tests.utils import asyncio_patch, AsyncioMagicMock
 from gns3server.modules.dynamips.nodes.router import Router
 from gns3server.modules.dynamips.dynamips_error import DynamipsError
 from gns3server.modules.dynamips import Dynamips
@@ -55,3 +57,17 @@ def test_router_invalid_dynamips_path(project, manager, loop):
         loop.run_until_complete(asyncio.async(router.create()))
         assert router.name == "test"
         assert router.id == "00010203-0405-0607-0809-0a0b0c0d0e0e"
+
+
+def test_set_image_known_idlepc(router, manager, loop):
+
+    image = os.path.join(manager.get_images_directory(), "c7200.image")
+    os.makedirs(os.path.dirname(image), exist_ok=True)
+    with open(image, "wb+") as f:
+        f.write(b"\x7fELF\x01\x02\x01")
+    router._hypervisor = MagicMock()
+    router._hypervisor.send = AsyncioMagicMock()
+    with asyncio_patch("gns3server.modules.dynamips.Dynamips.get_known_idlepc", return_value="0x60606f54"):
+        with asyncio_patch("gns3server.modules.dynamips.nodes.router.Router.is_running", return_value=False):
+            loop.run_until_complete(asyncio.async(router.set_image(image)))
+    assert router.idlepc == "0x60606f54"
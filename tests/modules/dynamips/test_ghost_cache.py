@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from gns3server.modules.dynamips.ghost_cache import GhostCache
+
+
+def generate(cache, name, size=1024 * 1024):
+
+    path = cache.get_path(name, "c7200", 256)
+    with open(path, "wb+") as f:
+        f.write(b"\0" * size)
+    return path
+
+
+def test_add(tmpdir):
+
+    cache = GhostCache(str(tmpdir / "ghosts"))
+    path = cache.get_path("abcd", "c7200", 256)
+    assert path == str(tmpdir / "ghosts" / "abcd-c7200-256.ghost")
+    assert not cache.contains(path)
+    generate(cache, "abcd")
+    cache.add(path)
+    assert cache.contains(path)
+
+    # loaded from the disk
+    assert GhostCache(str(tmpdir / "ghosts")).contains(path)
+
+
+def test_incomplete_ghost_deleted(tmpdir):
+
+    cache = GhostCache(str(tmpdir / "ghosts"))
+    path = generate(cache, "abcd")
+    GhostCache(str(tmpdir / "ghosts"))
+    assert not os.path.exists(path)
+
+
+def test_evict_lru(tmpdir):
+
+    cache = GhostCache(str(tmpdir / "ghosts"), max_size=2)
+    path1 = generate(cache, "a")
+    cache.add(path1)
+    path2 = generate(cache, "b")
+    cache.add(path2)
+    cache.touch(path1)
+    path3 = generate(cache, "c")
+    cache.add(path3)
+    assert cache.contains(path1)
+    assert not cache.contains(path2)
+    assert not os.path.exists(path2)
+    assert cache.contains(path3)
+
+
+def test_evict_in_use(tmpdir):
+
+    cache = GhostCache(str(tmpdir / "ghosts"), max_size=1)
+    path1 = generate(cache, "a")
+    cache.add(path1)
+    path2 = generate(cache, "b")
+    cache.add(path2, in_use=[path1])
+    assert cache.contains(path1)
+    assert cache.contains(path2)
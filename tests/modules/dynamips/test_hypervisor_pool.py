@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import uuid
+import pytest
+import asyncio
+from unittest.mock import MagicMock
+
+from gns3server.modules.dynamips import Dynamips
+from gns3server.modules.dynamips.nodes.router import Router
+from gns3server.modules.dynamips.hypervisor_pool import HypervisorPool
+from gns3server.config import Config
+
+
+@pytest.fixture(scope="module")
+def manager(port_manager):
+    m = Dynamips.instance()
+    m.port_manager = port_manager
+    return m
+
+
+@pytest.fixture
+def pool(manager, project):
+
+    pool = HypervisorPool(manager)
+    working_dir = project.module_working_directory("dynamips")
+    started = []
+
+    @asyncio.coroutine
+    def start_new_hypervisor(working_dir=None):
+        hypervisor = MagicMock()
+        hypervisor.working_dir = working_dir
+        hypervisor.devices = []
+        hypervisor.is_running.return_value = True
+        started.append(hypervisor)
+        return hypervisor
+
+    pool.started = started
+    pool._manager = MagicMock()
+    pool._manager.module_name = "Dynamips"
+    pool._manager.config = Config.instance()
+    pool._manager.start_new_hypervisor = start_new_hypervisor
+    return pool
+
+
+def allocate(loop, pool, project, manager, name, image="c7200.image", ram=256, platform="c7200"):
+
+    router = Router(name, str(uuid.uuid4()), project, manager, platform=platform)
+    hypervisor = loop.run_until_complete(asyncio.async(pool.allocate(router, image=image, ram=ram)))
+    hypervisor.devices.append(router)
+    return router, hypervisor
+
+
+def test_one_hypervisor_per_router(loop, pool, project, manager):
+
+    _, h1 = allocate(loop, pool, project, manager, "R1")
+    _, h2 = allocate(loop, pool, project, manager, "R2")
+    assert h1 is not h2
+    assert len(pool.started) == 2
+
+
+def test_pack_routers(loop, pool, project, manager):
+
+    Config.instance().set("Dynamips", "hypervisors_per_project", "4")
+    _, h1 = allocate(loop, pool, project, manager, "R1")
+    _, h2 = allocate(loop, pool, project, manager, "R2")
+    assert h1 is h2
+    assert pool.hypervisors(project) == [h1]
+
+
+def test_pack_routers_memory_limit(loop, pool, project, manager):
+
+    Config.instance().set("Dynamips", "hypervisors_per_project", "4")
+    Config.instance().set("Dynamips", "memory_usage_limit_per_hypervisor", "512")
+    _, h1 = allocate(loop, pool, project, manager, "R1")
+    _, h2 = allocate(loop, pool, project, manager, "R2")
+    _, h3 = allocate(loop, pool, project, manager, "R3")
+    assert h1 is h2
+    assert h3 is not h1
+
+
+def test_pack_routers_per_image(loop, pool, project, manager):
+
+    Config.instance().set("Dynamips", "hypervisors_per_project", "4")
+    _, h1 = allocate(loop, pool, project, manager, "R1", image="c3745.image", platform="c3745")
+    _, h2 = allocate(loop, pool, project, manager, "R2", image="c7200.image")
+    _, h3 = allocate(loop, pool, project, manager, "R3", image="c3745.image", platform="c3745")
+    assert h1 is not h2
+    assert h3 is h1
+
+
+def test_pack_routers_max_hypervisors(loop, pool, project, manager):
+
+    Config.instance().set("Dynamips", "hypervisors_per_project", "2")
+    _, h1 = allocate(loop, pool, project, manager, "R1", image="a.image", ram=512)
+    _, h2 = allocate(loop, pool, project, manager, "R2", image="b.image", ram=128)
+    _, h3 = allocate(loop, pool, project, manager, "R3", image="c.image")
+    assert len(pool.started) == 2
+    # the least loaded hypervisor
+    assert h3 is h2
+
+
+def test_same_name_not_packed(loop, pool, project, manager):
+
+    Config.instance().set("Dynamips", "hypervisors_per_project", "4")
+    _, h1 = allocate(loop, pool, project, manager, "R1")
+    _, h2 = allocate(loop, pool, project, manager, "R1")
+    assert h1 is not h2
+
+
+def test_release(loop, pool, project, manager):
+
+    Config.instance().set("Dynamips", "hypervisors_per_project", "4")
+    r1, h1 = allocate(loop, pool, project, manager, "R1")
+    r2, _ = allocate(loop, pool, project, manager, "R2")
+    pool.release(r1)
+    assert pool.hypervisors(project) == [h1]
+    pool.release(r2)
+    assert pool.hypervisors(project) == []
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from gns3server.modules.dynamips.idlepc_database import IdlePCDatabase
+
+
+def test_get_set(tmpdir):
+
+    path = str(tmpdir / "idlepc")
+    db = IdlePCDatabase(path)
+    assert db.get("abcd", "c7200", 256) is None
+    db.set("abcd", "c7200", 256, "0x60606f54", image="c7200.image")
+    assert db.get("abcd", "c7200", 256) == "0x60606f54"
+    assert db.get("abcd", "c3745", 256) is None
+    assert os.path.exists(path)
+
+    # loaded from the disk
+    assert IdlePCDatabase(path).get("abcd", "c7200", 256) == "0x60606f54"
+
+
+def test_get_other_ram(tmpdir):
+
+    db = IdlePCDatabase(str(tmpdir / "idlepc"))
+    db.set("abcd", "c7200", 256, "0x1")
+    db.set("abcd", "c7200", 512, "0x2")
+    assert db.get("abcd", "c7200", 512) == "0x2"
+    assert db.get("abcd", "c7200", 128) == "0x1"
+
+
+def test_remove(tmpdir):
+
+    path = str(tmpdir / "idlepc")
+    db = IdlePCDatabase(path)
+    db.set("abcd", "c7200", 256, "0x1")
+    db.remove("abcd", "c7200", 256)
+    assert IdlePCDatabase(path).get("abcd", "c7200", 256) is None
+
+
+def test_invalid_file(tmpdir):
+
+    path = str(tmpdir / "idlepc")
+    with open(path, "w+") as f:
+        f.write("{")
+    assert IdlePCDatabase(path).get("abcd", "c7200", 256) is None
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import socket
+import asyncio
+import pytest
+import sys
+
+from gns3server.modules.iou.iou_console import IOUConsole
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win"), reason="Not supported on Windows")
+
+
+def test_console(loop, tmpdir):
+
+    netio = str(tmpdir)
+    iou = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    iou.setblocking(False)
+    iou.bind(os.path.join(netio, "ttyS42"))
+    console = IOUConsole(42, "127.0.0.1", 0, netio=netio)
+
+    @asyncio.coroutine
+    def go():
+        yield from console.start()
+        port = console._server.sockets[0].getsockname()[1]
+        reader, writer = yield from asyncio.open_connection("127.0.0.1", port)
+        yield from reader.readexactly(12)  # telnet negotiation
+        while not console.connected:
+            yield from asyncio.sleep(0.01)
+
+        # output of IOU
+        iou.sendto(b"Router>", os.path.join(netio, "ttyC42"))
+        assert (yield from reader.readexactly(7)) == b"Router>"
+
+        # input of the telnet client
+        writer.write(b"show version\r")
+        assert (yield from loop.sock_recv(iou, 1024)) == b"show version\r"
+
+        console.stop()
+        assert (yield from reader.read()) == b""
+        assert not os.path.exists(os.path.join(netio, "ttyC42"))
+        writer.close()
+
+    try:
+        loop.run_until_complete(asyncio.async(go()))
+    finally:
+        console.stop()
+        iou.close()
+
+
+def test_reconnect(loop, tmpdir):
+
+    netio = str(tmpdir)
+    console = IOUConsole(42, "127.0.0.1", 0, netio=netio)
+
+    @asyncio.coroutine
+    def go():
+        yield from console.start()
+        # IOU is not started yet
+        yield from asyncio.sleep(0.1)
+        assert not console.connected
+
+        iou = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        iou.bind(os.path.join(netio, "ttyS42"))
+        try:
+            while not console.connected:
+                yield from asyncio.sleep(0.05)
+        finally:
+            iou.close()
+
+    try:
+        loop.run_until_complete(asyncio.wait_for(go(), 5))
+    finally:
+        console.stop()
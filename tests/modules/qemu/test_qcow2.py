@@ -19,7 +19,9 @@ import os
 import pytest
 import shutil
 import asyncio
+from unittest.mock import patch, MagicMock
 
+from tests.utils import asyncio_patch
 from gns3server.modules.qemu.qcow2 import Qcow2, Qcow2Error
 
 
@@ -71,3 +73,62 @@ def test_rebase(tmpdir, loop):
     assert qcow2.backing_file == "empty8G.qcow2"
     loop.run_until_complete(asyncio.async(qcow2.rebase(qemu_img(), str(tmpdir / "empty16G.qcow2"))))
     assert qcow2.backing_file == str(tmpdir / "empty16G.qcow2")
+
+
+def test_header():
+    qcow2 = Qcow2("tests/resources/linked.qcow2")
+    assert qcow2.cluster_size == 65536
+    assert qcow2.size == 8 * 1024 * 1024 * 1024
+    assert qcow2.l1_size == 16
+    assert qcow2.refcount_order == 4
+    assert qcow2.header_length == 104
+    assert qcow2.backing_format is None
+    assert qcow2.extensions_end == qcow2.backing_file_offset
+
+
+def test_create(tmpdir):
+    # the image is the same as the one created by qemu-img
+    Qcow2.create(str(tmpdir / "linked.qcow2"), "empty8G.qcow2", base_format=None, size=8 * 1024 * 1024 * 1024)
+    with open(str(tmpdir / "linked.qcow2"), "rb") as f:
+        with open("tests/resources/linked.qcow2", "rb") as expected:
+            assert f.read() == expected.read()
+
+
+def test_create_backing_format(tmpdir):
+    qcow2 = Qcow2.create(str(tmpdir / "linked.qcow2"), os.path.abspath("tests/resources/empty8G.qcow2"))
+    assert qcow2.version == 3
+    assert qcow2.size == 8 * 1024 * 1024 * 1024
+    assert qcow2.backing_file == os.path.abspath("tests/resources/empty8G.qcow2")
+    assert qcow2.backing_format == "qcow2"
+
+
+def test_create_invalid_base(tmpdir):
+    with pytest.raises(Qcow2Error):
+        Qcow2.create(str(tmpdir / "linked.qcow2"), "tests/resources/nvram_iou")
+    assert not os.path.exists(str(tmpdir / "linked.qcow2"))
+
+
+def test_rebase_native(tmpdir, loop):
+    shutil.copy("tests/resources/empty8G.qcow2", str(tmpdir / "empty16G.qcow2"))
+    shutil.copy("tests/resources/linked.qcow2", str(tmpdir / "linked.qcow2"))
+    qcow2 = Qcow2(str(tmpdir / "linked.qcow2"))
+    with asyncio_patch("asyncio.create_subprocess_exec") as mock:
+        loop.run_until_complete(asyncio.async(qcow2.rebase("qemu-img", str(tmpdir / "empty16G.qcow2"))))
+        # already rebased
+        loop.run_until_complete(asyncio.async(qcow2.rebase("qemu-img", str(tmpdir / "empty16G.qcow2"))))
+        assert not mock.called
+    assert Qcow2(str(tmpdir / "linked.qcow2")).backing_file == str(tmpdir / "empty16G.qcow2")
+    assert qcow2.backing_file == str(tmpdir / "empty16G.qcow2")
+
+
+def test_rebase_path_too_long(tmpdir, loop):
+    shutil.copy("tests/resources/linked.qcow2", str(tmpdir / "linked.qcow2"))
+    base_image = str(tmpdir / ("a" * 65536))
+    qcow2 = Qcow2(str(tmpdir / "linked.qcow2"))
+    process = MagicMock()
+    process.wait.return_value = asyncio.Future()
+    process.wait.return_value.set_result(0)
+    with patch("os.path.exists", return_value=True):
+        with asyncio_patch("asyncio.create_subprocess_exec", return_value=process) as mock:
+            loop.run_until_complete(asyncio.async(qcow2.rebase("qemu-img", base_image)))
+            assert mock.called
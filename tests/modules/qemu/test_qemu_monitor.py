@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import json
+import pytest
+import asyncio
+
+from gns3server.modules.qemu.qemu_monitor import QemuMonitor, QemuQMPMonitor
+from gns3server.modules.qemu.qemu_error import QemuError
+
+
+@pytest.yield_fixture
+def fake_monitor(loop):
+    """
+    Starts a fake QEMU human monitor, the connections are counted.
+    """
+
+    connections = []
+
+    @asyncio.coroutine
+    def handle(reader, writer):
+        connections.append(writer)
+        writer.write(b"QEMU 2.5.0 monitor - type 'help' for more information\r\n(qemu) ")
+        while True:
+            line = yield from reader.readline()
+            if not line:
+                break
+            command = line.decode().strip()
+            # QEMU echoes the command with terminal escape sequences
+            writer.write(b"\x1b[K" + command.encode() + b"\r\n")
+            if command == "info status":
+                writer.write(b"VM status: running\r\n")
+            elif command == "quit":
+                writer.close()
+                return
+            elif command == "bye":
+                # the connection is closed after the reply
+                writer.write(b"(qemu) ")
+                writer.close()
+                return
+            writer.write(b"(qemu) ")
+        writer.close()
+
+    server = loop.run_until_complete(asyncio.start_server(handle, "127.0.0.1", 0))
+    monitor = QemuMonitor("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+    monitor.connections = connections
+    yield monitor
+    monitor.close()
+    server.close()
+
+
+@pytest.yield_fixture
+def fake_qmp(loop):
+    """
+    Starts a fake QMP server sending an event before each reply.
+    """
+
+    @asyncio.coroutine
+    def handle(reader, writer):
+        writer.write(b'{"QMP": {"version": {}, "capabilities": []}}\r\n')
+        while True:
+            line = yield from reader.readline()
+            if not line:
+                break
+            command = json.loads(line.decode())
+            writer.write(b'{"event": "RESUME", "data": {}}\r\n')
+            if command["execute"] == "query-status":
+                reply = {"return": {"status": "paused", "running": False, "singlestep": False}}
+            elif command["execute"] == "human-monitor-command":
+                reply = {"return": "output of {}\r\n".format(command["arguments"]["command-line"])}
+            elif command["execute"] == "bad":
+                reply = {"error": {"class": "CommandNotFound", "desc": "The command bad has not been found"}}
+            else:
+                reply = {"return": {}}
+            writer.write(json.dumps(reply).encode() + b"\r\n")
+        writer.close()
+
+    server = loop.run_until_complete(asyncio.start_server(handle, "127.0.0.1", 0))
+    monitor = QemuQMPMonitor("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+    yield monitor
+    monitor.close()
+    server.close()
+
+
+def test_execute(loop, fake_monitor):
+
+    assert loop.run_until_complete(asyncio.async(fake_monitor.execute("info status"))) == [b"VM status: running"]
+    assert loop.run_until_complete(asyncio.async(fake_monitor.execute("stop"))) == []
+    # the connection is kept open
+    assert len(fake_monitor.connections) == 1
+
+
+def test_execute_reconnect(loop, fake_monitor):
+
+    loop.run_until_complete(asyncio.async(fake_monitor.execute("stop")))
+    # the monitor closes the connection, the next command uses a new one
+    # the command is not sent again
+    with pytest.raises(EOFError):
+        loop.run_until_complete(asyncio.async(fake_monitor.execute("quit")))
+    assert loop.run_until_complete(asyncio.async(fake_monitor.execute("info status"))) == [b"VM status: running"]
+    assert len(fake_monitor.connections) == 2
+
+
+def test_execute_closed_while_idle(loop, fake_monitor):
+
+    assert loop.run_until_complete(asyncio.async(fake_monitor.execute("bye"))) == []
+    loop.run_until_complete(asyncio.sleep(0.1))
+    # the connection closed by QEMU is replaced before sending the command
+    assert loop.run_until_complete(asyncio.async(fake_monitor.execute("info status"))) == [b"VM status: running"]
+    assert len(fake_monitor.connections) == 2
+
+
+def test_execute_handshake_timeout(loop):
+
+    @asyncio.coroutine
+    def handle(reader, writer):
+        # the banner comes too late
+        yield from asyncio.sleep(0.5)
+        writer.write(b"QEMU 2.5.0 monitor - type 'help' for more information\r\n(qemu) ")
+
+    server = loop.run_until_complete(asyncio.start_server(handle, "127.0.0.1", 0))
+    monitor = QemuMonitor("127.0.0.1", server.sockets[0].getsockname()[1], timeout=0.1)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            loop.run_until_complete(asyncio.async(monitor.execute("info status")))
+        assert not monitor.connected
+    finally:
+        monitor.close()
+        server.close()
+
+
+def test_execute_concurrent(loop, fake_monitor):
+
+    tasks = [asyncio.async(fake_monitor.execute("info status")) for _ in range(10)]
+    loop.run_until_complete(asyncio.wait(tasks))
+    assert [task.result() for task in tasks] == [[b"VM status: running"]] * 10
+    assert len(fake_monitor.connections) == 1
+
+
+def test_qmp(loop, fake_qmp):
+
+    status = loop.run_until_complete(asyncio.async(fake_qmp.execute("query-status")))
+    assert status == {"status": "paused", "running": False, "singlestep": False}
+    assert loop.run_until_complete(asyncio.async(fake_qmp.human_command("info cpus"))) == [b"output of info cpus"]
+    assert loop.run_until_complete(asyncio.async(fake_qmp.human_command("stop"))) == []
+    with pytest.raises(QemuError):
+        loop.run_until_complete(asyncio.async(fake_qmp.execute("bad")))
@@ -22,6 +22,7 @@ import os
 import sys
 import stat
 import re
+import shutil
 from tests.utils import asyncio_patch, AsyncioMagicMock
 
 
@@ -31,6 +32,7 @@ from unittest.mock import patch, MagicMock
 from gns3server.modules.qemu.qemu_vm import QemuVM
 from gns3server.modules.qemu.qemu_error import QemuError
 from gns3server.modules.qemu import Qemu
+from gns3server.modules.qemu.qcow2 import Qcow2
 from gns3server.utils import force_unix_path, macaddress_to_int, int_to_macaddress
 
 
@@ -329,6 +331,22 @@ def test_disk_options(vm, tmpdir, loop, fake_qemu_img_binary):
     assert options == ['-drive', 'file=' + os.path.join(vm.working_dir, "hda_disk.qcow2") + ',if=ide,index=0,media=disk']
 
 
+def test_disk_options_qcow2_base(vm, tmpdir, loop, fake_qemu_img_binary):
+
+    vm._hda_disk_image = str(tmpdir / "test.qcow2")
+    shutil.copy("tests/resources/empty8G.qcow2", vm._hda_disk_image)
+    disk = os.path.join(vm.working_dir, "hda_disk.qcow2")
+
+    with asyncio_patch("asyncio.create_subprocess_exec", return_value=MagicMock()) as process:
+        # the linked clone is created and checked without qemu-img
+        loop.run_until_complete(asyncio.async(vm._disk_options()))
+        options = loop.run_until_complete(asyncio.async(vm._disk_options()))
+        assert not process.called
+
+    assert Qcow2(disk).backing_file == vm._hda_disk_image
+    assert options == ['-drive', 'file=' + disk + ',if=ide,index=0,media=disk']
+
+
 def test_disk_options_multiple_disk(vm, tmpdir, loop, fake_qemu_img_binary):
 
     vm._hda_disk_image = str(tmpdir / "test0.qcow2")
@@ -381,33 +399,45 @@ def test_json(vm, project):
     assert json["project_id"] == project.id
 
 
-def test_control_vm(vm, loop):
+def test_control_vm(vm, loop, running_subprocess_mock):
 
-    vm._process = MagicMock()
-    reader = MagicMock()
-    writer = MagicMock()
-    with asyncio_patch("asyncio.open_connection", return_value=(reader, writer)) as open_connect:
+    vm._process = running_subprocess_mock
+    vm._monitor = 4242
+    with asyncio_patch("gns3server.modules.qemu.qemu_monitor.QemuMonitor.execute", return_value=[]) as mock:
         res = loop.run_until_complete(asyncio.async(vm._control_vm("test")))
-        assert writer.write.called_with("test")
+        mock.assert_called_with("test")
     assert res is None
 
 
 def test_control_vm_expect_text(vm, loop, running_subprocess_mock):
 
     vm._process = running_subprocess_mock
-    reader = MagicMock()
-    writer = MagicMock()
-    with asyncio_patch("asyncio.open_connection", return_value=(reader, writer)) as open_connect:
+    vm._monitor = 4242
+    with asyncio_patch("gns3server.modules.qemu.qemu_monitor.QemuMonitor.execute", return_value=[b"epic product"]):
+        res = loop.run_until_complete(asyncio.async(vm._control_vm("test", [b"epic"])))
+    assert res == "epic product"
 
-        future = asyncio.Future()
-        future.set_result(b"epic product")
-        reader.readline.return_value = future
 
-        vm._monitor = 4242
-        res = loop.run_until_complete(asyncio.async(vm._control_vm("test", [b"epic"])))
-        assert writer.write.called_with("test")
+def test_control_vm_keep_session(vm, loop, running_subprocess_mock):
 
-    assert res == "epic product"
+    vm._process = running_subprocess_mock
+    vm._monitor = 4242
+    with asyncio_patch("gns3server.modules.qemu.qemu_monitor.QemuMonitor.execute", return_value=[]):
+        loop.run_until_complete(asyncio.async(vm._control_vm("stop")))
+        session = vm._monitor_session
+        loop.run_until_complete(asyncio.async(vm._control_vm("cont")))
+        assert vm._monitor_session is session
+
+
+def test_get_vm_status_qmp(vm, loop, running_subprocess_mock):
+
+    vm._process = running_subprocess_mock
+    vm._monitor = 4242
+    vm.manager.config.set("Qemu", "monitor_protocol", "qmp")
+    with asyncio_patch("gns3server.modules.qemu.qemu_monitor.QemuQMPMonitor.execute", return_value={"status": "paused", "running": False}) as mock:
+        assert loop.run_until_complete(asyncio.async(vm._get_vm_status())) == "paused"
+        mock.assert_called_with("query-status")
+    assert vm._monitor_options() == ["-qmp", "tcp:127.0.0.1:4242,server,nowait"]
 
 
 def test_build_command(vm, loop, fake_qemu_binary, port_manager):
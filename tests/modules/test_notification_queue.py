@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from gns3server.modules.notification_queue import Notification, NotificationQueue
+
+
+def test_notification_data():
+
+    notification = Notification("vm.created", {"a": "b"})
+    assert notification == ("vm.created", {"a": "b"})
+    assert notification.data == b'{"action": "vm.created", "event": {"a": "b"}}\n'
+
+
+def test_notification_data_serialized_once():
+
+    vm = MagicMock()
+    vm.__json__ = MagicMock(return_value={"name": "PC1"})
+    notification = Notification("vm.started", vm)
+    assert json.loads(notification.data.decode())["event"] == {"name": "PC1"}
+    assert json.loads(notification.data.decode())["event"] == {"name": "PC1"}
+    assert vm.__json__.call_count == 1
+
+
+def test_queue_get_nowait():
+
+    queue = NotificationQueue()
+    assert queue.empty()
+    queue.put_nowait(("test", {}))
+    (action, event) = queue.get_nowait()
+    assert action == "test"
+    assert queue.empty()
+    with pytest.raises(asyncio.QueueEmpty):
+        queue.get_nowait()
+
+
+def test_queue_get(loop):
+
+    queue = NotificationQueue()
+    loop.call_soon(queue.put_nowait, ("test", {}))
+    assert loop.run_until_complete(asyncio.wait_for(queue.get(), 1)) == ("test", {})
+
+
+def test_queue_get_batch(loop):
+
+    queue = NotificationQueue()
+    loop.call_soon(queue.put_nowait, ("test", {"a": 1}))
+    loop.call_later(0.01, queue.put_nowait, ("test", {"a": 2}))
+    batch = loop.run_until_complete(queue.get_batch(timeout=1, window=0.05))
+    assert batch == [("test", {"a": 1}), ("test", {"a": 2})]
+    assert queue.empty()
+
+
+def test_queue_get_batch_timeout(loop):
+
+    queue = NotificationQueue()
+    assert loop.run_until_complete(queue.get_batch(timeout=0.01)) == []
+
+
+def test_queue_full_drop_oldest(loop):
+
+    queue = NotificationQueue(maxsize=2)
+    for i in range(4):
+        queue.put_nowait(("log.info", {"message": i}))
+    assert queue.qsize() == 2
+    assert queue.dropped == 2
+    batch = loop.run_until_complete(queue.get_batch(timeout=1, window=0))
+    assert batch[0].action == "log.warning"
+    assert "2 notifications" in batch[0].event["message"]
+    assert [n.event["message"] for n in batch[1:]] == [2, 3]
+    assert queue.dropped == 0
+
+
+def test_queue_full_coalesce():
+
+    vm = MagicMock()
+    vm.id = "vm1"
+    queue = NotificationQueue(maxsize=2)
+    queue.put_nowait(("vm.started", vm))
+    queue.put_nowait(("log.info", {}))
+    queue.put_nowait(("vm.stopped", vm))
+    queue.put_nowait(("project.export", {"project_id": "p1", "progress": 10}))
+    assert queue.dropped == 1
+    assert [n.action for n in (queue.get_nowait(), queue.get_nowait())] == ["vm.stopped", "project.export"]
@@ -19,7 +19,7 @@ import aiohttp
 import pytest
 import sys
 from unittest.mock import patch
-from gns3server.modules.port_manager import PortManager
+from gns3server.modules.port_manager import PortManager, PortAllocator
 from gns3server.modules.project import Project
 
 
@@ -117,3 +117,47 @@ def test_find_unused_port():
 def test_find_unused_port_invalid_range():
     with pytest.raises(aiohttp.web.HTTPConflict):
         p = PortManager().find_unused_port(10000, 1000)
+
+
+def test_get_free_udp_ports():
+    pm = PortManager()
+    project = Project()
+    ports = pm.get_free_udp_ports(project, 3)
+    assert len(set(ports)) == 3
+    for port in ports:
+        assert port in pm.udp_ports
+        with pytest.raises(aiohttp.web.HTTPConflict):
+            pm.reserve_udp_port(port, project)
+
+
+def test_get_free_udp_ports_not_enough_ports():
+    pm = PortManager()
+    pm.udp_port_range = (10000, 10001)
+    project = Project()
+    with pytest.raises(aiohttp.web.HTTPConflict):
+        pm.get_free_udp_ports(project, 3)
+    assert len(pm.udp_ports) == 0
+
+
+def test_get_free_tcp_port_skip_port_used_by_another_program():
+    pm = PortManager()
+    project = Project()
+    with patch("gns3server.modules.port_manager.PortManager._check_port") as mock_check:
+
+        def execute_mock(host, port, *args):
+            if port == 5000:
+                raise OSError("Port is already used")
+            return True
+
+        mock_check.side_effect = execute_mock
+        assert pm.get_free_tcp_port(project) == 5001
+
+
+def test_port_allocator():
+    allocator = PortAllocator(5, 10, used_ports=[6])
+    # 7 and 9 are banned ports
+    assert list(allocator.candidates()) == [5, 8, 10]
+    allocator.mark_used(5)
+    allocator.mark_free(6)
+    # the cursor has wrapped around the range
+    assert list(allocator.candidates()) == [6, 8, 10]
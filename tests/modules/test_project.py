@@ -192,6 +192,7 @@ def test_project_close(loop, vm, project):
         loop.run_until_complete(asyncio.async(project.close()))
         assert mock.called
     assert vm.id not in vm.manager._vms
+    assert "VPCS" in project.shutdown_report["stages"]["vms"]
 
 
 def test_project_close_temporary_project(loop, manager):
@@ -264,7 +265,7 @@ def test_list_files(tmpdir, loop):
         ]
 
 
-def test_export(tmpdir):
+def test_export(tmpdir, loop):
     project = Project()
     path = project.path
     os.makedirs(os.path.join(path, "vm-1", "dynamips"))
@@ -281,7 +282,7 @@ def test_export(tmpdir):
     with open(os.path.join(path, "project-files", "snapshots", "test"), 'w+') as f:
         f.write("WORLD")
 
-    z = project.export()
+    z = loop.run_until_complete(asyncio.async(project.export()))
 
     with open(str(tmpdir / 'zipfile.zip'), 'wb') as f:
         for data in z:
@@ -298,7 +299,7 @@ def test_export(tmpdir):
         assert 'vm-1/dynamips/test_log.txt' not in myzip.namelist()
 
 
-def test_export_fix_path(tmpdir):
+def test_export_fix_path(tmpdir, loop):
     """
     Fix absolute image path
     """
@@ -321,7 +322,7 @@ def test_export_fix_path(tmpdir):
     with open(os.path.join(path, "test.gns3"), 'w+') as f:
         json.dump(topology, f)
 
-    z = project.export()
+    z = loop.run_until_complete(asyncio.async(project.export()))
     with open(str(tmpdir / 'zipfile.zip'), 'wb') as f:
         for data in z:
             f.write(data)
@@ -333,7 +334,7 @@ def test_export_fix_path(tmpdir):
     assert topology["topology"]["nodes"][0]["properties"]["image"] == "c3725-adventerprisek9-mz.124-25d.image"
 
 
-def test_export_with_images(tmpdir):
+def test_export_with_images(tmpdir, loop):
     """
     Fix absolute image path
     """
@@ -361,7 +362,7 @@ def test_export_with_images(tmpdir):
         json.dump(topology, f)
 
     with patch("gns3server.modules.Dynamips.get_images_directory", return_value=str(tmpdir / "IOS"),):
-        z = project.export(include_images=True)
+        z = loop.run_until_complete(asyncio.async(project.export(include_images=True)))
         with open(str(tmpdir / 'zipfile.zip'), 'wb') as f:
             for data in z:
                 f.write(data)
@@ -370,7 +371,7 @@ def test_export_with_images(tmpdir):
         myzip.getinfo("images/IOS/test.image")
 
 
-def test_export_with_vm(tmpdir):
+def test_export_with_vm(tmpdir, loop):
     project = Project()
     path = project.path
     os.makedirs(os.path.join(path, "vm-1", "dynamips"))
@@ -391,7 +392,7 @@ def test_export_with_vm(tmpdir):
     with open(os.path.join(path, "servers", "vm", "project-files", "docker", "busybox"), 'w+') as f:
         f.write("DOCKER")
 
-    z = project.export()
+    z = loop.run_until_complete(asyncio.async(project.export()))
 
     with open(str(tmpdir / 'zipfile.zip'), 'wb') as f:
         for data in z:
@@ -491,3 +492,72 @@ def test_import_with_images(tmpdir):
     # TEST import images
     path = os.path.join(project._config().get("images_path"), "IOS", "test.image")
     assert os.path.exists(path), path
+
+
+def test_export_progress(tmpdir, loop):
+    project = Project()
+    path = project.path
+    os.makedirs(os.path.join(path, "vm-1", "qemu"))
+    with open(os.path.join(path, "vm-1", "qemu", "hda_disk.qcow2"), 'wb+') as f:
+        f.write(b"QFI\xfb" * 1024)
+
+    queue = project.get_listen_queue()
+    output = []
+
+    @asyncio.coroutine
+    def write(data):
+        output.append(data)
+
+    z = loop.run_until_complete(asyncio.async(project.export()))
+    loop.run_until_complete(asyncio.async(z.stream(write)))
+    project.stop_listen_queue(queue)
+
+    with open(str(tmpdir / 'zipfile.zip'), 'wb') as f:
+        f.write(b"".join(output))
+    with zipfile.ZipFile(str(tmpdir / 'zipfile.zip')) as myzip:
+        assert myzip.getinfo("vm-1/qemu/hda_disk.qcow2").compress_type == zipfile.ZIP_STORED
+
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    assert events[-1] == ("project.export", {"project_id": project.id, "progress": 100})
+
+
+def test_export_unreadable_file(tmpdir, loop):
+    project = Project()
+    path = project.path
+    with open(os.path.join(path, "a"), 'w+') as f:
+        f.write("A")
+    with open(os.path.join(path, "b"), 'w+') as f:
+        f.write("B")
+
+    queue = project.get_listen_queue()
+    z = loop.run_until_complete(asyncio.async(project.export()))
+    os.remove(os.path.join(path, "b"))
+    output = []
+
+    @asyncio.coroutine
+    def write(data):
+        output.append(data)
+
+    loop.run_until_complete(asyncio.async(z.stream(write)))
+    project.stop_listen_queue(queue)
+
+    with open(str(tmpdir / 'zipfile.zip'), 'wb') as f:
+        f.write(b"".join(output))
+    with zipfile.ZipFile(str(tmpdir / 'zipfile.zip')) as myzip:
+        assert myzip.namelist() == ["a"]
+
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    assert ("log.warning", {"message": "Could not export file {}: [Errno 2] No such file or directory: '{}'".format(os.path.join(path, "b"), os.path.join(path, "b"))}) in events
+
+
+def test_emit_shared_notification():
+
+    project = Project(project_id=str(uuid4()))
+    queue1 = project.get_listen_queue()
+    queue2 = project.get_listen_queue()
+    project.emit("test", {})
+    assert queue1.get_nowait() is queue2.get_nowait()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import asyncio
+import pytest
+
+from gns3server.modules.shutdown_scheduler import ShutdownScheduler
+
+
+def test_concurrency(loop):
+
+    running = {"VirtualBox": 0, "VPCS": 0}
+    peak = {"VirtualBox": 0, "VPCS": 0}
+
+    @asyncio.coroutine
+    def close(group):
+        running[group] += 1
+        peak[group] = max(peak[group], running[group])
+        yield from asyncio.sleep(0.01)
+        running[group] -= 1
+
+    progress = []
+    scheduler = ShutdownScheduler("test", progress=lambda done, total: progress.append((done, total)))
+    scheduler.set_concurrency("VirtualBox", 2)
+    for i in range(6):
+        scheduler.add("vms", "VirtualBox", "close vm {}".format(i), close, "VirtualBox")
+        scheduler.add("vms", "VPCS", "close vm {}".format(i), close, "VPCS")
+    loop.run_until_complete(asyncio.async(scheduler.run()))
+
+    assert peak == {"VirtualBox": 2, "VPCS": 6}
+    assert progress[-1] == (12, 12)
+    report = scheduler.report()
+    assert report["stages"]["vms"]["VirtualBox"]["jobs"] == 6
+    assert report["stages"]["vms"]["VPCS"]["errors"] == 0
+
+
+def test_stage_order(loop):
+
+    order = []
+
+    @asyncio.coroutine
+    def job(name):
+        order.append(name)
+
+    scheduler = ShutdownScheduler("test")
+    scheduler.add("after", "Dynamips", "closed hook", job, "after")
+    scheduler.add("hypervisors", "Dynamips", "stop hypervisor", job, "hypervisors")
+    scheduler.add("vms", "Dynamips", "close router", job, "vms")
+    scheduler.add("before", "Dynamips", "closing hook", job, "before")
+    loop.run_until_complete(asyncio.async(scheduler.run()))
+    assert order == ["before", "vms", "hypervisors", "after"]
+
+
+def test_errors(loop):
+
+    closed = []
+
+    @asyncio.coroutine
+    def fail():
+        raise ValueError("error")
+
+    @asyncio.coroutine
+    def close():
+        closed.append(True)
+
+    # errors of the jobs are only logged
+    scheduler = ShutdownScheduler("test")
+    scheduler.add("vms", "VPCS", "close vm", fail)
+    scheduler.add("after", "VPCS", "closed hook", close)
+    loop.run_until_complete(asyncio.async(scheduler.run()))
+    assert closed == [True]
+    assert scheduler.report()["stages"]["vms"]["VPCS"]["errors"] == 1
+
+    # the error of a critical job stops the next stages
+    scheduler.add("before", "VPCS", "closing hook", fail, critical=True)
+    scheduler.add("vms", "VPCS", "close vm", close)
+    with pytest.raises(ValueError):
+        loop.run_until_complete(asyncio.async(scheduler.run()))
+    assert closed == [True]
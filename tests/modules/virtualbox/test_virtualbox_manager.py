@@ -97,3 +97,79 @@ def test_list_images(manager, loop):
         {"vmname": "Windows 8.1", "ram": 512},
         {"vmname": "Linux Microcore 4.7.1", "ram": 256}
     ]
+
+
+def test_execute_parallel_vms(manager, loop):
+
+    running = {}
+    peak = {}
+
+    @asyncio.coroutine
+    def execute_mock(subcommand, args, timeout):
+        vmname = args[0]
+        running[vmname] = running.get(vmname, 0) + 1
+        peak["total"] = max(peak.get("total", 0), sum(running.values()))
+        peak[vmname] = max(peak.get(vmname, 0), running[vmname])
+        yield from asyncio.sleep(0.01)
+        running[vmname] -= 1
+        return []
+
+    with asyncio_patch("gns3server.modules.virtualbox.VirtualBox._execute") as mock:
+        mock.side_effect = execute_mock
+        tasks = []
+        for vmname in ("VM1", "VM2"):
+            for i in range(3):
+                tasks.append(asyncio.async(manager.execute("modifyvm", [vmname, "--nic{} null".format(i + 1)])))
+        loop.run_until_complete(asyncio.wait(tasks))
+
+    # the commands on different VMs run at the same time, not on the same VM
+    assert peak["total"] == 2
+    assert peak["VM1"] == 1
+    assert peak["VM2"] == 1
+    assert manager._vm_locks == {}
+
+
+def test_execute_queued_commands(manager, loop):
+
+    running = []
+    peak = []
+
+    @asyncio.coroutine
+    def execute_mock(subcommand, args, timeout):
+        running.append(args[1])
+        peak.append(len(running))
+        yield from asyncio.sleep(0.01)
+        running.remove(args[1])
+        return []
+
+    with asyncio_patch("gns3server.modules.virtualbox.VirtualBox._execute") as mock:
+        mock.side_effect = execute_mock
+        first = asyncio.async(manager.execute("modifyvm", ["VM1", "--nic1 null"]))
+        second = asyncio.async(manager.execute("modifyvm", ["VM1", "--nic2 null"]))
+        loop.run_until_complete(first)
+        # the second command is still waiting for the lock of the VM
+        third = asyncio.async(manager.execute("modifyvm", ["VM1", "--nic3 null"]))
+        loop.run_until_complete(asyncio.wait([second, third]))
+
+    assert mock.call_count == 3
+    assert max(peak) == 1
+    assert manager._vm_locks == {}
+
+
+def test_showvminfo_cache(manager, loop):
+
+    with asyncio_patch("gns3server.modules.virtualbox.VirtualBox._execute", return_value=['VMState="running"']) as mock:
+        loop.run_until_complete(asyncio.async(manager.showvminfo("VM1")))
+        loop.run_until_complete(asyncio.async(manager.showvminfo("VM1")))
+        assert mock.call_count == 1
+        loop.run_until_complete(asyncio.async(manager.execute("getextradata", ["VM1", "GNS3/Clone"])))
+        loop.run_until_complete(asyncio.async(manager.showvminfo("VM1")))
+        assert mock.call_count == 2
+
+        # a change of the VM drops the cache
+        loop.run_until_complete(asyncio.async(manager.execute("controlvm", ["VM1", "poweroff"])))
+        loop.run_until_complete(asyncio.async(manager.showvminfo("VM1")))
+        assert mock.call_count == 4
+
+        loop.run_until_complete(asyncio.async(manager.showvminfo("VM1", max_age=0)))
+        assert mock.call_count == 5
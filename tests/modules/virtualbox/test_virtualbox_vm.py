@@ -18,6 +18,7 @@
 import pytest
 import asyncio
 from tests.utils import asyncio_patch
+from unittest.mock import patch
 
 from gns3server.modules.virtualbox.virtualbox_vm import VirtualBoxVM
 from gns3server.modules.virtualbox.virtualbox_error import VirtualBoxError
@@ -67,3 +68,34 @@ def test_json(vm, tmpdir, project):
     project._path = str(tmpdir)
     vm._linked_clone = True
     assert vm.__json__()["vm_directory"] is not None
+
+
+def test_remote_console(loop, vm, tmpdir, free_console_port):
+
+    pipe_path = str(tmpdir / "pipe")
+    received = asyncio.Future()
+
+    @asyncio.coroutine
+    def serial_port(reader, writer):
+        writer.write(b"login:")
+        received.set_result((yield from reader.read(1024)))
+
+    @asyncio.coroutine
+    def go():
+        pipe_server = yield from asyncio.start_unix_server(serial_port, pipe_path)
+        vm.console = free_console_port
+        with patch("gns3server.modules.virtualbox.virtualbox_vm.VirtualBoxVM._get_pipe_name", return_value=pipe_path):
+            yield from vm._start_remote_console()
+        try:
+            reader, writer = yield from asyncio.open_connection("127.0.0.1", free_console_port)
+            yield from reader.readexactly(12)  # telnet negotiation
+            assert (yield from reader.readexactly(6)) == b"login:"
+            writer.write(b"admin")
+            assert (yield from received) == b"admin"
+            writer.close()
+        finally:
+            vm._stop_remote_console()
+            pipe_server.close()
+
+    loop.run_until_complete(asyncio.wait_for(go(), 5))
+    assert vm._telnet_server is None
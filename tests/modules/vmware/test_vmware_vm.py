@@ -71,3 +71,12 @@ def test_stop_capture(vm, tmpdir, manager, free_console_port, loop):
     assert vm._ethernet_adapters[0].get_nio(0).capturing
     loop.run_until_complete(asyncio.async(vm.stop_capture(0)))
     assert vm._ethernet_adapters[0].get_nio(0).capturing is False
+
+
+def test_set_enable_remote_console_error(vm, loop):
+
+    vm._started = True
+    with asyncio_patch("gns3server.modules.vmware.vmware_vm.VMwareVM._start_remote_console", side_effect=VMwareError("Could not open the pipe")):
+        with pytest.raises(VMwareError):
+            loop.run_until_complete(asyncio.async(vm.set_enable_remote_console(True)))
+    assert not vm.enable_remote_console
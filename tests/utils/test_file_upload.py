@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import pytest
+import asyncio
+import hashlib
+import tarfile
+
+from gns3server.utils.asyncio.file_upload import FileUpload, TarExtractor, WRITE_BUFFER_SIZE
+
+
+def upload_data(loop, upload, chunks):
+
+    @asyncio.coroutine
+    def go():
+        try:
+            yield from upload.open()
+            for chunk in chunks:
+                yield from upload.write(chunk)
+            return (yield from upload.finish())
+        finally:
+            upload.close()
+    return loop.run_until_complete(asyncio.async(go()))
+
+
+def test_upload(loop, tmpdir):
+
+    path = str(tmpdir / "images" / "test")
+    chunks = [os.urandom(100 * 1024) for _ in range(0, 25)]
+    data = b"".join(chunks)
+    assert len(data) > WRITE_BUFFER_SIZE
+
+    digest = upload_data(loop, FileUpload(path), chunks)
+    assert digest == hashlib.md5(data).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_upload_resume(loop, tmpdir):
+
+    path = str(tmpdir / "test")
+    # the end of the interrupted upload is sent again
+    with open(path + ".tmp", "wb") as f:
+        f.write(b"hello wor")
+    assert FileUpload.resume_offset(path) == 9
+
+    digest = upload_data(loop, FileUpload(path, offset=6), [b"world"])
+    assert digest == hashlib.md5(b"hello world").hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == b"hello world"
+
+
+def test_upload_resume_invalid_offset(loop, tmpdir):
+
+    path = str(tmpdir / "test")
+    with pytest.raises(ValueError):
+        upload_data(loop, FileUpload(path, offset=6), [b"world"])
+
+
+def test_tar_extractor(loop, tmpdir):
+
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        info = tarfile.TarInfo("a/b.txt")
+        info.size = 5
+        tar.addfile(info, io.BytesIO(b"hello"))
+    data = archive.getvalue()
+
+    @asyncio.coroutine
+    def go():
+        extractor = TarExtractor(str(tmpdir / "dst"))
+        extractor.start()
+        try:
+            for i in range(0, len(data), 100):
+                yield from extractor.write(data[i:i + 100])
+            yield from extractor.finish()
+        finally:
+            extractor.close()
+
+    loop.run_until_complete(asyncio.async(go()))
+    with open(str(tmpdir / "dst" / "a" / "b.txt")) as f:
+        assert f.read() == "hello"
+
+
+def test_tar_extractor_invalid(loop, tmpdir):
+
+    @asyncio.coroutine
+    def go():
+        extractor = TarExtractor(str(tmpdir / "dst"))
+        extractor.start()
+        try:
+            yield from extractor.write(b"not a tar archive" * 100)
+            yield from extractor.finish()
+        finally:
+            extractor.close()
+
+    with pytest.raises(tarfile.TarError):
+        loop.run_until_complete(asyncio.async(go()))
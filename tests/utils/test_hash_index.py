@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import asyncio
+from unittest.mock import patch
+
+from gns3server.utils.hash_index import HashIndex
+
+
+def test_get(tmpdir):
+
+    with open(str(tmpdir / "a"), "w+") as f:
+        f.write("hello")
+    index = HashIndex(str(tmpdir / "index"))
+    assert index.get(str(tmpdir / "a")) == "5d41402abc4b2a76b9719d911017c592"
+
+    # the digest is reloaded from the disk, the file is not read again
+    reloaded = HashIndex(str(tmpdir / "index"))
+    with patch("gns3server.utils.hash_index.hash_file") as mock:
+        assert reloaded.get(str(tmpdir / "a")) == "5d41402abc4b2a76b9719d911017c592"
+        assert not mock.called
+
+
+def test_load_forget_deleted_files(tmpdir):
+
+    with open(str(tmpdir / "a"), "w+") as f:
+        f.write("hello")
+    index = HashIndex(str(tmpdir / "index"))
+    index.get(str(tmpdir / "a"))
+    os.remove(str(tmpdir / "a"))
+    assert HashIndex(str(tmpdir / "index"))._entries == {}
+
+
+def test_get_many(tmpdir, loop):
+
+    with open(str(tmpdir / "a"), "w+") as f:
+        f.write("hello")
+    with open(str(tmpdir / "b"), "w+") as f:
+        f.write("world")
+
+    index = HashIndex(str(tmpdir / "index"))
+    paths = [str(tmpdir / "a"), str(tmpdir / "b"), str(tmpdir / "missing")]
+    digests = loop.run_until_complete(asyncio.async(index.get_many(paths)))
+    assert digests == {
+        str(tmpdir / "a"): "5d41402abc4b2a76b9719d911017c592",
+        str(tmpdir / "b"): "7d793037a0760186574b0282f2f435e7"
+    }
+    assert os.path.exists(str(tmpdir / "index"))
+
+
+def test_set(tmpdir):
+
+    with open(str(tmpdir / "a"), "w+") as f:
+        f.write("hello")
+
+    index = HashIndex(str(tmpdir / "index"))
+    index.set(str(tmpdir / "a"), "5d41402abc4b2a76b9719d911017c592")
+    with patch("gns3server.utils.hash_index.hash_file") as mock:
+        assert index.get(str(tmpdir / "a")) == "5d41402abc4b2a76b9719d911017c592"
+        assert not mock.called
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from gns3server.utils.asyncio.hypervisor_protocol import HypervisorProtocol
+from gns3server.ubridge.ubridge_error import UbridgeError
+
+
+@pytest.fixture
+def protocol():
+    protocol = HypervisorProtocol(UbridgeError, "uBridge", "127.0.0.1", 4242, lambda: True)
+    protocol.connection_made(MagicMock())
+    return protocol
+
+
+def test_send_batch(loop, protocol):
+
+    task = asyncio.async(protocol.send_batch(["hypervisor version", "bridge list", "bridge start unknown"], return_exceptions=True))
+    loop.call_soon(protocol.data_received, b"100-0.9.4\r\n101 bridge0 (NIOs = 2)\r")
+    loop.call_soon(protocol.data_received, b"\n101 bridge1 (NIOs = 0)\r\n100-OK\r\n209-unknown bridge\r\n")
+    results = loop.run_until_complete(task)
+    protocol._transport.write.assert_called_once_with(b"hypervisor version\nbridge list\nbridge start unknown\n")
+    assert results[0] == ["0.9.4"]
+    assert results[1] == ["bridge0 (NIOs = 2)", "bridge1 (NIOs = 0)"]
+    assert isinstance(results[2], UbridgeError)
+    assert str(results[2]) == "unknown bridge"
+    assert protocol.stats["bridge list"]["count"] == 1
+    assert protocol.stats["bridge start"]["errors"] == 1
+
+
+def test_send_batch_error(loop, protocol):
+
+    task = asyncio.async(protocol.send_batch(["bridge start unknown"]))
+    loop.call_soon(protocol.data_received, b"209-unknown bridge\r\n")
+    with pytest.raises(UbridgeError):
+        loop.run_until_complete(task)
+
+
+def test_connection_lost(loop, protocol):
+
+    task = asyncio.async(protocol.send_batch(["bridge list"]))
+    loop.call_soon(protocol.connection_lost, None)
+    with pytest.raises(UbridgeError):
+        loop.run_until_complete(task)
+    assert not protocol.connected
+
+
+def test_not_connected(loop):
+
+    protocol = HypervisorProtocol(UbridgeError, "uBridge", "127.0.0.1", 4242)
+    with pytest.raises(UbridgeError):
+        loop.run_until_complete(asyncio.async(protocol.send_batch(["bridge list"])))
@@ -18,6 +18,7 @@
 import os
 
 from gns3server.utils.images import md5sum, remove_checksum
+from gns3server.utils.hash_index import HashIndex
 
 
 def test_md5sum(tmpdir):
@@ -27,20 +28,21 @@ def test_md5sum(tmpdir):
         f.write('hello')
 
     assert md5sum(fake_img) == '5d41402abc4b2a76b9719d911017c592'
-    with open(str(tmpdir / 'hello载.md5sum')) as f:
-        assert f.read() == '5d41402abc4b2a76b9719d911017c592'
+    assert not os.path.exists(str(tmpdir / 'hello载.md5sum'))
+    assert HashIndex.instance_for(fake_img).get(fake_img) == '5d41402abc4b2a76b9719d911017c592'
 
 
-def test_md5sum_existing_digest(tmpdir):
+def test_md5sum_image_changed(tmpdir):
     fake_img = str(tmpdir / 'hello')
 
     with open(fake_img, 'w+') as f:
         f.write('hello')
+    assert md5sum(fake_img) == '5d41402abc4b2a76b9719d911017c592'
 
-    with open(str(tmpdir / 'hello.md5sum'), 'w+') as f:
-        f.write('aaaaa02abc4b2a76b9719d911017c592')
-
-    assert md5sum(fake_img) == 'aaaaa02abc4b2a76b9719d911017c592'
+    with open(fake_img, 'w+') as f:
+        f.write('world!')
+    os.utime(fake_img, ns=(0, 0))
+    assert md5sum(fake_img) == '08cf82251c975a5e9734699fadf5e9c0'
 
 
 def test_md5sum_existing_digest_but_missing_image(tmpdir):
@@ -58,10 +60,15 @@ def test_md5sum_none(tmpdir):
 
 def test_remove_checksum(tmpdir):
 
+    with open(str(tmpdir / 'hello'), 'w+') as f:
+        f.write('hello')
+    md5sum(str(tmpdir / 'hello'))
+
     with open(str(tmpdir / 'hello.md5sum'), 'w+') as f:
         f.write('aaaaa02abc4b2a76b9719d911017c592')
     remove_checksum(str(tmpdir / 'hello'))
 
     assert not os.path.exists(str(tmpdir / 'hello.md5sum'))
+    assert str(tmpdir / 'hello') not in HashIndex.instance_for(str(tmpdir / 'hello'))._entries
 
     remove_checksum(str(tmpdir / 'not_exists'))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import struct
+import socket
+import pytest
+
+from gns3server.utils.pcap_filter import PcapFilter, PcapFilterError, LINKTYPE_ETHERNET, LINKTYPE_C_HDLC
+
+
+def ethernet(payload, ethertype=0x0800, src="00:00:00:00:00:01", dst="00:00:00:00:00:02", vlan=None):
+
+    header = bytes(int(x, 16) for x in dst.split(":")) + bytes(int(x, 16) for x in src.split(":"))
+    if vlan is not None:
+        header += struct.pack("!HH", 0x8100, vlan)
+    return header + struct.pack("!H", ethertype) + payload
+
+
+def ipv4(src, dst, protocol, payload):
+
+    return struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(payload), 0, 0, 64, protocol, 0,
+                       socket.inet_aton(src), socket.inet_aton(dst)) + payload
+
+
+def ipv6(src, dst, protocol, payload):
+
+    return struct.pack("!IHBB16s16s", 6 << 28, len(payload), protocol, 64,
+                       socket.inet_pton(socket.AF_INET6, src), socket.inet_pton(socket.AF_INET6, dst)) + payload
+
+
+def ports(sport, dport):
+
+    return struct.pack("!HH", sport, dport) + b"\0" * 16
+
+
+TCP_PACKET = ethernet(ipv4("10.0.0.1", "10.0.0.2", 6, ports(1025, 80)))
+UDP_PACKET = ethernet(ipv4("10.0.0.2", "192.168.1.1", 17, ports(53, 1026)), vlan=10)
+IPV6_PACKET = ethernet(ipv6("2001:db8::1", "2001:db8::2", 6, ports(22, 2000)), ethertype=0x86dd)
+ARP_PACKET = ethernet(struct.pack("!HHBBH6s4s6s4s", 1, 0x0800, 6, 4, 1, b"\0" * 6, socket.inet_aton("10.0.0.1"),
+                                  b"\0" * 6, socket.inet_aton("10.0.0.3")), ethertype=0x0806)
+PACKETS = {"tcp": TCP_PACKET, "udp": UDP_PACKET, "ipv6": IPV6_PACKET, "arp": ARP_PACKET}
+
+
+def matching(expression):
+
+    packet_filter = PcapFilter(expression)
+    return sorted(name for name, packet in PACKETS.items() if packet_filter.match(LINKTYPE_ETHERNET, packet))
+
+
+def test_protocols():
+
+    assert matching("ip") == ["tcp", "udp"]
+    assert matching("ip6") == ["ipv6"]
+    assert matching("arp") == ["arp"]
+    assert matching("tcp") == ["ipv6", "tcp"]
+    assert matching("udp") == ["udp"]
+    assert matching("vlan") == ["udp"]
+    assert matching("vlan 10") == ["udp"]
+    assert matching("vlan 20") == []
+
+
+def test_host_and_net():
+
+    assert matching("host 10.0.0.1") == ["arp", "tcp"]
+    assert matching("src host 10.0.0.2") == ["udp"]
+    assert matching("dst host 10.0.0.2") == ["tcp"]
+    assert matching("host 2001:db8::2") == ["ipv6"]
+    assert matching("net 192.168.0.0/16") == ["udp"]
+    assert matching("net 2001:db8::/32") == ["ipv6"]
+
+
+def test_ports():
+
+    assert matching("port 80") == ["tcp"]
+    assert matching("tcp port 53") == []
+    assert matching("udp src port 53") == ["udp"]
+    assert matching("dst port 2000") == ["ipv6"]
+
+
+def test_ether():
+
+    assert matching("ether src 00:00:00:00:00:01") == ["arp", "ipv6", "tcp", "udp"]
+    assert matching("ether dst host 00:00:00:00:00:01") == []
+
+
+def test_operators():
+
+    assert matching("tcp and not ip6") == ["tcp"]
+    assert matching("udp or arp") == ["arp", "udp"]
+    assert matching("!(tcp || udp)") == ["arp"]
+    # and/or have the same precedence, evaluated from left to right
+    assert matching("arp or udp and vlan") == ["udp"]
+    assert matching("less 50") == ["arp"]
+    assert matching("greater 70") == ["ipv6"]
+
+
+def test_c_hdlc():
+
+    packet = struct.pack("!BBH", 0x0f, 0, 0x0800) + ipv4("10.0.0.1", "10.0.0.2", 17, ports(1, 2))
+    assert PcapFilter("udp and host 10.0.0.1").match(LINKTYPE_C_HDLC, packet)
+
+
+def test_truncated_packet():
+
+    assert not PcapFilter("port 80").match(LINKTYPE_ETHERNET, TCP_PACKET[:36])
+    assert PcapFilter("host 10.0.0.1").match(LINKTYPE_ETHERNET, TCP_PACKET[:36])
+
+
+@pytest.mark.parametrize("expression", ["", "tcp and", "host", "host 10.0.0.300", "port 70000", "(tcp", "tcp)", "foo", "ether host 00:11"])
+def test_invalid(expression):
+
+    with pytest.raises(PcapFilterError):
+        PcapFilter(expression)
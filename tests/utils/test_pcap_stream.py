@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import struct
+import asyncio
+
+from gns3server.utils.pcap_filter import PcapFilter
+from gns3server.utils.asyncio.pcap_stream import PcapParser, PcapStream
+
+PCAP_HEADER = struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)
+
+
+def packet(protocol):
+
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 28, 0, 0, 64, protocol, 0, b"\x0a\0\0\x01", b"\x0a\0\0\x02")
+    return b"\0" * 12 + b"\x08\x00" + ip + struct.pack("!HHI", 1025, 80, 0)
+
+
+TCP_PACKET = packet(6)
+UDP_PACKET = packet(17)
+
+
+def record(packet):
+
+    return struct.pack("<IIII", 0, 0, len(packet), len(packet)) + packet
+
+
+def read(loop, subscriber, size):
+
+    data = b""
+    while len(data) < size:
+        data += loop.run_until_complete(asyncio.wait_for(subscriber.read(), 2))
+    return data
+
+
+def test_parser():
+
+    parser = PcapParser()
+    data = PCAP_HEADER + record(TCP_PACKET) + record(UDP_PACKET)
+    assert parser.feed(data[:10]) == []
+    assert parser.feed(data[10:30]) == []
+    assert parser.header == PCAP_HEADER
+    assert parser.linktype == 1
+    assert parser.feed(data[30:-1]) == [record(TCP_PACKET)]
+    assert parser.feed(data[-1:]) == [record(UDP_PACKET)]
+    assert parser.consumed == len(data)
+
+
+def test_parser_not_pcap():
+
+    parser = PcapParser()
+    assert parser.feed(b"hello") == [b"hello"]
+    assert parser.raw
+    assert parser.feed(b"world") == [b"world"]
+
+
+def test_shared_stream(loop, tmpdir):
+
+    path = str(tmpdir / "test.pcap")
+    with open(path, "wb") as f:
+        f.write(PCAP_HEADER + record(TCP_PACKET))
+
+    first = PcapStream.subscribe(path)
+    assert read(loop, first, len(PCAP_HEADER) + len(record(TCP_PACKET))) == PCAP_HEADER + record(TCP_PACKET)
+
+    # the second client receives the packets written before it subscribed
+    second = PcapStream.subscribe(path, PcapFilter("udp"))
+    assert len(PcapStream._streams) == 1
+    with open(path, "ab") as f:
+        f.write(record(UDP_PACKET))
+
+    assert read(loop, first, len(record(UDP_PACKET))) == record(UDP_PACKET)
+    assert read(loop, second, len(PCAP_HEADER) + len(record(UDP_PACKET))) == PCAP_HEADER + record(UDP_PACKET)
+
+    first.close()
+    second.close()
+    assert PcapStream._streams == {}
+
+
+def test_stream_truncated(loop, tmpdir):
+
+    path = str(tmpdir / "test.pcap")
+    with open(path, "wb") as f:
+        f.write(PCAP_HEADER + record(TCP_PACKET))
+
+    subscriber = PcapStream.subscribe(path)
+    read(loop, subscriber, len(PCAP_HEADER) + len(record(TCP_PACKET)))
+    open(path, "wb").close()
+    assert loop.run_until_complete(asyncio.wait_for(subscriber.read(), 2)) == b""
+    subscriber.close()
+    assert PcapStream._streams == {}
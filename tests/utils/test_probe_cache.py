@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import asyncio
+from unittest.mock import MagicMock
+
+from gns3server.utils.probe_cache import ProbeCache
+
+
+def _probe(loop, cache, path, name, output):
+
+    mock = MagicMock()
+
+    @asyncio.coroutine
+    def probe():
+        mock()
+        return output
+
+    result = loop.run_until_complete(asyncio.async(cache.probe(path, name, probe)))
+    return result, mock.called
+
+
+def test_probe(loop, tmpdir):
+
+    path = str(tmpdir / "vpcs")
+    with open(path, "w+") as f:
+        f.write("1")
+    cache = ProbeCache(str(tmpdir / "cache"))
+    assert _probe(loop, cache, path, "-v", "version 0.8") == ("version 0.8", True)
+    assert _probe(loop, cache, path, "-v", "version 0.9") == ("version 0.8", False)
+
+    # the cache is reloaded from the disk
+    cache = ProbeCache(str(tmpdir / "cache"))
+    assert cache.get(path, "-v") == "version 0.8"
+    assert cache.get(path, "-h") is None
+
+
+def test_probe_executable_changed(loop, tmpdir):
+
+    path = str(tmpdir / "vpcs")
+    with open(path, "w+") as f:
+        f.write("1")
+    cache = ProbeCache(str(tmpdir / "cache"))
+    _probe(loop, cache, path, "-v", "version 0.8")
+    _probe(loop, cache, path, "-h", "help")
+
+    with open(path, "w+") as f:
+        f.write("12")
+    assert cache.get(path, "-h") is None
+    assert _probe(loop, cache, path, "-v", "version 0.9") == ("version 0.9", True)
+
+
+def test_probe_not_a_file(loop, tmpdir):
+
+    cache = ProbeCache(str(tmpdir / "cache"))
+    assert _probe(loop, cache, str(tmpdir), "-v", "version 0.8") == ("version 0.8", True)
+    assert _probe(loop, cache, str(tmpdir), "-v", "version 0.9") == ("version 0.9", True)
+    assert not os.path.exists(str(tmpdir / "cache"))
+
+
+def test_remove(loop, tmpdir):
+
+    path = str(tmpdir / "iou.bin")
+    with open(path, "w+") as f:
+        f.write("1")
+    cache = ProbeCache(str(tmpdir / "cache"))
+    _probe(loop, cache, path, "ldd", "libssl => not found")
+    _probe(loop, cache, path, "-h", "help")
+    cache.remove(path, "ldd")
+    assert cache.get(path, "ldd") is None
+    assert cache.get(path, "-h") == "help"
+    cache.remove(path)
+    assert cache.get(path, "-h") is None
+    assert ProbeCache(str(tmpdir / "cache")).get(path, "-h") is None
+
+
+def test_instance(tmpdir):
+
+    assert ProbeCache.instance() is ProbeCache.instance()
+    assert os.path.basename(ProbeCache.instance().path) == ".gns3_probe_cache"
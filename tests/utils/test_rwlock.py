@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import asyncio
+import pytest
+
+from gns3server.utils.asyncio.rwlock import ReadWriteLock
+
+
+def test_readers(loop):
+
+    lock = ReadWriteLock()
+    loop.run_until_complete(asyncio.async(lock.acquire_read()))
+    loop.run_until_complete(asyncio.async(lock.acquire_read()))
+    assert lock.readers == 2
+    lock.release_read()
+    lock.release_read()
+    assert not lock.locked()
+
+
+def test_writer_waits_for_readers(loop):
+
+    lock = ReadWriteLock()
+    events = []
+
+    @asyncio.coroutine
+    def reader(name):
+        with (yield from lock.reader()):
+            events.append(name)
+            yield from asyncio.sleep(0.01)
+            events.append(name + " done")
+
+    @asyncio.coroutine
+    def writer():
+        with (yield from lock.writer()):
+            events.append("writer")
+            yield from asyncio.sleep(0.01)
+            events.append("writer done")
+
+    tasks = [asyncio.async(reader("r1")), asyncio.async(reader("r2")), asyncio.async(writer()), asyncio.async(reader("r3"))]
+    loop.run_until_complete(asyncio.wait(tasks))
+
+    # the readers share the lock, the writer runs alone and
+    # the reader arriving after the writer waits for it
+    assert events[:2] == ["r1", "r2"]
+    assert events.index("writer") > events.index("r1 done")
+    assert events.index("writer") > events.index("r2 done")
+    assert events.index("r3") > events.index("writer done")
+
+
+def test_cancel_waiting_writer(loop):
+
+    lock = ReadWriteLock()
+    loop.run_until_complete(asyncio.async(lock.acquire_read()))
+    task = asyncio.async(lock.acquire_write())
+    loop.run_until_complete(asyncio.sleep(0))
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        loop.run_until_complete(task)
+    # the cancelled writer doesn't block the next readers
+    loop.run_until_complete(asyncio.wait_for(lock.acquire_read(), timeout=1))
+    assert lock.readers == 2
+
+
+def test_release_not_acquired():
+
+    lock = ReadWriteLock()
+    with pytest.raises(RuntimeError):
+        lock.release_write()
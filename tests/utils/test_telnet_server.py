@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from unittest.mock import MagicMock
+
+from gns3server.utils.asyncio.telnet_server import AsyncioTelnetServer, RingBuffer
+
+
+def test_ring_buffer():
+
+    buffer = RingBuffer(8)
+    assert buffer.getvalue() == b""
+    buffer.write(b"hello")
+    assert buffer.getvalue() == b"hello"
+    buffer.write(b" world")
+    assert buffer.getvalue() == b"lo world"
+    assert len(buffer) == 8
+    buffer.write(b"0123456789")
+    assert buffer.getvalue() == b"23456789"
+
+
+def test_ring_buffer_disabled():
+
+    buffer = RingBuffer(0)
+    buffer.write(b"hello")
+    assert buffer.getvalue() == b""
+
+
+def test_scrollback(loop):
+
+    output = asyncio.StreamReader()
+    telnet = AsyncioTelnetServer(reader=output, writer=MagicMock(), binary=True, echo=True)
+
+    @asyncio.coroutine
+    def go():
+        server = yield from asyncio.start_server(telnet.run, "127.0.0.1", 0)
+        telnet.start()
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader1, writer1 = yield from asyncio.open_connection("127.0.0.1", port)
+            yield from reader1.readexactly(12)  # telnet negotiation
+            output.feed_data(b"Router>")
+            assert (yield from reader1.readexactly(7)) == b"Router>"
+
+            # the new client receives the previous output
+            reader2, writer2 = yield from asyncio.open_connection("127.0.0.1", port)
+            yield from reader2.readexactly(12)
+            assert (yield from reader2.readexactly(7)) == b"Router>"
+
+            output.feed_data(b"enable")
+            assert (yield from reader1.readexactly(6)) == b"enable"
+            assert (yield from reader2.readexactly(6)) == b"enable"
+            assert telnet.clients == 2
+
+            output.feed_eof()
+            assert (yield from reader1.read()) == b""
+            writer1.close()
+            writer2.close()
+        finally:
+            server.close()
+
+    loop.run_until_complete(asyncio.wait_for(go(), 5))
+
+
+def test_output_before_client(loop):
+
+    output = asyncio.StreamReader()
+    telnet = AsyncioTelnetServer(reader=output, writer=MagicMock(), binary=True, echo=True, scrollback=8)
+
+    @asyncio.coroutine
+    def go():
+        server = yield from asyncio.start_server(telnet.run, "127.0.0.1", 0)
+        telnet.start()
+        port = server.sockets[0].getsockname()[1]
+        try:
+            # the output is read while nobody is connected
+            output.feed_data(b"Booting... Router>")
+            yield from asyncio.sleep(0.1)
+            assert len(output._buffer) == 0
+
+            # the first client only gets the scrollback
+            reader, writer = yield from asyncio.open_connection("127.0.0.1", port)
+            yield from reader.readexactly(12)  # telnet negotiation
+            assert (yield from reader.readexactly(8)) == b" Router>"
+
+            # the output is no longer read when the console is closed
+            telnet.close()
+            assert (yield from reader.read()) == b""
+            yield from asyncio.sleep(0)
+            output.feed_data(b"enable")
+            yield from asyncio.sleep(0.1)
+            assert bytes(output._buffer) == b"enable"
+            writer.close()
+        finally:
+            server.close()
+
+    loop.run_until_complete(asyncio.wait_for(go(), 5))
+
+
+def test_start_on_first_client(loop):
+
+    output = asyncio.StreamReader()
+    telnet = AsyncioTelnetServer(reader=output, writer=MagicMock(), binary=True, echo=True)
+
+    @asyncio.coroutine
+    def go():
+        server = yield from asyncio.start_server(telnet.run, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            # start() is not called, the first client starts the reader
+            reader, writer = yield from asyncio.open_connection("127.0.0.1", port)
+            yield from reader.readexactly(12)  # telnet negotiation
+            output.feed_data(b"Router>")
+            assert (yield from reader.readexactly(7)) == b"Router>"
+            writer.close()
+        finally:
+            server.close()
+            telnet.close()
+
+    loop.run_until_complete(asyncio.wait_for(go(), 5))
+
+
+def test_slow_client_disconnected():
+
+    telnet = AsyncioTelnetServer(client_buffer_limit=10)
+    fast = MagicMock()
+    fast.transport.get_write_buffer_size.return_value = 0
+    slow = MagicMock()
+    slow.transport.get_write_buffer_size.return_value = 20
+    telnet._clients = {fast, slow}
+
+    telnet._broadcast(b"hello")
+    fast.write.assert_called_with(b"hello")
+    slow.write.assert_called_with(b"hello")
+    assert slow.transport.abort.called
+    assert not fast.transport.abort.called
+    assert telnet.clients == 1
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import io
+import os
+import zlib
+import asyncio
+import zipfile
+
+from gns3server.utils.zip_stream import ZipStream, crc32_combine
+
+
+def test_crc32_combine():
+
+    a = os.urandom(1000)
+    b = os.urandom(4096)
+    assert crc32_combine(zlib.crc32(a), zlib.crc32(b), len(b)) == zlib.crc32(a + b)
+    assert crc32_combine(zlib.crc32(a), 0, 0) == zlib.crc32(a)
+
+
+def _zip(tmpdir, progress=None):
+
+    with open(str(tmpdir / "config.txt"), "wb") as f:
+        f.write(b"interface f0/0\n" * 10000)
+    with open(str(tmpdir / "disk.qcow2"), "wb") as f:
+        f.write(os.urandom(10000))
+    open(str(tmpdir / "empty"), "wb").close()
+
+    z = ZipStream(chunk_size=4096, workers=2, progress=progress)
+    z.write(str(tmpdir / "config.txt"), "vm-1/config.txt")
+    z.write(str(tmpdir / "disk.qcow2"), "disk.qcow2")
+    z.write(str(tmpdir / "empty"), "empty")
+    z.writestr("project.gns3", b"{}")
+    return z
+
+
+def _check(data, tmpdir):
+
+    with zipfile.ZipFile(io.BytesIO(data)) as myzip:
+        assert myzip.testzip() is None
+        assert myzip.namelist() == ["vm-1/config.txt", "disk.qcow2", "empty", "project.gns3"]
+        assert myzip.read("vm-1/config.txt") == b"interface f0/0\n" * 10000
+        assert myzip.getinfo("vm-1/config.txt").compress_type == zipfile.ZIP_DEFLATED
+        with open(str(tmpdir / "disk.qcow2"), "rb") as f:
+            assert myzip.read("disk.qcow2") == f.read()
+        assert myzip.getinfo("disk.qcow2").compress_type == zipfile.ZIP_STORED
+        assert myzip.read("empty") == b""
+        assert myzip.read("project.gns3") == b"{}"
+
+
+def test_iter(tmpdir):
+
+    _check(b"".join(_zip(tmpdir)), tmpdir)
+
+
+def test_stream(tmpdir, loop):
+
+    progress = []
+    z = _zip(tmpdir, progress=lambda done, total: progress.append((done, total)))
+    output = []
+
+    @asyncio.coroutine
+    def write(data):
+        output.append(data)
+
+    loop.run_until_complete(asyncio.async(z.stream(write)))
+    _check(b"".join(output), tmpdir)
+    assert progress[-1] == (z.total_size, z.total_size)
+    # the archive is the same as the one built without workers
+    assert b"".join(output) == b"".join(z)
+
+
+def _zip_missing_file(tmpdir, errors):
+
+    _zip(tmpdir)
+    with open(str(tmpdir / "deleted"), "wb") as f:
+        f.write(b"hello")
+    z = ZipStream(chunk_size=4096, workers=2, on_error=lambda path, e: errors.append(path))
+    z.write(str(tmpdir / "config.txt"), "vm-1/config.txt")
+    z.write(str(tmpdir / "deleted"), "deleted")
+    z.write(str(tmpdir / "disk.qcow2"), "disk.qcow2")
+    z.write(str(tmpdir / "empty"), "empty")
+    z.writestr("project.gns3", b"{}")
+    # the file disappears before the archive is produced
+    os.remove(str(tmpdir / "deleted"))
+    return z
+
+
+def test_iter_unreadable_file(tmpdir):
+
+    errors = []
+    z = _zip_missing_file(tmpdir, errors)
+    _check(b"".join(z), tmpdir)
+    assert errors == [str(tmpdir / "deleted")]
+
+
+def test_stream_unreadable_file(tmpdir, loop):
+
+    errors = []
+    z = _zip_missing_file(tmpdir, errors)
+    output = []
+
+    @asyncio.coroutine
+    def write(data):
+        output.append(data)
+
+    loop.run_until_complete(asyncio.async(z.stream(write)))
+    _check(b"".join(output), tmpdir)
+    assert errors == [str(tmpdir / "deleted")]
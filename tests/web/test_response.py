@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+from gns3server.config import Config
+from gns3server.web.response import Response, dumps_compact, accepts_compact_json, accepted_encoding
+
+
+def request(headers):
+
+    request = MagicMock()
+    request.headers = headers
+    return request
+
+
+def test_dumps_compact():
+
+    assert dumps_compact({"b": [1, 2], "a": "/"}) == b'{"a":"/","b":[1,2]}'
+
+
+def test_dumps_compact_without_ujson():
+
+    with patch("gns3server.web.response.UJSON_AVAILABLE", False):
+        assert dumps_compact({"b": 1, "a": 2}) == b'{"a":2,"b":1}'
+
+
+def test_accepts_compact_json():
+
+    assert accepts_compact_json(request({"ACCEPT": "application/json; indent=0"}))
+    assert accepts_compact_json(request({"ACCEPT": "text/html, application/json;indent=0"}))
+    assert not accepts_compact_json(request({"ACCEPT": "application/json"}))
+    assert not accepts_compact_json(request({}))
+
+
+def test_accepted_encoding():
+
+    assert accepted_encoding(request({"ACCEPT-ENCODING": "gzip, deflate"})) == "gzip"
+    assert accepted_encoding(request({"ACCEPT-ENCODING": "deflate"})) == "deflate"
+    assert accepted_encoding(request({"ACCEPT-ENCODING": "gzip;q=0, deflate"})) == "deflate"
+    assert accepted_encoding(request({"ACCEPT-ENCODING": "br"})) is None
+    assert accepted_encoding(request({})) is None
+
+
+def test_json_compact():
+
+    response = Response(request=request({"ACCEPT": "application/json; indent=0"}))
+    response.json({"a": 1})
+    assert response.body == b'{"a":1}'
+
+
+def test_json_indent():
+
+    response = Response(request=request({}))
+    response.json({"a": 1})
+    assert response.body == b'{\n    "a": 1\n}'
+
+
+def test_json_compressed():
+
+    answer = [{"name": "image{}".format(i)} for i in range(1000)]
+    response = Response(request=request({"ACCEPT-ENCODING": "gzip"}))
+    response.json(answer)
+    assert response.headers["CONTENT-ENCODING"] == "gzip"
+    assert json.loads(gzip.decompress(response.body).decode()) == answer
+
+
+def test_json_not_compressed_below_threshold():
+
+    response = Response(request=request({"ACCEPT-ENCODING": "gzip"}))
+    response.json({"a": 1})
+    assert "CONTENT-ENCODING" not in response.headers
+
+
+def test_json_compression_disabled():
+
+    Config.instance().set("Server", "compression_threshold", "0")
+    answer = [{"name": "image{}".format(i)} for i in range(1000)]
+    response = Response(request=request({"ACCEPT-ENCODING": "gzip"}))
+    response.json(answer)
+    assert "CONTENT-ENCODING" not in response.headers
+
+
+def test_compact_json_query(server):
+
+    response = server.get("/version", headers={"ACCEPT": "application/json; indent=0"})
+    assert response.status == 200
+    assert b"\n" not in response.body
+    assert response.json["version"]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import asyncio
+
+from gns3server.web.route import Route
+from gns3server.utils.asyncio.rwlock import ReadWriteLock
+
+
+def run_calls(loop, *read_only):
+
+    running = []
+    concurrency = []
+
+    @asyncio.coroutine
+    def call():
+        running.append(1)
+        concurrency.append(len(running))
+        yield from asyncio.sleep(0.01)
+        running.pop()
+
+    tasks = [asyncio.async(Route.run_with_vm_lock("vm1", call, read_only=r)) for r in read_only]
+    loop.run_until_complete(asyncio.wait(tasks))
+    assert "vm1" not in Route._vm_locks
+    return max(concurrency)
+
+
+def test_run_with_vm_lock_readers(loop):
+
+    assert run_calls(loop, True, True, True) == 3
+
+
+def test_run_with_vm_lock_writers(loop):
+
+    assert run_calls(loop, False, True, False) == 1
+
+
+def test_read_only_call_during_long_running_call(server, project, loop):
+
+    response = server.post("/projects/{project_id}/vpcs/vms".format(project_id=project.id), {"name": "PC TEST 1"})
+    vm_id = response.json["vm_id"]
+
+    # a long running call holds the lock
+    lock = ReadWriteLock()
+    loop.run_until_complete(asyncio.async(lock.acquire_write()))
+    Route._vm_locks[vm_id] = {"lock": lock, "concurrency": 1}
+    Route._vm_operations[vm_id] = {"method": "POST", "route": "/v1/projects/{project_id}/vpcs/vms/{vm_id}/start", "started": time.monotonic()}
+    try:
+        response = server.get("/projects/{project_id}/vpcs/vms/{vm_id}".format(project_id=project.id, vm_id=vm_id))
+        assert response.status == 200
+        assert response.headers["X-GNS3-VM-OPERATION"].startswith("POST /v1/projects/{project_id}/vpcs/vms/{vm_id}/start; elapsed=")
+    finally:
+        del Route._vm_locks[vm_id]
+        del Route._vm_operations[vm_id]
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import patch
+
+from gns3server.config import Config
+from gns3server.web.route_metrics import RouteMetrics
+
+
+def test_record():
+
+    metrics = RouteMetrics()
+    metrics.record("GET", "/v1/version", 200, 0.5, input_validation_time=0.1)
+    metrics.record("GET", "/v1/version", 404, 0.5, output_validation_time=0.2)
+    routes = metrics.routes()
+    assert routes[("GET", "/v1/version")]["calls"] == 2
+    assert routes[("GET", "/v1/version")]["errors"] == 1
+    assert routes[("GET", "/v1/version")]["statuses"] == {200: 1, 404: 1}
+    assert routes[("GET", "/v1/version")]["time"] == 1.0
+    assert routes[("GET", "/v1/version")]["input_validation_time"] == 0.1
+    assert routes[("GET", "/v1/version")]["output_validations"] == 1
+    assert routes[("GET", "/v1/version")]["output_validation_time"] == 0.2
+
+
+def test_route_metrics(server):
+
+    RouteMetrics.instance().reset()
+    response = server.post("/version", {"version": "0.1"})
+    assert response.status == 409
+    metrics = RouteMetrics.instance().routes()[("POST", "/v1/version")]
+    assert metrics["calls"] == 1
+    assert metrics["errors"] == 1
+    assert metrics["input_validation_time"] > 0
+    assert metrics["output_validations"] == 0
+
+
+def test_output_validation(server):
+
+    RouteMetrics.instance().reset()
+    server.get("/version")
+    assert RouteMetrics.instance().routes()[("GET", "/v1/version")]["output_validations"] == 1
+
+
+def test_output_validation_disabled(server):
+
+    Config.instance().set("Server", "output_validation_rate", "0")
+    RouteMetrics.instance().reset()
+    with patch("gns3server.web.response.get_validator") as mock:
+        response = server.get("/version")
+        assert not mock.called
+    assert response.status == 200
+    assert RouteMetrics.instance().routes()[("GET", "/v1/version")]["output_validations"] == 0
+
+
+def test_latency_histogram():
+
+    metrics = RouteMetrics()
+    metrics.record("GET", "/v1/version", 200, 0.001)
+    metrics.record("GET", "/v1/version", 200, 0.2)
+    metrics.record("GET", "/v1/version", 200, 120)
+    buckets = metrics.routes()[("GET", "/v1/version")]["buckets"]
+    assert buckets[0] == 1
+    assert buckets[5] == 1
+    assert buckets[-1] == 1
+    assert sum(buckets) == 3
+
+
+def test_prometheus():
+
+    metrics = RouteMetrics()
+    metrics.request_started("POST", "/v1/projects/{project_id}/vpcs/vms/{vm_id}/start")
+    metrics.record_lock_wait("POST", "/v1/projects/{project_id}/vpcs/vms/{vm_id}/start", 0.5)
+    metrics.record("POST", "/v1/projects/{project_id}/vpcs/vms/{vm_id}/start", 204, 0.2, request_bytes=10, response_bytes=0)
+    text = metrics.prometheus()
+    labels = '{method="POST",route="/v1/projects/{project_id}/vpcs/vms/{vm_id}/start"'
+    assert "# TYPE gns3_http_request_duration_seconds histogram" in text
+    assert "gns3_http_requests_total" + labels + ',status="204"} 1' in text
+    assert "gns3_http_requests_in_flight" + labels + "} 1" in text
+    assert "gns3_http_request_duration_seconds_bucket" + labels.replace("{", '{le="0.1",', 1) + "} 0" in text
+    assert "gns3_http_request_duration_seconds_bucket" + labels.replace("{", '{le="0.25",', 1) + "} 1" in text
+    assert "gns3_http_request_duration_seconds_bucket" + labels.replace("{", '{le="+Inf",', 1) + "} 1" in text
+    assert "gns3_http_vm_lock_wait_seconds_sum" + labels + "} 0.5" in text
+    assert "gns3_http_request_bytes_total" + labels + "} 10" in text
+
+
+def test_route_lock_wait(server, project):
+
+    response = server.post("/projects/{project_id}/vpcs/vms".format(project_id=project.id), {"name": "PC TEST 1"})
+    vm = response.json
+    RouteMetrics.instance().reset()
+    server.get("/projects/{project_id}/vpcs/vms/{vm_id}".format(project_id=vm["project_id"], vm_id=vm["vm_id"]))
+    metrics = RouteMetrics.instance().routes()[("GET", "/v1/projects/{project_id}/vpcs/vms/{vm_id}")]
+    assert metrics["lock_waits"] == 1
+    assert metrics["in_flight"] == 0
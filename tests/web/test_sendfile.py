@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import aiohttp.web
+
+from gns3server.web.sendfile import parse_range
+
+
+def test_parse_range():
+
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 10)
+    assert parse_range("bytes=90-", 100) == (90, 10)
+    assert parse_range("bytes=-10", 100) == (90, 10)
+    assert parse_range("bytes=-200", 100) == (0, 100)
+    assert parse_range("bytes=50-200", 100) == (50, 50)
+
+
+def test_parse_range_ignored():
+
+    assert parse_range("items=0-9", 100) is None
+    assert parse_range("bytes=0-9,20-29", 100) is None
+    assert parse_range("bytes=a-b", 100) is None
+
+
+def test_parse_range_not_satisfiable():
+
+    with pytest.raises(aiohttp.web.HTTPRequestRangeNotSatisfiable) as e:
+        parse_range("bytes=100-", 100)
+    assert e.value.headers["CONTENT-RANGE"] == "bytes */100"
+    with pytest.raises(aiohttp.web.HTTPRequestRangeNotSatisfiable):
+        parse_range("bytes=10-5", 100)
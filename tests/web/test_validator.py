@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 GNS3 Technologies Inc.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import jsonschema
+
+from gns3server.web.validator import get_validator, validate
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"}
+    },
+    "required": ["name"]
+}
+
+
+def test_get_validator_cached():
+
+    assert get_validator(SCHEMA) is get_validator(SCHEMA)
+    assert get_validator(SCHEMA) is not get_validator(dict(SCHEMA))
+
+
+def test_validate():
+
+    validate({"name": "test"}, SCHEMA)
+    with pytest.raises(jsonschema.ValidationError):
+        validate({"name": 1}, SCHEMA)
+
+
+def test_invalid_schema():
+
+    with pytest.raises(jsonschema.SchemaError):
+        get_validator({"type": 42})